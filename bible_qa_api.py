@@ -11,12 +11,13 @@ import json
 import logging
 import dspy
 import argparse
+import asyncio
 import random
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from typing import Optional, Dict, Any, List
@@ -34,6 +35,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+from src.utils.answer_metrics import AnswerScorer, score_answers, summarize
+from src.utils.answer_stream import SSE_HEADERS, sse_event, stream_answer
+from src.utils.inference_executor import InferenceExecutor, InferenceSaturated, InferenceTimeout
+from src.utils.model_registry import MODEL_ADMIN_TOKEN, ModelLoadError, ModelNotFound, ModelRegistry, admin_token_error
+
 # Import Bible QA specific classes from huggingface_integration
 try:
     from src.dspy_programs.huggingface_integration import BibleQAModule, BibleQASignature
@@ -67,7 +73,15 @@ except ImportError:
 class QuestionRequest(BaseModel):
     question: str
     context: Optional[str] = ""
-    model_version: Optional[str] = "latest"
+    model_version: Optional[str] = None
+    timeout: Optional[float] = None
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[QuestionRequest]
+    timeout: Optional[float] = None
+
+class TrafficRequest(BaseModel):
+    weights: Dict[str, float]
 
 class QuestionResponse(BaseModel):
     answer: str
@@ -107,12 +121,14 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Global variables for model and config
-model = None
-model_config = None
-model_registry = {}
+# Default model path (overridden by --model-path)
+DEFAULT_MODEL_PATH = "models/dspy/bible_qa_t5/bible_qa_t5_latest"
 model_path = None
 
+# Model calls block, so they run on a bounded thread pool instead of the event loop
+inference = InferenceExecutor()
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "16"))
+
 def load_model(path=None):
     """Load the trained DSPy model.
     
@@ -126,7 +142,7 @@ def load_model(path=None):
     
     # Use default path if none provided
     if path is None:
-        path = "models/dspy/bible_qa_t5/bible_qa_t5_latest"
+        path = DEFAULT_MODEL_PATH
     
     # Set the global model path
     model_path = path
@@ -418,35 +434,26 @@ def initialize_dspy():
             logger.error(f"Error initializing fallback DSPy configuration: {e2}")
             return False
 
-def load_model_registry():
-    """Load model registry from disk or initialize a new one."""
-    registry_path = "models/registry.json"
-    if os.path.exists(registry_path):
-        try:
-            with open(registry_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading model registry: {e}")
-    
-    # Initialize registry
-    registry = {
-        "versions": {},
-        "production": None,
-        "latest": None
-    }
-    return registry
+def load_model_version(entry):
+    """Registry loader: a version is either an MLflow run or a model path."""
+    if entry.get("run_id"):
+        loaded_model, _ = load_model_from_mlflow(entry["run_id"])
+        return loaded_model
+    return load_model(entry.get("path"))
 
-def save_model_registry(registry):
-    """Save model registry to disk."""
-    registry_path = "models/registry.json"
-    os.makedirs(os.path.dirname(registry_path), exist_ok=True)
-    
-    try:
-        with open(registry_path, 'w') as f:
-            json.dump(registry, f, indent=2)
-        logger.info("Saved model registry")
-    except Exception as e:
-        logger.error(f"Error saving model registry: {e}")
+# Trained models, loaded in the background at startup; versions can be
+# promoted, rolled back or split for A/B comparison without a restart
+registry = ModelRegistry(load_model_version)
+
+# Token for promoting, rolling back and splitting traffic (--api-token or MODEL_ADMIN_TOKEN);
+# those routes answer 403 while it is unset
+admin_token = MODEL_ADMIN_TOKEN
+
+def require_admin(request: Request):
+    """FastAPI dependency rejecting model administration requests without the admin token."""
+    error = admin_token_error(request.headers, admin_token)
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
 
 def load_test_examples(num_examples=30):
     """Load a subset of examples for testing."""
@@ -517,42 +524,47 @@ def test_model_with_lm(num_examples=30):
             logger.info(f"Attempting direct model load: {e}")
             model = load_model(f"{model_path}/model")
             
-        # Evaluate on test examples
-        correct = 0
+        # Predict every test example, then score them together; failed predictions
+        # stay "" at their own index so every prediction lines up with its gold answer
         results = []
+        result_indices = []
+        predictions = [""] * len(test_examples)
         
         for i, example in enumerate(test_examples):
             try:
                 prediction = predict_answer(model, example.get("context", ""), example["question"])
-                gold_answer = example["answer"]
-                
-                # Check accuracy
-                is_correct = evaluate_answer(prediction, gold_answer)
-                if is_correct:
-                    correct += 1
-                    
+                predictions[i] = prediction
+                result_indices.append(i)
                 results.append({
                     "question": example["question"],
                     "context": example.get("context", ""),
-                    "gold_answer": gold_answer,
-                    "prediction": prediction,
-                    "is_correct": is_correct
+                    "gold_answer": example["answer"],
+                    "prediction": prediction
                 })
             except Exception as e:
                 logger.error(f"Error testing example {i}: {e}")
                 
-        # Calculate accuracy
-        accuracy = correct / len(test_examples) if test_examples else 0
+        # Failed predictions count as wrong
+        scorer = AnswerScorer([example["answer"] for example in test_examples])
+        scores = scorer.score(predictions)
+        for result, i in zip(results, result_indices):
+            result["is_correct"] = bool(scores["correct"][i])
+        metrics = summarize(scores)
+        correct = int(scores["correct"].sum())
+        accuracy = metrics.get("correct", 0.0)
         
         logger.info(f"Test Results:")
-        logger.info(f"Accuracy: {accuracy:.4f} ({correct}/{len(test_examples)})")
-        logger.info(f"Error count: {num_examples - len(results)}/{num_examples}")
+        logger.info(f"Accuracy: {accuracy:.4f} ({correct}/{len(test_examples)}), "
+                    f"95% CI [{metrics.get('correct_ci_low', 0.0):.4f}, {metrics.get('correct_ci_high', 0.0):.4f}]")
+        logger.info(f"Token F1: {metrics.get('token_f1', 0.0):.4f}, ROUGE-L: {metrics.get('rouge_l', 0.0):.4f}")
+        logger.info(f"Error count: {len(test_examples) - len(results)}/{len(test_examples)}")
         
         return {
             "status": "success",
             "accuracy": accuracy,
             "correct": correct,
             "total": len(test_examples),
+            "metrics": metrics,
             "results": results
         }
     except Exception as e:
@@ -562,6 +574,10 @@ def test_model_with_lm(num_examples=30):
 def evaluate_answer(prediction, gold_answer):
     """Evaluate if a prediction matches the gold answer.
     
+    Uses the shared accept rule of src.utils.answer_metrics: containment of
+    the normalised gold answer, or high overlap of distinct tokens (80% of
+    the smaller side for answers of up to 5 tokens, 60% otherwise).
+    
     Args:
         prediction: The model's predicted answer
         gold_answer: The correct answer
@@ -569,35 +585,8 @@ def evaluate_answer(prediction, gold_answer):
     Returns:
         bool: True if there's a match, False otherwise
     """
-    # Normalize both answers
-    gold_norm = ' '.join(gold_answer.lower().split())
-    pred_norm = ' '.join(prediction.lower().split())
-    
-    # Strict match
-    if gold_norm == pred_norm:
-        return True
-    
-    # Lenient match - check if one is substring of the other
-    if gold_norm in pred_norm or pred_norm in gold_norm:
-        return True
-        
-    # Calculate token overlap
-    gold_tokens = set(gold_norm.split())
-    pred_tokens = set(pred_norm.split())
-    
-    # If small answers, check for high overlap
-    if len(gold_tokens) <= 5 and len(pred_tokens) <= 5:
-        overlap = gold_tokens.intersection(pred_tokens)
-        if len(overlap) >= min(len(gold_tokens), len(pred_tokens)) * 0.8:
-            return True
-    
-    # For longer answers, check for good overlap
-    if len(gold_tokens) > 5 or len(pred_tokens) > 5:
-        overlap = gold_tokens.intersection(pred_tokens)
-        if len(overlap) >= min(len(gold_tokens), len(pred_tokens)) * 0.6:
-            return True
-    
-    return False
+    scores = score_answers([prediction], [gold_answer], strongs=[None])
+    return bool(scores["correct"][0])
 
 def predict_answer(model, context, question):
     """Generate an answer using the loaded model.
@@ -630,8 +619,6 @@ def predict_answer(model, context, question):
 @app.on_event("startup")
 async def startup_event():
     """Initialize the API on startup."""
-    global model, model_config
-    
     # Create logs directory if it doesn't exist
     os.makedirs("logs", exist_ok=True)
     
@@ -649,22 +636,16 @@ async def startup_event():
     # Initialize DSPy
     initialize_dspy()
     
-    # Load the model
-    model = load_model()
-    
-    if model is None:
-        logger.error("Failed to load model")
-        # We'll continue anyway and handle errors at request time
-    
-    # Load model registry
-    load_model_registry()
-    
-    # Load or create a basic model configuration
-    model_config = {
-        "model_type": "DSPy T5 Bible QA",
-        "path": model_path,
-        "loaded_at": datetime.now().isoformat()
-    }
+    # Load the production model in the background; until it is resident,
+    # questions get a 503 instead of the first request paying for the load
+    if registry.default is None:
+        registry.default = ("default", {"path": model_path or DEFAULT_MODEL_PATH, "model_type": "bible_qa_t5"})
+    registry.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop watching the model registry."""
+    registry.stop()
 
 @app.get("/", response_class=HTMLResponse)
 async def get_html(request: Request):
@@ -674,15 +655,55 @@ async def get_html(request: Request):
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {
+        "status": "healthy",
+        "model_loaded": registry.get() is not None,
+        "model_version": registry.resolve(None),
+        "inference": {"pending": inference.pending, "capacity": inference.capacity, **inference.stats}
+    }
+
+def request_timeout(requested):
+    """Per-request timeout in seconds, capped at the executor default."""
+    if requested is None or requested <= 0:
+        return inference.timeout
+    return min(requested, inference.timeout)
+
+def select_model(model_version=None):
+    """The resident model for a request: a pinned version, or the traffic split / production."""
+    if model_version:
+        resident = registry.get(model_version)
+        if resident is None:
+            try:
+                # Load in the background; the client retries once it is resident
+                registry.load_async(model_version)
+            except ModelNotFound:
+                raise HTTPException(status_code=404, detail=f"Model version {model_version} not found")
+            raise HTTPException(status_code=503, detail=f"Model version {model_version} is loading",
+                                headers={"Retry-After": "5"})
+        return resident
+    resident = registry.select()
+    if resident is None:
+        logger.error("Model not loaded. Cannot answer question.")
+        raise HTTPException(status_code=503, detail="Model not loaded", headers={"Retry-After": "5"})
+    return resident
+
+def model_info(resident):
+    """Version details reported with every answer, so A/B results can be attributed."""
+    return {
+        "model_type": "T5 Bible QA",
+        "model_version": resident.version_id,
+        "model_path": (registry.entry(resident.version_id) or {}).get("path") or "Default"
+    }
+
+def saturated_error(e):
+    """503 with a Retry-After hint for a full inference queue."""
+    logger.warning(f"Rejecting question: {e}")
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 @app.post("/api/question", response_model=QuestionResponse)
 async def answer_question(request: QuestionRequest):
     """Answer a Bible question using the trained DSPy model."""
-    # Check if model is loaded
-    if model is None:
-        logger.error("Model not loaded. Cannot answer question.")
-        raise HTTPException(status_code=500, detail="Model not loaded")
+    resident = select_model(request.model_version)
 
     try:
         # Get question and context
@@ -692,49 +713,126 @@ async def answer_question(request: QuestionRequest):
         # Log the question
         logger.info(f"Question: {question}")
         
-        # Get answer from model
-        predicted_answer = predict_answer(model, context, question)
+        # Get answer from model without blocking the event loop; identical
+        # questions already being answered share that call
+        predicted_answer = await inference.run(
+            predict_answer, resident.model, context, question,
+            key=(resident.version_id, context, question),
+            timeout=request_timeout(request.timeout)
+        )
         
         # Prepare response
         response = {
             "status": "success",
             "question": question,
             "answer": predicted_answer,
-            "model_info": {
-                "model_type": "T5 Bible QA",
-                "model_path": model_path if model_path else "Default"
-            }
+            "model_info": model_info(resident)
         }
         
         # Log the answer
         logger.info(f"Answer: {predicted_answer}")
         
         return response
+    except InferenceSaturated as e:
+        raise saturated_error(e)
+    except InferenceTimeout as e:
+        logger.error(f"Timed out answering question: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error answering question: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error answering question: {str(e)}")
 
+@app.post("/api/question/stream")
+async def stream_question(request: QuestionRequest):
+    """
+    Answer a Bible question as a server-sent event stream.
+    
+    Emits a ``token`` event for each piece of the answer as it is generated,
+    then ``done`` with the full answer, its timings and the model info (or
+    ``error``). Admission and model selection fail with a normal HTTP error
+    before the stream starts.
+    """
+    resident = select_model(request.model_version)
+    question = request.question.strip()
+    context = request.context.strip() if request.context else ""
+    logger.info(f"Streaming question: {question}")
+    
+    def on_complete(answer, stats):
+        logger.info(f"Streamed answer in {stats['seconds']}s (first token after {stats['ttft']}s): {answer}")
+    
+    try:
+        events = inference.stream(stream_answer, resident.model, context, question, None, on_complete,
+                                  timeout=request_timeout(request.timeout))
+    except InferenceSaturated as e:
+        raise saturated_error(e)
+    
+    async def body():
+        try:
+            async for event, data in events:
+                if event == "done":
+                    data = dict(data, model_info=model_info(resident))
+                yield sse_event(event, data)
+        except InferenceTimeout as e:
+            logger.error(f"Timed out streaming answer: {e}")
+            yield sse_event("error", {"error": str(e)})
+        finally:
+            # A client that disconnects stops generation at the next token
+            await events.aclose()
+    
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/batch_question")
+async def answer_questions(request: BatchQuestionRequest):
+    """
+    Answer several questions as one micro-batch.
+    
+    The batch is admitted as a whole or refused with 503. Duplicate questions
+    are answered once and the rest run concurrently; a question that fails or
+    times out is reported in its own entry without failing the others.
+    The whole batch is answered by one model version.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(request.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {MAX_BATCH_QUESTIONS} questions per batch")
+    
+    resident = select_model(request.questions[0].model_version)
+    items = [(resident.model, (q.context or "").strip(), q.question.strip()) for q in request.questions]
+    try:
+        results = await inference.run_batch(
+            predict_answer, items,
+            keys=[(resident.version_id, context, question) for _, context, question in items],
+            timeout=request_timeout(request.timeout)
+        )
+    except InferenceSaturated as e:
+        raise saturated_error(e)
+    
+    answers = []
+    for (_, _, question), result in zip(items, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error answering batched question '{question}': {result}")
+            answers.append({"question": question, "status": "error", "error": str(result)})
+        else:
+            answers.append({"question": question, "status": "success", "answer": result})
+    
+    return {
+        "status": "success",
+        "answers": answers,
+        "model_info": model_info(resident)
+    }
+
 @app.get("/api/models", response_model=Dict[str, Any])
 async def list_models():
-    """List available models in the registry."""
-    global model_registry
-    
-    # Convert registry to proper format for API response
-    versions = []
-    for version_id, info in model_registry.get("versions", {}).items():
-        versions.append({
-            "version_id": version_id,
-            "run_id": info.get("run_id"),
-            "creation_time": info.get("creation_time"),
-            "model_type": info.get("model_type"),
-            "description": info.get("description"),
-            "is_production": version_id == model_registry.get("production")
-        })
-    
+    """List model versions with their load time, memory and traffic share."""
+    status = registry.status()
     return {
-        "available_models": versions,
-        "current_production": model_registry.get("production"),
-        "latest": model_registry.get("latest")
+        "available_models": status["versions"],
+        "current_production": status["production"],
+        "previous": status["previous"],
+        "latest": status["latest"],
+        "traffic": status["traffic"],
+        "ready": status["ready"]
     }
 
 @app.post("/api/models/register", response_model=Dict[str, Any])
@@ -743,31 +841,22 @@ async def register_model(
     description: Optional[str] = Query(None, description="Description of this model version")
 ):
     """Register a model from MLflow into the model registry."""
-    global model_registry
-    
     try:
         # Check if MLflow run exists
         client = MlflowClient()
-        run = client.get_run(run_id)
+        client.get_run(run_id)
         
         # Create version ID
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         version_id = f"mlflow_{run_id[:8]}_{timestamp}"
         
         # Add to registry
-        model_registry["versions"][version_id] = {
+        registry.register(version_id, {
             "run_id": run_id,
             "creation_time": timestamp,
             "model_type": "bible_qa_t5",
-            "description": description or f"Registered from MLflow run {run_id}",
-            "is_production": False
-        }
-        
-        # Update latest
-        model_registry["latest"] = version_id
-        
-        # Save registry
-        save_model_registry(model_registry)
+            "description": description or f"Registered from MLflow run {run_id}"
+        })
         
         return {
             "status": "success",
@@ -779,51 +868,65 @@ async def register_model(
         logger.error(f"Error registering model: {e}")
         raise HTTPException(status_code=500, detail=f"Error registering model: {str(e)}")
 
-@app.post("/api/models/{version_id}/promote", response_model=Dict[str, Any])
+@app.post("/api/models/{version_id}/promote", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
 async def promote_model(version_id: str):
-    """Promote a model version to production."""
-    global model, model_config, model_registry
+    """
+    Promote a model version to production.
     
-    if version_id not in model_registry.get("versions", {}):
+    The version is loaded first (off the event loop) and then swapped in;
+    the current version keeps answering until then, and if the load fails.
+    """
+    try:
+        resident = await asyncio.to_thread(registry.promote, version_id)
+    except ModelNotFound:
         raise HTTPException(status_code=404, detail=f"Model version {version_id} not found")
+    except ModelLoadError as e:
+        logger.error(f"Error promoting model: {e}")
+        raise HTTPException(status_code=500, detail=f"Error promoting model: {str(e)}")
+    
+    return {
+        "status": "success",
+        "message": f"Model version {version_id} promoted to production",
+        "version_id": resident.version_id,
+        "previous": registry.status()["previous"]
+    }
+
+@app.post("/api/models/rollback", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
+async def rollback_model():
+    """Return production to the previous version, which is still resident."""
+    try:
+        resident = await asyncio.to_thread(registry.rollback)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=409, detail=str(e.args[0]))
+    except ModelLoadError as e:
+        logger.error(f"Error rolling back model: {e}")
+        raise HTTPException(status_code=500, detail=f"Error rolling back model: {str(e)}")
     
+    return {
+        "status": "success",
+        "message": f"Rolled back to model version {resident.version_id}",
+        "version_id": resident.version_id
+    }
+
+@app.post("/api/models/traffic", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
+async def set_model_traffic(request: TrafficRequest):
+    """
+    Split questions between model versions by weight, e.g. {"weights": {"v2": 0.9, "v3": 0.1}}.
+    
+    An empty mapping sends all traffic to production again; promoting a
+    version also ends the split.
+    """
     try:
-        # Get version info
-        version_info = model_registry["versions"][version_id]
-        
-        # Load the model
-        if "run_id" in version_info:
-            # Load from MLflow
-            new_model, new_config = load_model_from_mlflow(version_info["run_id"])
-        elif "path" in version_info:
-            # Load from file path
-            new_model, new_config = load_model(version_info["path"])
-        else:
-            raise ValueError("No source path or run_id found for this version")
-        
-        if new_model is None:
-            raise ValueError("Failed to load model for this version")
-        
-        # Update global model
-        model = new_model
-        model_config = new_config
-        
-        # Mark as production
-        model_registry["production"] = version_id
-        model_registry["versions"][version_id]["is_production"] = True
-        
-        # Save registry
-        save_model_registry(model_registry)
-        
-        return {
-            "status": "success",
-            "message": f"Model version {version_id} promoted to production",
-            "version_id": version_id
-        }
+        weights = await asyncio.to_thread(registry.set_traffic, request.weights)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Model version {e.args[0]} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelLoadError as e:
+        logger.error(f"Error setting model traffic: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
     
-    except Exception as e:
-        logger.error(f"Error promoting model: {e}")
-        raise HTTPException(status_code=500, detail=f"Error promoting model: {str(e)}")
+    return {"status": "success", "traffic": weights}
 
 def parse_args():
     """Parse command line arguments for the API server."""
@@ -843,7 +946,8 @@ def parse_args():
     parser.add_argument("--run-id", type=str, help="MLflow run ID to load model from")
     
     # API token configuration
-    parser.add_argument("--api-token", type=str, help="API token for authentication")
+    parser.add_argument("--api-token", type=str,
+                        help="Token required by the model promote/rollback/traffic routes (default: MODEL_ADMIN_TOKEN)")
     
     # LM configurations
     parser.add_argument("--use-claude", action="store_true", help="Use Claude API for inference")
@@ -868,8 +972,10 @@ def parse_args():
 
 def main():
     """Main function for the Bible QA API server."""
-    global model_path
+    global model_path, admin_token
     args = parse_args()
+    if args.api_token:
+        admin_token = args.api_token
     
     # Ensure model directory exists
     model_path = args.model_path
@@ -932,10 +1038,10 @@ def main():
             logger.error(f"Failed to configure HuggingFace API: {e}")
             logger.error("Falling back to default configuration")
     
-    # If a specific MLflow run ID is provided, load model from MLflow
+    # If a specific MLflow run ID is provided, serve that run's model by default
     if args.run_id:
         logger.info(f"Loading model from MLflow run: {args.run_id}")
-        model, config = load_model_from_mlflow(args.run_id)
+        registry.default = (f"mlflow_{args.run_id[:8]}", {"run_id": args.run_id, "model_type": "bible_qa_t5"})
     else:
         # Otherwise, load model from path (handled by app startup)
         pass
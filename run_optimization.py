@@ -7,6 +7,7 @@ avoiding batch file issues.
 
 Usage:
     python run_optimization.py --method better_together --iterations 10 --target 0.95
+    python run_optimization.py --sweep bootstrap,miprov2,simba --lm-budget 3000
 """
 
 import os
@@ -53,6 +54,19 @@ def parse_args():
         default=0.95,
         help="Target accuracy to achieve (0.0-1.0)"
     )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default="",
+        help="Search these optimizers' configurations concurrently with a shared LM call cache "
+             "(e.g. bootstrap,miprov2,simba) instead of running --method"
+    )
+    parser.add_argument(
+        "--lm-budget",
+        type=int,
+        default=0,
+        help="LM calls allowed for the sweep (0 for unlimited)"
+    )
     return parser.parse_args()
 
 def verify_lm_studio():
@@ -163,6 +177,34 @@ def run_optimization(method, iterations, target):
         logger.error(f"Error running optimization: {e}")
         return False
 
+def run_optimizer_sweep(optimizers, lm_budget):
+    """Run the concurrent, cached optimizer sweep of train_dspy_bible_qa.py."""
+    logger.info(f"Running optimizer sweep over {optimizers} with an LM budget of {lm_budget or 'unlimited'} calls")
+    try:
+        result = subprocess.run(
+            [
+                "python", "train_dspy_bible_qa.py",
+                "--lm-studio",
+                "--sweep", optimizers,
+                "--lm-budget", str(lm_budget),
+                "--experiment-name", "bible_qa_optimization"
+            ],
+            check=False,
+            capture_output=True,
+            text=True
+        )
+        
+        logger.info(f"Optimizer sweep completed with exit code: {result.returncode}")
+        if result.returncode != 0:
+            logger.warning(f"Optimizer sweep returned non-zero exit code: {result.returncode}")
+            logger.warning(f"STDOUT: {result.stdout}")
+            logger.warning(f"STDERR: {result.stderr}")
+        
+        return result.returncode == 0
+    except Exception as e:
+        logger.error(f"Error running optimizer sweep: {e}")
+        return False
+
 def analyze_results():
     """Analyze the optimization results."""
     logger.info("Analyzing optimization results...")
@@ -223,7 +265,10 @@ def main():
     start_mlflow_server()  # Continue even if this fails
     
     # Step 5: Run optimization
-    success = run_optimization(args.method, args.iterations, args.target)
+    if args.sweep:
+        success = run_optimizer_sweep(args.sweep, args.lm_budget)
+    else:
+        success = run_optimization(args.method, args.iterations, args.target)
     
     # Step 6: Analyze results
     analyze_results()  # Continue even if this fails
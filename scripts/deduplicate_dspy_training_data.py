@@ -1,37 +1,39 @@
 #!/usr/bin/env python3
 """
-Deduplicate DSPy training data files by (context, labels) pair.
+Deduplicate DSPy training data files by (context, labels) pair, including
+paraphrased near-duplicates.
+
+Examples whose normalised context+labels shingles are estimated to be at
+least --threshold similar (MinHash/LSH, see src/utils/near_duplicates.py) are
+reduced to the first of each group. Files are streamed, not loaded whole.
 """
 import os
-import json
+import sys
 import glob
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.near_duplicates import DEFAULT_THRESHOLD, deduplicate_jsonl
 
 DATA_DIR = 'data/processed/dspy_training_data/'
+FIELDS = ('context', 'labels')
 
-def deduplicate_file(file_path):
-    seen = set()
-    deduped_lines = []
-    with open(file_path, encoding='utf-8') as f:
-        for line in f:
-            try:
-                obj = json.loads(line)
-                key = (obj.get('context'), json.dumps(obj.get('labels', None), sort_keys=True))
-                if key not in seen:
-                    seen.add(key)
-                    deduped_lines.append(line.rstrip())
-            except Exception:
-                continue
-    with open(file_path, 'w', encoding='utf-8') as f:
-        for l in deduped_lines:
-            f.write(l + '\n')
-    return len(deduped_lines)
+def deduplicate_file(file_path, threshold=DEFAULT_THRESHOLD):
+    tmp_path = file_path + '.dedup'
+    stats = deduplicate_jsonl(file_path, tmp_path, threshold=threshold, fields=FIELDS)
+    os.replace(tmp_path, file_path)
+    return stats['input'], stats['kept']
 
 def main():
-    files = glob.glob(os.path.join(DATA_DIR, '*.jsonl'))
+    parser = argparse.ArgumentParser(description="Remove near-duplicate examples from DSPy training data")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Similarity at which examples count as duplicates (1.0 > t > 0)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+    files = glob.glob(os.path.join(args.data_dir, '*.jsonl'))
     for file_path in files:
-        before = sum(1 for _ in open(file_path, encoding='utf-8'))
-        after = deduplicate_file(file_path)
+        before, after = deduplicate_file(file_path, args.threshold)
         print(f"{file_path}: {before} -> {after} unique examples")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -15,6 +15,9 @@ import argparse
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.jsonl_store import JsonlDataset
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -71,18 +74,10 @@ def parse_args():
     return parser.parse_args()
 
 def load_jsonl_file(file_path: str) -> List[Dict]:
-    """Load a JSONL file into a list of dictionaries."""
-    data = []
+    """Load a JSONL file into a list of dictionaries (malformed lines are skipped)."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip() and not line.startswith("//"):
-                    try:
-                        item = json.loads(line.strip())
-                        data.append(item)
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Error parsing JSON line: {e}")
-                        continue
+        with JsonlDataset(file_path) as dataset:
+            data = list(dataset)
         logger.info(f"Loaded {len(data)} items from {file_path}")
         return data
     except FileNotFoundError:
@@ -24,6 +24,11 @@ from datetime import datetime
 import psycopg
 from psycopg.rows import dict_row
 import re
+import math
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.training_data_engine import TEMPLATES, TrainingDataEngine, load_templates
 
 # Configure logging
 logging.basicConfig(
@@ -83,158 +88,39 @@ def save_jsonl(data, filename):
     logger.info(f"Saved {len(data)} examples to {filepath}")
     return filepath
 
+def qa_engine(limit=None, templates=None):
+    """Template engine for QA examples; with a limit, templates share it evenly."""
+    templates = templates or TEMPLATES
+    max_per_template = None
+    if limit:
+        max_per_template = math.ceil(limit / sum(len(t) for t in templates.values()))
+    return TrainingDataEngine(templates, max_per_template=max_per_template)
+
 def generate_qa_dataset(conn, limit=1000):
-    """Generate Question-Answer pairs for Bible verses."""
-    qa_pairs = []
-    
-    # Example 1: Get some key Genesis verses for QA pairs
-    try:
-        with conn.cursor(row_factory=dict_row) as cur:
-            # Genesis creation account
-            cur.execute("""
-                SELECT book_name, chapter_num, verse_num, verse_text 
-                FROM bible.verses 
-                WHERE book_name = 'Genesis' 
-                AND chapter_num = 1 
-                AND verse_num BETWEEN 1 AND 10
-                ORDER BY chapter_num, verse_num
-            """)
-            genesis_verses = cur.fetchall()
-            
-            # Create QA pairs for Genesis 1:1
-            if genesis_verses and len(genesis_verses) > 0:
-                gen1_1 = next((v for v in genesis_verses if v['verse_num'] == 1), None)
-                if gen1_1:
-                    qa_pairs.append({
-                        "context": gen1_1['verse_text'],
-                        "question": "Who created the heavens and the earth?",
-                        "answer": "God",
-                        "metadata": {
-                            "book": gen1_1['book_name'],
-                            "chapter": gen1_1['chapter_num'],
-                            "verse": gen1_1['verse_num'],
-                            "type": "factual"
-                        }
-                    })
-                    
-                    qa_pairs.append({
-                        "context": gen1_1['verse_text'],
-                        "question": "What did God create in the beginning?",
-                        "answer": "The heavens and the earth",
-                        "metadata": {
-                            "book": gen1_1['book_name'],
-                            "chapter": gen1_1['chapter_num'],
-                            "verse": gen1_1['verse_num'],
-                            "type": "factual"
-                        }
-                    })
-            
-            # Get John 3:16
-            cur.execute("""
-                SELECT book_name, chapter_num, verse_num, verse_text 
-                FROM bible.verses 
-                WHERE book_name = 'John' 
-                AND chapter_num = 3 
-                AND verse_num = 16
-            """)
-            john3_16 = cur.fetchone()
-            
-            if john3_16:
-                qa_pairs.append({
-                    "context": john3_16['verse_text'],
-                    "question": "What did God give because of his love for the world?",
-                    "answer": "His one and only Son",
-                    "metadata": {
-                        "book": john3_16['book_name'],
-                        "chapter": john3_16['chapter_num'],
-                        "verse": john3_16['verse_num'],
-                        "type": "theological"
-                    }
-                })
-                
-                qa_pairs.append({
-                    "context": john3_16['verse_text'],
-                    "question": "Why did God give his one and only Son?",
-                    "answer": "Because he loved the world",
-                    "metadata": {
-                        "book": john3_16['book_name'],
-                        "chapter": john3_16['chapter_num'],
-                        "verse": john3_16['verse_num'],
-                        "type": "theological"
-                    }
-                })
-            
-            # Get some Psalm verses
-            cur.execute("""
-                SELECT book_name, chapter_num, verse_num, verse_text 
-                FROM bible.verses 
-                WHERE book_name = 'Psalms' 
-                AND chapter_num = 23
-                ORDER BY verse_num
-                LIMIT 6
-            """)
-            psalm23_verses = cur.fetchall()
-            
-            if psalm23_verses:
-                psalm23_1 = next((v for v in psalm23_verses if v['verse_num'] == 1), None)
-                if psalm23_1:
-                    qa_pairs.append({
-                        "context": psalm23_1['verse_text'],
-                        "question": "Who is the psalmist's shepherd?",
-                        "answer": "The LORD",
-                        "metadata": {
-                            "book": psalm23_1['book_name'],
-                            "chapter": psalm23_1['chapter_num'],
-                            "verse": psalm23_1['verse_num'],
-                            "type": "theological"
-                        }
-                    })
-            
-            # Add questions about theological terms
-            cur.execute("""
-                SELECT h.book_name, h.chapter_num, h.verse_num, h.word_text, h.strongs_id, e.gloss
-                FROM bible.hebrew_ot_words h
-                JOIN bible.hebrew_entries e ON h.strongs_id = e.strongs_id
-                WHERE h.strongs_id IN ('H430', 'H3068', 'H113', 'H2617', 'H539')
-                LIMIT 100
-            """)
-            theological_terms = cur.fetchall()
-            
-            for term in theological_terms:
-                if term['strongs_id'] == 'H430':  # Elohim
-                    qa_pairs.append({
-                        "context": f"Hebrew word '{term['word_text']}' (Strong's ID: {term['strongs_id']}) in {term['book_name']} {term['chapter_num']}:{term['verse_num']}",
-                        "question": "What is the meaning of the Hebrew word 'Elohim'?",
-                        "answer": term['gloss'] or "God, gods, judges, angels",
-                        "metadata": {
-                            "book": term['book_name'],
-                            "chapter": term['chapter_num'],
-                            "verse": term['verse_num'],
-                            "strongs_id": term['strongs_id'],
-                            "type": "lexical"
-                        }
-                    })
-                elif term['strongs_id'] == 'H3068':  # YHWH
-                    qa_pairs.append({
-                        "context": f"Hebrew word '{term['word_text']}' (Strong's ID: {term['strongs_id']}) in {term['book_name']} {term['chapter_num']}:{term['verse_num']}",
-                        "question": "What is the meaning of the Hebrew name 'YHWH'?",
-                        "answer": term['gloss'] or "LORD, Yahweh, the proper name of the God of Israel",
-                        "metadata": {
-                            "book": term['book_name'],
-                            "chapter": term['chapter_num'],
-                            "verse": term['verse_num'],
-                            "strongs_id": term['strongs_id'],
-                            "type": "lexical"
-                        }
-                    })
-    
-    except Exception as e:
-        logger.error(f"Error generating QA dataset: {e}", exc_info=True)
-        # Roll back any open transaction
-        conn.rollback()
+    """Generate Question-Answer pairs for Bible verses, lexemes, names and morphology codes.
     
+    Each source table is streamed once and expanded through the templates in
+    src/utils/training_data_engine.py; duplicates are dropped as they stream.
+    """
+    engine = qa_engine(limit)
+    qa_pairs = list(engine.iter_examples(conn, limit=limit))
+    logger.info(f"QA generation: {engine.stats['rows']} rows, {engine.stats['candidates']} candidates, "
+                f"{engine.stats['duplicates']} duplicates dropped")
     return qa_pairs
 
+def write_qa_dataset(conn, filename="qa_dataset.jsonl", limit=None, templates=None):
+    """Stream QA examples straight to a JSONL file (bounded memory for the full corpus)."""
+    engine = qa_engine(limit, templates)
+    filepath = OUTPUT_DIR / filename
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(f"// DSPy training data for {filename.split('.')[0]}\n")
+        f.write(f"// Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        stats = engine.write_jsonl(conn, f, limit=limit)
+    
+    logger.info(f"Saved {stats['examples']} examples to {filepath} "
+                f"({stats['candidates']} candidates, {stats['duplicates']} duplicates dropped)")
+    return stats['examples']
+
 def generate_summarization_dataset(conn, limit=500):
     """Generate passage-summary pairs."""
     summaries = []
@@ -633,8 +519,16 @@ def theological_term_preservation(prediction, reference):
     
     return eval_examples
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate DSPy training data")
+    parser.add_argument("--qa-limit", type=int, default=1000,
+                        help="QA examples to generate (0 = every example the templates produce)")
+    parser.add_argument("--templates", help="JSON file replacing the built-in QA templates")
+    return parser.parse_args()
+
 def main():
     """Main function to orchestrate DSPy training data generation."""
+    args = parse_args()
     logger.info("Starting DSPy training data generation")
     
     try:
@@ -646,8 +540,8 @@ def main():
         conn.autocommit = True  # Use autocommit mode to avoid transaction issues
         
         # Generate datasets
-        qa_data = generate_qa_dataset(conn)
-        save_jsonl(qa_data, "qa_dataset.jsonl")
+        templates = load_templates(args.templates) if args.templates else None
+        qa_count = write_qa_dataset(conn, limit=args.qa_limit or None, templates=templates)
         
         summarization_data = generate_summarization_dataset(conn)
         save_jsonl(summarization_data, "summarization_dataset.jsonl")
@@ -671,7 +565,7 @@ def main():
         
         # Generate consolidated README
         datasets = {
-            "qa_dataset.jsonl": len(qa_data),
+            "qa_dataset.jsonl": qa_count,
             "summarization_dataset.jsonl": len(summarization_data),
             "translation_dataset.jsonl": len(translation_data),
             "theological_terms_dataset.jsonl": len(theological_terms_data),
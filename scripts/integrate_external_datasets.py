@@ -14,7 +14,6 @@ import sys
 import json
 import logging
 import argparse
-import random
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -22,6 +21,9 @@ from datetime import datetime
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.utils.jsonl_store import JsonlDataset
+from src.utils.near_duplicates import NearDuplicateIndex, split_by_group
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -60,13 +62,9 @@ def load_qa_dataset(file_path: Path) -> List[Dict[str, Any]]:
         qa_pairs = []
         
         if file_path.suffix == '.jsonl':
-            # Read JSONL file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    qa_pairs.append(json.loads(line))
+            # Read JSONL file through its sidecar index
+            with JsonlDataset(file_path) as dataset:
+                qa_pairs = list(dataset)
         
         elif file_path.suffix == '.json':
             # Read JSON file
@@ -144,31 +142,27 @@ def load_internal_dataset() -> List[Dict[str, Any]]:
         logger.error(f"Error loading internal dataset: {e}")
         return []
 
-def deduplicate_dataset(qa_pairs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def deduplicate_dataset(qa_pairs: List[Dict[str, Any]], threshold: float = 0.8) -> List[Dict[str, Any]]:
     """
-    Remove duplicate QA pairs based on question text.
+    Remove near-duplicate QA pairs (paraphrases included), keeping the first of each group.
     
     Args:
         qa_pairs: List of QA pairs
+        threshold: Estimated question+answer similarity at which pairs are duplicates
         
     Returns:
         Deduplicated list of QA pairs
     """
     try:
-        # Use a set to track seen questions
-        seen_questions = set()
-        deduplicated_pairs = []
+        groups = NearDuplicateIndex(threshold=threshold).assign(qa_pairs)
         
-        for qa_pair in qa_pairs:
-            question = qa_pair.get("question", "").strip().lower()
-            
-            # Skip if question has already been seen
-            if question in seen_questions:
-                continue
-            
-            # Add to deduplicated list and mark as seen
-            deduplicated_pairs.append(qa_pair)
-            seen_questions.add(question)
+        # A pair that opens a new group is the first of its kind
+        deduplicated_pairs = []
+        next_group = 0
+        for qa_pair, group in zip(qa_pairs, groups):
+            if group == next_group:
+                deduplicated_pairs.append(qa_pair)
+                next_group += 1
         
         logger.info(f"Deduplicated dataset from {len(qa_pairs)} to {len(deduplicated_pairs)} QA pairs")
         return deduplicated_pairs
@@ -181,6 +175,9 @@ def create_train_val_split(qa_pairs: List[Dict[str, Any]], train_pct: float = 0.
     """
     Create a train/validation split of the dataset.
     
+    Near-duplicate pairs are kept together, so no paraphrase of a
+    validation question is trained on.
+    
     Args:
         qa_pairs: List of QA pairs
         train_pct: Percentage of data to use for training
@@ -189,23 +186,11 @@ def create_train_val_split(qa_pairs: List[Dict[str, Any]], train_pct: float = 0.
         Dictionary with train and val splits
     """
     try:
-        # Shuffle the data
-        random.seed(42)
-        random.shuffle(qa_pairs)
-        
-        # Calculate split indices
-        train_size = int(len(qa_pairs) * train_pct)
+        splits = split_by_group(qa_pairs, {"train": train_pct, "val": 1 - train_pct}, seed=42)
         
-        # Split the data
-        train_data = qa_pairs[:train_size]
-        val_data = qa_pairs[train_size:]
+        logger.info(f"Split dataset into {len(splits['train'])} training and {len(splits['val'])} validation examples")
         
-        logger.info(f"Split dataset into {len(train_data)} training and {len(val_data)} validation examples")
-        
-        return {
-            "train": train_data,
-            "val": val_data
-        }
+        return splits
     
     except Exception as e:
         logger.error(f"Error creating train/val split: {e}")
@@ -3,7 +3,8 @@
 Split DSPy Dataset
 
 Split a DSPy dataset into training and validation sets with 
-a configurable ratio.
+a configurable ratio. Near-duplicate examples (paraphrases included) always
+land in the same set.
 
 Usage:
     python scripts/split_dspy_dataset.py --input-file PATH --train-ratio RATIO
@@ -12,11 +13,14 @@ Usage:
 import os
 import sys
 import json
-import random
 import logging
 import argparse
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.jsonl_store import JsonlDataset
+from src.utils.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, split_by_group
 
 # Configure logging
 logging.basicConfig(
@@ -29,11 +33,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def load_dataset(file_path: str) -> List[Dict[str, Any]]:
-    """Load a dataset from a JSON file."""
+def load_dataset(file_path: str) -> Sequence[Dict[str, Any]]:
+    """Load a dataset from a JSON file, or index a JSONL file without parsing it."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if file_path.endswith('.jsonl'):
+            data = JsonlDataset(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         logger.info(f"Loaded {len(data)} examples from {file_path}")
         return data
     except Exception as e:
@@ -41,28 +48,25 @@ def load_dataset(file_path: str) -> List[Dict[str, Any]]:
         return []
 
 def split_dataset(
-    dataset: List[Dict[str, Any]], 
+    dataset: Sequence[Dict[str, Any]], 
     train_ratio: float = 0.8,
-    random_seed: int = 42
+    random_seed: int = 42,
+    threshold: float = DEFAULT_THRESHOLD
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """Split a dataset into training and validation sets."""
+    """Split a dataset into training and validation sets, keeping near-duplicate groups together."""
     if not dataset:
         logger.error("Cannot split empty dataset")
         return [], []
     
-    # Set random seed for reproducibility
-    random.seed(random_seed)
-    
-    # Shuffle the dataset
-    shuffled = dataset.copy()
-    random.shuffle(shuffled)
-    
-    # Calculate split point
-    split_idx = int(len(shuffled) * train_ratio)
+    # Indexed JSONL files are grouped from their cached question/answer columns
+    index = NearDuplicateIndex(threshold=threshold)
+    groups = index.assign(dataset.project(index.fields) if isinstance(dataset, JsonlDataset) else dataset)
     
-    # Split into training and validation sets
-    train_set = shuffled[:split_idx]
-    val_set = shuffled[split_idx:]
+    # Groups are shuffled with the seed and assigned whole
+    splits = split_by_group(dataset, {"train": train_ratio, "val": 1 - train_ratio},
+                            seed=random_seed, groups=groups)
+    train_set = splits["train"]
+    val_set = splits["val"]
     
     logger.info(f"Split dataset into {len(train_set)} training and {len(val_set)} validation examples")
     return train_set, val_set
@@ -83,7 +87,7 @@ def main():
     parser.add_argument(
         "--input-file", 
         default="data/processed/dspy_training_data/bible_corpus/dspy/expanded_bible_corpus_dataset.json",
-        help="Path to input dataset"
+        help="Path to input dataset (.json, or .jsonl read through its index)"
     )
     parser.add_argument(
         "--train-ratio", 
@@ -97,6 +101,12 @@ def main():
         default=42,
         help="Random seed for reproducibility"
     )
+    parser.add_argument(
+        "--dedup-threshold", 
+        type=float, 
+        default=DEFAULT_THRESHOLD,
+        help="Similarity at which examples are kept in the same split"
+    )
     parser.add_argument(
         "--train-output", 
         default="data/processed/dspy_training_data/bible_corpus/dspy/expanded_bible_corpus_dataset_train.json",
@@ -120,7 +130,8 @@ def main():
     train_set, val_set = split_dataset(
         dataset, 
         train_ratio=args.train_ratio,
-        random_seed=args.random_seed
+        random_seed=args.random_seed,
+        threshold=args.dedup_threshold
     )
     
     # Save datasets
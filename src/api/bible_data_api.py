@@ -0,0 +1,246 @@
+"""
+Bible Data API
+
+JSON endpoints for lexicon, verse, proper name, morphology, concordance,
+cross-reference and Arabic Bible data. Every route is a thin wrapper around
+the in-process service in src/services, which the web_app HTML routes call
+directly; these endpoints exist for external clients and for deployments that
+point RemoteBibleDataService at a separate API server. Responses carry ETags
+and are cached server-side (src/services/response_cache.py).
+
+Registered under the /api prefix.
+"""
+
+import logging
+
+from flask import Blueprint, jsonify, request
+
+from src.services import BibleDataService, ServiceError
+from src.services.export import CONCORDANCE_COLUMNS, EXPORT_FORMATS, streaming_export
+from src.services.response_cache import get_response_cache
+from src.services.queries import MORPHOLOGY_TABLES
+
+logger = logging.getLogger(__name__)
+
+bible_data_api = Blueprint('bible_data', __name__)
+
+# Responses are cached until the next ETL load bumps the data version;
+# streamed exports are left to the client
+get_response_cache().register_blueprint(bible_data_api, exclude={'concordance_export'})
+
+# The blueprint always queries the database in-process, whatever backend the
+# web routes are configured to use
+service = BibleDataService()
+
+
+@bible_data_api.errorhandler(ServiceError)
+def handle_service_error(e):
+    return jsonify({'error': e.message}), e.status
+
+
+def _limit(default: int, maximum: int = 500) -> int:
+    return max(1, min(request.args.get('limit', default, type=int), maximum))
+
+
+def _verse_args():
+    book = request.args.get('book', '')
+    chapter = request.args.get('chapter', type=int)
+    verse = request.args.get('verse', type=int)
+    if not book or chapter is None or verse is None:
+        raise ServiceError("book, chapter and verse are required", 400)
+    return book, chapter, verse
+
+
+def _language(language: str) -> str:
+    if language not in MORPHOLOGY_TABLES:
+        raise ServiceError(f"Unknown language: {language}", 404)
+    return language
+
+
+def _found(data, message: str):
+    if data is None:
+        raise ServiceError(message, 404)
+    return jsonify(data)
+
+
+# Lexicon and verses
+
+@bible_data_api.route('/lexicon/stats', methods=['GET'])
+def lexicon_stats():
+    return jsonify(service.lexicon_stats())
+
+
+@bible_data_api.route('/lexicon/search', methods=['GET'])
+def lexicon_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ServiceError("Query parameter 'q' is required", 400)
+    return jsonify(service.search_lexicon(query, language=request.args.get('lang'), limit=_limit(50)))
+
+
+@bible_data_api.route('/lexicon/<language>/<strongs_id>', methods=['GET'])
+def lexicon_entry(language, strongs_id):
+    return _found(service.lexicon_entry(_language(language), strongs_id),
+                  f"Lexicon entry {strongs_id} not found")
+
+
+@bible_data_api.route('/verses/search', methods=['GET'])
+def verses_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ServiceError("Query parameter 'q' is required", 400)
+    return jsonify(service.search_verses(query, translation=request.args.get('translation'),
+                                         limit=_limit(50)))
+
+
+@bible_data_api.route('/tagged/verse', methods=['GET'])
+def tagged_verse():
+    return _found(service.tagged_verse(*_verse_args()), "Verse not found")
+
+
+@bible_data_api.route('/search', methods=['GET'])
+def search():
+    """Search used by the search page: ?type=lexicon (with lang) or ?type=verse."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ServiceError("Query parameter 'q' is required", 400)
+    if request.args.get('type', 'lexicon') == 'verse':
+        return jsonify({'verses': service.search_verses(query, limit=_limit(50))})
+    return jsonify({'lexicon': service.search_lexicon(query, language=request.args.get('lang'),
+                                                      limit=_limit(50))})
+
+
+@bible_data_api.route('/lexicon/hebrew/validate_critical_terms', methods=['GET'])
+def validate_critical_terms():
+    return jsonify(service.validate_critical_terms())
+
+
+@bible_data_api.route('/theological_terms_report', methods=['GET'])
+def theological_terms_report():
+    return jsonify(service.theological_terms_report())
+
+
+# Proper names
+
+@bible_data_api.route('/names', methods=['GET'])
+def names():
+    return jsonify(service.list_names(limit=_limit(5)))
+
+
+@bible_data_api.route('/names/types', methods=['GET'])
+def name_types():
+    return jsonify(service.name_types())
+
+
+@bible_data_api.route('/names/search', methods=['GET'])
+def names_search():
+    return jsonify(service.search_names(
+        query=request.args.get('q', ''),
+        search_type=request.args.get('type', 'name'),
+        name_type=request.args.get('name_type', ''),
+        gender=request.args.get('gender', ''),
+        book=request.args.get('book', ''),
+        offset=max(0, request.args.get('offset', 0, type=int)),
+        limit=_limit(50),
+    ))
+
+
+@bible_data_api.route('/names/<int:name_id>', methods=['GET'])
+def name_detail(name_id):
+    return _found(service.get_name(name_id), f"Proper name {name_id} not found")
+
+
+@bible_data_api.route('/verse/names', methods=['GET'])
+def verse_names():
+    return jsonify({'names': service.verse_names(*_verse_args())})
+
+
+# Morphology
+
+@bible_data_api.route('/morphology/<language>', methods=['GET'])
+def morphology_search(language):
+    return jsonify(service.search_morphology(_language(language), request.args.get('code', ''),
+                                             limit=_limit(25)))
+
+
+@bible_data_api.route('/morphology/<language>/<code>', methods=['GET'])
+def morphology_code(language, code):
+    return _found(service.get_morphology_code(_language(language), code),
+                  f"Morphology code {code} not found")
+
+
+@bible_data_api.route('/<language>/words', methods=['GET'])
+def words_by_grammar_code(language):
+    code = request.args.get('grammar_code', '')
+    if not code:
+        raise ServiceError("Query parameter 'grammar_code' is required", 400)
+    return jsonify(service.words_by_grammar_code(_language(language), code, limit=_limit(10)))
+
+
+# Concordance, cross references, semantic search
+
+@bible_data_api.route('/concordance/<strongs_id>', methods=['GET'])
+def concordance(strongs_id):
+    return jsonify(service.concordance(strongs_id, limit=_limit(500, 5000)))
+
+
+@bible_data_api.route('/concordance/<strongs_id>/export', methods=['GET'])
+def concordance_export(strongs_id):
+    """Stream every occurrence as CSV, TSV or JSON Lines (?format=), gzipped if accepted."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ServiceError(f"Unsupported export format: {fmt}", 400)
+    arabic = request.args.get('arabic', '').lower() == 'true'
+    rows = service.iter_concordance(strongs_id, arabic=arabic)
+    return streaming_export(rows, CONCORDANCE_COLUMNS, f"concordance_{strongs_id}", fmt=fmt,
+                            accept_encoding=request.headers.get('Accept-Encoding', ''))
+
+
+@bible_data_api.route('/concordance/arabic/<strongs_id>', methods=['GET'])
+def arabic_concordance(strongs_id):
+    return jsonify(service.arabic_concordance(strongs_id, limit=_limit(500, 5000)))
+
+
+@bible_data_api.route('/cross-references', methods=['GET'])
+def cross_references():
+    return _found(service.cross_references(*_verse_args(), limit=_limit(20, 100)), "Verse not found")
+
+
+@bible_data_api.route('/semantic-search', methods=['GET'])
+def semantic_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ServiceError("Query parameter 'q' is required", 400)
+    return jsonify(service.semantic_search(query, limit=_limit(20, 100),
+                                           translation=request.args.get('translation', 'KJV')))
+
+
+# Arabic Bible
+
+@bible_data_api.route('/arabic/stats', methods=['GET'])
+def arabic_stats():
+    return jsonify(service.arabic_stats())
+
+
+@bible_data_api.route('/arabic/verse', methods=['GET'])
+def arabic_verse():
+    return _found(service.arabic_verse(*_verse_args()), "Arabic verse not found")
+
+
+@bible_data_api.route('/arabic/context', methods=['GET'])
+def arabic_context():
+    context = min(max(request.args.get('context', 3, type=int), 0), 20)
+    return jsonify(service.arabic_context(*_verse_args(), context=context))
+
+
+@bible_data_api.route('/arabic/search', methods=['GET'])
+def arabic_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ServiceError("Query parameter 'q' is required", 400)
+    return jsonify(service.arabic_search(query, book=request.args.get('book') or None, limit=_limit(50)))
+
+
+@bible_data_api.route('/arabic/parallel', methods=['GET'])
+def arabic_parallel():
+    return jsonify(service.arabic_parallel(*_verse_args()))
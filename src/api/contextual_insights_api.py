@@ -83,7 +83,8 @@ def get_contextual_insights():
 
 @api_blueprint.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "ok"})
+    from src.utils.lm_client import get_lm_client
+    return jsonify({"status": "ok", "lm_metrics": get_lm_client().metrics.snapshot()})
 
 app.register_blueprint(api_blueprint)
 
@@ -1,9 +1,13 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import logging
-from src.utils.db_utils import get_db_connection
+from src.services import BibleDataService, ServiceError
+from src.services.response_cache import get_response_cache
 
 api_blueprint = Blueprint('cross_language', __name__)
 
+# Term data only changes when an ETL runs
+get_response_cache().register_blueprint(api_blueprint)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -11,47 +15,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger('cross_language_api')
 
+# Featured mappings shown by default; any other alignment is served from the
+# bible.cross_language_alignments view via ?strongs= or ?all=1
 MAPPINGS = [
-    {"hebrew": "יהוה", "greek": "θεός", "arabic": "الله", "strongs": "H3068"},
-    {"hebrew": "אלהים", "greek": "θεός", "arabic": "الله", "strongs": "H430"}
+    {"hebrew": "יהוה", "greek": "θεός", "arabic": "الله", "strongs": "H3068", "greek_strongs": "G2316"},
+    {"hebrew": "אלהים", "greek": "θεός", "arabic": "الله", "strongs": "H430", "greek_strongs": "G2316"}
 ]
 
+service = BibleDataService()
+
 @api_blueprint.route('/terms', methods=['GET'])
 def get_cross_language_terms():
-    results = []
-    conn = get_db_connection()
+    """
+    Cross-language term mappings with occurrence counts.
+
+    Counts come from the precomputed term statistics (src/utils/term_stats.py),
+    so a request costs at most one indexed read and usually none.
+
+    Query parameters:
+        strongs: Return every Hebrew<->Greek<->Arabic alignment involving this ID
+        all: Return all alignments, most frequent first (with limit/offset)
+    """
     try:
-        with conn.cursor() as cur:
-            for mapping in MAPPINGS:
-                # Hebrew count
-                cur.execute(
-                    "SELECT COUNT(*) FROM bible.hebrew_ot_words WHERE strongs_id = %s AND word_text = %s",
-                    (mapping['strongs'], mapping['hebrew'])
-                )
-                hebrew_count = cur.fetchone()[0]
-                # Greek count
-                cur.execute(
-                    "SELECT COUNT(*) FROM bible.greek_nt_words WHERE strongs_id = %s AND word_text = %s",
-                    (mapping['strongs'], mapping['greek'])
-                )
-                greek_count = cur.fetchone()[0]
-                # Arabic count
-                cur.execute(
-                    "SELECT COUNT(*) FROM bible.arabic_words WHERE arabic_word = %s",
-                    (mapping['arabic'],)
-                )
-                arabic_count = cur.fetchone()[0]
-                results.append({
-                    "hebrew": mapping['hebrew'],
-                    "greek": mapping['greek'],
-                    "arabic": mapping['arabic'],
-                    "strongs": mapping['strongs'],
-                    "counts": {"hebrew": hebrew_count, "greek": greek_count, "arabic": arabic_count}
-                })
-        return jsonify(results)
-    except Exception as e:
+        return jsonify(service.cross_language_terms(
+            MAPPINGS,
+            strongs_id=request.args.get('strongs'),
+            all_terms=request.args.get('all', '').lower() in ('1', 'true'),
+            limit=min(request.args.get('limit', 50, type=int), 500),
+            offset=request.args.get('offset', 0, type=int),
+        ))
+    except ServiceError as e:
         logger.error(f"Error fetching cross-language terms: {e}")
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if conn:
-            conn.close() 
\ No newline at end of file
+        return jsonify({'error': e.message}), e.status
@@ -5,10 +5,11 @@ This API provides endpoints for Bible question answering with DSPy 2.6 features:
 - Multi-turn conversation history
 - Enhanced theological accuracy via assertions
 - MLflow integration for tracking
+- Token streaming (server-sent events) via the /stream variants of the ask endpoints
 
 Version: 2.0.0
 """
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 import os
 import sys
 import json
@@ -17,6 +18,9 @@ import dspy
 import mlflow
 from datetime import datetime
 
+from src.utils.answer_stream import SSE_HEADERS, sse_event, stream_answer
+from src.utils.model_registry import ModelLoadError, ModelNotFound, ModelRegistry, admin_token_error
+
 # Configure logger
 logging.basicConfig(
     level=logging.INFO,
@@ -31,23 +35,36 @@ logger = logging.getLogger(__name__)
 # Create Blueprint for DSPy API
 api_blueprint = Blueprint('dspy', __name__)
 
-# Initialize model (loaded on first request)
-dspy_model = None
-model_loading_error = None
-
 # Conversation history storage
 # In a production environment, this would use a database
 conversation_histories = {}
 
-# Import the dspy modules once the blueprint is ready
-@api_blueprint.before_app_first_request
-def initialize_dspy_model():
-    """Initialize the DSPy model when the app starts."""
-    global dspy_model, model_loading_error
+# Saved programs are models/dspy/bible_qa_*.dspy; the newest serves unless
+# models/dspy/registry.json promotes another one
+MODEL_DIR = "models/dspy"
+
+def load_dspy_program(entry):
+    """Registry loader: a saved DSPy program, or a new BibleQAModule if there is none."""
+    if entry.get("path"):
+        return dspy.Module.load(entry["path"])
+    from src.dspy_programs.bible_qa_dspy26 import BibleQAModule
+    logger.warning("No trained model found, using default BibleQAModule")
+    return BibleQAModule()
+
+model_registry = ModelRegistry(
+    load_dspy_program,
+    path=os.path.join(MODEL_DIR, "registry.json"),
+    default=("default", {"description": "Untrained BibleQAModule"}),
+    patterns=[os.path.join(MODEL_DIR, "bible_qa_*.dspy")]
+)
+model_loading_error = None
+
+@api_blueprint.record_once
+def initialize_dspy_model(state):
+    """Configure DSPy when the blueprint is registered and start loading models in the background."""
+    global model_loading_error
     
     try:
-        # Import DSPy components
-        from src.dspy_programs.bible_qa_dspy26 import BibleQAModule
         from src.dspy_programs.huggingface_integration import configure_teacher_model
         
         # Set up MLflow for tracking
@@ -57,42 +74,105 @@ def initialize_dspy_model():
         # Configure LM
         lm = configure_teacher_model(model_category="high")
         dspy.settings.configure(lm=lm)
-        
-        # Find the latest model
-        model_dir = "models/dspy"
-        if os.path.exists(model_dir):
-            model_files = [f for f in os.listdir(model_dir) 
-                          if f.startswith("bible_qa_") and f.endswith(".dspy")]
-            
-            if model_files:
-                # Sort by modification time (newest first)
-                model_files.sort(key=lambda f: os.path.getmtime(os.path.join(model_dir, f)), reverse=True)
-                model_path = os.path.join(model_dir, model_files[0])
-                
-                # Load the model
-                logger.info(f"Loading DSPy model from {model_path}")
-                dspy_model = dspy.Module.load(model_path)
-                logger.info("DSPy model loaded successfully")
-            else:
-                # Fall back to a new model if no saved model is found
-                logger.warning("No trained model found, using default BibleQAModule")
-                dspy_model = BibleQAModule()
-        else:
-            # Fall back to a new model if directory doesn't exist
-            logger.warning(f"Model directory {model_dir} not found, using default BibleQAModule")
-            dspy_model = BibleQAModule()
-            
     except Exception as e:
         logger.error(f"Error initializing DSPy model: {e}")
         model_loading_error = str(e)
+        return
+    
+    # Load the production program eagerly so the first request does not pay for it
+    model_registry.start()
+
+def current_model(session_id=None):
+    """The resident program for a request, from the traffic split or production."""
+    resident = model_registry.select(key=session_id)
+    if resident is None:
+        if not model_registry.ready:
+            return None, (jsonify({"error": "DSPy model is loading"}), 503, {"Retry-After": "5"})
+        return None, (jsonify({
+            "error": "DSPy model not initialized",
+            "details": model_loading_error or model_registry.status()
+        }), 500)
+    return resident, None
+
+def remember_turn(session_id, history, question, answer):
+    """Append a turn to a session's history, keeping the last 10 turns."""
+    history.append((question, answer))
+    
+    # Limit history to last 10 turns
+    if len(history) > 10:
+        history = history[-10:]
+        
+    # Store updated history
+    conversation_histories[session_id] = history
+    return history
+
+def stream_events(resident, session_id, question, context, run_prefix):
+    """
+    Server-sent events for one streamed answer.
+    
+    History and the MLflow run are recorded only once the answer is complete,
+    so a client that disconnects mid-answer leaves no partial turn behind.
+    """
+    history = conversation_histories.get(session_id, [])
+    
+    def on_complete(answer, stats):
+        # Record the turn first: a tracking failure must not lose the answer
+        history_length = len(history)
+        remember_turn(session_id, history, question, answer)
+        try:
+            with mlflow.start_run(run_name=f"{run_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+                mlflow.log_param("question", question)
+                mlflow.log_param("context_length", len(context))
+                mlflow.log_param("history_length", history_length)
+                mlflow.log_param("model_version", resident.version_id)
+                mlflow.log_param("streamed", True)
+                mlflow.log_metric("response_length", len(answer))
+                mlflow.log_metric("time_to_first_token", stats["ttft"] or stats["seconds"])
+                mlflow.log_metric("response_seconds", stats["seconds"])
+        except Exception as e:
+            logger.error(f"Error logging streamed answer to MLflow: {e}")
+    
+    for event, data in stream_answer(resident.model, context, question, history=list(history),
+                                     on_complete=on_complete):
+        if event == "done":
+            data = dict(data, question=question, session_id=session_id,
+                        history_length=len(conversation_histories.get(session_id, [])),
+                        model_version=resident.version_id)
+        yield sse_event(event, data)
+
+def stream_request(with_context):
+    """Validate an ask request and start streaming its answer."""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No JSON data provided"}), 400
+    
+    question = data.get('question')
+    if not question:
+        return jsonify({"error": "No question provided"}), 400
+    
+    context = data.get('context', "") if with_context else ""
+    session_id = data.get('session_id', request.remote_addr)
+    
+    # A session stays on one model version during a traffic split
+    resident, error = current_model(session_id)
+    if error is not None:
+        return error
+    
+    run_prefix = "api_ask_context_stream" if with_context else "api_ask_stream"
+    events = stream_events(resident, session_id, question, context, run_prefix)
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers=SSE_HEADERS)
 
 @api_blueprint.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
-    global dspy_model, model_loading_error
-    
-    status = "ok" if dspy_model is not None else "error"
-    message = "DSPy API is running with model loaded" if dspy_model is not None else f"Error loading model: {model_loading_error}"
+    resident = model_registry.get()
+    status = "ok" if resident is not None else "error"
+    if resident is not None:
+        message = f"DSPy API is running with model {resident.version_id} loaded"
+    elif not model_registry.ready:
+        message = "DSPy model is loading"
+    else:
+        message = f"Error loading model: {model_loading_error}"
     
     return jsonify({
         "status": status,
@@ -112,14 +192,6 @@ def ask_question():
         "session_id": "optional-session-id-for-conversation-history"
     }
     """
-    global dspy_model
-    
-    if dspy_model is None:
-        return jsonify({
-            "error": "DSPy model not initialized",
-            "details": model_loading_error
-        }), 500
-    
     # Get request data
     try:
         data = request.get_json()
@@ -133,6 +205,11 @@ def ask_question():
         # Get session ID for conversation history
         session_id = data.get('session_id', request.remote_addr)
         
+        # A session stays on one model version during a traffic split
+        resident, error = current_model(session_id)
+        if error is not None:
+            return error
+        
         # Get conversation history for this session
         history = conversation_histories.get(session_id, [])
         
@@ -141,7 +218,9 @@ def ask_question():
             mlflow.log_param("question", question)
             mlflow.log_param("history_length", len(history))
             
-            prediction = dspy_model(
+            mlflow.log_param("model_version", resident.version_id)
+            
+            prediction = resident.model(
                 context="",
                 question=question,
                 history=history
@@ -150,21 +229,15 @@ def ask_question():
             mlflow.log_metric("response_length", len(prediction.answer))
         
         # Update conversation history
-        history.append((question, prediction.answer))
-        
-        # Limit history to last 10 turns
-        if len(history) > 10:
-            history = history[-10:]
-            
-        # Store updated history
-        conversation_histories[session_id] = history
+        history = remember_turn(session_id, history, question, prediction.answer)
         
         # Return the answer
         return jsonify({
             "question": question,
             "answer": prediction.answer,
             "session_id": session_id,
-            "history_length": len(history)
+            "history_length": len(history),
+            "model_version": resident.version_id
         })
         
     except Exception as e:
@@ -186,14 +259,6 @@ def ask_with_context():
         "session_id": "optional-session-id-for-conversation-history"
     }
     """
-    global dspy_model
-    
-    if dspy_model is None:
-        return jsonify({
-            "error": "DSPy model not initialized",
-            "details": model_loading_error
-        }), 500
-    
     # Get request data
     try:
         data = request.get_json()
@@ -209,6 +274,11 @@ def ask_with_context():
         # Get session ID for conversation history
         session_id = data.get('session_id', request.remote_addr)
         
+        # A session stays on one model version during a traffic split
+        resident, error = current_model(session_id)
+        if error is not None:
+            return error
+        
         # Get conversation history for this session
         history = conversation_histories.get(session_id, [])
         
@@ -218,7 +288,9 @@ def ask_with_context():
             mlflow.log_param("context_length", len(context))
             mlflow.log_param("history_length", len(history))
             
-            prediction = dspy_model(
+            mlflow.log_param("model_version", resident.version_id)
+            
+            prediction = resident.model(
                 context=context,
                 question=question,
                 history=history
@@ -227,14 +299,7 @@ def ask_with_context():
             mlflow.log_metric("response_length", len(prediction.answer))
         
         # Update conversation history
-        history.append((question, prediction.answer))
-        
-        # Limit history to last 10 turns
-        if len(history) > 10:
-            history = history[-10:]
-            
-        # Store updated history
-        conversation_histories[session_id] = history
+        history = remember_turn(session_id, history, question, prediction.answer)
         
         # Return the answer
         return jsonify({
@@ -242,7 +307,8 @@ def ask_with_context():
             "answer": prediction.answer,
             "context": context,
             "session_id": session_id,
-            "history_length": len(history)
+            "history_length": len(history),
+            "model_version": resident.version_id
         })
         
     except Exception as e:
@@ -252,6 +318,21 @@ def ask_with_context():
             "details": str(e)
         }), 500
 
+@api_blueprint.route('/ask/stream', methods=['POST'])
+def ask_question_stream():
+    """
+    Streaming variant of /ask: the answer arrives as server-sent events.
+    
+    Events are ``token`` ({"text": ...}) for each piece of the answer, then
+    ``done`` with the full answer, session and model version, or ``error``.
+    """
+    return stream_request(with_context=False)
+
+@api_blueprint.route('/ask_with_context/stream', methods=['POST'])
+def ask_with_context_stream():
+    """Streaming variant of /ask_with_context; events as for /ask/stream."""
+    return stream_request(with_context=True)
+
 @api_blueprint.route('/conversation', methods=['GET'])
 def get_conversation_history():
     """
@@ -297,4 +378,78 @@ def clear_conversation_history():
     return jsonify({
         "status": "ok",
         "message": f"Conversation history cleared for session {session_id}"
-    }) 
\ No newline at end of file
+    }) 
+
+@api_blueprint.route('/models', methods=['GET'])
+def list_models():
+    """Model versions with their load time, memory, request counts and traffic share."""
+    return jsonify(model_registry.status())
+
+def admin_required(f):
+    """Reject model administration requests without the configured MODEL_ADMIN_TOKEN."""
+    from functools import wraps
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = admin_token_error(request.headers)
+        if error:
+            return jsonify({"error": error[1]}), error[0]
+        return f(*args, **kwargs)
+    return decorated
+
+@api_blueprint.route('/models/<version_id>/promote', methods=['POST'])
+@admin_required
+def promote_model(version_id):
+    """Load a version if needed, then make it production without a restart."""
+    try:
+        resident = model_registry.promote(version_id)
+    except ModelNotFound:
+        return jsonify({"error": f"Model version {version_id} not found"}), 404
+    except ModelLoadError as e:
+        return jsonify({"error": "Error promoting model", "details": str(e)}), 500
+    
+    return jsonify({
+        "status": "ok",
+        "version_id": resident.version_id,
+        "previous": model_registry.status()["previous"]
+    })
+
+@api_blueprint.route('/models/rollback', methods=['POST'])
+@admin_required
+def rollback_model():
+    """Return production to the previous version."""
+    try:
+        resident = model_registry.rollback()
+    except ModelNotFound as e:
+        return jsonify({"error": str(e.args[0])}), 409
+    except ModelLoadError as e:
+        return jsonify({"error": "Error rolling back model", "details": str(e)}), 500
+    
+    return jsonify({"status": "ok", "version_id": resident.version_id})
+
+@api_blueprint.route('/models/traffic', methods=['POST'])
+@admin_required
+def set_model_traffic():
+    """
+    Split sessions between versions by weight.
+    
+    Expected JSON payload:
+    {
+        "weights": {"bible_qa_v2": 0.9, "bible_qa_v3": 0.1}
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    weights = data.get('weights')
+    if not isinstance(weights, dict):
+        return jsonify({"error": "No weights provided"}), 400
+    
+    try:
+        weights = model_registry.set_traffic(weights)
+    except ModelNotFound as e:
+        return jsonify({"error": f"Model version {e.args[0]} not found"}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except ModelLoadError as e:
+        return jsonify({"error": "Error loading model", "details": str(e)}), 500
+    
+    return jsonify({"status": "ok", "traffic": weights})
@@ -17,6 +17,8 @@ from psycopg2.extras import RealDictCursor
 import requests
 from dotenv import load_dotenv
 
+from src.utils.reference_engine import parse as parse_reference
+
 # Import secure connection (if available, otherwise fall back to direct connection)
 try:
     from src.database.secure_connection import get_secure_connection
@@ -109,6 +111,22 @@ def get_embedding(text):
         logger.error(f"Error getting embedding from LM Studio: {e}")
         return None
 
+def get_reference_param():
+    """
+    Read the verse reference from the request.
+    
+    Accepts either a free-form ``reference`` parameter (e.g. "1 John 1:9",
+    "Jhn.3.16") or separate ``book``/``chapter``/``verse`` parameters.
+    """
+    reference = request.args.get('reference', '').strip()
+    if not reference and request.args.get('book'):
+        reference = "{} {}:{}".format(
+            request.args.get('book', ''),
+            request.args.get('chapter', '1'),
+            request.args.get('verse', '1'),
+        )
+    return reference
+
 def validate_translation(translation):
     """Validate and normalize translation code."""
     # Get list of valid translations
@@ -203,7 +221,8 @@ def similar_verses():
     Find verses similar to a reference verse.
     
     Parameters:
-    - reference: Verse reference (e.g., "John 3:16")
+    - reference: Verse reference (e.g., "John 3:16", "Jhn.3.16")
+    - book, chapter, verse: Alternative to reference
     - translation: Bible translation (default: KJV)
     - limit: Maximum number of results (default: 10)
     
@@ -212,7 +231,7 @@ def similar_verses():
     """
     try:
         # Get parameters
-        reference = request.args.get('reference', '')
+        reference = get_reference_param()
         translation = validate_translation(request.args.get('translation', 'KJV'))
         limit = min(int(request.args.get('limit', 10)), 50)  # Cap at 50 results
         
@@ -220,21 +239,11 @@ def similar_verses():
             return jsonify({"error": "Parameter 'reference' is required"}), 400
         
         # Parse the verse reference
-        parts = reference.strip().split()
-        if len(parts) < 2:
+        parsed = parse_reference(reference)
+        if parsed is None:
             return jsonify({"error": "Invalid verse reference format"}), 400
         
-        book_name = " ".join(parts[:-1])
-        chapter_verse = parts[-1].split(":")
-        
-        if len(chapter_verse) != 2:
-            return jsonify({"error": "Invalid verse reference format"}), 400
-        
-        try:
-            chapter_num = int(chapter_verse[0])
-            verse_num = int(chapter_verse[1])
-        except ValueError:
-            return jsonify({"error": "Invalid chapter or verse number"}), 400
+        key = parsed.start_id
         
         # Connect to the database
         conn = get_db_connection()
@@ -245,13 +254,11 @@ def similar_verses():
         SELECT v.id as verse_id 
         FROM bible.verses v
         WHERE v.translation_source = %s
-        AND v.chapter = %s
-        AND v.verse = %s
-        AND LOWER(v.book) = LOWER(%s)
+        AND v.verse_key = %s
         LIMIT 1
         """
         
-        cursor.execute(verse_query, (translation, chapter_num, verse_num, book_name))
+        cursor.execute(verse_query, (translation, key))
         verse_result = cursor.fetchone()
         
         if not verse_result:
@@ -310,7 +317,8 @@ def compare_translations():
     Compare translations of a verse using vector similarity.
     
     Parameters:
-    - reference: Verse reference (e.g., "John 3:16")
+    - reference: Verse reference (e.g., "John 3:16", "Jhn.3.16")
+    - book, chapter, verse: Alternative to reference
     - base_translation: Base translation to compare against (default: KJV)
     
     Returns:
@@ -318,28 +326,18 @@ def compare_translations():
     """
     try:
         # Get parameters
-        reference = request.args.get('reference', '')
+        reference = get_reference_param()
         base_translation = validate_translation(request.args.get('base_translation', 'KJV'))
         
         if not reference:
             return jsonify({"error": "Parameter 'reference' is required"}), 400
         
         # Parse the verse reference
-        parts = reference.strip().split()
-        if len(parts) < 2:
-            return jsonify({"error": "Invalid verse reference format"}), 400
-        
-        book_name = " ".join(parts[:-1])
-        chapter_verse = parts[-1].split(":")
-        
-        if len(chapter_verse) != 2:
+        parsed = parse_reference(reference)
+        if parsed is None:
             return jsonify({"error": "Invalid verse reference format"}), 400
         
-        try:
-            chapter_num = int(chapter_verse[0])
-            verse_num = int(chapter_verse[1])
-        except ValueError:
-            return jsonify({"error": "Invalid chapter or verse number"}), 400
+        key = parsed.start_id
         
         # Connect to the database
         conn = get_db_connection()
@@ -351,14 +349,12 @@ def compare_translations():
                v.verse_text, e.translation_source, e.embedding
         FROM bible.verse_embeddings e
         JOIN bible.verses v ON e.verse_id = v.id
-        WHERE e.book_name = %s
-        AND e.chapter_num = %s
-        AND e.verse_num = %s
+        WHERE e.verse_key = %s
         AND e.translation_source = %s
         LIMIT 1
         """
         
-        cursor.execute(base_query, (book_name, chapter_num, verse_num, base_translation))
+        cursor.execute(base_query, (key, base_translation))
         base_verse = cursor.fetchone()
         
         if not base_verse:
@@ -370,13 +366,11 @@ def compare_translations():
                v.verse_text, e.translation_source, e.embedding
         FROM bible.verse_embeddings e
         JOIN bible.verses v ON e.verse_id = v.id
-        WHERE e.book_name = %s
-        AND e.chapter_num = %s
-        AND e.verse_num = %s
+        WHERE e.verse_key = %s
         AND e.translation_source != %s
         """
         
-        cursor.execute(trans_query, (book_name, chapter_num, verse_num, base_translation))
+        cursor.execute(trans_query, (key, base_translation))
         translations = cursor.fetchall()
         
         # Close the connection
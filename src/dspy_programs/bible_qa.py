@@ -23,6 +23,8 @@ try:
 except ImportError:
     raise ImportError("DSPy is required. Install with: pip install dspy")
 
+from src.utils.question_router import QuestionRouter, get_question_router
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -204,37 +206,7 @@ class TheologicalBibleQA(dspy.Module):
         Returns:
             bool: True if complex, False otherwise
         """
-        # Check for markers of complex questions
-        complexity_markers = [
-            "how does", "compare", "relationship between", 
-            "theological significance", "how do", "what are the implications",
-            "interpret", "symbolism", "different views", "reconcile",
-            "connection between", "how would", "why did"
-        ]
-        
-        # Check if any markers are present
-        question_lower = question.lower()
-        for marker in complexity_markers:
-            if marker in question_lower:
-                return True
-        
-        # Check for presence of multiple theological terms
-        theological_terms = [
-            "salvation", "justification", "sanctification", "redemption",
-            "atonement", "covenant", "grace", "faith", "trinity", "incarnation",
-            "predestination", "election", "sin", "resurrection", "messiah",
-            "prophecy", "apocalypse", "heaven", "hell", "judgment"
-        ]
-        
-        term_count = sum(1 for term in theological_terms if term in question_lower)
-        if term_count >= 2:
-            return True
-        
-        # Check question length as a proxy for complexity
-        if len(question.split()) > 15:
-            return True
-        
-        return False
+        return get_question_router().is_complex(question)
 
 # Integrated Bible QA system with enhanced features
 class IntegratedBibleQA(dspy.Module):
@@ -247,8 +219,10 @@ class IntegratedBibleQA(dspy.Module):
     3. Leverages the integrated dataset capabilities
     """
     
-    def __init__(self):
+    def __init__(self, router: Optional[QuestionRouter] = None):
         super().__init__()
+        # Routing runs before every LM call; see src/utils/question_router.py
+        self.router = router or get_question_router()
         # Initialize sub-modules
         self.basic_qa = BibleQA()
         self.theological_qa = TheologicalBibleQA()
@@ -268,12 +242,13 @@ class IntegratedBibleQA(dspy.Module):
             Object with answer attribute (and potentially other attributes)
         """
         # Determine question type
-        question_type = self._classify_question(question)
+        decision = self.router.analyze(question)
+        question_type = decision.route
         
         # Route to appropriate sub-module
         if question_type == "theological_term":
             # Extract term information
-            term, language, strongs_id = self._extract_term_info(question)
+            term, language, strongs_id = self.router.extract_term(question, decision)
             result = self.term_analyzer(term=term, language=language, strongs_id=strongs_id)
             
             # Reformat result to standard format
@@ -302,36 +277,7 @@ class IntegratedBibleQA(dspy.Module):
         Returns:
             str: Question type
         """
-        question_lower = question.lower()
-        
-        # Check for theological term questions
-        term_patterns = [
-            "meaning of", "what does", "definition of", "etymology of",
-            "translate", "translation of", "hebrew word", "greek word", 
-            "strong's", "strongs", "lexicon"
-        ]
-        
-        for pattern in term_patterns:
-            if pattern in question_lower:
-                return "theological_term"
-        
-        # Check for complex theological questions
-        if self.theological_qa._is_complex_question(question):
-            return "complex_theological"
-        
-        # Check for conversational questions (requires history to use)
-        conversational_markers = [
-            "follow up", "related to that", "on that note", "additionally",
-            "furthermore", "building on", "continuing", "earlier", "previous",
-            "you mentioned", "you said", "elaborate", "expand", "tell me more"
-        ]
-        
-        for marker in conversational_markers:
-            if marker in question_lower:
-                return "conversational"
-        
-        # Default to basic question
-        return "basic"
+        return self.router.route(question)
     
     def _extract_term_info(self, question):
         """
@@ -343,52 +289,7 @@ class IntegratedBibleQA(dspy.Module):
         Returns:
             tuple: (term, language, strongs_id)
         """
-        # Default values
-        term = ""
-        language = ""
-        strongs_id = ""
-        
-        question_lower = question.lower()
-        
-        # Try to extract term
-        term_markers = ["meaning of", "definition of", "what does", "translate"]
-        for marker in term_markers:
-            if marker in question_lower:
-                # Find the term after the marker
-                pos = question_lower.find(marker) + len(marker)
-                remaining = question[pos:].strip()
-                
-                # Extract the term
-                if "mean" in remaining:
-                    term = remaining.split("mean")[0].strip()
-                elif "?" in remaining:
-                    term = remaining.split("?")[0].strip()
-                else:
-                    term = remaining.strip()
-                
-                # Clean up the term
-                term = term.strip("\"'.,;: ")
-                if term.startswith("the "):
-                    term = term[4:]
-                break
-        
-        # Try to extract language
-        if "hebrew" in question_lower:
-            language = "Hebrew"
-        elif "greek" in question_lower:
-            language = "Greek"
-        elif "aramaic" in question_lower:
-            language = "Aramaic"
-        
-        # Try to extract Strong's ID
-        if "strong's" in question_lower or "strongs" in question_lower:
-            import re
-            # Look for patterns like H1234 or G5678
-            matches = re.findall(r'[HG]\d{1,4}', question)
-            if matches:
-                strongs_id = matches[0]
-        
-        return term, language, strongs_id
+        return self.router.extract_term(question)
 
 # Function to create a DSPy Bible QA model
 def create_bible_qa_model(model_type="basic"):
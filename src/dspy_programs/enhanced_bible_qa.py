@@ -35,7 +35,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 # Import database utilities
 from src.database.connection import get_db_connection, get_connection_string
 from src.database.secure_connection import get_secure_connection, secure_connection
-from src.utils.bible_reference_parser import parse_reference
+from src.utils.verse_keys import key_range_condition, reference_key_ranges
+from src.utils.lexicon_service import get_lexicon_service
 from src.utils.vector_search import search_verses_by_semantic_similarity
 
 # Configure logging
@@ -232,42 +233,33 @@ class EnhancedBibleQA:
             translation = self.default_translation
             
         context_verses = []
-        conn = self._get_db_connection()
         
+        # Resolve every reference to verse_key ranges and fetch them in one query
+        ranges = reference_key_ranges(references)
+        if not ranges:
+            return ""
+        condition, params = key_range_condition("verse_key", ranges)
+        
+        conn = self._get_db_connection()
         with conn.cursor() as cur:
-            for ref in references:
-                try:
-                    # Parse the reference
-                    parsed = parse_reference(ref)
-                    if not parsed:
-                        continue
-                        
-                    book, chapter, verse_start, verse_end = parsed
-                    
-                    # If verse_end is None, set it to verse_start for single verse lookup
-                    if verse_end is None:
-                        verse_end = verse_start
-                    
-                    # Query the database
-                    query = """
-                    SELECT book_name, chapter_num, verse_num, verse_text
-                    FROM bible.verses
-                    WHERE book_name = %s
-                    AND chapter_num = %s
-                    AND verse_num BETWEEN %s AND %s
-                    AND translation_source = %s
-                    ORDER BY chapter_num, verse_num
-                    """
-                    
-                    cur.execute(query, (book, chapter, verse_start, verse_end, translation))
-                    verses = cur.fetchall()
+            try:
+                query = f"""
+                SELECT book_name, chapter_num, verse_num, verse_text
+                FROM bible.verses
+                WHERE {condition}
+                AND translation_source = %s
+                ORDER BY verse_key
+                """
+                
+                cur.execute(query, params + [translation])
+                for verse in cur.fetchall():
+                    if hasattr(verse, 'keys'):
+                        verse = (verse['book_name'], verse['chapter_num'], verse['verse_num'], verse['verse_text'])
+                    book_name, chapter_num, verse_num, verse_text = verse
+                    context_verses.append(f"{book_name} {chapter_num}:{verse_num}: {verse_text}")
                     
-                    for verse in verses:
-                        book_name, chapter_num, verse_num, verse_text = verse
-                        context_verses.append(f"{book_name} {chapter_num}:{verse_num}: {verse_text}")
-                        
-                except Exception as e:
-                    logger.error(f"Error looking up reference {ref}: {e}")
+            except Exception as e:
+                logger.error(f"Error looking up references {references}: {e}")
         
         return "\n".join(context_verses)
     
@@ -295,92 +287,38 @@ class EnhancedBibleQA:
             return ""
     
     def _get_theological_terms(self, terms: List[str]) -> str:
-        """Look up theological terms in the database."""
+        """Look up theological terms in the lexicon (served from the in-process cache)."""
         if not terms:
             return ""
             
-        conn = self._get_db_connection()
+        lexicon = get_lexicon_service()
         term_info = []
         
-        with conn.cursor() as cur:
-            for term in terms:
-                # Extract Strong's ID if present (e.g., "H430")
-                strongs_match = re.search(r'([HG]\d+)', term)
-                
-                if strongs_match:
-                    strongs_id = strongs_match.group(1)
-                    
-                    # Query the appropriate table based on Strong's ID prefix
-                    if strongs_id.startswith('H'):
-                        query = """
-                        SELECT strongs_id, hebrew_word as term, transliteration, definition
-                        FROM bible.hebrew_entries
-                        WHERE strongs_id = %s
-                        """
-                    else:  # G prefix
-                        query = """
-                        SELECT strongs_id, greek_word as term, transliteration, definition
-                        FROM bible.greek_entries
-                        WHERE strongs_id = %s
-                        """
-                    
-                    cur.execute(query, (strongs_id,))
-                    results = cur.fetchall()
-                    
-                    for result in results:
-                        # Handle both tuple and dict result types
-                        if isinstance(result, dict):
-                            s_id = result.get('strongs_id', '')
-                            s_term = result.get('term', '')
-                            s_trans = result.get('transliteration', '')
-                            s_def = result.get('definition', '')
-                        else:  # Handle as tuple
-                            s_id = result[0] if len(result) > 0 else ''
-                            s_term = result[1] if len(result) > 1 else ''
-                            s_trans = result[2] if len(result) > 2 else ''
-                            s_def = result[3] if len(result) > 3 else ''
-                        term_info.append(f"{s_id} ({s_trans}): {s_def}")
-                else:
-                    # Try to look up by transliteration
-                    # Remove parentheses if present
-                    clean_term = re.sub(r'[\(\)]', '', term).strip()
-                    
-                    # Try Hebrew entries first
-                    query = """
-                    SELECT strongs_id, hebrew_word as term, transliteration, definition
-                    FROM bible.hebrew_entries
-                    WHERE LOWER(transliteration) = LOWER(%s)
-                    OR LOWER(hebrew_word) = LOWER(%s)
-                    """
-                    
-                    cur.execute(query, (clean_term, clean_term))
-                    results = cur.fetchall()
-                    
-                    if not results:
-                        # Try Greek entries if Hebrew returned nothing
-                        query = """
-                        SELECT strongs_id, greek_word as term, transliteration, definition
-                        FROM bible.greek_entries
-                        WHERE LOWER(transliteration) = LOWER(%s)
-                        OR LOWER(greek_word) = LOWER(%s)
-                        """
-                        
-                        cur.execute(query, (clean_term, clean_term))
-                        results = cur.fetchall()
-                    
-                    for result in results:
-                        # Handle both tuple and dict result types
-                        if isinstance(result, dict):
-                            s_id = result.get('strongs_id', '')
-                            s_term = result.get('term', '')
-                            s_trans = result.get('transliteration', '')
-                            s_def = result.get('definition', '')
-                        else:  # Handle as tuple
-                            s_id = result[0] if len(result) > 0 else ''
-                            s_term = result[1] if len(result) > 1 else ''
-                            s_trans = result[2] if len(result) > 2 else ''
-                            s_def = result[3] if len(result) > 3 else ''
-                        term_info.append(f"{s_id} ({s_trans}): {s_def}")
+        # Split terms into Strong's IDs (e.g., "H430 (Elohim)") and plain words
+        strongs_ids = {}
+        words = []
+        for term in terms:
+            strongs_match = re.search(r'([HG]\d+)', term)
+            if strongs_match:
+                strongs_ids[term] = strongs_match.group(1)
+            else:
+                # Remove parentheses if present
+                words.append(re.sub(r'[\(\)]', '', term).strip())
+        
+        # Resolve everything in two batched lookups instead of one query per term
+        entries = lexicon.get_entries(strongs_ids.values())
+        matches = lexicon.find_terms(words)
+        
+        for term in terms:
+            if term in strongs_ids:
+                results = [entries[strongs_ids[term]]] if strongs_ids[term] in entries else []
+            else:
+                results = matches.get(re.sub(r'[\(\)]', '', term).strip(), [])
+                # Hebrew matches take precedence over Greek ones
+                hebrew = [e for e in results if e.language == 'hebrew']
+                results = hebrew or results
+            for entry in results:
+                term_info.append(f"{entry.strongs_id} ({entry.transliteration}): {entry.definition}")
         
         return "\n".join(term_info)
     
@@ -3,12 +3,43 @@ Theological Question Answering with Strong's IDs
 
 This module implements a specialized DSPy Program of Thought for handling
 theological questions with Strong's IDs and theological term recognition.
+
+Each question is planned before any LM call (see ``ExecutionPlanner``):
+
+- Strong's IDs in the question are looked up in the local lexicon. The LM
+  analyzer only runs for IDs the lexicon does not know.
+- Simple questions (no complexity markers, short context) get exegesis and
+  answer in one merged call. Complex questions keep the two-stage chain.
+- LM calls are counted per question and per plan
+  (``TheologicalQA.planner.stats()``), so the savings can be measured.
+
+Configuration (environment):
+    THEOLOGICAL_QA_MERGE              "auto" (default), "always" or "never"
+    THEOLOGICAL_QA_MERGE_MAX_CONTEXT  Longest context, in words, answered with
+                                      a merged call (default: 150)
 """
 
+import os
 import re
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 import dspy
 from typing import List, Dict, Any, Optional
 
+from src.utils.question_router import get_question_router
+
+logger = logging.getLogger(__name__)
+
+MERGE_MODE = os.getenv('THEOLOGICAL_QA_MERGE', 'auto')
+MERGE_MAX_CONTEXT_WORDS = int(os.getenv('THEOLOGICAL_QA_MERGE_MAX_CONTEXT', '150'))
+
+NO_STRONGS_ANALYSIS = "No Strong's IDs identified in the question."
+
+# Match Strong's IDs like H1234 or G5678
+_STRONGS_ID_RE = re.compile(r'((?:H|G)\d{1,4})')
+
 class TheologicalQASignature(dspy.Signature):
     """Answer theological Bible questions with Strong's ID awareness."""
     context = dspy.InputField(desc="Biblical context or verse")
@@ -58,6 +89,112 @@ class TheologicalExegesis(dspy.Module):
         )
         return result
 
+class MergedAnswerSignature(dspy.Signature):
+    """Perform theological exegesis on the biblical text, then answer the question from it."""
+    context = dspy.InputField(desc="Biblical context or verse")
+    question = dspy.InputField(desc="Theological question about the context")
+    strongs_analysis = dspy.InputField(desc="Analysis of Strong's IDs if present")
+    theological_exegesis = dspy.OutputField(desc="Concise theological exegesis of the passage")
+    answer = dspy.OutputField(desc="Comprehensive theological answer with Strong's IDs where relevant")
+
+@dataclass
+class ExecutionPlan:
+    """The stages one question will run."""
+    strongs_ids: List[str] = field(default_factory=list)
+    # Strong's IDs the lexicon could not resolve; analyzed by the LM
+    unresolved_ids: List[str] = field(default_factory=list)
+    lexicon_analysis: str = ""
+    merge: bool = False
+
+    @property
+    def name(self) -> str:
+        strongs = 'lm' if self.unresolved_ids else ('lexicon' if self.strongs_ids else 'none')
+        return f"strongs={strongs},{'merged' if self.merge else 'two_stage'}"
+
+class ExecutionPlanner:
+    """
+    Decides which stages of TheologicalQA run for a question.
+
+    Args:
+        lexicon: Object with ``get_entries(ids)`` (default: the shared LexiconService)
+        merge: "auto", "always" or "never"
+        merge_max_context_words: Longest context answered with a merged call in auto mode
+    """
+
+    def __init__(self, lexicon=None, merge: str = MERGE_MODE,
+                 merge_max_context_words: int = MERGE_MAX_CONTEXT_WORDS):
+        if merge not in ('auto', 'always', 'never'):
+            raise ValueError(f"merge must be 'auto', 'always' or 'never', not {merge!r}")
+        self._lexicon = lexicon
+        self.merge = merge
+        self.merge_max_context_words = merge_max_context_words
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def lexicon(self):
+        if self._lexicon is None:
+            from src.utils.lexicon_service import get_lexicon_service
+            self._lexicon = get_lexicon_service()
+        return self._lexicon
+
+    def resolve_strongs(self, strongs_ids: List[str]):
+        """(analysis text, unresolved IDs) from the local lexicon."""
+        try:
+            entries = self.lexicon.get_entries(strongs_ids)
+        except Exception as e:
+            logger.warning(f"Lexicon lookup failed, falling back to LM analysis: {e}")
+            return "", list(strongs_ids)
+        lines = []
+        for strongs_id in strongs_ids:
+            entry = entries.get(strongs_id)
+            if entry is None:
+                continue
+            word = ", ".join(part for part in (entry.lemma, entry.transliteration) if part)
+            meaning = " - ".join(part for part in (entry.gloss, entry.definition) if part)
+            lines.append(f"{strongs_id} ({entry.language.capitalize()}{': ' + word if word else ''}): {meaning}")
+        return "\n".join(lines), [i for i in strongs_ids if i not in entries]
+
+    def should_merge(self, context: str, question: str) -> bool:
+        if self.merge != 'auto':
+            return self.merge == 'always'
+        if len((context or "").split()) > self.merge_max_context_words:
+            return False
+        return not get_question_router().is_complex(question)
+
+    def plan(self, context: str, question: str) -> ExecutionPlan:
+        strongs_ids = list(dict.fromkeys(_STRONGS_ID_RE.findall(question)))
+        plan = ExecutionPlan(strongs_ids=strongs_ids, merge=self.should_merge(context, question))
+        if strongs_ids:
+            plan.lexicon_analysis, plan.unresolved_ids = self.resolve_strongs(strongs_ids)
+        return plan
+
+    def record(self, plan: ExecutionPlan, lm_calls: int):
+        with self._lock:
+            self._questions += 1
+            self._lm_calls += lm_calls
+            self._plans[plan.name] += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self._questions = 0
+            self._lm_calls = 0
+            self._plans: Counter = Counter()
+
+    def stats(self) -> Dict[str, Any]:
+        """Questions answered, LM calls made and how often each plan ran."""
+        with self._lock:
+            return {
+                'questions': self._questions,
+                'lm_calls': self._lm_calls,
+                'lm_calls_per_question': round(self._lm_calls / self._questions, 3) if self._questions else 0.0,
+                'plans': dict(self._plans),
+            }
+
+    # Shared between module copies (dspy deep-copies programs when compiling)
+    def __deepcopy__(self, memo):
+        return self
+
 class TheologicalQA(dspy.Module):
     """Complete theological QA system with Strong's ID awareness."""
     
@@ -69,51 +206,64 @@ class TheologicalQA(dspy.Module):
         exegesis = dspy.InputField(desc="Theological exegesis")
         answer = dspy.OutputField(desc="Comprehensive theological answer with Strong's IDs where relevant")
     
-    def __init__(self):
+    def __init__(self, planner: Optional[ExecutionPlanner] = None):
         super().__init__()
         self.strongs_analyzer = StrongsIDAnalyzer()
         self.exegesis = TheologicalExegesis()
         self.answer_formulator = dspy.Predict(self.AnswerFormulation)
+        self.merged_answer = dspy.Predict(MergedAnswerSignature)
+        self.planner = planner or ExecutionPlanner()
     
     def extract_strongs_ids(self, text: str) -> List[str]:
         """Extract Strong's IDs from text."""
-        # Match Strong's IDs like H1234 or G5678
-        strongs_pattern = r'((?:H|G)\d{1,4})'
-        return re.findall(strongs_pattern, text)
+        return _STRONGS_ID_RE.findall(text)
     
     def has_strongs_ids(self, text: str) -> bool:
         """Check if text contains Strong's IDs."""
-        return bool(self.extract_strongs_ids(text))
+        return _STRONGS_ID_RE.search(text) is not None
     
     def forward(self, context, question, history=None):
-        # Check if question contains Strong's IDs
-        has_strongs = self.has_strongs_ids(question)
+        plan = self.planner.plan(context, question)
+        lm_calls = 0
         
-        # Step 1: Analyze Strong's IDs if present
-        if has_strongs:
+        # Step 1: Analyze Strong's IDs if present, from the lexicon where possible
+        hg_analysis = plan.lexicon_analysis
+        if plan.unresolved_ids:
             strongs_analysis = self.strongs_analyzer(context=context, question=question)
-            hg_analysis = strongs_analysis.hebrew_greek_analysis
-        else:
+            lm_calls += 1
+            hg_analysis = "\n".join(part for part in (hg_analysis, strongs_analysis.hebrew_greek_analysis) if part)
+        if not hg_analysis:
             # Simple placeholder for non-Strong's questions
-            hg_analysis = "No Strong's IDs identified in the question."
+            hg_analysis = NO_STRONGS_ANALYSIS
         
-        # Step 2: Perform theological exegesis
-        exegesis_result = self.exegesis(
-            context=context,
-            question=question,
-            strongs_analysis=hg_analysis
-        )
-        
-        # Step 3: Formulate the answer
-        answer_result = self.answer_formulator(
-            context=context,
-            question=question,
-            strongs_analysis=hg_analysis,
-            exegesis=exegesis_result.theological_exegesis
-        )
+        if plan.merge:
+            # Steps 2 and 3 in a single call
+            answer_result = self.merged_answer(
+                context=context,
+                question=question,
+                strongs_analysis=hg_analysis
+            )
+            lm_calls += 1
+        else:
+            # Step 2: Perform theological exegesis
+            exegesis_result = self.exegesis(
+                context=context,
+                question=question,
+                strongs_analysis=hg_analysis
+            )
+            
+            # Step 3: Formulate the answer
+            answer_result = self.answer_formulator(
+                context=context,
+                question=question,
+                strongs_analysis=hg_analysis,
+                exegesis=exegesis_result.theological_exegesis
+            )
+            lm_calls += 2
         
+        self.planner.record(plan, lm_calls)
         # Return the final answer
-        return dspy.Prediction(answer=answer_result.answer)
+        return dspy.Prediction(answer=answer_result.answer, lm_calls=lm_calls, plan=plan.name)
 
 # Example usage:
 # 
@@ -20,6 +20,8 @@ import glob
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.connection import get_db_connection
+from utils.db_utils import mark_dataset_updated
+from utils.term_stats import refresh_term_stats_after_load
 
 # Configure logging
 logging.basicConfig(
@@ -474,6 +476,11 @@ def main(files=None):
         # Load the data into the database
         load_arabic_bible_data(db_connection, all_bible_data)
         
+        mark_dataset_updated(db_connection, 'arabic_bible')
+        
+        # Refresh cross-language term statistics for the new words
+        refresh_term_stats_after_load(db_connection)
+        
         logger.info("Arabic Bible ETL process completed successfully")
         
     except Exception as e:
@@ -33,6 +33,8 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.connection import get_db_connection
+from utils.db_utils import mark_dataset_updated
+from utils.term_stats import refresh_term_stats_after_load
 
 # Configure logging
 log_dir = "logs/etl"
@@ -653,6 +655,11 @@ def main():
         if word_count < expected_words:
             logger.warning(f"Word count is still below expected ({word_count} < {expected_words})")
         
+        mark_dataset_updated(db_connection, 'arabic_bible')
+        
+        # Refresh cross-language term statistics for the new words
+        refresh_term_stats_after_load(db_connection)
+        
         logger.info("Enhanced Arabic Bible ETL process completed successfully")
         
     except Exception as e:
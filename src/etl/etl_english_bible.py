@@ -44,6 +44,8 @@ from datetime import datetime
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
 
+from src.utils.db_utils import mark_dataset_updated
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -270,6 +272,7 @@ def process_esv_bible():
         
         # Load the data
         load_esv_bible_data(conn, bible_data)
+        mark_dataset_updated(conn, 'verses')
         
         # Close the connection
         conn.close()
@@ -16,7 +16,10 @@ import psycopg2
 from psycopg2 import sql
 from dotenv import load_dotenv
 from psycopg2.extras import execute_values
+from src.utils.db_utils import mark_dataset_updated
 from src.utils.file_utils import append_dspy_training_example
+from src.utils.lexicon_aggregates import refresh_lexicon_aggregates
+from src.utils.term_stats import refresh_term_stats_after_load
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -521,6 +524,12 @@ def main(file_paths):
             
             logger.info(f"Completed processing file: {file_path}")
         
+        mark_dataset_updated(conn, 'greek_nt')
+        
+        # Refresh cross-language term statistics for the new words
+        refresh_term_stats_after_load(conn)
+        refresh_lexicon_aggregates(conn, languages=['greek'])
+        
         logger.info("Greek NT ETL process completed successfully")
     
     except Exception as e:
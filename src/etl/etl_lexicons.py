@@ -13,6 +13,10 @@ import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 from src.utils.file_utils import append_dspy_training_example
+from src.utils.db_utils import mark_dataset_updated
+from src.utils.lexicon_service import create_lexicon_indexes
+from src.utils.lexicon_aggregates import refresh_lexicon_aggregates
+from src.utils.term_stats import refresh_term_stats_after_load
 
 # Setup logging
 logging.basicConfig(
@@ -439,6 +443,16 @@ def main():
             logger.info("Loading word relationships into the database")
             load_word_relationships(relationships, conn)
             
+            # Prefix/trigram indexes for term lookups, then signal running
+            # services to refresh their in-process lexicon caches
+            create_lexicon_indexes(conn)
+            mark_dataset_updated(conn, 'lexicon')
+            
+            # Word relationships feed the cross-language alignment view
+            refresh_term_stats_after_load(conn)
+            # Entry pages embed the lexicon rows and their relationships
+            refresh_lexicon_aggregates(conn)
+            
             logger.info("Lexicon ETL process completed successfully")
         finally:
             conn.close()
@@ -17,6 +17,7 @@ import json
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.connection import get_db_connection
+from utils.db_utils import mark_dataset_updated
 
 # Configure logging
 logging.basicConfig(
@@ -280,6 +281,7 @@ def main(file_paths):
         
         # Load the data into the database
         load_lexicon_data(db_connection, all_lexicon_data)
+        mark_dataset_updated(db_connection, 'lsj_lexicon')
         
         logger.info("LSJ lexicon ETL process completed successfully")
         
@@ -161,6 +161,8 @@ from typing import Dict, List, Tuple, Any
 import re
 import psycopg
 from psycopg.rows import dict_row
+
+from src.utils.db_utils import mark_dataset_updated
 import datetime
 
 # Configure logging
@@ -478,6 +480,7 @@ def main():
         
         # Final commit
         conn.commit()
+        mark_dataset_updated(conn, 'proper_names')
         
     except Exception as e:
         if conn and not conn.closed:
@@ -13,6 +13,8 @@ import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 
+from src.utils.db_utils import mark_dataset_updated
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -325,6 +327,7 @@ def main():
             # Process Greek NT file if specified
             if args.greek:
                 process_greek_nt_file(conn, args.greek)
+                mark_dataset_updated(conn, 'greek_nt')
             
             # Process Hebrew OT file if specified (to be implemented)
             if args.hebrew:
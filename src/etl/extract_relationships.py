@@ -12,6 +12,8 @@ import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 
+from src.utils.db_utils import mark_dataset_updated
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -248,6 +250,7 @@ def main():
             
             # Save relationships to the database
             save_relationships(conn, relationships)
+            mark_dataset_updated(conn, 'word_relationships')
             
             logger.info("Word relationship extraction completed successfully")
         finally:
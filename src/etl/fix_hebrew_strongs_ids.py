@@ -64,6 +64,7 @@ except ImportError:
         sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         from src.database.connection import get_db_connection, check_table_exists
 
+from src.utils.db_utils import mark_dataset_updated
 from src.utils.file_utils import append_dspy_training_example
 
 def force_update_critical_terms(conn):
@@ -470,6 +471,7 @@ def main():
                 logger.error(f"Error: {general_stats['error']}")
                 return 1
                 
+            mark_dataset_updated(conn, 'hebrew_ot')
             logger.info("Hebrew Strong's ID update completed successfully")
             logger.info(f"Summary: {general_stats}")
             
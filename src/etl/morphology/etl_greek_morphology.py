@@ -16,6 +16,7 @@ import re
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.connection import get_db_connection
+from src.utils.db_utils import mark_dataset_updated
 
 # Configure logging
 logging.basicConfig(
@@ -292,6 +293,7 @@ def main(file_path):
         
         # Load the data into the database
         load_morphology_data(db_connection, morphology_data)
+        mark_dataset_updated(db_connection, 'greek_morphology')
         
         logger.info("Greek morphology ETL process completed successfully")
         
@@ -17,6 +17,7 @@ import json
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.connection import get_db_connection
+from src.utils.db_utils import mark_dataset_updated
 
 # Configure logging
 logging.basicConfig(
@@ -482,6 +483,7 @@ def main(file_path, max_records=None):
         
         # Resolve name relationships
         resolve_name_relationships(conn)
+        mark_dataset_updated(conn, 'proper_names')
         
         logger.info("Proper names ETL process completed successfully")
     
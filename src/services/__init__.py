@@ -0,0 +1,19 @@
+"""
+Service layer shared by the web UI routes and the JSON API blueprints.
+"""
+
+from .bible_data import (
+    BibleDataService,
+    RemoteBibleDataService,
+    ServiceError,
+    create_bible_data_service,
+    get_bible_data_service,
+)
+
+__all__ = [
+    'BibleDataService',
+    'RemoteBibleDataService',
+    'ServiceError',
+    'create_bible_data_service',
+    'get_bible_data_service',
+]
@@ -0,0 +1,402 @@
+"""
+Bible Data Service
+
+Single entry point the web routes use to read lexicon, verse, name, morphology,
+concordance and Arabic Bible data. The default backend runs the queries in
+src/services/queries.py in-process; the HTTP backend talks to a separately
+deployed API server with the same paths as src/api/bible_data_api.py.
+
+Configuration (environment):
+    BIBLE_DATA_BACKEND   "local" (default) or "http"
+    API_BASE_URL         API server for the http backend (default: http://localhost:5000)
+    BIBLE_DATA_TIMEOUT   Per-request timeout in seconds for the http backend (default: 10)
+
+Usage:
+    from src.services import get_bible_data_service, ServiceError
+
+    service = get_bible_data_service()
+    try:
+        stats = service.lexicon_stats()
+    except ServiceError as e:
+        ...
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+
+from src.services import queries
+from src.services.export import CONCORDANCE_COLUMNS
+from src.services.fanout import get_http_session
+from src.services.request_metrics import track_upstream
+from src.utils.lexicon_aggregates import get_lexicon_aggregate_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = 'http://localhost:5000'
+
+
+class ServiceError(Exception):
+    """A data request failed; ``status`` is the HTTP status to report."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def default_connection_factory():
+    """Read-only connection when secure connections are configured, else the standard one."""
+    try:
+        from src.database.secure_connection import get_secure_connection
+        return get_secure_connection(mode='read')
+    except ImportError:
+        from src.utils.db_utils import get_db_connection
+        return get_db_connection()
+
+
+class BibleDataService:
+    """
+    In-process backend: each call borrows one connection, runs its queries and closes it.
+    """
+
+    is_remote = False
+
+    def __init__(self, connection_factory: Optional[Callable[[], Any]] = None):
+        self.connection_factory = connection_factory or default_connection_factory
+
+    def _connect(self):
+        try:
+            conn = self.connection_factory()
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            conn = None
+        if conn is None:
+            raise ServiceError("Database connection unavailable", 503)
+        return conn
+
+    def _run(self, query: Callable, *args, **kwargs):
+        with track_upstream():
+            conn = self._connect()
+            try:
+                return query(conn, *args, **kwargs)
+            except ServiceError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in {query.__name__}: {e}")
+                raise ServiceError(f"Database error: {e}") from e
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _call(func: Callable, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in {func.__name__}: {e}")
+            raise ServiceError(str(e)) from e
+
+    def health(self) -> bool:
+        return True
+
+    # Lexicon and verses
+    def lexicon_stats(self):
+        return self._run(queries.lexicon_stats)
+
+    def search_lexicon(self, query: str, language: Optional[str] = None, limit: int = 50):
+        return self._run(queries.search_lexicon, query, language=language, limit=limit)
+
+    def lexicon_entry(self, language: str, strongs_id: str):
+        # Hot entries are served from the in-process LRU without a connection
+        page = get_lexicon_aggregate_cache().get_cached(language, strongs_id)
+        if page is not None:
+            return page
+        return self._run(queries.lexicon_entry_page, language, strongs_id)
+
+    def search_verses(self, query: str, translation: Optional[str] = None, limit: int = 50):
+        return self._run(queries.search_verses, query, translation=translation, limit=limit)
+
+    def tagged_verse(self, book: str, chapter: int, verse: int):
+        return self._run(queries.tagged_verse, book, chapter, verse)
+
+    def validate_critical_terms(self):
+        return self._call(queries.validate_critical_terms)
+
+    def theological_terms_report(self):
+        return self._call(queries.theological_terms_report)
+
+    def cross_language_terms(self, mappings, strongs_id: Optional[str] = None, all_terms: bool = False,
+                             limit: int = 50, offset: int = 0):
+        return self._call(queries.cross_language_terms, mappings, strongs_id=strongs_id,
+                          all_terms=all_terms, limit=limit, offset=offset)
+
+    # Proper names
+    def name_types(self):
+        return self._run(queries.name_types)
+
+    def list_names(self, limit: int = 5):
+        return self._run(queries.list_names, limit=limit)
+
+    def search_names(self, query: str = '', search_type: str = 'name', name_type: str = '',
+                     gender: str = '', book: str = '', offset: int = 0, limit: int = 50):
+        return self._run(queries.search_names, query, search_type=search_type, name_type=name_type,
+                         gender=gender, book=book, offset=offset, limit=limit)
+
+    def get_name(self, name_id: int):
+        return self._run(queries.get_name, name_id)
+
+    def verse_names(self, book: str, chapter: int, verse: int):
+        return self._run(queries.verse_names, book, chapter, verse)
+
+    # Morphology
+    def search_morphology(self, language: str, code: str, limit: int = 25):
+        return self._run(queries.search_morphology, language, code, limit=limit)
+
+    def get_morphology_code(self, language: str, code: str):
+        return self._run(queries.get_morphology_code, language, code)
+
+    def words_by_grammar_code(self, language: str, code: str, limit: int = 10):
+        return self._run(queries.words_by_grammar_code, language, code, limit=limit)
+
+    # Concordance, cross references, semantic search
+    def concordance(self, strongs_id: str, limit: Optional[int] = 500):
+        return self._run(queries.concordance, strongs_id, limit=limit)
+
+    def arabic_concordance(self, strongs_id: str, limit: Optional[int] = 500):
+        return self._run(queries.arabic_concordance, strongs_id, limit=limit)
+
+    def iter_concordance(self, strongs_id: str, arabic: bool = False,
+                         batch_size: int = queries.EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+        """
+        Stream (reference, verse_text, word, strongs_id) rows for an export.
+
+        The connection stays open until the iterator is exhausted or closed.
+        The first batch is fetched before returning, so connection and query
+        errors are raised here as ServiceError rather than mid-stream.
+        """
+        conn = self._connect()
+        rows = queries.iter_concordance_rows(conn, strongs_id, arabic=arabic, batch_size=batch_size)
+        try:
+            first = next(rows, None)
+        except Exception as e:
+            conn.close()
+            logger.error(f"Error in iter_concordance_rows: {e}")
+            raise ServiceError(f"Database error: {e}") from e
+        return self._stream(conn, rows, first)
+
+    @staticmethod
+    def _stream(conn, rows: Iterator[tuple], first) -> Iterator[tuple]:
+        try:
+            if first is not None:
+                yield first
+                yield from rows
+        finally:
+            rows.close()
+            conn.close()
+
+    def cross_references(self, book: str, chapter: int, verse: int, limit: int = 20):
+        return self._run(queries.cross_references, book, chapter, verse, limit=limit)
+
+    def semantic_search(self, query: str, limit: int = 20, translation: str = queries.DEFAULT_TRANSLATION):
+        return self._run(queries.semantic_search, query, limit=limit, translation=translation)
+
+    # Arabic Bible
+    def arabic_stats(self):
+        return self._run(queries.arabic_stats)
+
+    def arabic_verse(self, book: str, chapter: int, verse: int):
+        return self._run(queries.arabic_verse, book, chapter, verse)
+
+    def arabic_context(self, book: str, chapter: int, verse: int, context: int = 3):
+        return self._run(queries.arabic_context, book, chapter, verse, context=context)
+
+    def arabic_search(self, query: str, book: Optional[str] = None, limit: int = 50):
+        return self._run(queries.arabic_search, query, book=book, limit=limit)
+
+    def arabic_parallel(self, book: str, chapter: int, verse: int):
+        return self._run(queries.arabic_parallel, book, chapter, verse)
+
+
+class RemoteBibleDataService:
+    """
+    HTTP backend for deployments that serve the data API from another process.
+
+    Methods and return values match BibleDataService; lookups of a single
+    missing item return None instead of raising.
+    """
+
+    is_remote = True
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 session: Optional[requests.Session] = None):
+        self.base_url = (base_url or os.getenv('API_BASE_URL', DEFAULT_API_BASE_URL)).rstrip('/')
+        self.timeout = timeout or float(os.getenv('BIBLE_DATA_TIMEOUT', '10'))
+        self.session = session or get_http_session()
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None, allow_missing: bool = False):
+        try:
+            resp = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"Error requesting {path}: {e}")
+            raise ServiceError(f"API server unavailable: {e}", 503) from e
+        if resp.status_code == 404 and allow_missing:
+            return None
+        if resp.status_code != 200:
+            try:
+                message = resp.json().get('error') or resp.text
+            except ValueError:
+                message = resp.text
+            raise ServiceError(message or f"HTTP {resp.status_code}", resp.status_code)
+        return resp.json()
+
+    def health(self) -> bool:
+        try:
+            return self.session.get(f"{self.base_url}/health", timeout=2).status_code == 200
+        except requests.RequestException:
+            return False
+
+    # Lexicon and verses
+    def lexicon_stats(self):
+        return self._get('/api/lexicon/stats')
+
+    def search_lexicon(self, query: str, language: Optional[str] = None, limit: int = 50):
+        return self._get('/api/lexicon/search', {'q': query, 'lang': language, 'limit': limit})
+
+    def lexicon_entry(self, language: str, strongs_id: str):
+        return self._get(f'/api/lexicon/{language}/{strongs_id}', allow_missing=True)
+
+    def search_verses(self, query: str, translation: Optional[str] = None, limit: int = 50):
+        return self._get('/api/verses/search', {'q': query, 'translation': translation, 'limit': limit})
+
+    def tagged_verse(self, book: str, chapter: int, verse: int):
+        return self._get('/api/tagged/verse', {'book': book, 'chapter': chapter, 'verse': verse},
+                         allow_missing=True)
+
+    def validate_critical_terms(self):
+        return self._get('/api/lexicon/hebrew/validate_critical_terms')
+
+    def theological_terms_report(self):
+        return self._get('/api/theological_terms_report')
+
+    def cross_language_terms(self, mappings, strongs_id: Optional[str] = None, all_terms: bool = False,
+                             limit: int = 50, offset: int = 0):
+        return self._get('/api/cross_language/terms', {
+            'strongs': strongs_id, 'all': '1' if all_terms else None, 'limit': limit, 'offset': offset
+        })
+
+    # Proper names
+    def name_types(self):
+        return self._get('/api/names/types')
+
+    def list_names(self, limit: int = 5):
+        return self._get('/api/names', {'limit': limit})
+
+    def search_names(self, query: str = '', search_type: str = 'name', name_type: str = '',
+                     gender: str = '', book: str = '', offset: int = 0, limit: int = 50):
+        return self._get('/api/names/search', {
+            'q': query, 'type': search_type, 'name_type': name_type or None,
+            'gender': gender or None, 'book': book or None, 'offset': offset, 'limit': limit
+        })
+
+    def get_name(self, name_id: int):
+        return self._get(f'/api/names/{name_id}', allow_missing=True)
+
+    def verse_names(self, book: str, chapter: int, verse: int):
+        return self._get('/api/verse/names', {'book': book, 'chapter': chapter, 'verse': verse})['names']
+
+    # Morphology
+    def search_morphology(self, language: str, code: str, limit: int = 25):
+        return self._get(f'/api/morphology/{language}', {'code': code, 'limit': limit})
+
+    def get_morphology_code(self, language: str, code: str):
+        return self._get(f'/api/morphology/{language}/{code}', allow_missing=True)
+
+    def words_by_grammar_code(self, language: str, code: str, limit: int = 10):
+        return self._get(f'/api/{language}/words', {'grammar_code': code, 'limit': limit})
+
+    # Concordance, cross references, semantic search
+    def concordance(self, strongs_id: str, limit: Optional[int] = 500):
+        return self._get(f'/api/concordance/{strongs_id}', {'limit': limit})
+
+    def arabic_concordance(self, strongs_id: str, limit: Optional[int] = 500):
+        return self._get(f'/api/concordance/arabic/{strongs_id}', {'limit': limit})
+
+    def iter_concordance(self, strongs_id: str, arabic: bool = False) -> Iterator[tuple]:
+        """Stream export rows from the API server's JSON Lines export."""
+        path = f'/api/concordance/{strongs_id}/export'
+        try:
+            resp = self.session.get(f"{self.base_url}{path}", stream=True, timeout=self.timeout,
+                                    params={'format': 'jsonl', 'arabic': 'true' if arabic else None})
+        except requests.RequestException as e:
+            logger.error(f"Error requesting {path}: {e}")
+            raise ServiceError(f"API server unavailable: {e}", 503) from e
+        if resp.status_code != 200:
+            resp.close()
+            raise ServiceError(f"Concordance export failed: HTTP {resp.status_code}", resp.status_code)
+        return self._stream_lines(resp)
+
+    @staticmethod
+    def _stream_lines(resp) -> Iterator[tuple]:
+        keys = [key for _, key in CONCORDANCE_COLUMNS]
+        try:
+            for line in resp.iter_lines():
+                if line:
+                    record = json.loads(line)
+                    yield tuple(record.get(key) for key in keys)
+        finally:
+            resp.close()
+
+    def cross_references(self, book: str, chapter: int, verse: int, limit: int = 20):
+        return self._get('/api/cross-references', {
+            'book': book, 'chapter': chapter, 'verse': verse, 'limit': limit
+        }, allow_missing=True)
+
+    def semantic_search(self, query: str, limit: int = 20, translation: str = queries.DEFAULT_TRANSLATION):
+        return self._get('/api/semantic-search', {'q': query, 'limit': limit, 'translation': translation})
+
+    # Arabic Bible
+    def arabic_stats(self):
+        return self._get('/api/arabic/stats')
+
+    def arabic_verse(self, book: str, chapter: int, verse: int):
+        return self._get('/api/arabic/verse', {'book': book, 'chapter': chapter, 'verse': verse},
+                         allow_missing=True)
+
+    def arabic_context(self, book: str, chapter: int, verse: int, context: int = 3):
+        return self._get('/api/arabic/context', {
+            'book': book, 'chapter': chapter, 'verse': verse, 'context': context
+        })
+
+    def arabic_search(self, query: str, book: Optional[str] = None, limit: int = 50):
+        return self._get('/api/arabic/search', {'q': query, 'book': book, 'limit': limit})
+
+    def arabic_parallel(self, book: str, chapter: int, verse: int):
+        return self._get('/api/arabic/parallel', {'book': book, 'chapter': chapter, 'verse': verse})
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def create_bible_data_service(backend: Optional[str] = None):
+    """Build the backend named by ``backend`` or BIBLE_DATA_BACKEND ("local" or "http")."""
+    backend = (backend or os.getenv('BIBLE_DATA_BACKEND', 'local')).lower()
+    if backend == 'http':
+        return RemoteBibleDataService()
+    if backend != 'local':
+        logger.warning(f"Unknown BIBLE_DATA_BACKEND '{backend}', using local")
+    return BibleDataService()
+
+
+def get_bible_data_service():
+    """Return the process-wide data service, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = create_bible_data_service()
+    return _service
@@ -0,0 +1,119 @@
+"""
+Streaming Exports
+
+Encodes row iterators incrementally as CSV, TSV or JSON Lines and wraps them
+in a chunked Flask response. When the client accepts gzip, the response is
+compressed as it streams. Rows are consumed batch by batch, so memory use does
+not grow with the size of the result.
+
+Usage:
+    rows = service.iter_concordance('H3068')
+    return streaming_export(rows, CONCORDANCE_COLUMNS, 'concordance_H3068',
+                            fmt=request.args.get('format', 'csv'),
+                            accept_encoding=request.headers.get('Accept-Encoding', ''))
+"""
+
+import io
+import csv
+import json
+import zlib
+from itertools import islice
+from typing import Iterable, Iterator, Sequence, Tuple
+
+from flask import Response
+
+# Format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'tsv': ('text/tab-separated-values', 'tsv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+# (header label, JSON key) for concordance rows
+CONCORDANCE_COLUMNS = (
+    ('Reference', 'reference'),
+    ('Verse Text', 'verse_text'),
+    ('Target Word', 'target_word'),
+    ("Strong's ID", 'strongs_id'),
+)
+
+# Rows encoded per chunk
+CHUNK_ROWS = 500
+
+
+def encode_rows(rows: Iterable[Sequence], columns: Sequence[Tuple[str, str]], fmt: str = 'csv',
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """
+    Encode rows (tuples in column order) into text chunks of up to ``chunk_rows`` rows.
+
+    CSV and TSV start with a header row; JSON Lines emits one object per row.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    rows = iter(rows)
+    keys = [key for _, key in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter='\t' if fmt == 'tsv' else ',', lineterminator='\n')
+    if fmt != 'jsonl':
+        writer.writerow([label for label, _ in columns])
+    while True:
+        batch = list(islice(rows, chunk_rows))
+        if not batch:
+            break
+        if fmt == 'jsonl':
+            buffer.write(''.join(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n' for row in batch))
+        else:
+            writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (ignoring q=0)."""
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def streaming_export(rows: Iterable[Sequence], columns: Sequence[Tuple[str, str]], filename: str,
+                     fmt: str = 'csv', accept_encoding: str = '') -> Response:
+    """
+    Build a chunked attachment response that encodes (and optionally gzips) rows as they arrive.
+
+    Args:
+        rows: Row tuples in column order; consumed lazily while the response streams
+        columns: (header label, JSON key) pairs
+        filename: Attachment name without extension
+        fmt: 'csv', 'tsv' or 'jsonl'
+        accept_encoding: The request's Accept-Encoding header
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    body = encode_rows(rows, columns, fmt)
+    headers = {
+        "Content-Disposition": f"attachment;filename={filename}.{extension}",
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(accept_encoding):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype=mimetype, headers=headers)
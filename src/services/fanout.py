@@ -0,0 +1,156 @@
+"""
+Request Fan-Out
+
+Runs a page's independent data calls concurrently under one deadline. Calls
+run on a shared, bounded thread pool. HTTP calls go through a shared
+keep-alive session, so the calls for one page cost as long as the slowest of
+them rather than all of them added together. A call that fails or misses the
+deadline does not fail the page: it gets its default value and is reported as
+degraded, and the page renders without that section.
+
+Configuration (environment):
+    PAGE_DEADLINE_SECONDS   Default time budget for one page (default: 3)
+    FANOUT_MAX_WORKERS      Shared worker threads (default: 16)
+
+Usage:
+    page = fan_out({
+        'hebrew': lambda: service.search_morphology('hebrew', code),
+        'greek': lambda: service.search_morphology('greek', code),
+    }, defaults={'hebrew': [], 'greek': []})
+    page['hebrew'], page.degraded
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.request_metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_DEADLINE = float(os.getenv('PAGE_DEADLINE_SECONDS', '3'))
+MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', '16'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide fan-out thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='fanout')
+    return _executor
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter that counts each request as an upstream call of the current page."""
+
+    def send(self, request, **kwargs):
+        with track_upstream():
+            return super().send(request, **kwargs)
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide keep-alive session, pooled for MAX_WORKERS connections per host."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _TimedAdapter(pool_connections=8, pool_maxsize=MAX_WORKERS)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def fetch_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = DEFAULT_PAGE_DEADLINE):
+    """
+    GET a URL over the shared session and return the decoded JSON body.
+
+    Raises:
+        requests.RequestException: On connection errors, timeouts and non-2xx responses
+    """
+    resp = get_http_session().get(url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+class FanOut:
+    """
+    Results of one or more concurrent stages sharing a single page deadline.
+
+    Successful results are accessible by name (``page['greek']``); failed or
+    late calls hold their default and are listed in ``degraded``.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, executor: Optional[ThreadPoolExecutor] = None):
+        self.deadline = DEFAULT_PAGE_DEADLINE if deadline is None else deadline
+        self.executor = executor or get_executor()
+        self.started = time.monotonic()
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+
+    def remaining(self) -> float:
+        """Seconds left in the page budget."""
+        return max(0.0, self.deadline - (time.monotonic() - self.started))
+
+    def run(self, calls: Dict[str, Callable[[], Any]], defaults: Optional[Dict[str, Any]] = None) -> 'FanOut':
+        """
+        Run the calls concurrently and wait until they finish or the budget runs out.
+
+        Args:
+            calls: Mapping of section name to zero-argument callable
+            defaults: Values for sections whose call fails or times out (default None)
+        """
+        defaults = defaults or {}
+        # Each call runs in a copy of the caller's context so its upstream calls count toward the request
+        futures = {name: self.executor.submit(contextvars.copy_context().run, func)
+                   for name, func in calls.items()}
+        done, _ = wait(futures.values(), timeout=self.remaining())
+        for name, future in futures.items():
+            if future in done and future.exception() is None:
+                self.results[name] = future.result()
+                continue
+            if future in done:
+                self.errors[name] = str(future.exception())
+                logger.warning(f"Fan-out call '{name}' failed: {future.exception()}")
+            else:
+                # Calls already running cannot be interrupted; they finish in the background
+                future.cancel()
+                self.errors[name] = f"timed out after {self.deadline:.1f}s"
+                logger.warning(f"Fan-out call '{name}' missed the {self.deadline:.1f}s page deadline")
+            self.results[name] = defaults.get(name)
+        return self
+
+    @property
+    def degraded(self) -> List[str]:
+        """Names of the sections that failed or missed the deadline."""
+        return sorted(self.errors)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def __getitem__(self, name: str):
+        return self.results[name]
+
+    def get(self, name: str, default=None):
+        return self.results.get(name, default)
+
+
+def fan_out(calls: Dict[str, Callable[[], Any]], deadline: Optional[float] = None,
+            defaults: Optional[Dict[str, Any]] = None) -> FanOut:
+    """Run independent calls concurrently under one deadline; see FanOut.run."""
+    return FanOut(deadline).run(calls, defaults)
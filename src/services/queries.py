@@ -0,0 +1,949 @@
+"""
+Bible Data Queries
+
+Plain query functions behind both the JSON API blueprints and the HTML routes
+in web_app. Each function takes an open DB-API connection (psycopg2) as its
+first argument and returns JSON-serializable dicts/lists in the shape the
+templates and API clients expect, so a page view no longer needs a loopback
+HTTP call plus JSON re-parsing to reach its data.
+
+Verse lookups use the packed ``verse_key`` columns (see src/utils/verse_keys.py);
+lexicon and term-count lookups go through the in-process lexicon and term
+statistics caches.
+"""
+
+import re
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from src.utils.lexicon_aggregates import SAMPLE_VERSES, get_lexicon_aggregate_cache
+from src.utils.lexicon_service import get_lexicon_service, strongs_variants
+from src.utils.reference_engine import (
+    BOOK_ABBREVIATIONS, BOOK_NAMES, OT_BOOKS, format_verse_id, parse, resolve_book, unpack_verse_id
+)
+from src.utils.term_stats import get_term_stats_service
+from src.utils.verse_keys import key_range_condition, verse_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSLATION = 'KJV'
+
+WORD_TABLES = {
+    'hebrew': 'bible.hebrew_ot_words',
+    'greek': 'bible.greek_nt_words',
+}
+
+MORPHOLOGY_TABLES = {
+    'hebrew': 'bible.hebrew_morphology_codes',
+    'greek': 'bible.greek_morphology_codes',
+}
+
+# Critical Hebrew terms and the minimum occurrence counts the data must meet
+CRITICAL_HEBREW_TERMS = {
+    "H430": {"name": "Elohim", "hebrew": "אלהים", "expected_min": 2600},
+    "H3068": {"name": "YHWH", "hebrew": "יהוה", "expected_min": 6000},
+    "H113": {"name": "Adon", "hebrew": "אדון", "expected_min": 335},
+    "H2617": {"name": "Chesed", "hebrew": "חסד", "expected_min": 248},
+    "H539": {"name": "Aman", "hebrew": "אמן", "expected_min": 100},
+}
+
+# Key Greek terms reported alongside the critical Hebrew terms
+KEY_GREEK_TERMS = {
+    "G2316": "Theos",
+    "G2962": "Kyrios",
+    "G5547": "Christos",
+    "G26": "Agape",
+    "G4102": "Pistis",
+    "G5485": "Charis",
+}
+
+_STRONGS_RE = re.compile(r'^[HGhg]\d+[A-Za-z]?$')
+
+
+# --- helpers ----------------------------------------------------------------
+
+def language_for_strongs(strongs_id: str) -> str:
+    """Return 'hebrew' or 'greek' for a Strong's ID."""
+    return 'hebrew' if strongs_id[:1].upper() == 'H' else 'greek'
+
+
+def language_for_book(book) -> str:
+    """Return the original language ('hebrew' or 'greek') of a book."""
+    return 'hebrew' if resolve_book(book) in OT_BOOKS else 'greek'
+
+
+def book_spellings(book: str) -> List[str]:
+    """
+    Return every spelling a book may be stored under (given, canonical, STEP).
+
+    Used for tables without a verse_key column (e.g. bible.arabic_verses).
+    """
+    book_num = resolve_book(book)
+    spellings = [book]
+    if book_num is not None:
+        spellings += [BOOK_NAMES[book_num], BOOK_ABBREVIATIONS[book_num]]
+    return list(dict.fromkeys(spellings))
+
+
+def format_reference(book_name: str, chapter: int, verse: int) -> str:
+    return f"{book_name} {chapter}:{verse}"
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (table,))
+    return bool(cur.fetchone()['present'])
+
+
+def _lexicon_entry_dict(entry) -> Optional[Dict[str, Any]]:
+    if entry is None:
+        return None
+    data = entry.to_dict()
+    # Templates address the headword by language-specific column name
+    data[f"{entry.language}_word"] = entry.lemma
+    return data
+
+
+# --- lexicon ----------------------------------------------------------------
+
+def lexicon_stats(conn) -> Dict[str, Dict[str, int]]:
+    """Counts shown on the home page, in a single round trip."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        has_names = _table_exists(cur, 'bible.proper_names')
+        names_sql = """
+            (SELECT COUNT(*) FROM bible.proper_names) AS proper_names,
+            (SELECT COUNT(*) FROM bible.proper_name_references) AS proper_name_refs
+        """ if has_names else "0 AS proper_names, 0 AS proper_name_refs"
+        cur.execute(f"""
+            SELECT (SELECT COUNT(*) FROM bible.hebrew_entries) AS hebrew,
+                   (SELECT COUNT(*) FROM bible.greek_entries) AS greek,
+                   (SELECT COUNT(DISTINCT verse_key) FROM bible.verses) AS verses,
+                   {names_sql}
+        """)
+        row = cur.fetchone()
+    return {
+        'hebrew_lexicon': {'count': row['hebrew']},
+        'greek_lexicon': {'count': row['greek']},
+        'verses': {'count': row['verses']},
+        'proper_names': {'count': row['proper_names'], 'references': row['proper_name_refs']},
+    }
+
+
+def search_lexicon(conn, query: str, language: Optional[str] = None,
+                   limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Search both lexicons by Strong's ID, headword, transliteration or gloss.
+
+    Returns:
+        {'hebrew': [...], 'greek': [...]}, exact ID matches first
+    """
+    ids = strongs_variants(query) if _STRONGS_RE.match(query.strip()) else []
+    pattern = f"%{query.strip()}%"
+    results = {}
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        for lang, (table, word_column) in {
+            'hebrew': ('bible.hebrew_entries', 'hebrew_word'),
+            'greek': ('bible.greek_entries', 'greek_word'),
+        }.items():
+            if language and language not in (lang, 'both', 'all'):
+                results[lang] = []
+                continue
+            cur.execute(f"""
+                SELECT strongs_id, {word_column}, transliteration, gloss, definition
+                FROM {table}
+                WHERE strongs_id = ANY(%s) OR {word_column} = %s
+                   OR transliteration ILIKE %s OR gloss ILIKE %s
+                ORDER BY (strongs_id = ANY(%s)) DESC, length(gloss), strongs_id
+                LIMIT %s
+            """, (ids, query.strip(), pattern, pattern, ids, limit))
+            results[lang] = [dict(row) for row in cur.fetchall()]
+    return results
+
+
+def lexicon_entry_page(conn, language: str, strongs_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Everything the lexicon entry page shows for one Hebrew or Greek entry.
+
+    Reads the precomputed row from bible.lexicon_entry_aggregates by primary
+    key; entries without an aggregate row (e.g. before the first refresh) are
+    assembled from the lexicon, word_relationships and word tables instead.
+
+    Returns:
+        {'entry', 'occurrence_count', 'verse_count', 'occurrences', 'related_words'},
+        or None if the entry does not exist
+    """
+    if language not in WORD_TABLES:
+        return None
+    cache = get_lexicon_aggregate_cache()
+    page = cache.load(conn, language, strongs_id)
+    if page is not None:
+        return page
+
+    lexicon_table = f"bible.{language}_entries"
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT * FROM {lexicon_table}
+            WHERE strongs_id = ANY(%s)
+            ORDER BY strongs_id = %s DESC
+            LIMIT 1
+        """, (strongs_variants(strongs_id), strongs_id))
+        entry = cur.fetchone()
+        if entry is None:
+            return None
+        entry_id = entry['strongs_id']
+
+        cur.execute("""
+            SELECT wr.target_id, wr.relationship_type,
+                   COALESCE(he.hebrew_word, ge.greek_word) AS word,
+                   COALESCE(he.transliteration, ge.transliteration) AS transliteration,
+                   COALESCE(he.gloss, ge.gloss) AS gloss,
+                   CASE WHEN he.strongs_id IS NOT NULL THEN 'hebrew' ELSE 'greek' END AS language
+            FROM bible.word_relationships wr
+            LEFT JOIN bible.hebrew_entries he ON wr.target_id = he.strongs_id
+            LEFT JOIN bible.greek_entries ge ON wr.target_id = ge.strongs_id
+            WHERE wr.source_id = %s
+            ORDER BY wr.relationship_type, wr.target_id
+        """, (entry_id,))
+        related_words = [dict(row) for row in cur.fetchall()]
+
+        cur.execute(f"""
+            SELECT COUNT(*) AS occurrences, COUNT(DISTINCT verse_key) AS verses
+            FROM {WORD_TABLES[language]}
+            WHERE strongs_id = %s
+        """, (entry_id,))
+        counts = cur.fetchone()
+
+        cur.execute(f"""
+            SELECT k.verse_key, v.book_name, v.chapter_num, v.verse_num, v.verse_text
+            FROM (
+                SELECT DISTINCT verse_key FROM {WORD_TABLES[language]}
+                WHERE strongs_id = %s AND verse_key IS NOT NULL
+                ORDER BY verse_key
+                LIMIT %s
+            ) k
+            LEFT JOIN LATERAL (
+                SELECT book_name, chapter_num, verse_num, verse_text
+                FROM bible.verses
+                WHERE verse_key = k.verse_key
+                ORDER BY (translation_source = %s) DESC
+                LIMIT 1
+            ) v ON TRUE
+            ORDER BY k.verse_key
+        """, (entry_id, SAMPLE_VERSES, DEFAULT_TRANSLATION))
+        occurrences = [dict(row) for row in cur.fetchall()]
+
+    page = {
+        'entry': dict(entry),
+        'occurrence_count': counts['occurrences'],
+        'verse_count': counts['verses'],
+        'occurrences': occurrences,
+        'related_words': related_words,
+    }
+    cache.put(language, strongs_id, page)
+    return page
+
+
+def search_verses(conn, query: str, translation: Optional[str] = None,
+                  limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Search verses by reference ("Rom 8:28-30") or by text.
+
+    References become verse_key range scans; anything else is a text match.
+    """
+    parsed = parse(query)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        if parsed is not None:
+            condition, params = key_range_condition('verse_key', parsed.key_ranges())
+        else:
+            condition, params = "verse_text ILIKE %s", [f"%{query}%"]
+        if translation:
+            condition += " AND translation_source = %s"
+            params.append(translation)
+        cur.execute(f"""
+            SELECT book_name, chapter_num, verse_num, verse_text, translation_source
+            FROM bible.verses
+            WHERE {condition}
+            ORDER BY verse_key, translation_source
+            LIMIT %s
+        """, params + [limit])
+        return [dict(row) for row in cur.fetchall()]
+
+
+def tagged_verse(conn, book: str, chapter: int, verse: int,
+                 translation: str = DEFAULT_TRANSLATION) -> Optional[Dict[str, Any]]:
+    """
+    A verse with its tagged original-language words, or None if it does not exist.
+
+    Returns:
+        {'book_name', 'chapter_num', 'verse_num', 'text', 'tagged_words': [...],
+         'hebrew_text' or 'greek_text'}
+    """
+    key = verse_key(book, chapter, verse)
+    if key is None:
+        return None
+    language = language_for_book(book)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT book_name, chapter_num, verse_num, verse_text AS text
+            FROM bible.verses
+            WHERE verse_key = %s
+            ORDER BY (translation_source = %s) DESC
+            LIMIT 1
+        """, (key, translation))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute(f"""
+            SELECT word_text AS text, strongs_id, grammar_code AS morphology
+            FROM {WORD_TABLES[language]}
+            WHERE verse_key = %s
+            ORDER BY word_num
+        """, (key,))
+        words = [dict(w) for w in cur.fetchall()]
+    entries = get_lexicon_service().get_entries([w['strongs_id'] for w in words if w['strongs_id']], conn)
+    for word in words:
+        entry = entries.get(word['strongs_id'])
+        word['lemma'] = entry.lemma if entry else None
+    data = dict(row)
+    data['tagged_words'] = words
+    data[f"{language}_text"] = ' '.join(w['text'] for w in words if w['text'])
+    return data
+
+
+def validate_critical_terms() -> List[Dict[str, Any]]:
+    """Occurrence counts of the critical Hebrew terms against their expected minimums."""
+    counts = get_term_stats_service().get_counts(CRITICAL_HEBREW_TERMS)
+    return [{
+        'term': info['name'],
+        'hebrew': info['hebrew'],
+        'strongs_id': strongs_id,
+        'count': counts.get(strongs_id, {}).get('hebrew', 0),
+        'valid': counts.get(strongs_id, {}).get('hebrew', 0) >= info['expected_min'],
+    } for strongs_id, info in CRITICAL_HEBREW_TERMS.items()]
+
+
+def theological_terms_report() -> List[Dict[str, Any]]:
+    """Key Hebrew and Greek theological terms with lexicon roots and occurrence counts."""
+    terms = {sid: info['name'] for sid, info in CRITICAL_HEBREW_TERMS.items()}
+    terms.update(KEY_GREEK_TERMS)
+    counts = get_term_stats_service().get_counts(terms)
+    entries = get_lexicon_service().get_entries(terms)
+    report = []
+    for strongs_id, name in terms.items():
+        language = language_for_strongs(strongs_id)
+        entry = entries.get(strongs_id)
+        report.append({
+            'term': name,
+            'root': entry.lemma if entry else '',
+            'strongs_id': strongs_id,
+            'language': language,
+            'count': counts.get(strongs_id, {}).get(language, 0),
+        })
+    return report
+
+
+def cross_language_terms(mappings: List[Dict[str, str]], strongs_id: Optional[str] = None,
+                         all_terms: bool = False, limit: int = 50,
+                         offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Cross-language term mappings with occurrence counts (see term_stats).
+
+    Args:
+        mappings: Featured mappings returned by default
+        strongs_id: Return every alignment involving this Hebrew or Greek ID
+        all_terms: Return all alignments, most frequent first
+    """
+    service = get_term_stats_service()
+    if strongs_id or all_terms:
+        return [{
+            "hebrew": a['hebrew_form'],
+            "greek": a['greek_form'],
+            "arabic": a['arabic_form'],
+            "strongs": a['hebrew_strongs'],
+            "greek_strongs": a['greek_strongs'],
+            "counts": {"hebrew": a['hebrew_count'], "greek": a['greek_count'], "arabic": a['arabic_count']}
+        } for a in service.get_alignments(strongs_id, limit=limit, offset=offset)]
+
+    ids = {m['strongs'] for m in mappings} | {m['greek_strongs'] for m in mappings}
+    counts = service.get_counts(ids)
+    results = []
+    for mapping in mappings:
+        hebrew = counts.get(mapping['strongs'], {})
+        greek = counts.get(mapping['greek_strongs'], {})
+        results.append({
+            **mapping,
+            "counts": {
+                "hebrew": hebrew.get('hebrew', 0),
+                "greek": greek.get('greek', 0),
+                "arabic": hebrew.get('arabic', 0) + greek.get('arabic', 0)
+            }
+        })
+    return results
+
+
+# --- proper names -----------------------------------------------------------
+
+def name_types(conn) -> Dict[str, Any]:
+    """Filter values for the names search form."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT array_agg(DISTINCT type ORDER BY type) AS types,
+                   array_agg(DISTINCT gender ORDER BY gender) FILTER (WHERE gender IS NOT NULL) AS genders
+            FROM bible.proper_names
+        """)
+        row = cur.fetchone()
+        cur.execute("""
+            SELECT split_part(reference, '.', 1) AS book, COUNT(*) AS count
+            FROM bible.proper_name_references
+            GROUP BY 1
+            ORDER BY 1
+        """)
+        book_counts = {r['book']: r['count'] for r in cur.fetchall()}
+    return {
+        'types': row['types'] or [],
+        'genders': row['genders'] or [],
+        'book_counts': book_counts,
+    }
+
+
+def list_names(conn, limit: int = 5) -> List[Dict[str, Any]]:
+    """Most referenced proper names."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT n.id, n.name, n.type, n.gender, n.short_description,
+                   COUNT(r.id) AS reference_count
+            FROM bible.proper_names n
+            LEFT JOIN bible.proper_name_forms f ON f.proper_name_id = n.id
+            LEFT JOIN bible.proper_name_references r ON r.proper_name_form_id = f.id
+            GROUP BY n.id
+            ORDER BY reference_count DESC, n.name
+            LIMIT %s
+        """, (limit,))
+        return [dict(row) for row in cur.fetchall()]
+
+
+def search_names(conn, query: str = '', search_type: str = 'name', name_type: str = '',
+                 gender: str = '', book: str = '', offset: int = 0,
+                 limit: int = 50) -> Dict[str, Any]:
+    """
+    Search proper names by name, Strong's ID or reference, with optional filters.
+
+    Returns:
+        {'results': [...], 'metadata': {'total_count', 'offset', 'limit'}}
+    """
+    conditions, params = [], []
+    if query:
+        if search_type == 'strongs':
+            conditions.append("EXISTS (SELECT 1 FROM bible.proper_name_forms f "
+                              "WHERE f.proper_name_id = n.id AND f.strongs_id = ANY(%s))")
+            params.append(strongs_variants(query))
+        elif search_type == 'reference':
+            conditions.append("EXISTS (SELECT 1 FROM bible.proper_name_forms f "
+                              "JOIN bible.proper_name_references r ON r.proper_name_form_id = f.id "
+                              "WHERE f.proper_name_id = n.id AND r.reference LIKE %s)")
+            params.append(f"{query}%")
+        else:
+            conditions.append("n.name ILIKE %s")
+            params.append(f"%{query}%")
+    if name_type:
+        conditions.append("n.type = %s")
+        params.append(name_type)
+    if gender:
+        conditions.append("n.gender = %s")
+        params.append(gender)
+    if book:
+        conditions.append("EXISTS (SELECT 1 FROM bible.proper_name_forms f "
+                          "JOIN bible.proper_name_references r ON r.proper_name_form_id = f.id "
+                          "WHERE f.proper_name_id = n.id AND r.reference LIKE %s)")
+        params.append(f"{book}.%")
+    where = " AND ".join(conditions) or "TRUE"
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT n.id, n.name, n.type, n.gender, n.short_description,
+                   COUNT(*) OVER () AS total_count
+            FROM bible.proper_names n
+            WHERE {where}
+            ORDER BY n.name, n.id
+            OFFSET %s LIMIT %s
+        """, params + [offset, limit])
+        rows = [dict(row) for row in cur.fetchall()]
+    total = rows[0].pop('total_count') if rows else 0
+    for row in rows[1:]:
+        row.pop('total_count')
+    return {'results': rows, 'metadata': {'total_count': total, 'offset': offset, 'limit': limit}}
+
+
+def get_name(conn, name_id: int) -> Optional[Dict[str, Any]]:
+    """A proper name with its forms, references and relationships, or None."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT id, name, type, gender, title, description, short_description
+            FROM bible.proper_names WHERE id = %s
+        """, (name_id,))
+        name = cur.fetchone()
+        if name is None:
+            return None
+        name = dict(name)
+        cur.execute("""
+            SELECT f.id, f.language, f.form, f.transliteration, f.strongs_id,
+                   COALESCE(json_agg(json_build_object('reference', r.reference, 'context', r.context)
+                                     ORDER BY r.id) FILTER (WHERE r.id IS NOT NULL), '[]') AS references
+            FROM bible.proper_name_forms f
+            LEFT JOIN bible.proper_name_references r ON r.proper_name_form_id = f.id
+            WHERE f.proper_name_id = %s
+            GROUP BY f.id
+            ORDER BY f.language DESC, f.id
+        """, (name_id,))
+        name['forms'] = [dict(row) for row in cur.fetchall()]
+        cur.execute("""
+            SELECT rel.relationship_type, rel.description,
+                   other.id AS related_id, other.name AS related_name,
+                   other.type AS related_type, other.gender AS related_gender
+            FROM bible.proper_name_relationships rel
+            JOIN bible.proper_names other ON other.id = rel.target_name_id
+            WHERE rel.source_name_id = %s
+            ORDER BY rel.relationship_type, other.name
+        """, (name_id,))
+        name['relationships'] = [dict(row) for row in cur.fetchall()]
+    return name
+
+
+def verse_names(conn, book: str, chapter: int, verse: int) -> List[Dict[str, Any]]:
+    """Proper names referenced in a verse, with the form used there."""
+    book_num = resolve_book(book)
+    if book_num is None:
+        return []
+    reference = f"{BOOK_ABBREVIATIONS[book_num]}.{chapter}.{verse}"
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT DISTINCT ON (n.id) n.id, n.name, n.type, f.form, f.language, f.transliteration
+            FROM bible.proper_name_references r
+            JOIN bible.proper_name_forms f ON f.id = r.proper_name_form_id
+            JOIN bible.proper_names n ON n.id = f.proper_name_id
+            WHERE r.reference = %s
+            ORDER BY n.id, f.id
+        """, (reference,))
+        return [dict(row) for row in cur.fetchall()]
+
+
+# --- morphology -------------------------------------------------------------
+
+def search_morphology(conn, language: str, code: str, limit: int = 25) -> List[Dict[str, Any]]:
+    """Morphology codes starting with (or described by) the query."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT code, code_type, description, explanation, example
+            FROM {MORPHOLOGY_TABLES[language]}
+            WHERE code ILIKE %s OR description ILIKE %s
+            ORDER BY (code ILIKE %s) DESC, length(code), code
+            LIMIT %s
+        """, (f"{code}%", f"%{code}%", f"{code}%", limit))
+        return [dict(row) for row in cur.fetchall()]
+
+
+def get_morphology_code(conn, language: str, code: str) -> Optional[Dict[str, Any]]:
+    """A single morphology code, or None."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT code, code_type, description, explanation, example
+            FROM {MORPHOLOGY_TABLES[language]}
+            WHERE code = %s
+            LIMIT 1
+        """, (code,))
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def words_by_grammar_code(conn, language: str, code: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Example words tagged with a morphology code, in canonical order."""
+    translation = "translation" if language == 'greek' else "NULL"
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT book_name, chapter_num, verse_num, word_text, strongs_id,
+                   {translation} AS translation
+            FROM {WORD_TABLES[language]}
+            WHERE grammar_code = %s
+            ORDER BY verse_key, word_num
+            LIMIT %s
+        """, (code, limit))
+        return [dict(row) for row in cur.fetchall()]
+
+
+# --- concordance ------------------------------------------------------------
+
+def concordance(conn, strongs_id: str, limit: Optional[int] = 500, context_words: int = 3,
+                translation: str = DEFAULT_TRANSLATION) -> Dict[str, Any]:
+    """
+    Occurrences of a Strong's ID with verse text and surrounding words.
+
+    Occurrences, verse text and context words come back in one query; the
+    total count uses the (strongs_id, verse_key) index.
+    """
+    language = language_for_strongs(strongs_id)
+    table = WORD_TABLES[language]
+    ids = strongs_variants(strongs_id)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"SELECT COUNT(*) AS total FROM {table} WHERE strongs_id = ANY(%s)", (ids,))
+        total = cur.fetchone()['total']
+        cur.execute(f"""
+            WITH hits AS (
+                SELECT verse_key, word_num, word_text, strongs_id, book_name, chapter_num, verse_num
+                FROM {table}
+                WHERE strongs_id = ANY(%s)
+                ORDER BY verse_key, word_num
+                LIMIT %s
+            )
+            SELECT h.*, v.verse_text, ctx.before, ctx.after
+            FROM hits h
+            LEFT JOIN LATERAL (
+                SELECT verse_text FROM bible.verses v
+                WHERE v.verse_key = h.verse_key
+                ORDER BY (v.translation_source = %s) DESC
+                LIMIT 1
+            ) v ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object('word_text', w.word_text, 'strongs_id', w.strongs_id)
+                                ORDER BY w.word_num) FILTER (WHERE w.word_num < h.word_num) AS before,
+                       json_agg(json_build_object('word_text', w.word_text, 'strongs_id', w.strongs_id)
+                                ORDER BY w.word_num) FILTER (WHERE w.word_num > h.word_num) AS after
+                FROM {table} w
+                WHERE w.verse_key = h.verse_key
+                  AND w.word_num BETWEEN h.word_num - %s AND h.word_num + %s
+            ) ctx ON TRUE
+            ORDER BY h.verse_key, h.word_num
+        """, (ids, limit, translation, context_words, context_words))
+        rows = cur.fetchall()
+    entry = get_lexicon_service().get_entries([strongs_id], conn).get(strongs_id)
+    return {
+        'strongs_id': strongs_id,
+        'language': language,
+        'lexicon_entry': _lexicon_entry_dict(entry),
+        'total': total,
+        'occurrences': [{
+            'reference': format_reference(row['book_name'], row['chapter_num'], row['verse_num']),
+            'verse_key': row['verse_key'],
+            'verse_text': row['verse_text'] or '',
+            'target_word': {'text': row['word_text'], 'strongs_id': row['strongs_id']},
+            'context': {'before': row['before'] or [], 'after': row['after'] or []},
+        } for row in rows],
+    }
+
+
+def arabic_concordance(conn, strongs_id: str, limit: Optional[int] = 500,
+                       context_words: int = 3) -> Dict[str, Any]:
+    """Arabic words aligned to a Strong's ID, with verse text and surrounding words."""
+    ids = strongs_variants(strongs_id)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT COUNT(*) AS total FROM bible.arabic_words WHERE strongs_id = ANY(%s)", (ids,))
+        total = cur.fetchone()['total']
+        cur.execute("""
+            WITH hits AS (
+                SELECT w.verse_id, w.word_position, w.arabic_word, w.strongs_id
+                FROM bible.arabic_words w
+                WHERE w.strongs_id = ANY(%s)
+                ORDER BY w.verse_id, w.word_position
+                LIMIT %s
+            )
+            SELECT h.*, v.book_name, v.chapter_num, v.verse_num, v.verse_text, ctx.before, ctx.after
+            FROM hits h
+            JOIN bible.arabic_verses v ON v.id = h.verse_id
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object('word_text', w.arabic_word, 'strongs_id', w.strongs_id)
+                                ORDER BY w.word_position) FILTER (WHERE w.word_position < h.word_position) AS before,
+                       json_agg(json_build_object('word_text', w.arabic_word, 'strongs_id', w.strongs_id)
+                                ORDER BY w.word_position) FILTER (WHERE w.word_position > h.word_position) AS after
+                FROM bible.arabic_words w
+                WHERE w.verse_id = h.verse_id
+                  AND w.word_position BETWEEN h.word_position - %s AND h.word_position + %s
+            ) ctx ON TRUE
+            ORDER BY h.verse_id, h.word_position
+        """, (ids, limit, context_words, context_words))
+        rows = cur.fetchall()
+    entry = get_lexicon_service().get_entries([strongs_id], conn).get(strongs_id)
+    return {
+        'strongs_id': strongs_id,
+        'language': 'arabic',
+        'lexicon_entry': _lexicon_entry_dict(entry),
+        'total': total,
+        'occurrences': [{
+            'reference': format_reference(row['book_name'], row['chapter_num'], row['verse_num']),
+            'verse_text': row['verse_text'] or '',
+            'target_word': {'text': row['arabic_word'], 'strongs_id': row['strongs_id']},
+            'context': {'before': row['before'] or [], 'after': row['after'] or []},
+        } for row in rows],
+    }
+
+
+EXPORT_BATCH_SIZE = 2000
+
+
+def iter_concordance_rows(conn, strongs_id: str, arabic: bool = False,
+                          batch_size: int = EXPORT_BATCH_SIZE,
+                          translation: str = DEFAULT_TRANSLATION) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Stream every occurrence of a Strong's ID as (reference, verse_text, word, strongs_id).
+
+    Rows come from a named (server-side) cursor ``batch_size`` at a time, so
+    the full result set is never held in memory on either side.
+    """
+    ids = strongs_variants(strongs_id)
+    if arabic:
+        sql = """
+            SELECT v.book_name, v.chapter_num, v.verse_num, v.verse_text, w.arabic_word, w.strongs_id
+            FROM bible.arabic_words w
+            JOIN bible.arabic_verses v ON v.id = w.verse_id
+            WHERE w.strongs_id = ANY(%s)
+            ORDER BY w.verse_id, w.word_position
+        """
+        params = (ids,)
+    else:
+        sql = f"""
+            SELECT w.book_name, w.chapter_num, w.verse_num, v.verse_text, w.word_text, w.strongs_id
+            FROM {WORD_TABLES[language_for_strongs(strongs_id)]} w
+            LEFT JOIN LATERAL (
+                SELECT verse_text FROM bible.verses v
+                WHERE v.verse_key = w.verse_key
+                ORDER BY (v.translation_source = %s) DESC
+                LIMIT 1
+            ) v ON TRUE
+            WHERE w.strongs_id = ANY(%s)
+            ORDER BY w.verse_key, w.word_num
+        """
+        params = (translation, ids)
+    with conn.cursor(name='concordance_export', cursor_factory=RealDictCursor) as cur:
+        cur.itersize = batch_size
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                book_name, chapter_num, verse_num, verse_text, word, sid = row.values()
+                yield (format_reference(book_name, chapter_num, verse_num), verse_text or '', word, sid)
+
+
+# --- cross references and semantic search -----------------------------------
+
+def cross_references(conn, book: str, chapter: int, verse: int, limit: int = 20,
+                     max_frequency: int = 500,
+                     translation: str = DEFAULT_TRANSLATION) -> Optional[Dict[str, Any]]:
+    """
+    Verses sharing the most distinctive original-language words with a verse.
+
+    Words occurring more than ``max_frequency`` times are ignored; verses that
+    share most of the remaining words are reported as parallel passages.
+
+    Returns:
+        {'verse': {'reference', 'text'}, 'cross_references': [...]}, or None if the
+        verse does not exist
+    """
+    key = verse_key(book, chapter, verse)
+    if key is None:
+        return None
+    table = WORD_TABLES[language_for_book(book)]
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT verse_text FROM bible.verses
+            WHERE verse_key = %s ORDER BY (translation_source = %s) DESC LIMIT 1
+        """, (key, translation))
+        source = cur.fetchone()
+        if source is None:
+            return None
+        cur.execute(f"""
+            WITH source_ids AS (
+                SELECT DISTINCT strongs_id FROM {table}
+                WHERE verse_key = %s AND strongs_id IS NOT NULL
+            ), distinctive AS (
+                SELECT w.strongs_id
+                FROM {table} w JOIN source_ids s USING (strongs_id)
+                GROUP BY w.strongs_id
+                HAVING COUNT(*) <= %s
+            ), matches AS (
+                SELECT w.verse_key, COUNT(DISTINCT w.strongs_id) AS shared_words
+                FROM {table} w JOIN distinctive d USING (strongs_id)
+                WHERE w.verse_key <> %s
+                GROUP BY w.verse_key
+                HAVING COUNT(DISTINCT w.strongs_id) >= 2
+                ORDER BY shared_words DESC, w.verse_key
+                LIMIT %s
+            )
+            SELECT m.verse_key, m.shared_words, (SELECT COUNT(*) FROM distinctive) AS distinctive_words,
+                   v.verse_text
+            FROM matches m
+            LEFT JOIN LATERAL (
+                SELECT verse_text FROM bible.verses v
+                WHERE v.verse_key = m.verse_key
+                ORDER BY (v.translation_source = %s) DESC
+                LIMIT 1
+            ) v ON TRUE
+            ORDER BY m.shared_words DESC, m.verse_key
+        """, (key, max_frequency, key, limit, translation))
+        rows = cur.fetchall()
+    references = []
+    for row in rows:
+        is_parallel = row['shared_words'] >= max(3, 0.6 * row['distinctive_words'])
+        references.append({
+            'reference': format_verse_id(row['verse_key']),
+            'text': row['verse_text'] or '',
+            'type': 'parallel_passage' if is_parallel else 'shared_content',
+            'shared_words': row['shared_words'],
+        })
+    return {
+        'verse': {'reference': format_verse_id(key), 'text': source['verse_text']},
+        'cross_references': references,
+    }
+
+
+def semantic_search(conn, query: str, limit: int = 20,
+                    translation: str = DEFAULT_TRANSLATION) -> Dict[str, Any]:
+    """
+    Embedding search with neighbouring verses for context and matched query terms.
+
+    The neighbouring verses of every hit are fetched in one verse_key query.
+    """
+    from src.utils.api_utils import format_vector_search_response
+    from src.utils.vector_search import search_verses_by_semantic_similarity
+
+    hits = search_verses_by_semantic_similarity(query, translation=translation, limit=limit)
+    response = format_vector_search_response(hits, query, translation)
+
+    keys = [verse_key(r['book_name'], r['chapter_num'], r['verse_num']) for r in response['results']]
+    neighbours = sorted({k + d for k in keys if k for d in (-1, 1)})
+    texts: Dict[int, str] = {}
+    if neighbours:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT verse_key, verse_text FROM bible.verses
+                WHERE verse_key = ANY(%s) AND translation_source = %s
+            """, (neighbours, translation))
+            texts = {row['verse_key']: row['verse_text'] for row in cur.fetchall()}
+
+    terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) > 2]
+    matched = set()
+    for result, key in zip(response['results'], keys):
+        result['match_score'] = result['similarity']
+        result['context'] = {
+            'previous': texts.get(key - 1, '') if key else '',
+            'next': texts.get(key + 1, '') if key else '',
+        }
+        text = (result['verse_text'] or '').lower()
+        matched.update(t for t in terms if t in text)
+    response['metadata']['matched_terms'] = sorted(matched)
+    return response
+
+
+# --- Arabic Bible -----------------------------------------------------------
+
+def arabic_stats(conn) -> Dict[str, Any]:
+    """Verse/word totals and per-book verse counts for the Arabic Bible."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT book_name, COUNT(*) AS verse_count
+            FROM bible.arabic_verses
+            GROUP BY book_name
+        """)
+        books = [dict(row) for row in cur.fetchall()]
+        cur.execute("SELECT COUNT(*) AS total FROM bible.arabic_words")
+        total_words = cur.fetchone()['total']
+    books.sort(key=lambda b: (resolve_book(b['book_name']) or 99, b['book_name']))
+    return {
+        'total_verses': sum(b['verse_count'] for b in books),
+        'total_words': total_words,
+        'books': books,
+    }
+
+
+def arabic_verse(conn, book: str, chapter: int, verse: int) -> Optional[Dict[str, Any]]:
+    """An Arabic verse with its tagged words and their lexicon entries, or None."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT id, book_name, chapter_num, verse_num, verse_text, translation_source
+            FROM bible.arabic_verses
+            WHERE book_name = ANY(%s) AND chapter_num = %s AND verse_num = %s
+            LIMIT 1
+        """, (book_spellings(book), chapter, verse))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        verse_row = dict(row)
+        cur.execute("""
+            SELECT word_position, arabic_word, strongs_id, greek_word,
+                   transliteration, gloss, morphology
+            FROM bible.arabic_words
+            WHERE verse_id = %s
+            ORDER BY word_position
+        """, (verse_row['id'],))
+        words = [dict(w) for w in cur.fetchall()]
+    entries = get_lexicon_service().get_entries([w['strongs_id'] for w in words if w['strongs_id']], conn)
+    for word in words:
+        entry = entries.get(word['strongs_id'])
+        word['lexicon'] = {
+            'lemma': entry.lemma,
+            'transliteration': entry.transliteration,
+            'short_definition': entry.gloss,
+        } if entry else None
+    verse_row['words'] = words
+    return {'verse': verse_row, 'words': words}
+
+
+def arabic_context(conn, book: str, chapter: int, verse: int, context: int = 3) -> Dict[str, Any]:
+    """Arabic verses surrounding a verse within the same chapter."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT book_name, chapter_num, verse_num, verse_text
+            FROM bible.arabic_verses
+            WHERE book_name = ANY(%s) AND chapter_num = %s AND verse_num BETWEEN %s AND %s
+            ORDER BY verse_num
+        """, (book_spellings(book), chapter, verse - context, verse + context))
+        return {'verses': [dict(row) for row in cur.fetchall()]}
+
+
+def arabic_search(conn, query: str, book: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """Search Arabic verse text, optionally within one book."""
+    conditions, params = ["verse_text ILIKE %s"], [f"%{query}%"]
+    if book:
+        conditions.append("book_name = ANY(%s)")
+        params.append(book_spellings(book))
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT book_name, chapter_num, verse_num, verse_text
+            FROM bible.arabic_verses
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT %s
+        """, params + [limit])
+        results = [dict(row) for row in cur.fetchall()]
+    return {'query': query, 'count': len(results), 'results': results}
+
+
+def arabic_parallel(conn, book: str, chapter: int, verse: int) -> Dict[str, Any]:
+    """An Arabic verse next to the original-language text of the same verse."""
+    key = verse_key(book, chapter, verse)
+    parallel = {'arabic': None, 'greek': None, 'hebrew': None}
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT book_name, chapter_num, verse_num, verse_text
+            FROM bible.arabic_verses
+            WHERE book_name = ANY(%s) AND chapter_num = %s AND verse_num = %s
+            LIMIT 1
+        """, (book_spellings(book), chapter, verse))
+        row = cur.fetchone()
+        parallel['arabic'] = dict(row) if row else None
+        if key is not None:
+            language = language_for_book(book)
+            cur.execute(f"""
+                SELECT string_agg(word_text, ' ' ORDER BY word_num) AS verse_text
+                FROM {WORD_TABLES[language]}
+                WHERE verse_key = %s
+            """, (key,))
+            row = cur.fetchone()
+            if row and row['verse_text']:
+                book_num, chapter_num, verse_num = unpack_verse_id(key)
+                parallel[language] = {
+                    'book_name': BOOK_NAMES[book_num],
+                    'chapter_num': chapter_num,
+                    'verse_num': verse_num,
+                    'verse_text': row['verse_text'],
+                }
+    return parallel
@@ -0,0 +1,337 @@
+"""
+Request Metrics
+
+Per-request instrumentation installed as Flask before/after hooks, so no
+route needs a decorator. Each request records:
+
+- the route template (``/verse/<book>/<int:chapter>/<int:verse>``), method and status;
+- latency, in a histogram;
+- the number of upstream calls (database queries through the service layer,
+  HTTP calls over the shared fan-out session) and the time spent in them.
+
+Metrics are kept in per-thread shards, so recording a request takes no lock;
+``/metrics`` sums the shards and renders them in the Prometheus text format.
+
+Interaction logging for DSPy training data is sampled
+(INTERACTION_LOG_SAMPLE_RATE) and written by a background thread. A full
+queue drops entries, so logging never re-runs or blocks a handler. Requests
+whose handler already submitted a record are not sampled again.
+
+Usage:
+    metrics = RequestMetrics(interaction_log=InteractionLog(log_web_interaction))
+    metrics.init_app(app)
+
+    with track_upstream():
+        rows = run_query(...)
+"""
+
+import os
+import time
+import queue
+import random
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_CALL_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+INTERACTION_LOG_SAMPLE_RATE = float(os.getenv('INTERACTION_LOG_SAMPLE_RATE', '0.1'))
+INTERACTION_LOG_QUEUE_SIZE = int(os.getenv('INTERACTION_LOG_QUEUE_SIZE', '1000'))
+
+# Paths that are neither timed per route nor logged as interactions
+UNTRACKED_PATHS = ('/static', '/health', '/favicon.ico', '/metrics')
+
+
+# --- metric types -------------------------------------------------------------
+
+class _ShardedMetric:
+    """
+    Values per label set, kept in one shard per thread.
+
+    Only the owning thread writes to a shard, so updates need no lock; the
+    shard list itself is only locked when a thread records its first value.
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, list]] = []
+        self._shards_lock = threading.Lock()
+
+    def _cells(self, label_values: tuple, width: int) -> list:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        cells = shard.get(label_values)
+        if cells is None:
+            cells = shard[label_values] = [0] * width
+        return cells
+
+    def _merged(self) -> Dict[tuple, list]:
+        merged: Dict[tuple, list] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, cells in list(shard.items()):
+                total = merged.setdefault(key, [0] * len(cells))
+                for i, value in enumerate(cells):
+                    total[i] += value
+        return merged
+
+    def _label_text(self, label_values: tuple, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, *label_values):
+        self._cells(label_values, 1)[0] += amount
+
+    def value(self, *label_values) -> float:
+        return self._merged().get(label_values, [0])[0]
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, (value,) in sorted(self._merged().items()):
+            lines.append(f"{self.name}{self._label_text(key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values):
+        # Cells: one per bucket, one for values above the last bucket, then the sum
+        cells = self._cells(label_values, len(self.buckets) + 2)
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def snapshot(self, *label_values) -> Tuple[int, float]:
+        """(count, sum) for one label set."""
+        cells = self._merged().get(label_values)
+        if cells is None:
+            return 0, 0.0
+        return sum(cells[:-1]), cells[-1]
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, cells in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, cells):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _number(bound))])} {cumulative}")
+            cumulative += cells[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{self._label_text(key, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(cells[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# --- upstream call tracking ----------------------------------------------------
+
+class RequestTrace:
+    """Upstream calls made while serving one request (appended from any thread)."""
+
+    __slots__ = ('started', 'upstream')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.upstream: List[float] = []
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    'request_trace', default=None
+)
+
+
+def record_upstream(seconds: float):
+    """Attribute one upstream call to the current request, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.upstream.append(seconds)
+
+
+@contextmanager
+def track_upstream():
+    """Time the enclosed block as one upstream call of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_upstream(time.perf_counter() - start)
+
+
+# --- interaction logging -------------------------------------------------------
+
+class InteractionLog:
+    """
+    Writes interaction records on a background thread.
+
+    Args:
+        sink: Function called with each record's keyword arguments (e.g. log_web_interaction)
+        sample_rate: Fraction of requests ``sample()`` passes on
+        max_queue: Records waiting to be written; beyond this new records are dropped
+    """
+
+    def __init__(self, sink: Callable[..., object], sample_rate: float = INTERACTION_LOG_SAMPLE_RATE,
+                 max_queue: int = INTERACTION_LOG_QUEUE_SIZE):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name='interaction-log', daemon=True)
+                    self._thread.start()
+
+    def _worker(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self.sink(**record)
+            except Exception as e:
+                logger.error(f"Error logging interaction: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, **record) -> bool:
+        """Queue a record; returns False if it was dropped."""
+        if has_request_context():
+            # The handler logged this request itself, so RequestMetrics does not sample it
+            g.interaction_logged = True
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def sample(self, **record) -> bool:
+        """Queue a record with probability ``sample_rate``."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        return self.submit(**record)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued records are written (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+# --- Flask integration ---------------------------------------------------------
+
+class RequestMetrics:
+    """
+    Flask before/after hooks that time requests and serve ``/metrics``.
+
+    Args:
+        interaction_log: Optional sampled interaction logger for page requests
+    """
+
+    def __init__(self, interaction_log: Optional[InteractionLog] = None):
+        self.interaction_log = interaction_log
+        self.requests = Histogram('http_request_duration_seconds', 'Request latency by route template',
+                                  ('route', 'method', 'status'))
+        self.upstream_calls = Histogram('http_upstream_calls', 'Upstream calls per request by route template',
+                                        ('route',), buckets=UPSTREAM_CALL_BUCKETS)
+        self.upstream_seconds = Counter('http_upstream_duration_seconds_total',
+                                        'Time spent in upstream calls by route template', ('route',))
+        self.metrics = [self.requests, self.upstream_calls, self.upstream_seconds]
+
+    def init_app(self, app):
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    @staticmethod
+    def _route() -> str:
+        # Route templates keep label cardinality bounded; unmatched paths share one label
+        return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+    def _before(self):
+        if request.path.startswith(UNTRACKED_PATHS):
+            return None
+        request.environ['bible.request_trace_token'] = _current_trace.set(RequestTrace())
+        return None
+
+    def _after(self, response):
+        trace = _current_trace.get()
+        if trace is None:
+            return response
+        try:
+            route = self._route()
+            self.requests.observe(time.perf_counter() - trace.started, route, request.method,
+                                  str(response.status_code))
+            upstream = list(trace.upstream)
+            self.upstream_calls.observe(len(upstream), route)
+            self.upstream_seconds.inc(sum(upstream), route)
+            if self.interaction_log is not None and request.method == 'GET' and not g.get('interaction_logged'):
+                self.interaction_log.sample(route=request.path, query_params=dict(request.args),
+                                            response_type=response.mimetype, response_status=response.status_code)
+        except Exception as e:
+            logger.error(f"Error recording request metrics: {e}")
+        return response
+
+    def _teardown(self, exc=None):
+        token = request.environ.pop('bible.request_trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        if self.interaction_log is not None:
+            lines.extend([
+                "# HELP interaction_log_dropped_total Interaction records dropped because the queue was full",
+                "# TYPE interaction_log_dropped_total counter",
+                f"interaction_log_dropped_total {self.interaction_log.dropped}",
+            ])
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
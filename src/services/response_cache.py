@@ -0,0 +1,321 @@
+"""
+HTTP Response Cache
+
+Bible, lexicon and morphology data only change when an ETL runs, so rendered
+pages and JSON responses are reusable until the next load. Every cached
+response carries a strong ETag derived from (endpoint, arguments, data
+version), where the data version is the sum of the counters in
+bible.etl_versions that the ETL loaders bump:
+
+- A request whose If-None-Match (or If-Modified-Since) still matches gets a
+  304 without running the view.
+- Otherwise the response body comes from a byte-bounded in-process LRU, and
+  only on a miss is the view rendered.
+- Cache-Control lets a reverse proxy or browser reuse the response for
+  RESPONSE_CACHE_MAX_AGE seconds and then revalidate with the ETag.
+
+Responses are only cached when they are a plain 200 that did not render an
+error template (or a template with an ``error`` message) or set a cookie;
+requests that carry a session cookie bypass the cache. Views can opt out of
+caching a particular response with ``skip_response_cache()``.
+
+Usage:
+    response_cache = get_response_cache()
+
+    @app.route('/lexicon/<lang>/<strongs_id>')
+    @response_cache.cached
+    def lexicon_entry(lang, strongs_id): ...
+
+    response_cache.register_blueprint(bible_data_api, exclude={'concordance_export'})
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from flask import Response, current_app, g, has_request_context, make_response, request, template_rendered
+
+from src.utils.db_utils import get_data_version
+
+logger = logging.getLogger(__name__)
+
+# Total and per-response size bounds of the rendered-response LRU (bytes)
+MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+MAX_ENTRY_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRY_BYTES', str(1024 * 1024)))
+# How long clients and proxies may reuse a response before revalidating (seconds)
+MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', '300'))
+STALE_WHILE_REVALIDATE = int(os.getenv('RESPONSE_CACHE_STALE_WHILE_REVALIDATE', '60'))
+# How often the data version is re-read from bible.etl_versions (seconds)
+VERSION_CHECK_INTERVAL = float(os.getenv('DATA_VERSION_CHECK_INTERVAL', '30'))
+
+ERROR_TEMPLATES = ('error.html',)
+
+# Response headers replayed from the cache
+_STORED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+def _default_connection():
+    from src.services.bible_data import default_connection_factory
+    return default_connection_factory()
+
+
+class DataVersion:
+    """
+    The global data version, re-read at most once per ``check_interval``.
+
+    If the database cannot be reached the last known version is kept; before
+    the first successful read ``current()`` returns None and caching is off.
+    """
+
+    def __init__(self, connection_factory: Optional[Callable] = None,
+                 check_interval: float = VERSION_CHECK_INTERVAL):
+        self.connection_factory = connection_factory or _default_connection
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value: Optional[Tuple[int, Optional[datetime]]] = None
+        self._checked_at = None
+
+    def current(self) -> Optional[Tuple[int, Optional[datetime]]]:
+        """Return (version, last_modified), or None if the version is unknown."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._value
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self._value
+            self._checked_at = now
+            try:
+                conn = self.connection_factory()
+                if conn is None:
+                    raise RuntimeError("no database connection")
+                try:
+                    value = get_data_version(conn)
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"Could not read data version: {e}")
+                return self._value
+            version, last_modified = value
+            if last_modified is not None and last_modified.tzinfo is None:
+                # bible.etl_versions stores naive UTC timestamps
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            value = (version, last_modified)
+            if self._value is not None and value[0] != self._value[0]:
+                logger.info(f"Data version changed ({self._value[0]} -> {value[0]})")
+            self._value = value
+            return value
+
+    def invalidate(self):
+        """Re-read the version on the next request."""
+        self._checked_at = None
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    status: int
+    headers: List[Tuple[str, str]]
+
+
+class FragmentCache:
+    """
+    LRU of rendered response bodies bounded by total size in bytes.
+
+    Keys are ETags, which include the data version, so entries from an older
+    version are never served; ``clear()`` drops them when the version changes.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, max_entry_bytes: int = MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse) -> bool:
+        """Store an entry; returns False if it is larger than ``max_entry_bytes``."""
+        size = len(entry.body)
+        if size > min(self.max_entry_bytes, self.max_bytes):
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self._entries[key] = entry
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.stats['evictions'] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def make_etag(endpoint: str, view_args: dict, args: Iterable[Tuple[str, str]], version: int) -> str:
+    """Strong ETag value for a request: a hash of the endpoint, its arguments and the data version."""
+    key = json.dumps([endpoint, sorted((view_args or {}).items()), sorted(args), version],
+                     default=str, ensure_ascii=False)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def skip_response_cache():
+    """Mark the current response as not cacheable (e.g. a page rendered with fallback data)."""
+    g._response_cache_skip = True
+
+
+def _record_template(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('_rendered_templates', []).append(template.name)
+        if context.get('error'):
+            # A page rendered with an error message reflects a failure, not the data
+            skip_response_cache()
+
+
+template_rendered.connect(_record_template)
+
+
+class ResponseCache:
+    """
+    Conditional GET, server-side response caching and Cache-Control headers.
+
+    Args:
+        data_version: Source of the global data version
+        fragments: Rendered-response store
+        max_age: Seconds clients and proxies may reuse a response without revalidating
+        error_templates: Templates whose rendering marks a response as an error page
+    """
+
+    def __init__(self, data_version: Optional[DataVersion] = None, fragments: Optional[FragmentCache] = None,
+                 max_age: int = MAX_AGE, error_templates: Iterable[str] = ERROR_TEMPLATES):
+        self.data_version = data_version or DataVersion()
+        self.fragments = fragments if fragments is not None else FragmentCache()
+        self.max_age = max_age
+        self.error_templates = set(error_templates)
+        self._version = None
+
+    def _cache_headers(self, response: Response, etag: str, last_modified: Optional[datetime]) -> Response:
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.headers['Cache-Control'] = (
+            f"public, max-age={self.max_age}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+        )
+        return response
+
+    def before(self) -> Optional[Response]:
+        """Answer from the client's validators or the cache, or note the request for ``after``."""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if current_app.config.get('SESSION_COOKIE_NAME', 'session') in request.cookies:
+            return None  # may include per-user content such as flashed messages
+        current = self.data_version.current()
+        if current is None:
+            return None
+        version, last_modified = current
+        if version != self._version:
+            if self._version is not None:
+                self.fragments.clear()
+            self._version = version
+        etag = make_etag(request.endpoint, request.view_args, request.args.items(multi=True), version)
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = (last_modified is not None and request.if_modified_since is not None
+                            and request.if_modified_since >= last_modified.replace(microsecond=0))
+        if not_modified:
+            return self._cache_headers(Response(status=304), etag, last_modified)
+
+        entry = self.fragments.get(etag)
+        if entry is not None:
+            response = Response(entry.body, status=entry.status, headers=entry.headers)
+            response.headers['X-Cache'] = 'HIT'
+            return self._cache_headers(response, etag, last_modified)
+
+        g._response_cache_key = (etag, last_modified)
+        return None
+
+    def _cacheable(self, response: Response) -> bool:
+        return (response.status_code == 200
+                and not response.is_streamed
+                and not response.direct_passthrough
+                and 'Set-Cookie' not in response.headers
+                and 'no-store' not in response.headers.get('Cache-Control', '')
+                and not g.get('_response_cache_skip')
+                and not self.error_templates.intersection(g.get('_rendered_templates', ())))
+
+    def after(self, response: Response) -> Response:
+        """Store and tag a freshly rendered response noted by ``before``."""
+        key = g.pop('_response_cache_key', None)
+        if key is None:
+            return response
+        etag, last_modified = key
+        if not self._cacheable(response):
+            response.headers.setdefault('Cache-Control', 'no-store')
+            return response
+        headers = [(name, response.headers[name]) for name in _STORED_HEADERS if name in response.headers]
+        self.fragments.put(etag, CachedResponse(response.get_data(), response.status_code, headers))
+        response.headers['X-Cache'] = 'MISS'
+        return self._cache_headers(response, etag, last_modified)
+
+    def cached(self, view: Callable) -> Callable:
+        """Decorator for a view whose output depends only on its arguments and the loaded data."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            early = self.before()
+            if early is not None:
+                return early
+            return self.after(make_response(view(*args, **kwargs)))
+        return wrapper
+
+    def register_blueprint(self, blueprint, exclude: Iterable[str] = ()):
+        """Cache every GET endpoint of a blueprint except the view functions named in ``exclude``."""
+        excluded = {f"{blueprint.name}.{name}" for name in exclude}
+
+        def before_blueprint_request():
+            if request.endpoint in excluded:
+                return None
+            return self.before()
+
+        blueprint.before_request(before_blueprint_request)
+        blueprint.after_request(self.after)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide ResponseCache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,19 @@
+"""
+Deterministic fake LM and embedding backends for offline and load testing.
+"""
+
+from .fake_lm import (
+    CannedResponses,
+    FakeLM,
+    Latency,
+    fake_embedding,
+)
+from .stub_server import StubLMServer
+
+__all__ = [
+    'CannedResponses',
+    'FakeLM',
+    'Latency',
+    'StubLMServer',
+    'fake_embedding',
+]
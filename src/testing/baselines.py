@@ -0,0 +1,152 @@
+"""
+Benchmark Baselines
+
+Stores benchmark summaries as JSON baselines and checks new runs against
+them for regressions.
+
+A baseline records the summary (see load_driver.summarize) together with what
+makes it comparable: the mix, the fixture fingerprint and configuration, the
+load settings and the host. A run on another fixture is reported as
+incomparable rather than compared. A run on the same fixture regresses when,
+overall or on any route with enough samples:
+
+- p95 or p99 latency rises by more than the relative threshold AND by more
+  than the absolute floor. The floor keeps jitter on millisecond routes from
+  failing the check.
+- throughput (RPS) drops by more than the relative threshold;
+- the error rate rises by more than the threshold (absolute, 0.01 = 1 point).
+
+Configuration (environment):
+    BENCH_BASELINE_DIR            Baseline directory (default: benchmarks/baselines)
+    BENCH_LATENCY_REGRESSION      Relative p95/p99 increase (default: 0.20)
+    BENCH_LATENCY_FLOOR_MS        Absolute p95/p99 increase (default: 5)
+    BENCH_RPS_REGRESSION          Relative RPS drop (default: 0.15)
+    BENCH_ERROR_RATE_REGRESSION   Error rate increase (default: 0.01)
+    BENCH_MIN_ROUTE_SAMPLES       Routes with fewer samples are not compared (default: 30)
+
+Usage:
+    save_baseline(baseline_path("mixed"), summary, metadata)
+    regressions = compare(load_baseline(baseline_path("mixed")), summary, metadata)
+"""
+
+import os
+import json
+import socket
+import platform
+import logging
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASELINE_DIR = os.getenv('BENCH_BASELINE_DIR', os.path.join('benchmarks', 'baselines'))
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    latency: float = float(os.getenv('BENCH_LATENCY_REGRESSION', '0.20'))
+    latency_floor_ms: float = float(os.getenv('BENCH_LATENCY_FLOOR_MS', '5'))
+    rps: float = float(os.getenv('BENCH_RPS_REGRESSION', '0.15'))
+    error_rate: float = float(os.getenv('BENCH_ERROR_RATE_REGRESSION', '0.01'))
+    min_samples: int = int(os.getenv('BENCH_MIN_ROUTE_SAMPLES', '30'))
+
+
+@dataclass
+class Regression:
+    scope: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        if self.metric == 'error_rate':
+            return f"{self.scope}: error rate {self.baseline:.2%} -> {self.current:.2%}"
+        change = (self.current - self.baseline) / self.baseline if self.baseline else float('inf')
+        return f"{self.scope}: {self.metric} {self.baseline:.1f} -> {self.current:.1f} ({change:+.0%})"
+
+
+@dataclass
+class Comparison:
+    comparable: bool
+    regressions: List[Regression] = field(default_factory=list)
+    reason: str = ''
+
+    @property
+    def passed(self) -> bool:
+        return self.comparable and not self.regressions
+
+
+def baseline_path(mix: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or BASELINE_DIR, f"{mix}.json")
+
+
+def host_info() -> Dict[str, Any]:
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_baseline(path: str, summary: Dict[str, Any], metadata: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    baseline = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'host': host_info(),
+        'metadata': metadata,
+        'summary': summary,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+    logger.info(f"Saved baseline to {path}")
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _compare_stats(scope: str, baseline: Dict[str, Any], current: Dict[str, Any],
+                   thresholds: Thresholds) -> List[Regression]:
+    regressions = []
+    for metric in ('latency_p95', 'latency_p99'):
+        if metric not in baseline or metric not in current:
+            continue
+        before, after = baseline[metric], current[metric]
+        if after > before * (1 + thresholds.latency) and after - before > thresholds.latency_floor_ms:
+            regressions.append(Regression(scope, metric, before, after))
+    if baseline.get('rps') and current['rps'] < baseline['rps'] * (1 - thresholds.rps):
+        regressions.append(Regression(scope, 'rps', baseline['rps'], current['rps']))
+    if current['error_rate'] - baseline.get('error_rate', 0.0) > thresholds.error_rate:
+        regressions.append(Regression(scope, 'error_rate', baseline.get('error_rate', 0.0), current['error_rate']))
+    return regressions
+
+
+# Load settings that must match for RPS and latency to be comparable
+COMPARABLE_SETTINGS = ('mix', 'fixture', 'mode', 'concurrency', 'rate')
+
+
+def compare(baseline: Dict[str, Any], summary: Dict[str, Any], metadata: Dict[str, Any],
+            thresholds: Thresholds = Thresholds()) -> Comparison:
+    """Regressions of ``summary`` against ``baseline``, or why the two cannot be compared."""
+    recorded = baseline.get('metadata', {})
+    for key in COMPARABLE_SETTINGS:
+        if recorded.get(key) != metadata.get(key):
+            return Comparison(False, reason=f"{key} differs: baseline {recorded.get(key)!r}, "
+                                            f"run {metadata.get(key)!r}")
+
+    before = baseline['summary']
+    regressions = _compare_stats('overall', before['overall'], summary['overall'], thresholds)
+    for route, stats in summary['routes'].items():
+        route_baseline = before['routes'].get(route)
+        if route_baseline is None:
+            continue
+        if min(route_baseline['count'], stats['count']) < thresholds.min_samples:
+            continue
+        regressions.extend(_compare_stats(route, route_baseline, stats, thresholds))
+    return Comparison(True, regressions)
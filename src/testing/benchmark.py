@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Synthetic-Load Benchmark
+
+Runs a workload mix against the web app and the APIs on a CPU-only box and
+checks the result against a stored baseline:
+
+1. Builds the seeded fixture database (``--build-db``; see fixture_db.py),
+   or uses the one already built for the same seed and scale.
+2. Starts the stub LM Studio server (chat and embeddings) with the
+   configured latency, so vector search and DSPy routes need no GPU.
+3. Starts the web app (``flask run``, threaded) against the fixture
+   database and the stub, with API_BASE_URL and DSPY_API_URL pointing at the
+   web app itself. ``--base-url`` targets a server that is already running
+   instead.
+4. Replays the mix's planned requests with the load driver. This is a closed
+   loop at ``--concurrency`` or, with ``--rate``, an open loop.
+5. Prints RPS and p50/p95/p99 per route and compares the run against
+   ``benchmarks/baselines/<mix>.json``. ``--baseline update`` rewrites the
+   baseline. Regressions beyond the thresholds (see baselines.py) exit
+   with status 1.
+
+Configuration (environment):
+    BENCH_DB_NAME        Fixture database name (default: bible_bench)
+    BENCH_LM_LATENCY     Stub chat latency (default: lognormal:0.05,0.3+0.001)
+    BENCH_WEB_PORT       Port for the web app (default: 5055)
+    POSTGRES_*           Server and accounts, as for the web app
+    BENCH_* thresholds   See baselines.py
+
+Usage:
+    python -m src.testing.benchmark --build-db --mix mixed --requests 3000 --concurrency 8
+    python -m src.testing.benchmark --mix search --rate 40 --duration 60 --baseline update
+    python -m src.testing.benchmark --mix pages --base-url http://127.0.0.1:5000 --baseline none
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+from src.testing.baselines import Thresholds, baseline_path, compare, load_baseline, save_baseline
+from src.testing.fixture_db import BENCH_DB_NAME, FixtureConfig, build_fixture_database, generate_fixture
+from src.testing.load_driver import LoadDriver, format_summary
+from src.testing.stub_server import StubLMServer
+from src.testing.workloads import MIXES, get_mix
+
+logger = logging.getLogger(__name__)
+
+BENCH_LM_LATENCY = os.getenv('BENCH_LM_LATENCY', 'lognormal:0.05,0.3+0.001')
+BENCH_WEB_PORT = int(os.getenv('BENCH_WEB_PORT', '5055'))
+
+
+def wait_for_health(base_url: str, timeout: float = 60.0, process: Optional[subprocess.Popen] = None):
+    """Poll ``/health`` until it answers 200; raises RuntimeError on timeout or if ``process`` exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Web app exited with status {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{base_url}/health did not answer within {timeout:.0f}s")
+
+
+@contextmanager
+def web_app(port: int, dbname: str, lm_url: str, log_path: Optional[str] = None) -> Iterator[str]:
+    """Run the web app in a subprocess against the fixture database and the stub LM; yields its URL."""
+    base_url = f"http://127.0.0.1:{port}"
+    env = os.environ.copy()
+    env.update({
+        'FLASK_APP': 'src.web_app',
+        'POSTGRES_DB': dbname,
+        'LM_STUDIO_API_URL': lm_url,
+        'API_BASE_URL': base_url,
+        'DSPY_API_URL': base_url,
+    })
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, '-m', 'flask', 'run', '--port', str(port), '--with-threads'],
+                               env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_for_health(base_url, process=process)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if log_path:
+            log.close()
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Plan, run and summarize one benchmark; returns the summary and the metadata to store with it."""
+    config = FixtureConfig(seed=args.seed).scaled(args.scale)
+    fixture = generate_fixture(config)
+    fingerprint = fixture.fingerprint()
+    mix = get_mix(args.mix)
+    plan = mix.plan(fixture.catalog(), args.requests, seed=args.plan_seed)
+
+    with ExitStack() as stack:
+        base_url = args.base_url
+        if base_url is None:
+            if args.build_db:
+                build_fixture_database(fixture, args.db)
+            lm = stack.enter_context(StubLMServer(latency=args.lm_latency, dimensions=config.dimensions))
+            base_url = stack.enter_context(web_app(args.port, args.db, lm.url, args.server_log))
+        else:
+            wait_for_health(base_url.rstrip('/'), timeout=10)
+
+        driver = LoadDriver(base_url, plan, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                            warmup=args.warmup, timeout=args.timeout, seed=args.plan_seed)
+        result = driver.run()
+
+    metadata = {
+        'mix': mix.name,
+        'fixture': fingerprint,
+        'fixture_config': config.to_dict(),
+        'mode': result.mode,
+        'concurrency': result.concurrency,
+        'rate': result.rate,
+        'requests': args.requests,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'plan_seed': args.plan_seed,
+        'lm_latency': args.lm_latency if args.base_url is None else None,
+        'base_url': args.base_url,
+    }
+    return {'summary': result.summary(), 'metadata': metadata}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the web app and APIs against the fixture database")
+    parser.add_argument('--mix', default='mixed', help=f"Workload mix ({', '.join(MIXES)}) or a mix JSON file")
+    parser.add_argument('--requests', type=int, default=2000, help='Planned requests (cycled with --duration)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent connections')
+    parser.add_argument('--rate', type=float, help='Open-loop arrival rate (requests/s); default closed loop')
+    parser.add_argument('--duration', type=float, help='Run for this many seconds instead of one pass')
+    parser.add_argument('--warmup', type=int, default=100, help='Unrecorded leading requests')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--plan-seed', type=int, default=7, help='Seed of the request plan and arrivals')
+    parser.add_argument('--seed', type=int, default=FixtureConfig.seed, help='Fixture seed')
+    parser.add_argument('--scale', type=float, default=1.0, help='Fixture scale')
+    parser.add_argument('--db', default=BENCH_DB_NAME, help='Fixture database name')
+    parser.add_argument('--build-db', action='store_true', help='(Re)build the fixture database first')
+    parser.add_argument('--lm-latency', default=BENCH_LM_LATENCY, help='Stub LM chat latency')
+    parser.add_argument('--port', type=int, default=BENCH_WEB_PORT, help='Port for the web app')
+    parser.add_argument('--server-log', help='Write the web app output to this file')
+    parser.add_argument('--base-url', help='Benchmark an already-running server instead')
+    parser.add_argument('--baseline', choices=['compare', 'update', 'none'], default='compare',
+                        help='Compare with, rewrite, or ignore the stored baseline')
+    parser.add_argument('--baseline-dir', help='Baseline directory (default: BENCH_BASELINE_DIR)')
+    parser.add_argument('--output', help='Also write the summary and metadata to this JSON file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        run = run_benchmark(args)
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        return 2
+
+    summary, metadata = run['summary'], run['metadata']
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+
+    path = baseline_path(metadata['mix'], args.baseline_dir)
+    if args.baseline == 'update':
+        save_baseline(path, summary, metadata)
+        return 0
+    if args.baseline == 'none':
+        return 0
+
+    baseline = load_baseline(path)
+    if baseline is None:
+        logger.warning(f"No baseline at {path}; run with --baseline update to create one")
+        return 0
+    comparison = compare(baseline, summary, metadata, Thresholds())
+    if not comparison.comparable:
+        logger.warning(f"Not compared with {path}: {comparison.reason}")
+        return 0
+    if comparison.regressions:
+        print(f"\n{len(comparison.regressions)} regression(s) against {path}:")
+        for regression in comparison.regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions against {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
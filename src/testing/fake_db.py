@@ -0,0 +1,99 @@
+"""
+Fake Database Connection
+
+A scriptable stand-in for a psycopg2 connection, for unit tests of code
+that takes a ``connection_factory`` or a connection:
+
+- ``FakeConnection.respond`` answers each query. Override it in a subclass,
+  or pass ``respond=``. It returns the result rows, and it may set
+  ``rowcount`` or ``description`` on the cursor or raise to fail the query.
+- The connection records what ran: ``queries`` holds (query, params) pairs,
+  ``fetches`` counts ``fetchmany`` batches, ``closed_cursors`` lists the
+  named (server-side) cursors that were closed, and ``commits``,
+  ``rollbacks`` and ``closed`` track the transaction and the connection.
+- ``fail=True`` makes ``cursor()`` raise, as if the database were down.
+
+Usage:
+    class LexiconConnection(FakeConnection):
+        def respond(self, cursor, query, params):
+            return [('H430', 'elohim')] if 'hebrew_entries' in query else []
+
+    service = LexiconService(connection_factory=LexiconConnection)
+"""
+
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class FakeCursor:
+    """DB-API cursor that asks its connection for the rows of each query."""
+
+    def __init__(self, conn: 'FakeConnection', name: Optional[str] = None):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self.description = None
+        self.rowcount = -1
+        self.rows: List[Any] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None):
+        self.conn.queries.append((query, params))
+        self.rowcount = -1
+        self.rows = list(self.conn.respond(self, query, params) or [])
+        if self.rowcount == -1:
+            self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size: int):
+        self.conn.fetches += 1
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        if self.name:
+            self.conn.closed_cursors.append(self.name)
+
+
+class FakeConnection:
+    """psycopg2-style connection whose queries are answered by ``respond``."""
+
+    autocommit = False
+
+    def __init__(self, respond: Optional[Callable[[FakeCursor, str, Any], Sequence[Any]]] = None,
+                 fail: bool = False):
+        self._respond = respond
+        self.fail = fail
+        self.queries: List[Any] = []
+        self.fetches = 0
+        self.closed_cursors: List[str] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def respond(self, cursor: FakeCursor, query: str, params: Any) -> Sequence[Any]:
+        return self._respond(cursor, query, params) if self._respond else []
+
+    def cursor(self, name: Optional[str] = None, cursor_factory=None) -> FakeCursor:
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return FakeCursor(self, name)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
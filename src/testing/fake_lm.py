@@ -0,0 +1,384 @@
+"""
+Fake Language Model and Embeddings
+
+Deterministic stand-ins for LM Studio, so the DSPy programs and embedding
+callers can be load-tested with no GPU and no network:
+
+- ``FakeLM`` is a ``dspy.BaseLM``. It answers in the chat adapter's
+  ``[[ ## field ## ]]`` format for whatever output fields the prompt asks
+  for. Values come from canned responses or are derived from a hash of the
+  prompt, so the same prompt always gets the same answer.
+- ``Latency`` samples a per-call delay (constant, uniform, normal or
+  lognormal, plus a cost per output token) from a seeded generator.
+- ``fake_embedding`` returns a stable unit vector (768-d by default). It is
+  the normalised sum of hash-derived vectors for the text's words, so texts
+  that share words are closer than unrelated ones.
+
+Usage:
+    lm = FakeLM(responses={"Who built the ark?": {"answer": "Noah"}},
+                latency=Latency.lognormal(0.4, 0.5, per_token=0.01))
+    dspy.settings.configure(lm=lm)
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import dspy
+    _BaseLM = dspy.BaseLM
+    DSPY_AVAILABLE = True
+except (ImportError, AttributeError):
+    _BaseLM = object
+    DSPY_AVAILABLE = False
+
+EMBEDDING_DIMENSIONS = 768
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# The chat adapter's closing instruction lists the output fields and their types
+_OUTPUT_FIELDS_RE = re.compile(
+    r"`\[\[ ## (\w+) ## \]\]`(?: \(must be formatted as a valid Python ([^)]*)\))?")
+_RESPOND_WITH = "Respond with the corresponding output fields"
+
+Responses = Union[None, Dict[str, Any], Sequence[Any], Callable[[List[Dict[str, str]]], Any]]
+
+
+# --- latency ---------------------------------------------------------------------
+
+class Latency:
+    """
+    Seconds a fake call takes: a sample from a base distribution plus
+    ``per_token`` seconds per output token.
+
+    Args:
+        kind: 'constant', 'uniform', 'normal' or 'lognormal'
+        params: Distribution parameters (see the constructors below)
+        per_token: Added seconds per output token
+        seed: Seed of the generator, for reproducible runs
+    """
+
+    def __init__(self, kind: str = 'constant', *params: float, per_token: float = 0.0,
+                 seed: Optional[int] = 0):
+        if kind not in ('constant', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = params or (0.0,)
+        self.per_token = per_token
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def constant(cls, seconds: float, **kwargs) -> 'Latency':
+        return cls('constant', seconds, **kwargs)
+
+    @classmethod
+    def uniform(cls, low: float, high: float, **kwargs) -> 'Latency':
+        return cls('uniform', low, high, **kwargs)
+
+    @classmethod
+    def normal(cls, mean: float, stddev: float, **kwargs) -> 'Latency':
+        return cls('normal', mean, stddev, **kwargs)
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float, **kwargs) -> 'Latency':
+        """Long-tailed latency typical of LM servers; ``median`` in seconds."""
+        return cls('lognormal', median, sigma, **kwargs)
+
+    @classmethod
+    def parse(cls, spec: Union[None, float, str, 'Latency']) -> 'Latency':
+        """From a number of seconds or a spec such as ``"lognormal:0.4,0.5"`` or ``"uniform:0.1,0.3+0.01"``."""
+        if isinstance(spec, Latency):
+            return spec
+        if spec is None or spec == '':
+            return cls.constant(0.0)
+        if isinstance(spec, (int, float)):
+            return cls.constant(float(spec))
+        spec, _, per_token = str(spec).partition('+')
+        kind, _, params = spec.partition(':')
+        if not params:
+            kind, params = 'constant', kind
+        return cls(kind.strip(), *(float(p) for p in params.split(',')),
+                   per_token=float(per_token) if per_token else 0.0)
+
+    def sample(self, tokens: int = 0) -> float:
+        with self._lock:
+            if self.kind == 'constant':
+                base = self.params[0]
+            elif self.kind == 'uniform':
+                base = self._rng.uniform(*self.params[:2])
+            elif self.kind == 'normal':
+                base = self._rng.gauss(*self.params[:2])
+            else:
+                median, sigma = self.params[:2]
+                base = median * self._rng.lognormvariate(0.0, sigma) if median > 0 else 0.0
+        return max(0.0, base) + self.per_token * tokens
+
+    def __repr__(self):
+        return f"Latency({self.kind!r}, {', '.join(map(str, self.params))}, per_token={self.per_token})"
+
+
+# --- deterministic content ---------------------------------------------------------
+
+def stable_hash(*parts: str) -> str:
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (words and punctuation), for usage figures and latency."""
+    return len(re.findall(r"\w+|[^\w\s]", text or ''))
+
+
+def prompt_text(messages: Optional[List[Dict[str, Any]]], prompt: Optional[str] = None) -> str:
+    if messages:
+        return '\n\n'.join(str(m.get('content') or '') for m in messages)
+    return prompt or ''
+
+
+def requested_fields(messages: Optional[List[Dict[str, Any]]]) -> Dict[str, Optional[str]]:
+    """Output fields (name -> Python type, None for str) a DSPy chat prompt asks for."""
+    if not messages:
+        return {}
+    content = str(messages[-1].get('content') or '')
+    start = content.rfind(_RESPOND_WITH)
+    if start < 0:
+        return {}
+    return {name: type_name or None for name, type_name in _OUTPUT_FIELDS_RE.findall(content[start:])
+            if name != 'completed'}
+
+
+def deterministic_text(seed: str, words: int = 12) -> str:
+    """A stable pseudo-sentence for ``seed``."""
+    digest = stable_hash(seed)
+    return ' '.join(f"w{digest[i:i + 5]}" for i in range(0, min(words, 12) * 5, 5))
+
+
+def _typed_value(type_name: Optional[str], seed: str) -> Any:
+    """A deterministic value the chat adapter can parse as ``type_name``."""
+    digest = stable_hash(seed)
+    if type_name is None or type_name == 'str':
+        return deterministic_text(seed)
+    lowered = type_name.lower()
+    if lowered.startswith('literal['):
+        return type_name[8:-1].split(',')[0].strip().strip('\'"')
+    if lowered.startswith(('list', 'tuple', 'set')):
+        return [deterministic_text(seed, words=3)]
+    if lowered.startswith('dict'):
+        return {}
+    if lowered == 'bool':
+        return int(digest[:2], 16) % 2 == 0
+    if lowered == 'int':
+        return int(digest[:4], 16) % 100
+    if lowered == 'float':
+        return round(int(digest[:4], 16) / 0xFFFF, 3)
+    return deterministic_text(seed)
+
+
+def format_fields(values: Dict[str, Any]) -> str:
+    """Chat adapter output: each field under its ``[[ ## name ## ]]`` header."""
+    parts = []
+    for name, value in values.items():
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        parts.append(f"[[ ## {name} ## ]]\n{value}")
+    parts.append("[[ ## completed ## ]]")
+    return '\n\n'.join(parts)
+
+
+class CannedResponses:
+    """
+    Chooses the reply for a prompt.
+
+    ``responses`` can be:
+        None      Hash-derived values for every requested field
+        dict      {substring of the last message: reply}; the first match wins
+        sequence  Replies returned in turn (cycling)
+        callable  Called with the messages; returns a reply
+
+    A reply is a dict of output field values or a string. A string fills
+    the first requested field, or is the whole completion for a plain
+    (non-DSPy) prompt.
+    """
+
+    def __init__(self, responses: Responses = None):
+        self.responses = responses
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def _reply(self, messages: List[Dict[str, Any]]) -> Any:
+        responses = self.responses
+        if responses is None:
+            return None
+        if callable(responses):
+            return responses(messages)
+        if isinstance(responses, dict):
+            last = str(messages[-1].get('content') or '') if messages else ''
+            return next((reply for key, reply in responses.items() if key in last), None)
+        with self._lock:
+            if not responses:
+                return None
+            reply = responses[self._index % len(responses)]
+            self._index += 1
+        return reply
+
+    def complete(self, messages: List[Dict[str, Any]], model: str = 'fake') -> str:
+        """Completion text for a chat request."""
+        seed = stable_hash(model, prompt_text(messages))
+        reply = self._reply(messages)
+        fields = requested_fields(messages)
+        if not fields:
+            if isinstance(reply, dict):
+                return json.dumps(reply, ensure_ascii=False)
+            return reply if reply is not None else deterministic_text(seed)
+        if isinstance(reply, str):
+            reply = {next(iter(fields)): reply}
+        reply = reply or {}
+        values = {name: reply[name] if name in reply else _typed_value(type_name, f"{seed}:{name}")
+                  for name, type_name in fields.items()}
+        return format_fields(values)
+
+
+def schema_value(schema: Dict[str, Any], seed: str) -> Any:
+    """A deterministic instance of a JSON schema (for structured-output requests)."""
+    kind = schema.get('type')
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if kind == 'object' or 'properties' in schema:
+        return {name: schema_value(sub, f"{seed}:{name}") for name, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [schema_value(schema.get('items', {}), f"{seed}:0")]
+    if kind in ('integer', 'number', 'boolean'):
+        return _typed_value({'integer': 'int', 'number': 'float', 'boolean': 'bool'}[kind], seed)
+    return deterministic_text(seed, words=6)
+
+
+# --- embeddings ----------------------------------------------------------------------
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dimensions: int) -> np.ndarray:
+    blocks = -(-dimensions * 4 // 32)
+    raw = b''.join(hashlib.sha256(f"{word}\x1f{i}".encode('utf-8')).digest() for i in range(blocks))
+    values = np.frombuffer(raw, dtype='<u4')[:dimensions].astype(np.float64)
+    return values / 2 ** 31 - 1.0
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Stable unit vector for ``text``: the normalised sum of per-word hash
+    vectors, so identical texts match exactly and shared words raise similarity.
+    """
+    words = _WORD_RE.findall((text or '').lower()) or ['']
+    vector = np.zeros(dimensions)
+    for word in words:
+        vector += _word_vector(word, dimensions)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return [float(v) for v in vector.astype(np.float32)]
+
+
+# --- dspy LM -------------------------------------------------------------------------
+
+def completion_response(content: str, model: str, prompt_tokens: int) -> SimpleNamespace:
+    """An OpenAI-style chat completion object, as dspy.BaseLM.forward returns."""
+    completion_tokens = count_tokens(content)
+    return SimpleNamespace(
+        id=f"fake-{stable_hash(content)[:12]}",
+        object='chat.completion',
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason='stop',
+                                 message=SimpleNamespace(role='assistant', content=content))],
+        usage={'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+               'total_tokens': prompt_tokens + completion_tokens},
+    )
+
+
+class FakeLM(_BaseLM):
+    """
+    ``dspy.BaseLM`` with deterministic answers and simulated latency.
+
+    Args:
+        responses: Canned replies (see CannedResponses); None derives every value from the prompt
+        latency: A Latency, a number of seconds or a spec string (see Latency.parse)
+        model: Model name reported in responses and history
+        fail_every: Raise ConnectionError on every n-th call, to exercise retry paths
+
+    ``calls``, ``max_in_flight`` and ``total_sleep`` describe the load a run put on the "server".
+    """
+
+    def __init__(self, responses: Responses = None, latency: Union[None, float, str, Latency] = None,
+                 model: str = 'fake/bible-qa', fail_every: int = 0, **kwargs):
+        if DSPY_AVAILABLE:
+            super().__init__(model=model, model_type='chat', cache=False, **kwargs)
+        else:
+            self.model = model
+            self.model_type = 'chat'
+            self.kwargs = dict(kwargs)
+            self.history = []
+        self.responses = CannedResponses(responses)
+        self.latency = Latency.parse(latency)
+        self.fail_every = fail_every
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_sleep = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _begin(self) -> int:
+        with self._stats_lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.calls
+
+    def _end(self, slept: float):
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.total_sleep += slept
+
+    def _respond(self, prompt, messages, call_number: int):
+        messages = messages or [{'role': 'user', 'content': prompt or ''}]
+        if self.fail_every and call_number % self.fail_every == 0:
+            raise ConnectionError(f"Simulated LM failure on call {call_number}")
+        content = self.responses.complete(messages, self.model)
+        return completion_response(content, self.model, count_tokens(prompt_text(messages))), content
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        call_number = self._begin()
+        slept = 0.0
+        try:
+            response, content = self._respond(prompt, messages, call_number)
+            slept = self.latency.sample(count_tokens(content))
+            time.sleep(slept)
+            return response
+        finally:
+            self._end(slept)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        call_number = self._begin()
+        slept = 0.0
+        try:
+            response, content = self._respond(prompt, messages, call_number)
+            slept = self.latency.sample(count_tokens(content))
+            await asyncio.sleep(slept)
+            return response
+        finally:
+            self._end(slept)
+
+    if not DSPY_AVAILABLE:
+        def __call__(self, prompt=None, messages=None, **kwargs):
+            response = self.forward(prompt=prompt, messages=messages, **kwargs)
+            return [choice.message.content for choice in response.choices]
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.calls = self.in_flight = self.max_in_flight = 0
+            self.total_sleep = 0.0
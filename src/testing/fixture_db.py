@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Fixture Database
+
+Builds a small, reproducible Bible database for benchmarks and load tests.
+The web app and the APIs can run against it with no ETL inputs:
+
+- ``generate_fixture`` derives every row from one seed: books, chapters and
+  verses in two translations, Hebrew and Greek lexicon entries, tagged words
+  and lexicon relationships. Strong's IDs are drawn with a Zipf skew, so a
+  few entries (H430, H3068, G2316, ...) have thousands of occurrences and the
+  rest have a handful, as in the real data. The same seed always gives the
+  same rows, and ``Fixture.fingerprint`` identifies them.
+- Verse texts are built from the glosses of their words. Embeddings are
+  ``fake_embedding`` vectors, the same ones the stub server returns for a
+  query, so vector searches rank verses that share words with the query first.
+- ``build_fixture_database`` (re)creates the database and COPYs the rows in.
+  It then runs the regular post-ETL steps: verse keys, lexicon aggregates,
+  term statistics and the vector index.
+- ``Fixture.catalog`` lists the references, Strong's IDs (with occurrence
+  counts), search phrases and questions that workloads can ask for.
+
+Configuration (environment):
+    BENCH_DB_NAME      Fixture database name (default: bible_bench)
+    POSTGRES_HOST, POSTGRES_PORT, POSTGRES_USER, POSTGRES_PASSWORD
+                       Server and an account allowed to create databases
+
+Usage:
+    python -m src.testing.fixture_db --seed 42 --scale 1.0
+
+    fixture = generate_fixture(FixtureConfig(seed=42))
+    build_fixture_database(fixture, dbname="bible_bench")
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from src.testing.fake_lm import EMBEDDING_DIMENSIONS, fake_embedding
+from src.utils.reference_engine import BOOK_ABBREVIATIONS, resolve_book
+
+logger = logging.getLogger(__name__)
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'bible_bench')
+
+# Entries that the pages, reports and validation checks single out; they get the top frequency ranks
+HOT_HEBREW_IDS = ('H430', 'H3068', 'H113', 'H2617', 'H539')
+HOT_GREEK_IDS = ('G2316', 'G2962', 'G5547', 'G26', 'G4102', 'G5485')
+MAX_STRONGS = {'hebrew': 8674, 'greek': 5624}
+
+_GLOSSES = (
+    "god lord heaven earth light darkness water spirit word life love faith hope grace mercy "
+    "peace truth glory king people nation land city house temple altar sacrifice covenant law "
+    "commandment prophet priest servant son daughter father mother brother shepherd sheep vine "
+    "bread wine fire cloud mountain river sea stone gold silver sword bow war battle enemy "
+    "righteousness judgment salvation sin iniquity forgiveness blessing curse praise prayer song "
+    "heart soul strength wisdom knowledge understanding fear joy sorrow tears death grave "
+    "resurrection kingdom throne crown hand eye mouth voice name day night year generation seed "
+    "harvest field tree fruit wilderness journey gate wall road witness promise redeemer savior"
+).split()
+_FILLER = ("and the of unto in that he they shall was for which with not is them him".split())
+_HEBREW_LETTERS = "אבגדהוזחטיכלמנסעפצקרשת"
+_GREEK_LETTERS = "αβγδεζηθικλμνξοπρστυφχψω"
+_SYLLABLES = ("ba be bi da de di ka ke ki la le li ma me mi na ne ni ra re ri sa se si "
+              "ta te ti ya ye ho ha cha sha tho lo mo no ro so to").split()
+_POS = ('noun', 'verb', 'adjective', 'adverb', 'preposition', 'particle', 'proper noun')
+_GRAMMAR = {
+    'hebrew': ('HNcmsa', 'HNcfsa', 'HVqp3ms', 'HVqw3ms', 'HNcmpa', 'HR', 'HC', 'HTd'),
+    'greek': ('N-NSM', 'N-ASF', 'V-AAI-3S', 'V-PAI-3S', 'A-NSM', 'PREP', 'CONJ', 'T-NSM'),
+}
+_RELATIONSHIPS = ('the Greek of', 'the Hebrew of', 'related')
+_HOT_GLOSSES = {'H430': 'god', 'H3068': 'lord', 'H113': 'lord', 'H2617': 'mercy', 'H539': 'faith',
+                'G2316': 'god', 'G2962': 'lord', 'G5547': 'savior', 'G26': 'love', 'G4102': 'faith', 'G5485': 'grace'}
+
+
+@dataclass(frozen=True)
+class FixtureConfig:
+    """Size and seed of a fixture; equal configs always produce equal rows."""
+    seed: int = 42
+    ot_books: Tuple[str, ...] = ('Genesis', 'Exodus', 'Psalms', 'Isaiah')
+    nt_books: Tuple[str, ...] = ('Matthew', 'John', 'Romans', 'Revelation')
+    chapters: int = 12
+    verses: int = 25
+    words_per_verse: Tuple[int, int] = (8, 18)
+    hebrew_entries: int = 2000
+    greek_entries: int = 1500
+    translations: Tuple[str, ...] = ('KJV', 'ASV')
+    zipf: float = 1.1
+    parallel_links: int = 300
+    relationships: int = 400
+    dimensions: int = EMBEDDING_DIMENSIONS
+
+    def scaled(self, scale: float) -> 'FixtureConfig':
+        """The same fixture with ``scale`` times as many chapters."""
+        return replace(self, chapters=max(1, int(round(self.chapters * scale))))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: list(value) if isinstance(value, tuple) else value for key, value in asdict(self).items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FixtureConfig':
+        return cls(**{key: tuple(value) if isinstance(value, list) else value for key, value in data.items()})
+
+
+@dataclass
+class Fixture:
+    """Rows of every fixture table, as tuples in TABLE_COLUMNS order."""
+    config: FixtureConfig
+    tables: Dict[str, List[tuple]] = field(default_factory=dict)
+
+    def fingerprint(self) -> str:
+        """Hash of the config and every row; baselines are only compared for equal fingerprints."""
+        digest = hashlib.sha256(json.dumps(self.config.to_dict(), sort_keys=True).encode('utf-8'))
+        for table in sorted(self.tables):
+            digest.update(table.encode('utf-8'))
+            for row in self.tables[table]:
+                digest.update(repr(row).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def embedding_rows(self) -> Iterator[tuple]:
+        """bible.verse_embeddings rows, computed on demand (one per verse and translation)."""
+        for verse_id, book, chapter, verse, text, translation in self.tables['bible.verses']:
+            yield (verse_id, book, chapter, verse, translation,
+                   _vector_literal(fake_embedding(text, self.config.dimensions)))
+
+    def catalog(self) -> 'FixtureCatalog':
+        counts: Dict[str, int] = {}
+        for table in ('bible.hebrew_ot_words', 'bible.greek_nt_words'):
+            for row in self.tables[table]:
+                counts[row[6]] = counts.get(row[6], 0) + 1
+        entries = {lang: [row[0] for row in self.tables[f"bible.{lang}_entries"]] for lang in ('hebrew', 'greek')}
+        glosses = {row[0]: row[5] for lang in ('hebrew', 'greek') for row in self.tables[f"bible.{lang}_entries"]}
+        rng = np.random.default_rng(self.config.seed + 1)
+        verses = [row for row in self.tables['bible.verses'] if row[5] == self.config.translations[0]]
+        queries = []
+        for _ in range(200):
+            words = rng.choice(_GLOSSES, size=int(rng.integers(2, 5)), replace=False)
+            queries.append(' '.join(words))
+        questions = []
+        for index in rng.choice(len(verses), size=min(200, len(verses)), replace=False):
+            _, book, chapter, verse, text, _ = verses[int(index)]
+            subject = next((w for w in text.rstrip('.').lower().split() if w not in _FILLER), 'god')
+            questions.append({'question': f"What does {book} {chapter}:{verse} say about {subject}?",
+                              'context': text})
+        return FixtureCatalog(
+            references=[(row[1], row[2], row[3]) for row in verses],
+            strongs_ids={lang: [(sid, counts.get(sid, 0)) for sid in ids] for lang, ids in entries.items()},
+            glosses=glosses,
+            queries=queries,
+            questions=questions,
+            translations=list(self.config.translations),
+        )
+
+
+@dataclass
+class FixtureCatalog:
+    """What a workload can ask the fixture for."""
+    references: List[Tuple[str, int, int]]
+    strongs_ids: Dict[str, List[Tuple[str, int]]]
+    glosses: Dict[str, str]
+    queries: List[str]
+    questions: List[Dict[str, str]]
+    translations: List[str]
+
+
+# Column order of the generated rows
+TABLE_COLUMNS = {
+    'bible.verses': ('id', 'book_name', 'chapter_num', 'verse_num', 'verse_text', 'translation_source'),
+    'bible.hebrew_entries': ('strongs_id', 'extended_strongs', 'hebrew_word', 'transliteration', 'pos',
+                             'gloss', 'definition'),
+    'bible.greek_entries': ('strongs_id', 'extended_strongs', 'greek_word', 'transliteration', 'pos',
+                            'gloss', 'definition'),
+    'bible.hebrew_ot_words': ('id', 'book_name', 'chapter_num', 'verse_num', 'word_num', 'word_text', 'strongs_id',
+                              'grammar_code', 'word_transliteration', 'translation'),
+    'bible.greek_nt_words': ('id', 'book_name', 'chapter_num', 'verse_num', 'word_num', 'word_text', 'strongs_id',
+                             'grammar_code', 'word_transliteration', 'translation'),
+    'bible.word_relationships': ('source_id', 'target_id', 'relationship_type'),
+    'bible.verse_parallel_mapping': ('source_verse_id', 'target_verse_id'),
+}
+EMBEDDING_COLUMNS = ('verse_id', 'book_name', 'chapter_num', 'verse_num', 'translation_source', 'embedding')
+
+WORD_TABLE_COLUMNS = """
+        id SERIAL PRIMARY KEY,
+        book_name TEXT NOT NULL,
+        chapter_num INTEGER NOT NULL,
+        verse_num INTEGER NOT NULL,
+        word_num INTEGER NOT NULL,
+        word_text TEXT NOT NULL,
+        strongs_id TEXT,
+        grammar_code TEXT,
+        word_transliteration TEXT,
+        translation TEXT,
+        UNIQUE (book_name, chapter_num, verse_num, word_num)
+"""
+
+SCHEMA_SQL = """
+    CREATE SCHEMA IF NOT EXISTS bible;
+    CREATE TABLE bible.verses (
+        id SERIAL PRIMARY KEY,
+        book_name TEXT NOT NULL,
+        chapter_num INTEGER NOT NULL,
+        verse_num INTEGER NOT NULL,
+        verse_text TEXT NOT NULL,
+        translation_source TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (book_name, chapter_num, verse_num, translation_source)
+    );
+    CREATE TABLE bible.hebrew_entries (
+        strongs_id TEXT PRIMARY KEY,
+        extended_strongs TEXT,
+        hebrew_word TEXT,
+        transliteration TEXT,
+        pos TEXT,
+        gloss TEXT,
+        definition TEXT
+    );
+    CREATE TABLE bible.greek_entries (
+        strongs_id TEXT PRIMARY KEY,
+        extended_strongs TEXT,
+        greek_word TEXT,
+        transliteration TEXT,
+        pos TEXT,
+        gloss TEXT,
+        definition TEXT
+    );
+    CREATE TABLE bible.hebrew_ot_words ({word_columns});
+    CREATE TABLE bible.greek_nt_words ({word_columns});
+    CREATE TABLE bible.word_relationships (
+        id SERIAL PRIMARY KEY,
+        source_id TEXT NOT NULL,
+        target_id TEXT NOT NULL,
+        relationship_type TEXT NOT NULL
+    );
+    CREATE TABLE bible.verse_parallel_mapping (
+        id SERIAL PRIMARY KEY,
+        source_verse_id INTEGER NOT NULL REFERENCES bible.verses(id),
+        target_verse_id INTEGER NOT NULL REFERENCES bible.verses(id)
+    );
+    CREATE INDEX idx_hebrew_ot_words_strongs ON bible.hebrew_ot_words (strongs_id);
+    CREATE INDEX idx_greek_nt_words_strongs ON bible.greek_nt_words (strongs_id);
+    CREATE INDEX idx_word_relationships_source ON bible.word_relationships (source_id);
+    CREATE INDEX idx_verse_parallel_mapping_source ON bible.verse_parallel_mapping (source_verse_id);
+"""
+
+EMBEDDINGS_SQL = """
+    CREATE TABLE bible.verse_embeddings (
+        id SERIAL PRIMARY KEY,
+        verse_id INTEGER NOT NULL REFERENCES bible.verses(id),
+        book_name VARCHAR(50) NOT NULL,
+        chapter_num INTEGER NOT NULL,
+        verse_num INTEGER NOT NULL,
+        translation_source VARCHAR(20) NOT NULL,
+        embedding VECTOR({dimensions}) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (verse_id, translation_source)
+    );
+    CREATE INDEX idx_verse_embeddings_translation ON bible.verse_embeddings (translation_source);
+"""
+
+
+# --- generation ----------------------------------------------------------------------
+
+def _vector_literal(vector: Sequence[float]) -> str:
+    return '[' + ','.join(f"{v:.6f}" for v in vector) + ']'
+
+
+def _zipf_weights(count: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _strongs_ids(rng: np.random.Generator, prefix: str, hot: Sequence[str], count: int, maximum: int) -> List[str]:
+    """``hot`` first, then distinct random IDs; the list order is the frequency rank."""
+    taken = set(hot)
+    pool = np.array([n for n in range(1, maximum + 1) if f"{prefix}{n}" not in taken])
+    extra = rng.choice(pool, size=max(0, min(count - len(hot), len(pool))), replace=False)
+    return list(hot)[:count] + [f"{prefix}{n}" for n in extra]
+
+
+def _lexicon_rows(rng: np.random.Generator, language: str, ids: List[str]) -> List[tuple]:
+    letters = _HEBREW_LETTERS if language == 'hebrew' else _GREEK_LETTERS
+    rows = []
+    for strongs_id in ids:
+        lemma = ''.join(rng.choice(list(letters), size=int(rng.integers(3, 7))))
+        transliteration = ''.join(rng.choice(_SYLLABLES, size=int(rng.integers(2, 4))))
+        gloss = _HOT_GLOSSES.get(strongs_id) or str(rng.choice(_GLOSSES))
+        pos = str(rng.choice(_POS))
+        definition = f"{gloss}; {' '.join(rng.choice(_GLOSSES, size=6))}"
+        rows.append((strongs_id, f"{{{strongs_id[0]}{int(strongs_id[1:]):04d}}}", lemma, transliteration, pos,
+                     gloss, definition))
+    return rows
+
+
+def generate_fixture(config: FixtureConfig = FixtureConfig()) -> Fixture:
+    """All fixture rows for ``config`` (embeddings excepted; see Fixture.embedding_rows)."""
+    rng = np.random.default_rng(config.seed)
+    tables: Dict[str, List[tuple]] = {}
+    lexicons = {}
+    for language, prefix, hot, count in (('hebrew', 'H', HOT_HEBREW_IDS, config.hebrew_entries),
+                                         ('greek', 'G', HOT_GREEK_IDS, config.greek_entries)):
+        ids = _strongs_ids(rng, prefix, hot, count, MAX_STRONGS[language])
+        rows = _lexicon_rows(rng, language, ids)
+        tables[f"bible.{language}_entries"] = rows
+        lexicons[language] = (rows, np.cumsum(_zipf_weights(len(rows), config.zipf)))
+
+    verses: List[tuple] = []
+    words = {'hebrew': [], 'greek': []}
+    low, high = config.words_per_verse
+    for book in config.ot_books + config.nt_books:
+        book_number = resolve_book(book)
+        if book_number is None:
+            raise ValueError(f"Unknown book: {book}")
+        language = 'hebrew' if book in config.ot_books else 'greek'
+        # Tagged words use STEP abbreviations, verses the full name, as the ETL loads them
+        abbreviation = BOOK_ABBREVIATIONS[book_number]
+        rows, cdf = lexicons[language]
+        for chapter in range(1, config.chapters + 1):
+            for verse in range(1, config.verses + 1):
+                draws = rng.random(int(rng.integers(low, high + 1))) * cdf[-1]
+                picks = np.minimum(np.searchsorted(cdf, draws, side='right'), len(rows) - 1)
+                glosses = []
+                for word_num, pick in enumerate(picks, start=1):
+                    strongs_id, _, lemma, transliteration, _, gloss, _ = rows[pick]
+                    words[language].append((len(words[language]) + 1, abbreviation, chapter, verse, word_num, lemma,
+                                            strongs_id, str(rng.choice(_GRAMMAR[language])), transliteration, gloss))
+                    glosses.append(gloss)
+                for t, translation in enumerate(config.translations):
+                    text = []
+                    for gloss in glosses:
+                        text.append(str(rng.choice(_FILLER)))
+                        # Later translations swap some words, so they rank close to but below the first one
+                        text.append(str(rng.choice(_GLOSSES)) if t and rng.random() < 0.15 else gloss)
+                    sentence = ' '.join(text)
+                    verses.append((len(verses) + 1, book, chapter, verse, sentence[0].upper() + sentence[1:] + '.',
+                                   translation))
+    tables['bible.verses'] = verses
+    tables['bible.hebrew_ot_words'] = words['hebrew']
+    tables['bible.greek_nt_words'] = words['greek']
+
+    hebrew_ids = [row[0] for row in tables['bible.hebrew_entries']]
+    greek_ids = [row[0] for row in tables['bible.greek_entries']]
+    relationships = set()
+    for _ in range(config.relationships):
+        source, target = str(rng.choice(hebrew_ids)), str(rng.choice(greek_ids))
+        kind = str(rng.choice(_RELATIONSHIPS))
+        relationships.add((source, target, kind) if rng.random() < 0.5 else (target, source, kind))
+    tables['bible.word_relationships'] = sorted(relationships)
+
+    first = [row[0] for row in verses if row[5] == config.translations[0]]
+    links = set()
+    for _ in range(config.parallel_links):
+        source, target = rng.choice(first, size=2, replace=False)
+        links.add((int(source), int(target)))
+    tables['bible.verse_parallel_mapping'] = sorted(links)
+    return Fixture(config, tables)
+
+
+# --- loading -------------------------------------------------------------------------
+
+def connect(dbname: str, autocommit: bool = False):
+    """Connection to ``dbname`` with the POSTGRES_* settings (write user)."""
+    import psycopg2
+    conn = psycopg2.connect(
+        host=os.getenv('POSTGRES_HOST', 'localhost'),
+        port=os.getenv('POSTGRES_PORT', '5432'),
+        dbname=dbname,
+        user=os.getenv('POSTGRES_WRITE_USER', os.getenv('POSTGRES_USER', 'postgres')),
+        password=os.getenv('POSTGRES_WRITE_PASSWORD', os.getenv('POSTGRES_PASSWORD', 'postgres')),
+    )
+    conn.autocommit = autocommit
+    return conn
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return r'\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int = 20000) -> int:
+    """COPY rows into a table in batches of ``batch_size``."""
+    total = 0
+    buffer = io.StringIO()
+    pending = 0
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row) + '\n')
+        pending += 1
+        if pending == batch_size:
+            buffer.seek(0)
+            cur.copy_expert(sql, buffer)
+            total += pending
+            buffer, pending = io.StringIO(), 0
+    if pending:
+        buffer.seek(0)
+        cur.copy_expert(sql, buffer)
+        total += pending
+    return total
+
+
+def recreate_database(dbname: str, force: bool = False):
+    """Drop and create ``dbname``; refuses the application database unless ``force``."""
+    if dbname == os.getenv('POSTGRES_DB', 'bible_db') and not force:
+        raise ValueError(f"Refusing to recreate the application database '{dbname}' (use force=True)")
+    admin = connect('postgres', autocommit=True)
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+            cur.execute(f'CREATE DATABASE "{dbname}"')
+    finally:
+        admin.close()
+
+
+def build_fixture_database(fixture: Fixture, dbname: str = BENCH_DB_NAME, recreate: bool = True,
+                           force: bool = False) -> Dict[str, Any]:
+    """
+    Load a fixture into ``dbname`` and run the post-ETL steps.
+
+    Returns:
+        Summary: row counts per table, fingerprint, whether embeddings were loaded, seconds
+    """
+    from src.utils.db_utils import mark_dataset_updated
+    from src.utils.lexicon_aggregates import refresh_lexicon_aggregates
+    from src.utils.term_stats import refresh_term_stats
+    from src.utils.verse_keys import setup_verse_keys
+
+    start = time.perf_counter()
+    if recreate:
+        recreate_database(dbname, force=force)
+    conn = connect(dbname)
+    counts: Dict[str, int] = {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL.format(word_columns=WORD_TABLE_COLUMNS))
+            for table, columns in TABLE_COLUMNS.items():
+                counts[table] = copy_rows(cur, table, columns, fixture.tables[table])
+            for table in ('bible.verses', 'bible.hebrew_ot_words', 'bible.greek_nt_words'):
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))")
+        conn.commit()
+
+        embeddings = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                cur.execute(EMBEDDINGS_SQL.format(dimensions=fixture.config.dimensions))
+                counts['bible.verse_embeddings'] = copy_rows(cur, 'bible.verse_embeddings', EMBEDDING_COLUMNS,
+                                                             fixture.embedding_rows(), batch_size=2000)
+            conn.commit()
+            embeddings = True
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Skipping verse embeddings (pgvector unavailable?): {e}")
+
+        setup_verse_keys(conn)
+        if embeddings:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_verse_embeddings_vector
+                    ON bible.verse_embeddings USING hnsw (embedding vector_cosine_ops)
+                """)
+            conn.commit()
+        refresh_lexicon_aggregates(conn)
+        try:
+            refresh_term_stats(conn)
+        except Exception as e:
+            logger.warning(f"Term statistics not refreshed: {e}")
+        mark_dataset_updated(conn, 'fixture')
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE")
+    finally:
+        conn.close()
+
+    summary = {
+        'database': dbname,
+        'fingerprint': fixture.fingerprint(),
+        'rows': counts,
+        'embeddings': embeddings,
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+    logger.info(f"Fixture database {dbname} built in {summary['seconds']}s "
+                f"({sum(counts.values())} rows, fingerprint {summary['fingerprint']})")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the seeded benchmark fixture database")
+    parser.add_argument('--db', default=BENCH_DB_NAME, help='Database name (dropped and recreated)')
+    parser.add_argument('--seed', type=int, default=FixtureConfig.seed, help='Generator seed')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply the number of chapters per book')
+    parser.add_argument('--force', action='store_true', help='Allow recreating the POSTGRES_DB database')
+    parser.add_argument('--fingerprint', action='store_true', help='Only print the fixture fingerprint')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    fixture = generate_fixture(FixtureConfig(seed=args.seed).scaled(args.scale))
+    if args.fingerprint:
+        print(fixture.fingerprint())
+        return 0
+    try:
+        summary = build_fixture_database(fixture, args.db, force=args.force)
+    except Exception as e:
+        logger.error(f"Could not build fixture database: {e}")
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
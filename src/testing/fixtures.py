@@ -0,0 +1,125 @@
+"""
+Fake Backend Fixtures
+
+Wires the fake LM and the stub server into the existing modules without
+touching their code:
+
+- ``use_fake_lm`` makes ``dspy.LM(...)`` return a FakeLM and configures it
+  as the default LM, so EnhancedBibleQA(use_lm_studio=True),
+  EnhancedSemanticSearch, TheologicalQA and IntegratedBibleQA all run
+  against it.
+- ``use_stub_server`` points LM_STUDIO_API_URL at a StubLMServer, both in
+  the environment and in the module-level constants of already-imported
+  embedding callers, and drops the shared LMClient so the next
+  get_lm_client() connects to the stub.
+
+The pytest fixtures ``fake_lm`` and ``stub_lm_server`` wrap the two;
+import them into a test module or a conftest.py to use them.
+
+Usage:
+    from src.testing.fixtures import fake_lm, stub_lm_server  # noqa: F401
+
+    def test_qa(fake_lm):
+        qa = EnhancedBibleQA(use_lm_studio=True)
+        assert qa.answer_question("Who built the ark?")
+        assert fake_lm.calls > 0
+"""
+
+import os
+import sys
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pytest
+
+from src.testing.fake_lm import DSPY_AVAILABLE, FakeLM
+from src.testing.stub_server import StubLMServer
+
+logger = logging.getLogger(__name__)
+
+# Modules that read LM_STUDIO_API_URL into a constant at import time
+API_URL_MODULES = (
+    'src.dspy_programs.semantic_search',
+    'src.api.vector_search_api',
+    'src.utils.generate_verse_embeddings',
+    'src.utils.vector_search_demo',
+    'src.utils.test_vector_search',
+)
+
+
+@contextmanager
+def use_fake_lm(lm: Optional[FakeLM] = None, **kwargs) -> Iterator[FakeLM]:
+    """
+    Serve every DSPy LM call from ``lm`` (a new FakeLM(**kwargs) by default).
+
+    ``dspy.LM`` and the configured default LM are restored on exit.
+    """
+    lm = lm or FakeLM(**kwargs)
+    if not DSPY_AVAILABLE:
+        yield lm
+        return
+    import dspy
+    original_lm_class = dspy.LM
+    original_default = dspy.settings.lm
+    dspy.LM = lambda *args, **kw: lm
+    dspy.settings.configure(lm=lm)
+    try:
+        yield lm
+    finally:
+        dspy.LM = original_lm_class
+        dspy.settings.configure(lm=original_default)
+
+
+def _reset_lm_client():
+    lm_client = sys.modules.get('src.utils.lm_client')
+    if lm_client is None:
+        return
+    with lm_client._client_lock:
+        if lm_client._client is not None:
+            lm_client._client.close()
+        lm_client._client = None
+
+
+@contextmanager
+def use_stub_server(server: Optional[StubLMServer] = None, **kwargs) -> Iterator[StubLMServer]:
+    """
+    Point every LM Studio caller at ``server`` (a new StubLMServer(**kwargs)
+    by default) while the block runs.
+    """
+    server = server or StubLMServer(**kwargs)
+    server.start()
+    previous_env = os.environ.get('LM_STUDIO_API_URL')
+    patched = []
+    os.environ['LM_STUDIO_API_URL'] = server.url
+    for name in API_URL_MODULES:
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, 'LM_STUDIO_API_URL'):
+            patched.append((module, module.LM_STUDIO_API_URL))
+            module.LM_STUDIO_API_URL = server.url
+    _reset_lm_client()
+    try:
+        yield server
+    finally:
+        for module, value in patched:
+            module.LM_STUDIO_API_URL = value
+        if previous_env is None:
+            os.environ.pop('LM_STUDIO_API_URL', None)
+        else:
+            os.environ['LM_STUDIO_API_URL'] = previous_env
+        _reset_lm_client()
+        server.stop()
+
+
+@pytest.fixture
+def fake_lm():
+    """A FakeLM with no latency, installed as the DSPy LM for one test."""
+    with use_fake_lm() as lm:
+        yield lm
+
+
+@pytest.fixture
+def stub_lm_server():
+    """A StubLMServer on a free port, used as LM Studio for one test."""
+    with use_stub_server() as server:
+        yield server
@@ -0,0 +1,255 @@
+"""
+Load Driver
+
+Replays a planned request list (see workloads.py) against a running server
+and records, for each request, the route, status, latency, time to first
+byte and response size.
+
+Two modes:
+
+- Closed loop (default): ``concurrency`` workers each send their next request
+  as soon as the previous one returns. This measures peak throughput.
+- Open loop (``rate``): requests are issued on a seeded Poisson schedule at
+  ``rate`` per second, whatever the server is doing. Latency is measured
+  from the scheduled start, not from when a worker became free. A stalled
+  server therefore shows up in the percentiles (no coordinated omission).
+  ``concurrency`` caps the requests in flight.
+
+The first ``warmup`` requests are sent but not recorded, so connection pools
+and caches are warm. ``summarize`` reduces the samples to RPS, error rate and
+p50/p95/p99 latency (ms), overall and per route.
+
+Usage:
+    driver = LoadDriver("http://127.0.0.1:5000", mix.plan(catalog, 2000), concurrency=8, warmup=100)
+    result = driver.run()
+    print(format_summary(result.summary()))
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.testing.workloads import PlannedRequest
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Sample:
+    route: str
+    status: int
+    latency: float
+    ttfb: float
+    bytes: int
+    start: float
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or self.status >= 400
+
+
+@dataclass
+class LoadResult:
+    samples: List[Sample]
+    elapsed: float
+    mode: str
+    concurrency: int
+    rate: Optional[float] = None
+    warmup: int = 0
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize(self.samples, self.elapsed)
+
+
+def _latency_stats(values: np.ndarray, prefix: str) -> Dict[str, float]:
+    if not len(values):
+        return {}
+    stats = {f"{prefix}_p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    if prefix == 'latency':
+        stats['latency_mean'] = float(values.mean())
+        stats['latency_max'] = float(values.max())
+    return stats
+
+
+def _stats(samples: Sequence[Sample], elapsed: float) -> Dict[str, Any]:
+    failed = np.array([sample.failed for sample in samples], dtype=bool)
+    ok = ~failed
+    latency = np.array([sample.latency for sample in samples]) * 1000
+    ttfb = np.array([sample.ttfb for sample in samples]) * 1000
+    stats = {
+        'count': len(samples),
+        'errors': int(failed.sum()),
+        'error_rate': float(failed.mean()) if len(samples) else 0.0,
+        'rps': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'bytes': int(sum(sample.bytes for sample in samples)),
+    }
+    # Percentiles over successful requests; fast failures would flatter them
+    stats.update(_latency_stats(latency[ok], 'latency'))
+    stats.update(_latency_stats(ttfb[ok], 'ttfb'))
+    return stats
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> Dict[str, Any]:
+    """RPS, errors and latency percentiles (ms), overall and per route."""
+    by_route: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_route.setdefault(sample.route, []).append(sample)
+    return {
+        'elapsed': elapsed,
+        'overall': _stats(samples, elapsed),
+        'routes': {route: _stats(route_samples, elapsed) for route, route_samples in sorted(by_route.items())},
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """A fixed-width table of the per-route and overall figures."""
+    header = f"{'route':<22} {'count':>7} {'err%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ttfb95':>8}"
+    lines = [header, '-' * len(header)]
+    rows = list(summary['routes'].items()) + [('overall', summary['overall'])]
+    for route, stats in rows:
+        lines.append(
+            f"{route:<22} {stats['count']:>7} {stats['error_rate'] * 100:>6.1f} {stats['rps']:>8.1f} "
+            f"{stats.get('latency_p50', float('nan')):>8.1f} {stats.get('latency_p95', float('nan')):>8.1f} "
+            f"{stats.get('latency_p99', float('nan')):>8.1f} {stats.get('ttfb_p95', float('nan')):>8.1f}"
+        )
+    lines.append(f"{summary['elapsed']:.1f}s; latencies in ms")
+    return '\n'.join(lines)
+
+
+class LoadDriver:
+    """
+    Sends planned requests to ``base_url`` from a pool of worker threads.
+
+    Args:
+        base_url: Server root, e.g. http://127.0.0.1:5000
+        plan: Requests to send, in order (cycled when ``duration`` is set)
+        concurrency: Worker threads, i.e. the most requests in flight
+        rate: Requests per second for an open-loop run; None for closed loop
+        duration: Seconds to run for instead of sending the plan once
+        warmup: Leading requests sent but not recorded
+        timeout: Per-request timeout in seconds
+        seed: Seed of the open-loop arrival schedule
+    """
+
+    def __init__(self, base_url: str, plan: Sequence[PlannedRequest], concurrency: int = 8,
+                 rate: Optional[float] = None, duration: Optional[float] = None, warmup: int = 0,
+                 timeout: float = 30.0, seed: int = 0):
+        if not plan:
+            raise ValueError("The request plan is empty")
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        self.base_url = base_url.rstrip('/')
+        self.plan = list(plan)
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.duration = duration
+        self.warmup = max(0, warmup)
+        self.timeout = timeout
+        self.seed = seed
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next = 0
+        self._samples: List[Sample] = []
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def _send(self, planned: PlannedRequest, scheduled: float) -> Sample:
+        """One request; latency and time to first byte count from ``scheduled``."""
+        size = 0
+        ttfb = None
+        status = 0
+        error = None
+        try:
+            with self._session().request(planned.method, self.base_url + planned.path, params=planned.params,
+                                         json=planned.json, timeout=self.timeout, stream=True) as response:
+                status = response.status_code
+                for chunk in response.iter_content(chunk_size=16384):
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - scheduled
+                    size += len(chunk)
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        return Sample(planned.route, status, latency, latency if ttfb is None else ttfb, size,
+                      scheduled, error)
+
+    def _claim(self) -> Optional[int]:
+        with self._lock:
+            index = self._next
+            self._next += 1
+        return index
+
+    def _worker(self, start: float, deadline: Optional[float], schedule: Optional[np.ndarray]):
+        while True:
+            index = self._claim()
+            if schedule is not None:
+                if index >= len(schedule):
+                    return
+                scheduled = start + schedule[index]
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                if deadline is None and index >= self.warmup + len(self.plan):
+                    return
+                scheduled = time.perf_counter()
+                if deadline is not None and scheduled >= deadline and index >= self.warmup:
+                    return
+            sample = self._send(self.plan[index % len(self.plan)], scheduled)
+            if index >= self.warmup:
+                with self._lock:
+                    self._samples.append(sample)
+
+    def _schedule(self) -> np.ndarray:
+        """Seeded Poisson arrival offsets (seconds) for warmup plus the measured requests."""
+        if self.duration is not None:
+            count = self.warmup + max(1, int(self.rate * self.duration))
+        else:
+            count = self.warmup + len(self.plan)
+        gaps = np.random.default_rng(self.seed).exponential(1.0 / self.rate, size=count)
+        return np.cumsum(gaps) - gaps[0]
+
+    def run(self) -> LoadResult:
+        self._next = 0
+        self._samples = []
+        schedule = self._schedule() if self.rate is not None else None
+        mode = 'open' if schedule is not None else 'closed'
+        logger.info(f"Load run ({mode} loop): {len(self.plan)} planned requests, concurrency {self.concurrency}"
+                    + (f", {self.rate}/s" if self.rate else '') + (f", {self.duration}s" if self.duration else ''))
+
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration is not None and schedule is None else None
+        threads = [threading.Thread(target=self._worker, args=(start, deadline, schedule), name=f"load-{i}",
+                                    daemon=True) for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        samples = sorted(self._samples, key=lambda sample: sample.start)
+        # Measured span: from the first recorded start to the last completion
+        if samples:
+            elapsed = max(sample.start + sample.latency for sample in samples) - samples[0].start
+        else:
+            elapsed = time.perf_counter() - start
+        return LoadResult(samples, elapsed, mode, self.concurrency, rate=self.rate, warmup=self.warmup,
+                          settings={'duration': self.duration, 'timeout': self.timeout, 'seed': self.seed,
+                                    'planned': len(self.plan)})
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Stub LM Studio Server
+
+OpenAI-compatible HTTP server answering from the fake backends in
+``src.testing.fake_lm``:
+
+    GET  /v1/models            The configured chat and embedding models
+    POST /v1/chat/completions  Deterministic completions (DSPy field format,
+                               JSON for ``response_format`` schemas, or text)
+    POST /v1/completions       Deterministic text completions
+    POST /v1/embeddings        Hash-derived unit vectors (768-d by default)
+
+Requests with ``"stream": true`` get server-sent events: the first chunk
+after the latency's base delay, then one word at a time at its per-token
+cost, so time to first token can be measured.
+
+Point LM_STUDIO_API_URL at it to exercise every HTTP caller, including
+``dspy.LM`` via LiteLLM, the pooled ``LMClient`` and the embedding
+generators. Requests are served concurrently and each sleeps for the
+configured latency, so throughput and concurrency limits can be measured.
+``stats`` counts requests and peak concurrency, and ``fail_next`` scripts
+503s. ``route`` adds handlers for other paths (e.g. a stubbed web API), so
+tests need no HTTP server of their own.
+
+Usage:
+    python -m src.testing.stub_server --port 1234 --latency lognormal:0.4,0.5+0.005
+
+    with StubLMServer(latency=0.05) as server:
+        os.environ["LM_STUDIO_API_URL"] = server.url
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.testing.fake_lm import (
+    EMBEDDING_DIMENSIONS, CannedResponses, Latency, Responses, count_tokens, fake_embedding,
+    prompt_text, schema_value, stable_hash
+)
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = os.getenv('LM_STUDIO_CHAT_MODEL', 'stub-chat')
+EMBEDDING_MODEL = os.getenv('LM_STUDIO_EMBEDDING_MODEL', 'text-embedding-nomic-embed-text-v1.5@q8_0')
+
+_PIECE_RE = re.compile(r"\s*\S+\s*|\s+")
+
+# handler(method, path, body) -> (status, payload) for paths added with StubLMServer.route
+RouteHandler = Callable[[str, str, Optional[Dict[str, Any]]], Tuple[int, Any]]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'StubLMServer'
+
+    def _send(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, events):
+        """Write server-sent events with chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for event in events:
+            data = f"data: {event if isinstance(event, str) else json.dumps(event)}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _path(self) -> str:
+        path = self.path.split('?', 1)[0].rstrip('/')
+        return path[3:] if path.startswith('/v1') else path
+
+    def _route(self, body: Optional[Dict[str, Any]] = None) -> bool:
+        """Answer from a handler added with ``StubLMServer.route``; False if none matches."""
+        handler = self.server.find_route(self.path)
+        if handler is None:
+            return False
+        with self.server._lock:
+            self.server.stats['requests'] += 1
+        status, payload = handler(self.command, self.path, body)
+        self._send(status, payload)
+        return True
+
+    def do_GET(self):
+        if self._route():
+            return
+        if self._path() == '/models':
+            models = [self.server.chat_model, self.server.embedding_model]
+            self._send(200, {'object': 'list',
+                             'data': [{'id': m, 'object': 'model', 'owned_by': 'stub'} for m in models]})
+        else:
+            self._send(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send(400, {'error': {'message': 'Invalid JSON'}})
+            return
+        if self._route(body):
+            return
+        path = self._path()
+        handler = {'/chat/completions': self.server.chat_completion,
+                   '/completions': self.server.text_completion,
+                   '/embeddings': self.server.embeddings}.get(path)
+        if handler is None:
+            self._send(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+        stream = self._send_stream if body.get('stream') and path != '/embeddings' else None
+        status, payload = self.server.dispatch(path, handler, body, stream)
+        if payload is not None:
+            self._send(status, payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StubLMServer(ThreadingHTTPServer):
+    """
+    Threaded OpenAI-compatible stub.
+
+    Args:
+        host, port: Bind address (port 0 picks a free port)
+        responses: Canned chat replies (see CannedResponses)
+        latency: Chat completion latency (Latency, seconds or spec string)
+        embedding_latency: Latency per embeddings request
+        dimensions: Embedding size
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, responses: Responses = None,
+                 latency: Union[None, float, str, Latency] = None,
+                 embedding_latency: Union[None, float, str, Latency] = None,
+                 dimensions: int = EMBEDDING_DIMENSIONS, chat_model: str = CHAT_MODEL,
+                 embedding_model: str = EMBEDDING_MODEL):
+        super().__init__((host, port), _StubHandler)
+        self.responses = CannedResponses(responses)
+        self.latency = Latency.parse(latency)
+        self.embedding_latency = Latency.parse(embedding_latency)
+        self.dimensions = dimensions
+        self.chat_model = chat_model
+        self.embedding_model = embedding_model
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._routes: List[Tuple[str, RouteHandler]] = []
+        self._failures = 0
+        self.stats = {'requests': 0, 'chat_completions': 0, 'completions': 0, 'embeddings': 0, 'embedded_texts': 0,
+                      'failures': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    @property
+    def url(self) -> str:
+        """Base URL (".../v1") for LM_STUDIO_API_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def route(self, prefix: str, handler: RouteHandler) -> 'StubLMServer':
+        """
+        Serve requests whose path starts with ``prefix`` from ``handler``.
+
+        The handler is called with the method, the full path (query string
+        included) and the JSON body of a POST (None for GET), and returns
+        (status, JSON payload). The first matching prefix wins.
+        """
+        self._routes.append((prefix, handler))
+        return self
+
+    def find_route(self, path: str) -> Optional[RouteHandler]:
+        bare = path.split('?', 1)[0]
+        return next((handler for prefix, handler in self._routes if bare.startswith(prefix)), None)
+
+    def fail_next(self, count: int = 1):
+        """Answer the next ``count`` POST requests with HTTP 503."""
+        with self._lock:
+            self._failures += count
+
+    def reset_stats(self):
+        with self._lock:
+            in_flight = self.stats['in_flight']
+            self.stats = {key: 0 for key in self.stats}
+            self.stats['in_flight'] = in_flight
+
+    def dispatch(self, path: str, handler, body: Dict[str, Any], stream=None):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+            fail = self._failures > 0
+            if fail:
+                self._failures -= 1
+                self.stats['failures'] += 1
+        try:
+            if fail:
+                return 503, {'error': {'message': 'Simulated overload'}}
+            payload, delay = handler(body)
+            if stream is None:
+                time.sleep(delay)
+                return 200, payload
+            stream(self.stream_events(payload, body))
+            return 200, None
+        except Exception as e:
+            logger.error(f"Stub error on {path}: {e}")
+            return 500, {'error': {'message': str(e)}}
+        finally:
+            with self._lock:
+                self.stats['in_flight'] -= 1
+
+    def chat_completion(self, body: Dict[str, Any]):
+        messages = body.get('messages') or [{'role': 'user', 'content': body.get('prompt', '')}]
+        model = body.get('model') or self.chat_model
+        response_format = body.get('response_format') or {}
+        schema = (response_format.get('json_schema') or {}).get('schema')
+        if schema:
+            content = json.dumps(schema_value(schema, stable_hash(model, prompt_text(messages))))
+        elif response_format.get('type') == 'json_object':
+            content = json.dumps({'answer': self.responses.complete(messages, model)})
+        else:
+            content = self.responses.complete(messages, model)
+        prompt_tokens = count_tokens(prompt_text(messages))
+        completion_tokens = count_tokens(content)
+        with self._lock:
+            self.stats['chat_completions'] += 1
+        payload = {
+            'id': f"chatcmpl-{stable_hash(content)[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+        return payload, self.latency.sample(completion_tokens)
+
+    def text_completion(self, body: Dict[str, Any]):
+        prompt = str(body.get('prompt') or '')
+        model = body.get('model') or self.chat_model
+        text = self.responses.complete([{'role': 'user', 'content': prompt}], model)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(text)
+        with self._lock:
+            self.stats['completions'] += 1
+        payload = {
+            'id': f"cmpl-{stable_hash(text)[:12]}",
+            'object': 'text_completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'text': text}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+        return payload, self.latency.sample(completion_tokens)
+
+    def stream_events(self, payload: Dict[str, Any], body: Dict[str, Any]):
+        """SSE chunks for a finished completion payload, paced by the latency model."""
+        choice = payload['choices'][0]
+        chat = 'message' in choice
+        text = choice['message']['content'] if chat else choice['text']
+        base = {'id': payload['id'], 'created': payload['created'], 'model': payload['model'],
+                'object': 'chat.completion.chunk' if chat else 'text_completion'}
+        time.sleep(self.latency.sample(0))
+        for i, piece in enumerate(_PIECE_RE.findall(text)):
+            if i:
+                time.sleep(self.latency.per_token * count_tokens(piece))
+            delta = {'role': 'assistant', 'content': piece} if chat and i == 0 else {'content': piece}
+            yield dict(base, choices=[dict({'index': 0, 'finish_reason': None},
+                                           **({'delta': delta} if chat else {'text': piece}))])
+        yield dict(base, choices=[dict({'index': 0, 'finish_reason': 'stop'},
+                                       **({'delta': {}} if chat else {'text': ''}))])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            yield dict(base, choices=[], usage=payload['usage'])
+        yield '[DONE]'
+
+    def embeddings(self, body: Dict[str, Any]):
+        texts = body.get('input', '')
+        if isinstance(texts, str):
+            texts = [texts]
+        dimensions = int(body.get('dimensions') or self.dimensions)
+        data = [{'object': 'embedding', 'index': i, 'embedding': fake_embedding(str(text), dimensions)}
+                for i, text in enumerate(texts)]
+        tokens = sum(count_tokens(str(text)) for text in texts)
+        with self._lock:
+            self.stats['embeddings'] += 1
+            self.stats['embedded_texts'] += len(texts)
+        payload = {'object': 'list', 'model': body.get('model') or self.embedding_model, 'data': data,
+                   'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}}
+        return payload, self.embedding_latency.sample()
+
+    def start(self) -> 'StubLMServer':
+        """Serve on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever, name='stub-lm-server', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> 'StubLMServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an OpenAI-compatible stub of LM Studio")
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=1234, help='Port (LM Studio uses 1234)')
+    parser.add_argument('--latency', default='0', help="Chat latency, e.g. 0.2 or lognormal:0.4,0.5+0.005")
+    parser.add_argument('--embedding-latency', default='0', help='Latency per embeddings request')
+    parser.add_argument('--dimensions', type=int, default=EMBEDDING_DIMENSIONS, help='Embedding size')
+    parser.add_argument('--responses', help='JSON file of canned replies {"substring": {"answer": ...}}')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    server = StubLMServer(args.host, args.port, responses=responses, latency=args.latency,
+                          embedding_latency=args.embedding_latency, dimensions=args.dimensions)
+    logger.info(f"Stub LM server listening on {server.url} (latency {server.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Served {server.stats['requests']} requests "
+                    f"(peak concurrency {server.stats['max_in_flight']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Benchmark Workloads
+
+Scripted request mixes for load-testing the web app and the APIs against the
+fixture database (see fixture_db.py):
+
+- A ``Route`` is one kind of request: a method, a path template and optional
+  query, form or JSON templates. Placeholders such as ``{book}``,
+  ``{strongs_id}`` or ``{query}`` are filled from the fixture catalog.
+- A ``WorkloadMix`` weights routes. ``plan`` turns it into a fixed list of
+  concrete requests from a seed, so two runs (or a run and its baseline)
+  send exactly the same requests in the same order.
+- Keys are drawn with a Zipf skew over the catalog (``skew``): a few verses
+  and Strong's IDs are hot and most are cold, as with real traffic. The mix
+  of response-cache hits and misses is therefore realistic.
+
+Mixes can also be read from a JSON file:
+    {"name": "...", "skew": 1.0, "routes": [{"name": "...", "path": "...", "weight": 1}, ...]}
+
+Usage:
+    mix = get_mix("mixed")
+    requests = mix.plan(generate_fixture().catalog(), count=2000, seed=7)
+"""
+
+import json
+import string
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.testing.fixture_db import FixtureCatalog
+
+
+@dataclass(frozen=True)
+class Route:
+    """One kind of request; templates use str.format placeholders (see PLACEHOLDERS)."""
+    name: str
+    path: str
+    method: str = 'GET'
+    params: Optional[Dict[str, str]] = None
+    json: Optional[Dict[str, str]] = None
+    stream: bool = False
+    weight: float = 1.0
+
+
+@dataclass
+class PlannedRequest:
+    """A concrete request of a plan."""
+    route: str
+    method: str
+    path: str
+    params: Optional[Dict[str, str]] = None
+    json: Optional[Dict[str, str]] = None
+    stream: bool = False
+
+
+# Placeholders a route template may use
+PLACEHOLDERS = ('book', 'chapter', 'verse', 'translation', 'strongs_id', 'language', 'hebrew_id', 'greek_id',
+                'query', 'question', 'context')
+
+
+@dataclass
+class WorkloadMix:
+    name: str
+    routes: List[Route]
+    skew: float = 1.0
+    description: str = ''
+
+    def weights(self) -> np.ndarray:
+        weights = np.array([route.weight for route in self.routes], dtype=float)
+        if not len(weights) or weights.sum() <= 0:
+            raise ValueError(f"Workload mix '{self.name}' has no weighted routes")
+        return weights / weights.sum()
+
+    def plan(self, catalog: FixtureCatalog, count: int, seed: int = 0) -> List[PlannedRequest]:
+        """``count`` concrete requests, the same ones for the same catalog and seed."""
+        rng = np.random.default_rng(seed)
+        sampler = _KeySampler(catalog, rng, self.skew)
+        routes = rng.choice(len(self.routes), size=count, p=self.weights())
+        planned = []
+        for index in routes:
+            route = self.routes[int(index)]
+            values = sampler.values(route)
+            planned.append(PlannedRequest(
+                route=route.name,
+                method=route.method,
+                path=route.path.format(**values),
+                params={k: str(v).format(**values) for k, v in route.params.items()} if route.params else None,
+                json={k: str(v).format(**values) for k, v in route.json.items()} if route.json else None,
+                stream=route.stream,
+            ))
+        return planned
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'description': self.description,
+            'skew': self.skew,
+            'routes': [{key: value for key, value in route.__dict__.items() if value not in (None, False)}
+                       for route in self.routes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WorkloadMix':
+        routes = [Route(**route) for route in data.get('routes', [])]
+        for route in routes:
+            unknown = _fields(route) - set(PLACEHOLDERS)
+            if unknown:
+                raise ValueError(f"Route '{route.name}' uses unknown placeholders: {sorted(unknown)}")
+        return cls(data['name'], routes, skew=float(data.get('skew', 1.0)),
+                   description=data.get('description', ''))
+
+
+def _fields(route: Route) -> set:
+    templates = [route.path] + list((route.params or {}).values()) + list((route.json or {}).values())
+    return {name for template in templates for _, name, _, _ in string.Formatter().parse(str(template)) if name}
+
+
+class _KeySampler:
+    """Draws placeholder values from the catalog with a Zipf skew over a seeded shuffle."""
+
+    def __init__(self, catalog: FixtureCatalog, rng: np.random.Generator, skew: float):
+        self.catalog = catalog
+        self.rng = rng
+        self.skew = skew
+        self._orders: Dict[str, tuple] = {}
+
+    def _pick(self, name: str, size: int, ranked: bool = False) -> int:
+        """Index into a list of ``size`` items; ``ranked`` lists are already in popularity order."""
+        if name not in self._orders:
+            weights = 1.0 / np.arange(1, size + 1) ** self.skew if self.skew > 0 else np.ones(size)
+            order = np.arange(size) if ranked else self.rng.permutation(size)
+            self._orders[name] = (order, np.cumsum(weights / weights.sum()))
+        order, cdf = self._orders[name]
+        return int(order[min(int(np.searchsorted(cdf, self.rng.random() * cdf[-1], side='right')), size - 1)])
+
+    def values(self, route: Route) -> Dict[str, Any]:
+        needed = _fields(route)
+        catalog = self.catalog
+        values: Dict[str, Any] = {}
+        if needed & {'book', 'chapter', 'verse'}:
+            book, chapter, verse = catalog.references[self._pick('reference', len(catalog.references))]
+            values.update(book=book, chapter=chapter, verse=verse)
+        if 'translation' in needed:
+            values['translation'] = catalog.translations[0]
+        # Strong's IDs are listed by frequency, so the most frequent entries are also the most requested
+        for language in ('hebrew', 'greek'):
+            if needed & {f"{language}_id", 'strongs_id', 'language'}:
+                ids = catalog.strongs_ids[language]
+                values[f"{language}_id"] = ids[self._pick(language, len(ids), ranked=True)][0]
+        if needed & {'strongs_id', 'language'}:
+            language = 'hebrew' if self.rng.random() < 0.5 else 'greek'
+            values.update(strongs_id=values[f"{language}_id"], language=language)
+        if 'query' in needed:
+            values['query'] = catalog.queries[self._pick('query', len(catalog.queries))]
+        if needed & {'question', 'context'}:
+            question = catalog.questions[self._pick('question', len(catalog.questions))]
+            values.update(question=question['question'], context=question['context'])
+        return values
+
+
+# --- built-in mixes ------------------------------------------------------------------
+
+VERSE_PAGE = Route('verse_page', '/verse/{book}/{chapter}/{verse}')
+LEXICON_PAGE = Route('lexicon_page', '/lexicon/{language}/{strongs_id}')
+CONCORDANCE_PAGE = Route('concordance_page', '/concordance/{strongs_id}')
+VECTOR_SEARCH_PAGE = Route('vector_search_page', '/vector-search', params={'q': '{query}', 'translation': '{translation}'})
+VECTOR_SEARCH_API = Route('vector_search_api', '/api/vector-search',
+                          params={'q': '{query}', 'translation': '{translation}', 'limit': '20'})
+SIMILAR_VERSES_PAGE = Route('similar_verses_page', '/similar-verses',
+                            params={'book': '{book}', 'chapter': '{chapter}', 'verse': '{verse}',
+                                    'translation': '{translation}'})
+SIMILAR_VERSES_API = Route('similar_verses_api', '/api/similar-verses',
+                           params={'reference': '{book} {chapter}:{verse}', 'translation': '{translation}',
+                                   'limit': '20'})
+CONCORDANCE_EXPORT = Route('concordance_export', '/export/concordance/{strongs_id}', params={'format': 'csv'},
+                           stream=True)
+DSPY_ASK_STREAM = Route('dspy_ask_stream', '/dspy-ask/stream', method='POST',
+                        json={'question': '{question}', 'context': '{context}'}, stream=True)
+DSPY_ASK_API = Route('dspy_ask_api', '/api/dspy/ask_with_context', method='POST',
+                     json={'question': '{question}', 'context': '{context}'})
+
+
+def _weighted(route: Route, weight: float) -> Route:
+    return Route(**dict(route.__dict__, weight=weight))
+
+
+MIXES: Dict[str, WorkloadMix] = {
+    'pages': WorkloadMix('pages', [
+        _weighted(VERSE_PAGE, 50), _weighted(LEXICON_PAGE, 35), _weighted(CONCORDANCE_PAGE, 15),
+    ], description='Verse, lexicon and concordance pages'),
+    'search': WorkloadMix('search', [
+        _weighted(VECTOR_SEARCH_PAGE, 30), _weighted(VECTOR_SEARCH_API, 30),
+        _weighted(SIMILAR_VERSES_PAGE, 20), _weighted(SIMILAR_VERSES_API, 20),
+    ], description='Vector search and similar verses, through the pages and the API'),
+    'export': WorkloadMix('export', [_weighted(CONCORDANCE_EXPORT, 1)],
+                          description='Streamed concordance exports, hot Strong\'s IDs included'),
+    'ask': WorkloadMix('ask', [_weighted(DSPY_ASK_STREAM, 60), _weighted(DSPY_ASK_API, 40)],
+                       description='DSPy question answering against the stub LM'),
+    'mixed': WorkloadMix('mixed', [
+        _weighted(VERSE_PAGE, 30), _weighted(LEXICON_PAGE, 20), _weighted(CONCORDANCE_PAGE, 5),
+        _weighted(VECTOR_SEARCH_PAGE, 8), _weighted(VECTOR_SEARCH_API, 7), _weighted(SIMILAR_VERSES_PAGE, 5),
+        _weighted(SIMILAR_VERSES_API, 5), _weighted(CONCORDANCE_EXPORT, 5), _weighted(DSPY_ASK_STREAM, 10),
+        _weighted(DSPY_ASK_API, 5),
+    ], description='All routes, weighted like interactive use'),
+}
+
+
+def get_mix(name_or_path: str) -> WorkloadMix:
+    """A built-in mix by name, or a mix read from a JSON file."""
+    if name_or_path in MIXES:
+        return MIXES[name_or_path]
+    try:
+        with open(name_or_path, 'r', encoding='utf-8') as f:
+            return WorkloadMix.from_dict(json.load(f))
+    except FileNotFoundError:
+        raise ValueError(f"Unknown workload mix '{name_or_path}' (built-in: {', '.join(sorted(MIXES))})")
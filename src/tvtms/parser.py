@@ -19,6 +19,7 @@ from .constants import (
 import copy
 import psycopg
 from collections import defaultdict
+from src.utils.reference_engine import BOOK_ABBREVIATIONS, resolve_book
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -29,6 +30,55 @@ NULL_REF = {
     'subverse': None, 'manuscript': None, 'status': 'invalid'
 }
 
+# Database uses these exact abbreviations with proper capitalization
+STANDARD_BOOK_IDS = {
+    # Old Testament
+    'gen': 'Gen', 'exod': 'Exo', 'exo': 'Exo', 'lev': 'Lev', 'num': 'Num', 'deut': 'Deu', 'deu': 'Deu',
+    'josh': 'Jos', 'jos': 'Jos', 'judg': 'Jdg', 'jdg': 'Jdg', 'ruth': 'Rth', 'rut': 'Rth',
+    '1sam': '1Sa', '1sa': '1Sa', '2sam': '2Sa', '2sa': '2Sa',
+    '1kgs': '1Ki', '1ki': '1Ki', '2kgs': '2Ki', '2ki': '2Ki',
+    '1chr': '1Ch', '1ch': '1Ch', '2chr': '2Ch', '2ch': '2Ch',
+    'ezra': 'Ezr', 'ezr': 'Ezr', 'neh': 'Neh', 'esth': 'Est', 'est': 'Est',
+    'job': 'Job', 'ps': 'Psa', 'psa': 'Psa', 'psalm': 'Psa', 'psalms': 'Psa',
+    'prov': 'Pro', 'pro': 'Pro', 'eccl': 'Ecc', 'ecc': 'Ecc', 'song': 'Sng', 'sng': 'Sng', 'cant': 'Sng',
+    'isa': 'Isa', 'jer': 'Jer', 'lam': 'Lam', 'ezek': 'Ezk', 'ezk': 'Ezk', 'dan': 'Dan',
+    'hos': 'Hos', 'joel': 'Jol', 'jol': 'Jol', 'amos': 'Amo', 'amo': 'Amo', 'obad': 'Oba', 'oba': 'Oba',
+    'jonah': 'Jon', 'jon': 'Jon', 'mic': 'Mic', 'nah': 'Nam', 'nam': 'Nam', 'hab': 'Hab',
+    'zeph': 'Zep', 'zep': 'Zep', 'hag': 'Hag', 'zech': 'Zec', 'zec': 'Zec', 'mal': 'Mal',
+    
+    # New Testament
+    'matt': 'Mat', 'mat': 'Mat', 'mark': 'Mrk', 'mrk': 'Mrk', 'luke': 'Luk', 'luk': 'Luk', 'john': 'Jhn', 'jhn': 'Jhn',
+    'acts': 'Act', 'act': 'Act', 'rom': 'Rom', '1cor': '1Co', '1co': '1Co', '2cor': '2Co', '2co': '2Co',
+    'gal': 'Gal', 'eph': 'Eph', 'phil': 'Php', 'php': 'Php', 'col': 'Col',
+    '1thess': '1Th', '1th': '1Th', '2thess': '2Th', '2th': '2Th',
+    '1tim': '1Ti', '1ti': '1Ti', '2tim': '2Ti', '2ti': '2Ti',
+    'titus': 'Tit', 'tit': 'Tit', 'phlm': 'Phm', 'phm': 'Phm', 'heb': 'Heb',
+    'jas': 'Jas', 'jam': 'Jas', '1pet': '1Pe', '1pe': '1Pe', '2pet': '2Pe', '2pe': '2Pe',
+    '1john': '1Jn', '1jn': '1Jn', '2john': '2Jn', '2jn': '2Jn', '3john': '3Jn', '3jn': '3Jn',
+    'jude': 'Jud', 'jud': 'Jud', 'rev': 'Rev',
+    
+    # Apocrypha/Deuterocanonical
+    'tob': 'Tob', 'jdt': 'Jdt', 'wis': 'Wis', 'sir': 'Sir', 'bar': 'Bar', 
+    '1ma': '1Ma', '2ma': '2Ma', '3ma': '3Ma', '4ma': '4Ma',
+    'sus': 'Sus', 'bel': 'Bel', 'man': 'Man', 'oda': 'Oda',
+    'esg': 'EstG', 'estg': 'EstG', 'esa': 'EstA', 'esta': 'EstA', 'est1': 'EstA', 'est2': 'EstB', 'estb': 'EstB',
+    'est3': 'EstC', 'estc': 'EstC', 'est4': 'EstD', 'estd': 'EstD', 'est5': 'EstE', 'este': 'EstE',
+    'est6': 'EstF', 'estf': 'EstF', 'lje': 'LJe', 'lje': 'LJe', '1es': '1Es', '2es': '2Es',
+    'adest': 'AddEst', 'add est': 'AddEst', 'addest': 'AddEst', 'add-est': 'AddEst',
+    'prazr': 'PrAzar', 'prazrr': 'PrAzar', 'prazr': 'PrAzar'
+}
+
+# Precompiled reference patterns (parse_file calls these once per row)
+_NUMBERED_BOOK_RE = re.compile(r'(\d+)\s*([a-z]+)')
+_ANNOTATION_RE = re.compile(r'(\[=.*?\])')
+_MANUSCRIPT_MARKER_RE = re.compile(r'^!(\w+)$')
+_BOOK_CHAPTER_VERSE_PREFIX_RE = re.compile(r'^([^.]+)\.([^:]+):(\d+)')
+_RANGE_RE = re.compile(r'^(?P<book>[^.]+)\.(?P<chapter>[^:]+):(?P<start>\d+)-(?P<end>\d+)$')
+_BOOK_CHAPTER_VERSE_RE = re.compile(r'^(?P<book>[^.]+)\.(?P<chapter>[^:]+):(?P<verse>\d+)(?:\.(?P<subverse>\w+))?$')
+_BOOK_CHAPTER_RE = re.compile(r'^(?P<book>[^.]+)\.(?P<chapter>\w+)$')
+_CHAPTER_VERSE_RE = re.compile(r'^(?P<chapter>[^:]+):(?P<verse>\d+)(?:\.(?P<subverse>\w+))?$')
+_CHAPTER_RE = re.compile(r'^(?P<chapter>\w+)$')
+
 class TVTMSParser:
     """Parser for TVTMS data."""
     
@@ -75,73 +125,43 @@ class TVTMSParser:
         # Convert to lowercase for case-insensitive matching
         book_abbr = book_abbr.lower()
         
-        # Database uses these exact abbreviations with proper capitalization
-        standard_books = {
-            # Old Testament
-            'gen': 'Gen', 'exod': 'Exo', 'exo': 'Exo', 'lev': 'Lev', 'num': 'Num', 'deut': 'Deu', 'deu': 'Deu',
-            'josh': 'Jos', 'jos': 'Jos', 'judg': 'Jdg', 'jdg': 'Jdg', 'ruth': 'Rth', 'rut': 'Rth',
-            '1sam': '1Sa', '1sa': '1Sa', '2sam': '2Sa', '2sa': '2Sa',
-            '1kgs': '1Ki', '1ki': '1Ki', '2kgs': '2Ki', '2ki': '2Ki',
-            '1chr': '1Ch', '1ch': '1Ch', '2chr': '2Ch', '2ch': '2Ch',
-            'ezra': 'Ezr', 'ezr': 'Ezr', 'neh': 'Neh', 'esth': 'Est', 'est': 'Est',
-            'job': 'Job', 'ps': 'Psa', 'psa': 'Psa', 'psalm': 'Psa', 'psalms': 'Psa',
-            'prov': 'Pro', 'pro': 'Pro', 'eccl': 'Ecc', 'ecc': 'Ecc', 'song': 'Sng', 'sng': 'Sng', 'cant': 'Sng',
-            'isa': 'Isa', 'jer': 'Jer', 'lam': 'Lam', 'ezek': 'Ezk', 'ezk': 'Ezk', 'dan': 'Dan',
-            'hos': 'Hos', 'joel': 'Jol', 'jol': 'Jol', 'amos': 'Amo', 'amo': 'Amo', 'obad': 'Oba', 'oba': 'Oba',
-            'jonah': 'Jon', 'jon': 'Jon', 'mic': 'Mic', 'nah': 'Nam', 'nam': 'Nam', 'hab': 'Hab',
-            'zeph': 'Zep', 'zep': 'Zep', 'hag': 'Hag', 'zech': 'Zec', 'zec': 'Zec', 'mal': 'Mal',
-            
-            # New Testament
-            'matt': 'Mat', 'mat': 'Mat', 'mark': 'Mrk', 'mrk': 'Mrk', 'luke': 'Luk', 'luk': 'Luk', 'john': 'Jhn', 'jhn': 'Jhn',
-            'acts': 'Act', 'act': 'Act', 'rom': 'Rom', '1cor': '1Co', '1co': '1Co', '2cor': '2Co', '2co': '2Co',
-            'gal': 'Gal', 'eph': 'Eph', 'phil': 'Php', 'php': 'Php', 'col': 'Col',
-            '1thess': '1Th', '1th': '1Th', '2thess': '2Th', '2th': '2Th',
-            '1tim': '1Ti', '1ti': '1Ti', '2tim': '2Ti', '2ti': '2Ti',
-            'titus': 'Tit', 'tit': 'Tit', 'phlm': 'Phm', 'phm': 'Phm', 'heb': 'Heb',
-            'jas': 'Jas', 'jam': 'Jas', '1pet': '1Pe', '1pe': '1Pe', '2pet': '2Pe', '2pe': '2Pe',
-            '1john': '1Jn', '1jn': '1Jn', '2john': '2Jn', '2jn': '2Jn', '3john': '3Jn', '3jn': '3Jn',
-            'jude': 'Jud', 'jud': 'Jud', 'rev': 'Rev',
-            
-            # Apocrypha/Deuterocanonical
-            'tob': 'Tob', 'jdt': 'Jdt', 'wis': 'Wis', 'sir': 'Sir', 'bar': 'Bar', 
-            '1ma': '1Ma', '2ma': '2Ma', '3ma': '3Ma', '4ma': '4Ma',
-            'sus': 'Sus', 'bel': 'Bel', 'man': 'Man', 'oda': 'Oda',
-            'esg': 'EstG', 'estg': 'EstG', 'esa': 'EstA', 'esta': 'EstA', 'est1': 'EstA', 'est2': 'EstB', 'estb': 'EstB',
-            'est3': 'EstC', 'estc': 'EstC', 'est4': 'EstD', 'estd': 'EstD', 'est5': 'EstE', 'este': 'EstE',
-            'est6': 'EstF', 'estf': 'EstF', 'lje': 'LJe', 'lje': 'LJe', '1es': '1Es', '2es': '2Es',
-            'adest': 'AddEst', 'add est': 'AddEst', 'addest': 'AddEst', 'add-est': 'AddEst',
-            'prazr': 'PrAzar', 'prazrr': 'PrAzar', 'prazr': 'PrAzar'
-        }
         
         # Special handling for aliases with numbers
-        match = re.match(r'(\d+)\s*([a-z]+)', book_abbr)
+        match = _NUMBERED_BOOK_RE.match(book_abbr)
         if match:
             num, name = match.groups()
             combined = f"{num}{name}"
-            if combined in standard_books:
-                return standard_books[combined]
+            if combined in STANDARD_BOOK_IDS:
+                return STANDARD_BOOK_IDS[combined]
         
         # Try direct lookup
-        if book_abbr in standard_books:
-            return standard_books[book_abbr]
+        if book_abbr in STANDARD_BOOK_IDS:
+            return STANDARD_BOOK_IDS[book_abbr]
             
         # Trying with common variations
         if book_abbr.startswith('1'):
             alt = 'i' + book_abbr[1:]
-            if alt in standard_books:
-                return standard_books[alt]
+            if alt in STANDARD_BOOK_IDS:
+                return STANDARD_BOOK_IDS[alt]
         elif book_abbr.startswith('2'):
             alt = 'ii' + book_abbr[1:]
-            if alt in standard_books:
-                return standard_books[alt]
+            if alt in STANDARD_BOOK_IDS:
+                return STANDARD_BOOK_IDS[alt]
         elif book_abbr.startswith('3'):
             alt = 'iii' + book_abbr[1:]
-            if alt in standard_books:
-                return standard_books[alt]
+            if alt in STANDARD_BOOK_IDS:
+                return STANDARD_BOOK_IDS[alt]
         elif book_abbr.startswith('4'):
             alt = 'iv' + book_abbr[1:]
-            if alt in standard_books:
-                return standard_books[alt]
+            if alt in STANDARD_BOOK_IDS:
+                return STANDARD_BOOK_IDS[alt]
+        
+        # Fall back to the shared reference engine's alias table (full names,
+        # "I John", "Song of Songs", ...) for the 66 canonical books
+        book_num = resolve_book(book_abbr)
+        if book_num is not None:
+            step_abbr = BOOK_ABBREVIATIONS[book_num]
+            return STANDARD_BOOK_IDS.get(step_abbr.lower(), step_abbr)
         
         logger.warning(f"Unknown book abbreviation: {book_abbr}")
         return None
@@ -502,7 +522,7 @@ class TVTMSParser:
             
         # Fallback: Try to parse Book.Chapter:Verse format directly
         if '.' in ref and ':' in ref:
-            match = re.match(r'^([^.]+)\.([^:]+):(\d+)', ref)
+            match = _BOOK_CHAPTER_VERSE_PREFIX_RE.match(ref)
             if match:
                 book, chapter, verse = match.groups()
                 book = self.normalize_book_reference(book)
@@ -526,13 +546,13 @@ class TVTMSParser:
             return []
         ref_str = ref.strip()
         # Extract annotation [=...]
-        annotation_match = re.search(r'(\[=.*?\])', ref_str)
+        annotation_match = _ANNOTATION_RE.search(ref_str)
         if annotation_match:
             annotation = annotation_match.group(1)
             ref_str = ref_str.replace(annotation, '')
         # Extract manuscript marker (!a, !b, etc.)
         manuscript_marker = None
-        m_marker = re.match(r'^!(\w+)$', ref_str)
+        m_marker = _MANUSCRIPT_MARKER_RE.match(ref_str)
         if m_marker:
             manuscript_marker = f'!{m_marker.group(1)}'
             return [{
@@ -554,7 +574,7 @@ class TVTMSParser:
             first_ref = ref_str.split(',')[0].strip()
             return self._parse_single_reference(first_ref, current_book, annotation, manuscript)
         # Handle ranges (e.g. Gen.1:1-3, but also allow for bookless ranges like 1:1-3)
-        range_match = re.match(r'^(?P<book>[^.]+)\.(?P<chapter>[^:]+):(?P<start>\d+)-(?P<end>\d+)$', ref_str)
+        range_match = _RANGE_RE.match(ref_str)
         if range_match:
             book = self.normalize_book_reference(range_match.group('book'))
             chapter = range_match.group('chapter')
@@ -573,7 +593,7 @@ class TVTMSParser:
                 })
             return result
         # Handle Book.Chapter:Verse(.Subverse) or Book.Chapter:Verse
-        match = re.match(r'^(?P<book>[^.]+)\.(?P<chapter>[^:]+):(?P<verse>\d+)(?:\.(?P<subverse>\w+))?$', ref_str)
+        match = _BOOK_CHAPTER_VERSE_RE.match(ref_str)
         if match:
             book = self.normalize_book_reference(match.group('book'))
             chapter = match.group('chapter')
@@ -594,7 +614,7 @@ class TVTMSParser:
                 'range_note': range_note
             }]
         # Handle Book.Chapter (whole chapter reference)
-        match = re.match(r'^(?P<book>[^.]+)\.(?P<chapter>\w+)$', ref_str)
+        match = _BOOK_CHAPTER_RE.match(ref_str)
         if match:
             book = self.normalize_book_reference(match.group('book'))
             chapter = match.group('chapter')
@@ -608,7 +628,7 @@ class TVTMSParser:
                 'range_note': range_note
             }]
         # Handle Chapter:Verse(.Subverse) or Chapter:Verse
-        match = re.match(r'^(?P<chapter>[^:]+):(?P<verse>\d+)(?:\.(?P<subverse>\w+))?$', ref_str)
+        match = _CHAPTER_VERSE_RE.match(ref_str)
         if match and current_book:
             book = self.normalize_book_reference(current_book)
             chapter = match.group('chapter')
@@ -628,7 +648,7 @@ class TVTMSParser:
                 'range_note': range_note
             }]
         # Handle Chapter only (implied verse 1)
-        match = re.match(r'^(?P<chapter>\w+)$', ref_str)
+        match = _CHAPTER_RE.match(ref_str)
         if match and current_book:
             book = self.normalize_book_reference(current_book)
             chapter = match.group('chapter')
@@ -693,8 +713,8 @@ class TVTMSParser:
             # Fallback to direct Book.Chapter:Verse pattern extraction
             try:
                 # Direct pattern matching for Book.Chapter:Verse format
-                source_match = re.match(r'^([^.]+)\.([^:]+):(\d+)', source_ref_str)
-                target_match = re.match(r'^([^.]+)\.([^:]+):(\d+)', standard_ref_str)
+                source_match = _BOOK_CHAPTER_VERSE_PREFIX_RE.match(source_ref_str)
+                target_match = _BOOK_CHAPTER_VERSE_PREFIX_RE.match(standard_ref_str)
                 
                 if source_match and target_match:
                     source_book = self.normalize_book_reference(source_match.group(1))
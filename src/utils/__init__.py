@@ -12,6 +12,9 @@ from .logging_config import configure_logging, configure_etl_logging, configure_
 
 # Import Bible reference parsing
 from .bible_reference_parser import parse_reference, extract_references, is_valid_reference
+from .reference_engine import (
+    ParsedReference, VerseSpan, parse_many, pack_verse_id, unpack_verse_id, resolve_book
+)
 
 # Import vector search functions
 from .vector_search import search_verses_by_semantic_similarity, get_verse_by_reference
@@ -35,6 +38,12 @@ __all__ = [
     'parse_reference',
     'extract_references',
     'is_valid_reference',
+    'ParsedReference',
+    'VerseSpan',
+    'parse_many',
+    'pack_verse_id',
+    'unpack_verse_id',
+    'resolve_book',
     
     # Vector search utilities
     'search_verses_by_semantic_similarity',
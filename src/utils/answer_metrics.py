@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Answer Metrics
+
+Scores whole sets of predicted answers against reference answers at once,
+for training metrics, evaluation scripts and MLflow logging:
+
+- Texts are normalised (lower case, punctuation dropped, Hebrew and Greek
+  diacritics kept with their letters) and tokenized once, into token-ID
+  arrays that share a vocabulary. ``AnswerScorer`` keeps the reference side,
+  so scoring several prediction sets against the same references (optimizer
+  trials, model comparisons) never re-tokenizes them.
+- Token precision/recall/F1 (ROUGE-1, clipped counts or distinct tokens) come
+  from intersecting (row, token) keys across the whole set. ROUGE-L uses
+  bit-parallel LCS, advancing every pair one reference token per step in
+  numpy uint64 lanes. Predictions longer than 64 tokens fall back to Python
+  integers.
+- Strong's-ID recall compares the H/G numbers in a prediction with the
+  expected IDs (given, or found in the reference). ``H0430`` and ``h430``
+  count as the same ID.
+- ``bootstrap_ci`` gives percentile confidence intervals from a seeded
+  generator, so the same scores always produce the same interval.
+
+``correct`` is the shared accept rule. An answer is correct when it contains
+the normalised reference, or when the overlap coefficient (shared distinct
+tokens over the smaller side's distinct tokens) reaches LENIENT_OVERLAP. For
+answers of at most SHORT_ANSWER_TOKENS tokens on both sides the threshold is
+SHORT_OVERLAP instead.
+
+Usage:
+    scorer = AnswerScorer(references, strongs=[ex['metadata'].get('strongs_id') for ex in examples])
+    scores = scorer.score(predictions)              # dict of per-example arrays
+    mlflow.log_metrics(summarize(scores))           # means with bootstrap CIs
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Word characters plus combining marks (Greek accents, Hebrew points and cantillation)
+_TOKEN_RE = re.compile(r"[\w\u0300-\u036f\u0591-\u05c7]+", re.UNICODE)
+_STRONGS_RE = re.compile(r"\b([HG])0*(\d{1,5})([a-z]?)\b", re.IGNORECASE)
+
+SHORT_ANSWER_TOKENS = 5
+SHORT_OVERLAP = 0.8
+LENIENT_OVERLAP = 0.6
+
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+
+# uint64 popcount through a byte lookup table (np.bitwise_count needs numpy 2)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def normalize_answer(text: Any) -> str:
+    """Lower-case tokens of a text joined by single spaces."""
+    return ' '.join(_TOKEN_RE.findall(str(text or '').lower()))
+
+
+def strongs_ids(text: Any) -> List[str]:
+    """Distinct Strong's IDs in a text, normalised (``H0430`` -> ``H430``), in order of appearance."""
+    seen = {}
+    for letter, number, suffix in _STRONGS_RE.findall(str(text or '')):
+        seen.setdefault(f"{letter.upper()}{number}{suffix.lower()}", None)
+    return list(seen)
+
+
+def _as_id_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return strongs_ids(value)
+    return [i for item in value for i in strongs_ids(item)]
+
+
+@dataclass
+class TokenArrays:
+    """Token IDs of many texts, flattened, with row offsets."""
+    ids: np.ndarray
+    offsets: np.ndarray
+    normalized: List[str]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def row(self, i: int) -> np.ndarray:
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+
+class Vocabulary:
+    """Token -> ID map shared by the texts being compared."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def encode(self, texts: Sequence[Any]) -> TokenArrays:
+        normalized = [normalize_answer(t) for t in texts]
+        tokens = [s.split() for s in normalized]
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in tokens], out=offsets[1:])
+        index = self.index
+        ids = np.fromiter((index.setdefault(tok, len(index)) for row in tokens for tok in row),
+                          dtype=np.int64, count=int(offsets[-1]))
+        return TokenArrays(ids, offsets, normalized)
+
+    def encode_ids(self, id_lists: Sequence[List[str]]) -> TokenArrays:
+        """Encode lists of already-normalised items (e.g. Strong's IDs)."""
+        offsets = np.zeros(len(id_lists) + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in id_lists], out=offsets[1:])
+        index = self.index
+        ids = np.fromiter((index.setdefault(item, len(index)) for items in id_lists for item in items),
+                          dtype=np.int64, count=int(offsets[-1]))
+        return TokenArrays(ids, offsets, [' '.join(items) for items in id_lists])
+
+
+# --- vectorized metrics ------------------------------------------------------------
+
+def _keys(arrays: TokenArrays, width: int, distinct: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique (row, token) keys and their counts (1 each when ``distinct``)."""
+    keys, counts = np.unique(arrays.rows * width + arrays.ids, return_counts=True)
+    return keys, (np.ones_like(counts) if distinct else counts)
+
+
+def overlap_counts(predictions: TokenArrays, references: TokenArrays, width: int,
+                   distinct: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-row (shared, prediction, reference) token counts.
+
+    Counts are clipped multiset counts as in ROUGE-1, or distinct tokens when ``distinct``.
+    """
+    n = len(references)
+    pred_keys, pred_counts = _keys(predictions, width, distinct)
+    ref_keys, ref_counts = _keys(references, width, distinct)
+    common, pi, ri = np.intersect1d(pred_keys, ref_keys, assume_unique=True, return_indices=True)
+    shared = np.bincount(common // width, weights=np.minimum(pred_counts[pi], ref_counts[ri]), minlength=n)
+    pred_total = np.bincount(pred_keys // width, weights=pred_counts, minlength=n)
+    ref_total = np.bincount(ref_keys // width, weights=ref_counts, minlength=n)
+    return shared, pred_total, ref_total
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1e-12), 0.0)
+
+
+def _f1(precision: np.ndarray, recall: np.ndarray) -> np.ndarray:
+    return _ratio(2 * precision * recall, precision + recall)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    return _POPCOUNT8[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1)
+
+
+def _lcs_bits(pred: Sequence[int], ref: Sequence[int]) -> int:
+    """LCS length with arbitrary-width bit vectors (Hyyrö's bit-parallel algorithm)."""
+    m = len(pred)
+    if not m or not len(ref):
+        return 0
+    full = (1 << m) - 1
+    masks: Dict[int, int] = {}
+    for j, token in enumerate(pred):
+        masks[token] = masks.get(token, 0) | (1 << j)
+    v = full
+    for token in ref:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    return m - bin(v).count('1')
+
+
+def lcs_lengths(predictions: TokenArrays, references: TokenArrays) -> np.ndarray:
+    """Longest common subsequence length of every (prediction, reference) pair."""
+    n = len(references)
+    lcs = np.zeros(n, dtype=np.int64)
+    pred_len = predictions.lengths
+    ref_len = references.lengths
+    lanes = np.flatnonzero((pred_len <= 64) & (pred_len > 0) & (ref_len > 0))
+    if len(lanes):
+        # Match mask of each (lane, token): bit j set where the prediction has the token at j
+        lane_of = np.repeat(np.arange(len(lanes)), pred_len[lanes])
+        starts = predictions.offsets[lanes]
+        positions = np.arange(len(lane_of)) - np.repeat(np.cumsum(pred_len[lanes]) - pred_len[lanes], pred_len[lanes])
+        tokens = predictions.ids[np.repeat(starts, pred_len[lanes]) + positions]
+        width = int(max(predictions.ids.max(initial=0), references.ids.max(initial=0))) + 1
+        keys = lane_of * width + tokens
+        order = np.argsort(keys, kind='stable')
+        keys, bits = keys[order], np.left_shift(np.uint64(1), positions[order].astype(np.uint64))
+        unique_keys, first = np.unique(keys, return_index=True)
+        masks = np.bitwise_or.reduceat(bits, first) if len(first) else bits
+
+        # Reference tokens laid out as [lane, step], padded past each reference's end
+        steps = int(ref_len[lanes].max())
+        ref_rows = np.repeat(np.arange(len(lanes)), ref_len[lanes])
+        ref_pos = np.arange(len(ref_rows)) - np.repeat(np.cumsum(ref_len[lanes]) - ref_len[lanes], ref_len[lanes])
+        ref_tokens = references.ids[np.repeat(references.offsets[lanes], ref_len[lanes]) + ref_pos]
+        lookup = ref_rows * width + ref_tokens
+        found = np.searchsorted(unique_keys, lookup)
+        found = np.minimum(found, len(unique_keys) - 1)
+        step_masks = np.zeros((len(lanes), steps), dtype=np.uint64)
+        hit = unique_keys[found] == lookup
+        step_masks[ref_rows[hit], ref_pos[hit]] = masks[found[hit]]
+
+        m = pred_len[lanes].astype(np.uint64)
+        full = np.where(m == 64, np.uint64(0xFFFFFFFFFFFFFFFF),
+                        np.left_shift(np.uint64(1), np.minimum(m, 63)) - np.uint64(1))
+        v = full.copy()
+        with np.errstate(over='ignore'):
+            for k in range(steps):
+                u = v & step_masks[:, k]
+                v = ((v + u) | (v - u)) & full
+        lcs[lanes] = pred_len[lanes] - _popcount(v)
+    for i in np.flatnonzero(pred_len > 64):
+        lcs[i] = _lcs_bits(predictions.row(i).tolist(), references.row(i).tolist())
+    return lcs
+
+
+def bootstrap_ci(values: Sequence[float], confidence: float = DEFAULT_CONFIDENCE,
+                 n_resamples: int = DEFAULT_RESAMPLES, seed: int = 0) -> Tuple[float, float, float]:
+    """
+    (mean, low, high): the mean and its percentile bootstrap interval.
+
+    NaN values (metrics that do not apply to an example) are left out.
+    Resampling is seeded and done in bounded chunks.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return float('nan'), float('nan'), float('nan')
+    if n_resamples <= 0:
+        return float(values.mean()), float('nan'), float('nan')
+    rng = np.random.default_rng(seed)
+    means = np.empty(n_resamples)
+    chunk = max(1, (1 << 22) // len(values))
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        means[start:start + size] = values[rng.integers(0, len(values), size=(size, len(values)))].mean(axis=1)
+    alpha = (1.0 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1.0 - alpha])
+    return float(values.mean()), float(low), float(high)
+
+
+# --- scoring -------------------------------------------------------------------------
+
+class AnswerScorer:
+    """
+    Scores prediction sets against fixed references.
+
+    Args:
+        references: Reference answers
+        strongs: Expected Strong's IDs per reference (an ID string, a list, or
+                 None). When omitted, the IDs found in each reference are used.
+    """
+
+    def __init__(self, references: Sequence[Any], strongs: Optional[Sequence[Any]] = None):
+        self.vocab = Vocabulary()
+        self.references = self.vocab.encode(references)
+        expected = [_as_id_list(s) for s in strongs] if strongs is not None else \
+            [strongs_ids(r) for r in references]
+        if len(expected) != len(self.references):
+            raise ValueError(f"{len(expected)} Strong's ID lists for {len(self.references)} references")
+        self._id_vocab = Vocabulary()
+        self.expected_ids = self._id_vocab.encode_ids(expected)
+        self._ref_short = None
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def score(self, predictions: Sequence[Any], distinct: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Per-example arrays:
+
+        exact_match, contains, correct (bool); token_precision, token_recall,
+        token_f1 (ROUGE-1; distinct tokens when ``distinct``), rouge_l; and
+        strongs_recall (NaN where no Strong's ID is expected).
+        """
+        if len(predictions) != len(self):
+            raise ValueError(f"{len(predictions)} predictions for {len(self)} references")
+        refs = self.references
+        preds = self.vocab.encode(predictions)
+        width = max(len(self.vocab), 1)
+
+        shared, pred_total, ref_total = overlap_counts(preds, refs, width, distinct)
+        precision = _ratio(shared, pred_total)
+        recall = _ratio(shared, ref_total)
+
+        exact = np.fromiter((p == r for p, r in zip(preds.normalized, refs.normalized)), dtype=bool, count=len(refs))
+        contains = np.fromiter((bool(r) and f" {r} " in f" {p} " for p, r in zip(preds.normalized, refs.normalized)),
+                               dtype=bool, count=len(refs))
+
+        # Overlap coefficient over distinct tokens decides ``correct``
+        d_shared, d_pred, d_ref = (shared, pred_total, ref_total) if distinct else \
+            overlap_counts(preds, refs, width, distinct=True)
+        coefficient = _ratio(d_shared, np.minimum(d_pred, d_ref))
+        short = (preds.lengths <= SHORT_ANSWER_TOKENS) & (refs.lengths <= SHORT_ANSWER_TOKENS)
+        threshold = np.where(short, SHORT_OVERLAP, LENIENT_OVERLAP)
+        correct = contains | ((d_pred > 0) & (d_ref > 0) & (coefficient >= threshold))
+
+        lcs = lcs_lengths(preds, refs).astype(np.float64)
+        rouge_l = _f1(_ratio(lcs, preds.lengths), _ratio(lcs, refs.lengths))
+
+        found = self._id_vocab.encode_ids([strongs_ids(p) for p in predictions])
+        id_shared, _, id_expected = overlap_counts(found, self.expected_ids, max(len(self._id_vocab), 1), True)
+        strongs_recall = np.where(id_expected > 0, _ratio(id_shared, id_expected), np.nan)
+
+        return {
+            'exact_match': exact,
+            'contains': contains,
+            'correct': correct,
+            'token_precision': precision,
+            'token_recall': recall,
+            'token_f1': _f1(precision, recall),
+            'rouge_l': rouge_l,
+            'strongs_recall': strongs_recall,
+        }
+
+    def summary(self, predictions: Sequence[Any], **kwargs) -> Dict[str, float]:
+        """Means with bootstrap intervals; see summarize()."""
+        return summarize(self.score(predictions), **kwargs)
+
+
+def score_answers(predictions: Sequence[Any], references: Sequence[Any],
+                  strongs: Optional[Sequence[Any]] = None, distinct: bool = False) -> Dict[str, np.ndarray]:
+    """Score one prediction set; see AnswerScorer.score()."""
+    return AnswerScorer(references, strongs).score(predictions, distinct=distinct)
+
+
+def summarize(scores: Dict[str, np.ndarray], confidence: float = DEFAULT_CONFIDENCE,
+              n_resamples: int = DEFAULT_RESAMPLES, seed: int = 0, prefix: str = '') -> Dict[str, float]:
+    """
+    Flat ``{name: mean, name_ci_low: ..., name_ci_high: ...}`` for every score,
+    ready for mlflow.log_metrics. Metrics with no applicable examples are left out.
+    """
+    summary: Dict[str, float] = {}
+    for name, values in scores.items():
+        mean, low, high = bootstrap_ci(np.asarray(values, dtype=np.float64), confidence, n_resamples, seed)
+        if np.isnan(mean):
+            continue
+        summary[f"{prefix}{name}"] = mean
+        if n_resamples:
+            summary[f"{prefix}{name}_ci_low"] = low
+            summary[f"{prefix}{name}_ci_high"] = high
+    if scores:
+        summary[f"{prefix}count"] = float(len(next(iter(scores.values()))))
+    return summary
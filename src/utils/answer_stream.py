@@ -0,0 +1,165 @@
+"""
+Answer Streaming
+
+Turns a question-answering model into a stream of answer tokens so web
+endpoints can send text as it is generated instead of after the whole answer
+is ready. The chunks come from the first source the model supports:
+
+1. ``model.stream(context=..., question=...)`` (e.g. CustomLMStudioModule,
+   which streams through LMClient);
+2. ``dspy.streamify`` with a listener on the ``answer`` output field, for
+   DSPy programs whose answer is produced by a single predictor;
+3. a plain call, yielding the whole answer as one chunk.
+
+``stream_answer`` wraps the chunks in ``(event, data)`` pairs: ``token`` for
+each piece of text, then ``done`` with the full answer and its timings, or
+``error`` if generation failed. ``on_complete`` runs only when the answer was
+generated completely, so conversation history and telemetry are never
+recorded for abandoned or failed streams. ``sse_event`` formats a pair as a
+server-sent event and ``parse_sse`` reads them back.
+
+Usage:
+    def events():
+        for event, data in stream_answer(model, context, question, history=history,
+                                         on_complete=save_turn):
+            yield sse_event(event, data)
+    return Response(events(), mimetype='text/event-stream')
+"""
+
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Headers that keep proxies (nginx, the web app) from buffering an event stream
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+
+def _model_kwargs(context: str, question: str, history: Optional[list]) -> Dict[str, Any]:
+    kwargs = {'context': context, 'question': question}
+    if history is not None:
+        kwargs['history'] = history
+    return kwargs
+
+
+def _dspy_chunks(model, kwargs: Dict[str, Any]) -> Optional[Iterator[str]]:
+    """Answer chunks from dspy.streamify, or None if the program cannot be streamed."""
+    try:
+        import dspy
+        from dspy.streaming import StreamListener, StreamResponse, apply_sync_streaming
+    except ImportError:
+        return None
+    if not isinstance(model, dspy.Module):
+        return None
+    try:
+        # Listeners keep per-stream state, so each call gets its own
+        program = dspy.streamify(model, stream_listeners=[StreamListener(signature_field_name='answer')])
+    except ValueError as e:
+        # No predictor (or more than one) produces an ``answer`` field
+        logger.debug(f"Not streaming {type(model).__name__}: {e}")
+        return None
+
+    def chunks():
+        streamed = False
+        for item in apply_sync_streaming(program(**kwargs)):
+            if isinstance(item, StreamResponse):
+                if item.chunk:
+                    streamed = True
+                    yield item.chunk
+            elif isinstance(item, dspy.Prediction) and not streamed:
+                # Cache hits and non-streaming LMs only produce the final prediction
+                yield item.answer or ''
+    return chunks()
+
+
+def answer_chunks(model, context: str, question: str, history: Optional[list] = None) -> Iterator[str]:
+    """Yield the model's answer in pieces as it is generated."""
+    kwargs = _model_kwargs(context, question, history)
+    stream = getattr(model, 'stream', None)
+    if callable(stream):
+        return iter(stream(**kwargs))
+    chunks = _dspy_chunks(model, kwargs)
+    if chunks is not None:
+        return chunks
+    return iter([model(**kwargs).answer or ''])
+
+
+def stream_answer(model, context: str, question: str, history: Optional[list] = None,
+                  on_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None
+                  ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream an answer as ``(event, data)`` pairs.
+
+    Events:
+        token: ``{"text": ...}`` for each non-empty chunk
+        done:  ``{"answer", "ttft", "seconds", "chunks"}`` after the last chunk
+        error: ``{"error": ...}`` if the model failed; nothing follows it
+
+    Args:
+        history: Passed to the model only when given (not every model takes it)
+        on_complete: Called as ``on_complete(answer, stats)`` before ``done``;
+                     not called if the stream fails or is closed early
+    """
+    start = time.perf_counter()
+    ttft = None
+    pieces: List[str] = []
+    chunks = None
+    try:
+        chunks = answer_chunks(model, context, question, history)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            pieces.append(chunk)
+            yield 'token', {'text': chunk}
+    except Exception as e:
+        logger.error(f"Error streaming answer: {e}")
+        yield 'error', {'error': str(e)}
+        return
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+    answer = ''.join(pieces).strip()
+    stats = {
+        'ttft': round(ttft, 4) if ttft is not None else None,
+        'seconds': round(time.perf_counter() - start, 4),
+        'chunks': len(pieces),
+    }
+    if on_complete is not None:
+        try:
+            on_complete(answer, stats)
+        except Exception as e:
+            logger.error(f"Error recording streamed answer: {e}")
+    yield 'done', {'answer': answer, **stats}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def parse_sse(text: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read complete server-sent events (as written by sse_event) back into pairs."""
+    events = []
+    for block in text.split('\n\n'):
+        event = 'message'
+        data = []
+        for line in block.splitlines():
+            if line.startswith('event:'):
+                event = line[6:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].strip())
+        if data:
+            try:
+                events.append((event, json.loads('\n'.join(data))))
+            except ValueError:
+                continue
+    return events
@@ -8,6 +8,8 @@ import re
 import logging
 from typing import Tuple, Optional, List, Dict
 
+from .reference_engine import BOOK_NAMES, parse, resolve_book
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -279,68 +281,35 @@ def normalize_book_name(book_name: str) -> str:
     Returns:
         Canonical book name or original if not recognized
     """
-    # Convert to lowercase for case-insensitive matching
-    book_lower = book_name.lower()
-    
-    # Check exact matches first
-    for canonical in CANONICAL_BOOKS:
-        if book_lower == canonical.lower():
-            return canonical
-    
-    # Check aliases
-    if book_lower in BOOK_ALIASES:
-        return BOOK_ALIASES[book_lower]
-    
-    # If no match, return original
-    return book_name
+    book_num = resolve_book(book_name)
+    return BOOK_NAMES[book_num] if book_num else book_name
 
 def parse_reference(reference: str) -> Optional[Tuple[str, int, int, Optional[int]]]:
     """
     Parse a Bible reference into its components.
     
+    Parsing is delegated to the canonical reference engine; for lists such as
+    "Rom 8:28, 31" only the first span is returned.
+    
     Args:
         reference: Bible reference string (e.g., "Genesis 1:1-3", "John 3:16")
         
     Returns:
         Tuple of (book_name, chapter, verse_start, verse_end) or None if invalid
     """
-    try:
-        # Common patterns:
-        # "Genesis 1:1"
-        # "Gen 1:1-3"
-        # "Psalm 23"
-        # "Matthew 5:3-10"
-        
-        # Basic regex to match reference patterns
-        pattern = r'([1-3]?\s?[A-Za-z]+)\s+(\d+)(?::(\d+)(?:-(\d+))?)?'
-        match = re.match(pattern, reference.strip())
-        
-        if not match:
-            logger.warning(f"Failed to parse reference: {reference}")
-            return None
-        
-        # Extract components
-        book_raw, chapter_str, verse_start_str, verse_end_str = match.groups()
-        
-        # Normalize book name
-        book_name = normalize_book_name(book_raw)
-        
-        # Convert to integers
-        chapter = int(chapter_str)
-        
-        # If verse_start is None, it's a whole chapter reference
-        if verse_start_str is None:
-            verse_start = 1  # Start from verse 1
-            verse_end = None  # All verses in the chapter
-        else:
-            verse_start = int(verse_start_str)
-            verse_end = int(verse_end_str) if verse_end_str else verse_start
-        
-        return (book_name, chapter, verse_start, verse_end)
-    
-    except Exception as e:
-        logger.error(f"Error parsing reference '{reference}': {e}")
+    parsed = parse(reference) if reference else None
+    if parsed is None:
+        logger.warning(f"Failed to parse reference: {reference}")
         return None
+    return parsed.to_legacy_tuple()
+
+# Candidate reference spans in free text: a book-like word followed by a chapter,
+# optionally with verses, ranges and comma lists
+_REFERENCE_CANDIDATE_RE = re.compile(
+    r"(?:\b[1-3]\s?|\b(?:I{1,3})\s)?\b[A-Za-z]+\.?(?:\s+of\s+[A-Za-z]+)?\s+\d+"
+    r"(?:\s*[:.]\s*\d+[a-z]?)?(?:\s*[-\u2013]\s*\d+(?:[:.]\d+)?[a-z]?)*"
+    r"(?:,\s*\d+(?:\s*[-\u2013]\s*\d+)?)*"
+)
 
 def extract_references(text: str) -> List[str]:
     """
@@ -352,20 +321,20 @@ def extract_references(text: str) -> List[str]:
     Returns:
         List of reference strings found in the text
     """
-    # Common reference patterns
-    patterns = [
-        r'([1-3]?\s?[A-Za-z]+)\s+(\d+)(?::(\d+)(?:-(\d+))?)?',  # Genesis 1:1-3
-        r'([1-3]?\s?[A-Za-z]+)\.?\s+(\d+)(?::(\d+)(?:-(\d+))?)?'  # Gen. 1:1-3
-    ]
-    
     references = []
+    pos = 0
     
-    for pattern in patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            ref_text = match.group(0)
-            if parse_reference(ref_text):  # Verify it's a valid reference
-                references.append(ref_text)
+    while True:
+        match = _REFERENCE_CANDIDATE_RE.search(text, pos)
+        if not match:
+            break
+        ref_text = match.group(0)
+        if parse(ref_text):  # Verify it's a valid reference
+            references.append(ref_text)
+            pos = match.end()
+        else:
+            # A leading non-book word ("and 1 John") can hide a real reference
+            pos = match.start() + 1
     
     return references
 
@@ -109,4 +109,101 @@ def batch_insert(conn, table_name, columns, data, batch_size=1000):
     finally:
         cursor.close()
         
-    return total_inserted 
\ No newline at end of file
+    return total_inserted
+
+
+def get_dataset_version(conn, dataset):
+    """
+    Get the current version counter for a dataset.
+    
+    Args:
+        conn: Database connection
+        dataset (str): Dataset name (e.g. 'lexicon', 'verses')
+        
+    Returns:
+        int: Version number, or None if the dataset has never been versioned
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass('bible.etl_versions') IS NOT NULL AS present")
+        row = cursor.fetchone()
+        if not (row['present'] if hasattr(row, 'keys') else row[0]):
+            return None
+        cursor.execute("SELECT version FROM bible.etl_versions WHERE dataset = %s", (dataset,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return row['version'] if hasattr(row, 'keys') else row[0]
+    finally:
+        cursor.close()
+
+def get_data_version(conn):
+    """
+    Get the global data version: the sum of all dataset version counters.
+    
+    Any ETL load that calls mark_dataset_updated changes this value, so it
+    identifies the state of all loaded data at once.
+    
+    Args:
+        conn: Database connection
+        
+    Returns:
+        tuple: (version, last_modified) - (0, None) if nothing has been versioned
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass('bible.etl_versions') IS NOT NULL AS present")
+        row = cursor.fetchone()
+        if not (row['present'] if hasattr(row, 'keys') else row[0]):
+            return 0, None
+        cursor.execute("""
+            SELECT COALESCE(SUM(version), 0) AS version, MAX(updated_at) AS updated_at
+            FROM bible.etl_versions
+        """)
+        row = cursor.fetchone()
+        if hasattr(row, 'keys'):
+            return int(row['version']), row['updated_at']
+        return int(row[0]), row[1]
+    finally:
+        cursor.close()
+
+def mark_dataset_updated(conn, dataset):
+    """
+    Bump the version counter for a dataset after an ETL load.
+    
+    Long-running processes compare this counter to decide when their
+    in-process caches are stale.
+    
+    Args:
+        conn: Database connection
+        dataset (str): Dataset name (e.g. 'lexicon', 'verses')
+        
+    Returns:
+        int: The new version number
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bible.etl_versions (
+                dataset TEXT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO bible.etl_versions (dataset, version) VALUES (%s, 1)
+            ON CONFLICT (dataset) DO UPDATE
+            SET version = bible.etl_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING version
+        """, (dataset,))
+        row = cursor.fetchone()
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error updating version for dataset '{dataset}': {str(e)}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    version = row['version'] if hasattr(row, 'keys') else row[0]
+    logger.info(f"Dataset '{dataset}' is now at version {version}")
+    return version
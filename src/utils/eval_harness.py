@@ -0,0 +1,319 @@
+"""
+Evaluation Harness
+
+Runs a QA model over an evaluation set in parallel and scores the answers in
+one pass at the end:
+
+- Examples are predicted on a thread pool of ``workers`` threads, so a
+  local LM is kept busy with a bounded number of concurrent requests.
+- Every prediction is appended to a JSONL results file as soon as it
+  finishes, keyed by a hash of the example and a hash of the model. A rerun
+  with the same model skips examples already in the file, so a crash or
+  Ctrl-C loses at most the calls in flight. Failed predictions are recorded
+  but retried on the next run.
+- Scores (token overlap accuracy, exact match, token precision/recall/F1,
+  ROUGE-L) are computed for all predictions at once with
+  src.utils.answer_metrics, overall and per category (``metadata.type`` of
+  each example), with a bootstrap interval on overall accuracy.
+
+Configuration (environment):
+    EVAL_WORKERS   Concurrent predictions (default: 4)
+
+Usage:
+    report = evaluate(model, val_data, results_path="eval/bible_qa.jsonl")
+    print(report.metrics["accuracy"], report.by_category)
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.answer_metrics import bootstrap_ci, score_answers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv('EVAL_WORKERS', '4'))
+
+# Share of the expected answer's tokens a prediction must contain to count as correct
+OVERLAP_THRESHOLD = 0.3
+UNCATEGORIZED = 'uncategorized'
+
+
+# --- examples and models ---------------------------------------------------------
+
+def example_fields(example: Any) -> Dict[str, Any]:
+    """context/question/answer/history/category of a dict or dspy.Example."""
+    get = example.get if isinstance(example, dict) else (lambda k, d=None: getattr(example, k, d))
+    metadata = get('metadata') or {}
+    category = (metadata.get('type') if isinstance(metadata, dict) else None) or get('category') or get('type')
+    return {
+        'context': get('context', '') or '',
+        'question': get('question', '') or '',
+        'answer': get('answer', '') or '',
+        'history': get('history') or [],
+        'category': category or UNCATEGORIZED,
+    }
+
+
+def _digest(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def example_hash(fields: Dict[str, Any]) -> str:
+    return _digest([fields['context'], fields['question'], fields['answer'], fields['history']])
+
+
+def model_hash(model: Any) -> str:
+    """
+    Hash of what determines a model's answers: its class and learned state
+    (``dump_state()`` for DSPy modules, otherwise its public scalar
+    attributes such as ``model_name``).
+    """
+    state = None
+    dump_state = getattr(model, 'dump_state', None)
+    if callable(dump_state):
+        try:
+            state = dump_state()
+        except Exception as e:
+            logger.debug(f"dump_state failed, hashing attributes instead: {e}")
+    if state is None:
+        state = {k: v for k, v in vars(model).items()
+                 if isinstance(v, (str, int, float, bool)) and not k.startswith('_')} if hasattr(model, '__dict__') else {}
+    return _digest([type(model).__module__, type(model).__qualname__, state])
+
+
+def predict(model: Callable, fields: Dict[str, Any]) -> str:
+    prediction = model(context=fields['context'], question=fields['question'], history=fields['history'])
+    answer = getattr(prediction, 'answer', prediction)
+    return '' if answer is None else str(answer)
+
+
+# --- checkpoint file -------------------------------------------------------------
+
+class ResultsStore:
+    """
+    Append-only JSONL file of predictions.
+
+    Each line is one record with ``model`` and ``example`` hashes. Lines are
+    flushed as they are written; a partial last line from a crash is ignored.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self, model_id: str) -> Dict[str, dict]:
+        """Successful records for ``model_id``, by example hash (later lines win)."""
+        records: Dict[str, dict] = {}
+        if not self.path or not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('model') == model_id and record.get('error') is None:
+                    records[record['example']] = record
+        return records
+
+    def append(self, record: dict):
+        if not self.path:
+            return
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# --- scoring ---------------------------------------------------------------------
+
+def score(predictions: Sequence[str], answers: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Per-example scores as arrays: overlap of distinct lowercase word tokens
+    (precision, recall, F1, and ``correct`` when recall exceeds
+    OVERLAP_THRESHOLD), ROUGE-L, and ``exact`` when the expected answer
+    appears verbatim in the prediction.
+    """
+    n = len(predictions)
+    metrics = score_answers(predictions, answers, strongs=[None] * n, distinct=True)
+    recall = metrics['token_recall']
+    exact = np.fromiter(
+        (bool(a.strip()) and a.strip().lower() in p.lower() for p, a in zip(predictions, answers)),
+        dtype=bool, count=n)
+    return {
+        'correct': recall > OVERLAP_THRESHOLD,
+        'exact': exact,
+        'precision': metrics['token_precision'],
+        'recall': recall,
+        'f1': metrics['token_f1'],
+        'rouge_l': metrics['rouge_l'],
+    }
+
+
+def _summarize(scores: Dict[str, np.ndarray], errors: np.ndarray, seconds: np.ndarray,
+               mask: np.ndarray) -> Dict[str, float]:
+    count = int(mask.sum())
+    if count == 0:
+        return {'count': 0}
+    ok = mask & ~errors
+    summary = {
+        'count': count,
+        # Failed predictions count as wrong
+        'accuracy': float(scores['correct'][mask].mean()),
+        'exact_match': float(scores['exact'][mask].mean()),
+        'token_f1': float(scores['f1'][mask].mean()),
+        'token_precision': float(scores['precision'][mask].mean()),
+        'token_recall': float(scores['recall'][mask].mean()),
+        'rouge_l': float(scores['rouge_l'][mask].mean()),
+        'error_rate': float(errors[mask].mean()),
+    }
+    if ok.any():
+        summary['latency_p50'] = float(np.percentile(seconds[ok], 50))
+        summary['latency_p95'] = float(np.percentile(seconds[ok], 95))
+    return summary
+
+
+@dataclass
+class EvalReport:
+    metrics: Dict[str, float]
+    by_category: Dict[str, Dict[str, float]]
+    records: List[dict] = field(repr=False, default_factory=list)
+    predicted: int = 0
+    reused: int = 0
+
+    def flat(self) -> Dict[str, float]:
+        """Overall metrics plus ``<metric>/<category>`` entries, e.g. for mlflow.log_metrics."""
+        flat = dict(self.metrics)
+        for category, summary in self.by_category.items():
+            for name in ('accuracy', 'token_f1', 'count'):
+                if name in summary:
+                    flat[f"{name}/{category}"] = summary[name]
+        return flat
+
+
+def build_report(records: Sequence[dict]) -> EvalReport:
+    """Score a list of result records (as written to the results file)."""
+    predictions = [r.get('prediction') or '' for r in records]
+    answers = [r.get('answer') or '' for r in records]
+    scores = score(predictions, answers)
+    errors = np.fromiter((r.get('error') is not None for r in records), dtype=bool, count=len(records))
+    seconds = np.fromiter((r.get('seconds') or 0.0 for r in records), dtype=float, count=len(records))
+    categories = np.asarray([r.get('category') or UNCATEGORIZED for r in records], dtype=object)
+
+    everything = np.ones(len(records), dtype=bool)
+    by_category = {
+        str(category): _summarize(scores, errors, seconds, categories == category)
+        for category in sorted(set(categories.tolist()))
+    }
+    metrics = _summarize(scores, errors, seconds, everything)
+    if len(records):
+        _, metrics['accuracy_ci_low'], metrics['accuracy_ci_high'] = bootstrap_ci(scores['correct'])
+    return EvalReport(metrics, by_category, list(records))
+
+
+# --- running ---------------------------------------------------------------------
+
+def evaluate(model: Callable, examples: Iterable[Any], results_path: Optional[str] = None,
+             workers: int = DEFAULT_WORKERS, model_id: Optional[str] = None,
+             predict_fn: Callable[[Callable, Dict[str, Any]], str] = predict,
+             progress_every: int = 100) -> EvalReport:
+    """
+    Predict every example with ``model`` and score the results.
+
+    Args:
+        model: Called as ``model(context=, question=, history=)``; returns a
+               prediction with an ``answer`` attribute, or the answer itself
+        examples: Dicts or dspy.Examples with question/answer (and optional
+                  context, history, metadata.type)
+        results_path: JSONL checkpoint file; None keeps results in memory only
+        workers: Concurrent predictions
+        model_id: Identifies the model in the results file (default: ``model_hash(model)``)
+        predict_fn: Produces the answer text for one example
+        progress_every: Log progress after this many predictions
+
+    Returns:
+        An EvalReport covering every example, including ones reused from the results file
+    """
+    model_id = model_id or model_hash(model)
+    store = ResultsStore(results_path)
+    done = store.load(model_id)
+
+    records: Dict[str, dict] = {}
+    pending: Dict[str, Dict[str, Any]] = {}
+    order: List[str] = []
+    for example in examples:
+        fields = example_fields(example)
+        key = example_hash(fields)
+        order.append(key)
+        if key in records or key in pending:
+            continue
+        if key in done:
+            records[key] = done[key]
+        else:
+            pending[key] = fields
+    reused = len(records)
+    logger.info(f"Evaluating model {model_id}: {len(pending)} to predict, {reused} reused from {results_path}")
+
+    def run_one(key: str, fields: Dict[str, Any]) -> dict:
+        start = time.perf_counter()
+        prediction, error = None, None
+        try:
+            prediction = predict_fn(model, fields)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record = {
+            'model': model_id,
+            'example': key,
+            'category': fields['category'],
+            'question': fields['question'],
+            'answer': fields['answer'],
+            'prediction': prediction,
+            'error': error,
+            'seconds': round(time.perf_counter() - start, 4),
+        }
+        store.append(record)
+        return record
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='eval') as pool:
+            futures = [pool.submit(run_one, key, fields) for key, fields in pending.items()]
+            try:
+                for finished, future in enumerate(as_completed(futures), 1):
+                    record = future.result()
+                    records[record['example']] = record
+                    if record['error'] is not None:
+                        logger.warning(f"Error evaluating example {record['example']}: {record['error']}")
+                    if progress_every and finished % progress_every == 0:
+                        logger.info(f"Evaluated {finished}/{len(futures)} examples")
+            except BaseException:
+                # Keep what has been written; drop the queued predictions
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        store.close()
+
+    report = build_report([records[key] for key in order])
+    report.predicted = len(pending)
+    report.reused = reused
+    return report
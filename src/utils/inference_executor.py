@@ -0,0 +1,256 @@
+"""
+Inference Executor
+
+Runs blocking model calls (DSPy modules, LM clients) for async web servers
+without stalling the event loop. Calls run on a sized thread pool via
+``asyncio.wrap_future``, and admission is limited to the pool size plus a
+bounded queue. When both are full, new work is refused immediately with
+``InferenceSaturated`` instead of piling up behind slow calls. Each call has a
+timeout; a call that times out before it starts is cancelled, and one that is
+already running finishes in the background but still counts against capacity
+until it does.
+
+Identical requests that arrive while one is already running share its result
+(single flight), and ``run_batch`` admits a whole micro-batch at once:
+duplicates are answered once, unique items run concurrently, and the batch
+is either admitted as a whole or refused.
+
+``stream`` runs a generator (e.g. an answer token stream) on the pool and
+hands its items to the event loop as they are produced. It is admitted like
+a single call; the timeout covers the whole stream, and a consumer that stops
+early (client disconnect) stops the generator at its next item.
+
+Configuration (environment):
+    INFERENCE_WORKERS      Threads running model calls (default: 4)
+    INFERENCE_MAX_QUEUE    Calls allowed to wait for a thread (default: 32)
+    INFERENCE_TIMEOUT      Default per-request timeout in seconds (default: 60)
+
+Usage:
+    executor = InferenceExecutor()
+    answer = await executor.run(predict_answer, model, context, question,
+                                key=(context, question))
+    async for event, data in executor.stream(stream_answer, model, context, question):
+        ...
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv('INFERENCE_WORKERS', '4'))
+DEFAULT_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '32'))
+DEFAULT_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '60'))
+
+
+class InferenceSaturated(RuntimeError):
+    """Raised when the pool and its queue are full; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InferenceTimeout(TimeoutError):
+    """Raised when a call does not finish within its timeout."""
+
+
+class InferenceExecutor:
+    """
+    Bounded, timed execution of blocking model calls for asyncio code.
+
+    Args:
+        max_workers: Threads running model calls
+        max_queue: Calls allowed to wait for a free thread
+        timeout: Default per-call timeout in seconds
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._inflight: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Future, int] = {}
+        self.stats = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'shared': 0}
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """Calls running or queued, including timed-out calls that are still running."""
+        return self._pending
+
+    def _release(self, key: Optional[Hashable], future: Future):
+        with self._lock:
+            self._pending -= 1
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.cancelled():
+                self.stats['completed'] += 1
+
+    def _admit(self, calls: Sequence[Tuple[Optional[Hashable], Callable, tuple]]) -> List[Future]:
+        """Submit calls all-or-nothing, joining in-flight calls with the same key."""
+        submitted = []
+        futures = []
+        with self._lock:
+            new = [c for c in calls if c[0] is None or c[0] not in self._inflight]
+            if self._pending + len(new) > self.capacity:
+                self.stats['rejected'] += 1
+                raise InferenceSaturated(
+                    f"Inference queue is full ({self._pending} pending, capacity {self.capacity})",
+                    retry_after=max(1, round(self.timeout / 10)))
+            for key, func, args in calls:
+                if key is not None and key in self._inflight:
+                    self.stats['shared'] += 1
+                    future = self._inflight[key]
+                else:
+                    future = self._pool.submit(func, *args)
+                    self._pending += 1
+                    if key is not None:
+                        self._inflight[key] = future
+                    submitted.append((key, future))
+                self._waiters[future] = self._waiters.get(future, 0) + 1
+                futures.append(future)
+        for key, future in submitted:
+            future.add_done_callback(lambda f, key=key: self._release(key, f))
+        return futures
+
+    async def _await(self, future: Future, timeout: Optional[float]):
+        timeout = self.timeout if timeout is None else timeout
+        timed_out = False
+        try:
+            # shield: a shared call must not be cancelled because one of its waiters gave up
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self.stats['timeouts'] += 1
+            raise InferenceTimeout(f"Inference did not finish within {timeout:.0f}s")
+        finally:
+            with self._lock:
+                waiters = self._waiters.pop(future, 1) - 1
+                if waiters > 0:
+                    self._waiters[future] = waiters
+            if timed_out and waiters == 0:
+                # Drop work that never started; a running call finishes in the background
+                future.cancel()
+
+    async def run(self, func: Callable, *args, key: Optional[Hashable] = None,
+                  timeout: Optional[float] = None) -> Any:
+        """
+        Run ``func(*args)`` on the pool and await its result.
+
+        Args:
+            key: Identifies equivalent requests; a call with the key of one
+                 still in flight awaits that call instead of starting another
+            timeout: Seconds to wait (default: the executor's timeout)
+
+        Raises:
+            InferenceSaturated: The pool and queue are full
+            InferenceTimeout: The call did not finish in time
+        """
+        future = self._admit([(key, func, args)])[0]
+        return await self._await(future, timeout)
+
+    async def run_batch(self, func: Callable, items: Sequence[tuple], keys: Optional[Sequence[Hashable]] = None,
+                        timeout: Optional[float] = None) -> List[Any]:
+        """
+        Run ``func(*item)`` for every item, admitting the batch as a whole.
+
+        Items with equal keys run once. Results are returned in item order; an
+        item whose call failed or timed out holds the exception instead.
+
+        Raises:
+            InferenceSaturated: The unique items do not fit in the remaining capacity
+        """
+        keys = list(keys) if keys is not None else [None] * len(items)
+        unique: Dict[Hashable, int] = {}
+        calls = []
+        slots = []
+        for key, item in zip(keys, items):
+            if key is not None and key in unique:
+                slots.append(unique[key])
+                continue
+            if key is not None:
+                unique[key] = len(calls)
+            slots.append(len(calls))
+            calls.append((key, func, tuple(item)))
+        futures = self._admit(calls)
+        results = await asyncio.gather(*(self._await(f, timeout) for f in futures), return_exceptions=True)
+        return [results[slot] for slot in slots]
+
+    def stream(self, func: Callable[..., Iterable], *args, timeout: Optional[float] = None) -> AsyncIterator:
+        """
+        Run the generator ``func(*args)`` on the pool and iterate its items asynchronously.
+
+        Admission happens here, before the first item, so a caller can still
+        answer with an error status instead of a started stream. Must be
+        called from a running event loop.
+
+        Raises:
+            InferenceSaturated: The pool and queue are full (raised immediately)
+            InferenceTimeout: The stream did not finish in time (raised while iterating)
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop is gone; nobody is listening any more
+                stop.set()
+
+        def pump():
+            iterator = None
+            try:
+                iterator = iter(func(*args))
+                for item in iterator:
+                    if stop.is_set():
+                        break
+                    put((True, item))
+                put((False, None))
+            except BaseException as e:
+                put((False, e))
+            finally:
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+
+        future = self._admit([(None, pump, ())])[0]
+        return self._drain(queue, stop, future, self.timeout if timeout is None else timeout)
+
+    async def _drain(self, queue: asyncio.Queue, stop: threading.Event, future: Future, timeout: float):
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    more, item = await asyncio.wait_for(queue.get(), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    self.stats['timeouts'] += 1
+                    raise InferenceTimeout(f"Inference stream did not finish within {timeout:.0f}s")
+                if not more:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            stop.set()
+            with self._lock:
+                self._waiters.pop(future, None)
+            # Drop a stream that never started; a running one stops at its next item
+            future.cancel()
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
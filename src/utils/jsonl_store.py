@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Indexed JSONL Dataset Store
+
+Random access to JSONL training and evaluation files without parsing them
+whole. The first time a file is opened, its newlines are found with one
+vectorized pass and the byte offset and length of every record line are
+saved in a sidecar index (``<file>.idx.npz``). Later opens just load that
+index, so a dataset of any size opens in milliseconds. Records are parsed
+only when accessed, straight from a memory map of the file.
+
+- ``dataset[i]``, ``dataset[a:b]`` and ``dataset.take(indices)`` parse only
+  the requested records; ``sample(n)`` costs O(n), not O(file).
+- ``shard(k, n)`` iterates a contiguous 1/n of the records, for parallel workers.
+- ``columns(fields)`` parses the file once for the requested fields (dotted
+  paths such as ``metadata.type`` reach into nested objects) and caches
+  each as a compact UTF-8 blob plus an offsets array
+  (``<file>.col.<field>.npz``). Splitting, grouping and stratifying by
+  question, answer or category then never reparse the records.
+
+Sidecars store the file's size and modification time and are rebuilt
+whenever either changes. Blank lines and ``//`` or ``#`` comment lines are
+not records. A malformed record raises ValueError on direct access and is
+skipped, with a warning, during iteration (as the old loaders did).
+
+Configuration (environment):
+    JSONL_INDEX_DIR   Directory for sidecar files (default: next to each JSONL file)
+
+Usage:
+    dataset = JsonlDataset("data/processed/.../qa_dataset_val.jsonl")
+    len(dataset), dataset[0], dataset.sample(100, seed=42)
+    for record in dataset.shard(worker, num_workers): ...
+    questions = dataset.column("question")
+
+    python -m src.utils.jsonl_store index data/processed/dspy_training_data/*.jsonl
+    python -m src.utils.jsonl_store sample qa_dataset.jsonl -n 5
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import hashlib
+import logging
+import argparse
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv('JSONL_INDEX_DIR', '')
+# Bump when the sidecar layout changes so old sidecars are rebuilt
+INDEX_VERSION = 1
+
+_NEWLINE = ord('\n')
+_SKIP_FIRST_BYTES = np.frombuffer(b'/#', dtype=np.uint8)
+_SPACE_BYTES = np.frombuffer(b' \t\r\v\f', dtype=np.uint8)
+
+_UNSAFE_NAME_RE = re.compile(r'[^\w.-]')
+
+# Column value kinds
+_MISSING, _TEXT, _JSON = 0, 1, 2
+
+
+def sidecar_path(path: str, suffix: str) -> str:
+    """Where the sidecar ``suffix`` of a JSONL file is stored."""
+    if not INDEX_DIR:
+        return path + suffix
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(INDEX_DIR, f"{os.path.basename(path)}.{digest}{suffix}")
+
+
+def file_signature(path: str) -> np.ndarray:
+    """Size, modification time and index version; any change invalidates sidecars."""
+    st = os.stat(path)
+    return np.array([st.st_size, st.st_mtime_ns, INDEX_VERSION], dtype=np.int64)
+
+
+def _load_sidecar(path: str, signature: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if not np.array_equal(data['signature'], signature):
+                return None
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable sidecar {path}: {e}")
+        return None
+
+
+def _save_sidecar(path: str, signature: np.ndarray, **arrays: np.ndarray):
+    """Write a sidecar atomically; an unwritable location only costs a rebuild next time."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, signature=signature, **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save sidecar {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def scan_lines(buffer) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Offsets and lengths of the record lines in a JSONL buffer.
+
+    Blank lines and lines starting with ``//`` or ``#`` are left out. Only
+    lines that begin with whitespace are looked at individually.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data == _NEWLINE)
+    if data[-1] != _NEWLINE:
+        ends = np.append(ends, len(data))
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+
+    first = np.zeros(len(starts), dtype=np.uint8)
+    nonempty = lengths > 0
+    first[nonempty] = data[starts[nonempty]]
+    is_record = nonempty & ~np.isin(first, _SKIP_FIRST_BYTES)
+    for i in np.flatnonzero(nonempty & np.isin(first, _SPACE_BYTES)):
+        text = bytes(data[starts[i]:ends[i]]).strip()
+        is_record[i] = bool(text) and not text.startswith((b'//', b'#'))
+    return starts[is_record], lengths[is_record]
+
+
+def _field_value(record: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+def _encode_column(values: List[Any]) -> Dict[str, np.ndarray]:
+    kinds = np.zeros(len(values), dtype=np.uint8)
+    pieces = []
+    for i, value in enumerate(values):
+        if value is None:
+            pieces.append(b'')
+        elif isinstance(value, str):
+            kinds[i] = _TEXT
+            pieces.append(value.encode('utf-8'))
+        else:
+            kinds[i] = _JSON
+            pieces.append(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in pieces], out=offsets[1:])
+    return {'kinds': kinds, 'offsets': offsets, 'blob': np.frombuffer(b''.join(pieces), dtype=np.uint8)}
+
+
+def _decode_column(arrays: Dict[str, np.ndarray]) -> List[Any]:
+    blob = arrays['blob'].tobytes()
+    offsets = arrays['offsets'].tolist()
+    values: List[Any] = []
+    for i, kind in enumerate(arrays['kinds'].tolist()):
+        if kind == _MISSING:
+            values.append(None)
+            continue
+        text = blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+        values.append(text if kind == _TEXT else json.loads(text))
+    return values
+
+
+class JsonlDataset(Sequence):
+    """
+    A JSONL file as a read-only sequence of records.
+
+    Args:
+        path: The JSONL file
+        rebuild: Ignore an existing sidecar index and rescan the file
+    """
+
+    def __init__(self, path: str, rebuild: bool = False):
+        self.path = str(path)
+        self.signature = file_signature(self.path)
+        index = None if rebuild else _load_sidecar(sidecar_path(self.path, '.idx.npz'), self.signature)
+        self._file = open(self.path, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.signature[0] else b''
+        if index is None:
+            self.offsets, self.lengths = scan_lines(self._buffer)
+            _save_sidecar(sidecar_path(self.path, '.idx.npz'), self.signature,
+                          offsets=self.offsets, lengths=self.lengths)
+            logger.debug(f"Indexed {len(self.offsets)} records in {self.path}")
+        else:
+            self.offsets, self.lengths = index['offsets'], index['lengths']
+        self._columns: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.take(range(*item.indices(len(self))))
+        return self.record(item)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_range(0, len(self))
+
+    def raw(self, i: int) -> bytes:
+        """The bytes of record ``i``, without the newline."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"record {i} out of range for {len(self)} records")
+        start = int(self.offsets[i])
+        return self._buffer[start:start + int(self.lengths[i])]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Parse record ``i``."""
+        try:
+            return json.loads(self.raw(i))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed record {i} in {self.path}: {e}") from e
+
+    def take(self, indices) -> List[Dict[str, Any]]:
+        """Parse the records at ``indices``, in that order."""
+        return [self.record(int(i)) for i in indices]
+
+    def sample(self, n: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to ``n`` distinct records chosen at random."""
+        rng = np.random.default_rng(seed)
+        return self.take(rng.choice(len(self), size=min(n, len(self)), replace=False))
+
+    def shard(self, shard: int, num_shards: int) -> Iterator[Dict[str, Any]]:
+        """Records of shard ``shard`` of ``num_shards`` contiguous, near-equal shards."""
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"shard must be in [0, {num_shards}), not {shard}")
+        return self._iter_range(len(self) * shard // num_shards, len(self) * (shard + 1) // num_shards)
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+        for i in range(start, stop):
+            try:
+                yield self.record(i)
+            except ValueError as e:
+                logger.warning(f"Skipping {e}")
+
+    def columns(self, fields) -> Dict[str, List[Any]]:
+        """
+        Values of each field for every record (None where missing).
+
+        Cached in memory and in sidecars; fields without a valid sidecar are
+        extracted together in a single parse of the file.
+        """
+        missing = []
+        for name in fields:
+            if name in self._columns:
+                continue
+            cached = _load_sidecar(self._column_path(name), self.signature)
+            if cached is None:
+                missing.append(name)
+            else:
+                self._columns[name] = _decode_column(cached)
+        if missing:
+            paths = [tuple(name.split('.')) for name in missing]
+            values: List[List[Any]] = [[] for _ in missing]
+            for i in range(len(self)):
+                try:
+                    record = self.record(i)
+                except ValueError as e:
+                    logger.warning(f"Skipping {e}")
+                    record = None
+                for column, path in zip(values, paths):
+                    column.append(_field_value(record, path))
+            for name, column in zip(missing, values):
+                _save_sidecar(self._column_path(name), self.signature, **_encode_column(column))
+                self._columns[name] = column
+        return {name: self._columns[name] for name in fields}
+
+    def column(self, field: str) -> List[Any]:
+        """Values of one field for every record; see columns()."""
+        return self.columns([field])[field]
+
+    def project(self, fields) -> List[Dict[str, Any]]:
+        """Records reduced to ``fields``, built from the column cache without reparsing."""
+        columns = self.columns(fields)
+        return [dict(zip(fields, values)) for values in zip(*(columns[f] for f in fields))]
+
+    def _column_path(self, field: str) -> str:
+        return sidecar_path(self.path, f".col.{_UNSAFE_NAME_RE.sub('_', field)}.npz")
+
+    def is_stale(self) -> bool:
+        """Whether the file changed after it was opened (reopen to see the new records)."""
+        try:
+            return not np.array_equal(file_signature(self.path), self.signature)
+        except OSError:
+            return True
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Index JSONL datasets and sample records")
+    commands = parser.add_subparsers(dest='command', required=True)
+    index_cmd = commands.add_parser('index', help="Build or refresh sidecar indexes")
+    index_cmd.add_argument('files', nargs='+')
+    index_cmd.add_argument('--columns', nargs='*', default=[], help="Fields to cache as columns")
+    index_cmd.add_argument('--rebuild', action='store_true')
+    sample_cmd = commands.add_parser('sample', help="Print random records")
+    sample_cmd.add_argument('file')
+    sample_cmd.add_argument('-n', type=int, default=5)
+    sample_cmd.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'index':
+        for path in args.files:
+            with JsonlDataset(path, rebuild=args.rebuild) as dataset:
+                dataset.columns(args.columns)
+                print(f"{path}: {len(dataset)} records")
+    else:
+        with JsonlDataset(args.file) as dataset:
+            for record in dataset.sample(args.n, seed=args.seed):
+                print(json.dumps(record, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
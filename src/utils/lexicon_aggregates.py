@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Lexicon Entry Aggregates
+
+Precomputed per-entry data for the lexicon entry page. Each row of
+``bible.lexicon_entry_aggregates`` holds, for one Hebrew or Greek Strong's ID:
+the lexicon entry, its occurrence and verse counts, the first N verses it
+occurs in (with text), and its related words. The page is then a single
+primary-key read instead of a relationship join plus a DISTINCT scan over
+every occurrence of the word.
+
+The Hebrew, Greek and lexicon ETLs call ``refresh_lexicon_aggregates`` for the
+languages they loaded. Rows are upserted and only rewritten when their
+contents change, and the ``lexicon_aggregates`` dataset version is bumped.
+``LexiconAggregateCache`` keeps recently viewed entries in an in-process LRU
+that is cleared when that version changes.
+
+Usage:
+    python -m src.utils.lexicon_aggregates [--language hebrew|greek] [--ids H430 G2316 ...]
+
+Options:
+    --language   Refresh one language only (default: both)
+    --ids        Refresh only these Strong's IDs
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from .db_utils import get_dataset_version, mark_dataset_updated
+from .lexicon_service import strongs_variants
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_TABLE = 'bible.lexicon_entry_aggregates'
+SAMPLE_VERSES = int(os.getenv('LEXICON_SAMPLE_VERSES', '20'))
+CACHE_SIZE = int(os.getenv('LEXICON_PAGE_CACHE_SIZE', '512'))
+CHECK_INTERVAL = float(os.getenv('LEXICON_PAGE_CHECK_INTERVAL', '60'))
+SAMPLE_TRANSLATION = 'KJV'
+
+# language -> (lexicon table, tagged-word table)
+AGGREGATE_SOURCES = {
+    'hebrew': ('bible.hebrew_entries', 'bible.hebrew_ot_words'),
+    'greek': ('bible.greek_entries', 'bible.greek_nt_words'),
+}
+
+CREATE_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {AGGREGATES_TABLE} (
+        language TEXT NOT NULL,
+        strongs_id TEXT NOT NULL,
+        entry JSONB NOT NULL,
+        occurrence_count INTEGER NOT NULL DEFAULT 0,
+        verse_count INTEGER NOT NULL DEFAULT 0,
+        sample_verses JSONB NOT NULL DEFAULT '[]',
+        related_words JSONB NOT NULL DEFAULT '[]',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (language, strongs_id)
+    )
+"""
+
+_RELATED_WORD_SQL = """
+    jsonb_build_object(
+        'target_id', wr.target_id,
+        'relationship_type', wr.relationship_type,
+        'word', COALESCE(he.hebrew_word, ge.greek_word),
+        'transliteration', COALESCE(he.transliteration, ge.transliteration),
+        'gloss', COALESCE(he.gloss, ge.gloss),
+        'language', CASE WHEN he.strongs_id IS NOT NULL THEN 'hebrew' ELSE 'greek' END
+    )
+"""
+
+_SAMPLE_VERSE_SQL = """
+    jsonb_build_object(
+        'verse_key', f.verse_key,
+        'book_name', v.book_name,
+        'chapter_num', v.chapter_num,
+        'verse_num', v.verse_num,
+        'verse_text', v.verse_text
+    )
+"""
+
+
+def _upsert_sql(language: str, filtered: bool) -> str:
+    lexicon_table, words_table = AGGREGATE_SOURCES[language]
+    entry_filter = "WHERE e.strongs_id = ANY(%(ids)s)" if filtered else ""
+    word_filter = "AND w.strongs_id = ANY(%(ids)s)" if filtered else ""
+    relation_filter = "WHERE wr.source_id = ANY(%(ids)s)" if filtered else ""
+    return f"""
+        WITH counts AS (
+            SELECT w.strongs_id, COUNT(*) AS occurrences, COUNT(DISTINCT w.verse_key) AS verses
+            FROM {words_table} w
+            WHERE w.strongs_id IS NOT NULL {word_filter}
+            GROUP BY w.strongs_id
+        ), firsts AS (
+            SELECT strongs_id, verse_key
+            FROM (
+                SELECT strongs_id, verse_key,
+                       ROW_NUMBER() OVER (PARTITION BY strongs_id ORDER BY verse_key) AS rn
+                FROM (
+                    SELECT DISTINCT w.strongs_id, w.verse_key
+                    FROM {words_table} w
+                    WHERE w.strongs_id IS NOT NULL AND w.verse_key IS NOT NULL {word_filter}
+                ) d
+            ) ranked
+            WHERE rn <= %(samples)s
+        ), samples AS (
+            SELECT f.strongs_id, jsonb_agg({_SAMPLE_VERSE_SQL} ORDER BY f.verse_key) AS sample_verses
+            FROM firsts f
+            LEFT JOIN LATERAL (
+                SELECT book_name, chapter_num, verse_num, verse_text
+                FROM bible.verses v
+                WHERE v.verse_key = f.verse_key
+                ORDER BY (v.translation_source = %(translation)s) DESC
+                LIMIT 1
+            ) v ON TRUE
+            GROUP BY f.strongs_id
+        ), related AS (
+            SELECT wr.source_id,
+                   jsonb_agg({_RELATED_WORD_SQL} ORDER BY wr.relationship_type, wr.target_id) AS related_words
+            FROM bible.word_relationships wr
+            LEFT JOIN bible.hebrew_entries he ON wr.target_id = he.strongs_id
+            LEFT JOIN bible.greek_entries ge ON wr.target_id = ge.strongs_id
+            {relation_filter}
+            GROUP BY wr.source_id
+        )
+        INSERT INTO {AGGREGATES_TABLE} AS a
+            (language, strongs_id, entry, occurrence_count, verse_count, sample_verses, related_words)
+        SELECT %(language)s, e.strongs_id, to_jsonb(e),
+               COALESCE(c.occurrences, 0), COALESCE(c.verses, 0),
+               COALESCE(s.sample_verses, '[]'), COALESCE(r.related_words, '[]')
+        FROM {lexicon_table} e
+        LEFT JOIN counts c ON c.strongs_id = e.strongs_id
+        LEFT JOIN samples s ON s.strongs_id = e.strongs_id
+        LEFT JOIN related r ON r.source_id = e.strongs_id
+        {entry_filter}
+        ON CONFLICT (language, strongs_id) DO UPDATE SET
+            entry = EXCLUDED.entry,
+            occurrence_count = EXCLUDED.occurrence_count,
+            verse_count = EXCLUDED.verse_count,
+            sample_verses = EXCLUDED.sample_verses,
+            related_words = EXCLUDED.related_words,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (a.entry, a.occurrence_count, a.verse_count, a.sample_verses, a.related_words)
+              IS DISTINCT FROM
+              (EXCLUDED.entry, EXCLUDED.occurrence_count, EXCLUDED.verse_count,
+               EXCLUDED.sample_verses, EXCLUDED.related_words)
+    """
+
+
+def create_lexicon_aggregates_table(conn):
+    """Create bible.lexicon_entry_aggregates if it does not exist."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE_SQL)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating lexicon aggregates table: {e}")
+        raise
+
+
+def refresh_lexicon_aggregates(conn, languages: Optional[Iterable[str]] = None,
+                               strongs_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Recompute lexicon entry aggregates and bump the ``lexicon_aggregates`` dataset version.
+
+    Args:
+        conn: Database connection
+        languages: Languages to refresh (default: hebrew and greek)
+        strongs_ids: Refresh only these entries (e.g. the IDs an ETL run touched)
+
+    Returns:
+        Number of aggregate rows inserted or changed
+    """
+    languages = list(languages or AGGREGATE_SOURCES)
+    ids = None
+    if strongs_ids is not None:
+        ids = sorted({variant for sid in strongs_ids for variant in strongs_variants(sid)})
+    create_lexicon_aggregates_table(conn)
+    changed = 0
+    try:
+        with conn.cursor() as cur:
+            for language in languages:
+                start = time.perf_counter()
+                cur.execute(_upsert_sql(language, ids is not None), {
+                    'language': language,
+                    'ids': ids,
+                    'samples': SAMPLE_VERSES,
+                    'translation': SAMPLE_TRANSLATION,
+                })
+                changed += max(cur.rowcount, 0)
+                if ids is None:
+                    # Drop aggregates for entries removed from the lexicon
+                    cur.execute(f"""
+                        DELETE FROM {AGGREGATES_TABLE} a
+                        WHERE a.language = %s
+                          AND NOT EXISTS (SELECT 1 FROM {AGGREGATE_SOURCES[language][0]} e
+                                          WHERE e.strongs_id = a.strongs_id)
+                    """, (language,))
+                    changed += max(cur.rowcount, 0)
+                logger.info(f"Refreshed {language} lexicon aggregates in {time.perf_counter() - start:.1f}s")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error refreshing lexicon aggregates: {e}")
+        raise
+    mark_dataset_updated(conn, 'lexicon_aggregates')
+    logger.info(f"Lexicon aggregates refreshed: {changed} rows changed")
+    return changed
+
+
+def _default_connection():
+    from .db_utils import get_db_connection
+    return get_db_connection()
+
+
+def _row_values(row) -> list:
+    # Works for both tuple cursors and RealDictCursor connections
+    return list(row.values()) if hasattr(row, 'keys') else list(row)
+
+
+def _json(value):
+    # psycopg2 decodes JSONB already; other drivers may return text
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class LexiconAggregateCache:
+    """
+    LRU cache of lexicon entry pages backed by bible.lexicon_entry_aggregates.
+
+    Args:
+        connection_factory: Callable returning a DB-API connection
+        max_entries: Entries kept in memory
+        check_interval: Seconds between checks of the lexicon_aggregates data version
+    """
+
+    COLUMNS = ('language', 'strongs_id', 'entry', 'occurrence_count', 'verse_count',
+               'sample_verses', 'related_words')
+
+    def __init__(self, connection_factory: Optional[Callable] = None, max_entries: int = CACHE_SIZE,
+                 check_interval: Optional[float] = CHECK_INTERVAL):
+        self.connection_factory = connection_factory or _default_connection
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._version = None
+        self._last_check = 0.0
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def invalidate(self):
+        """Drop all cached pages."""
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self):
+        if self.check_interval is None or time.monotonic() - self._last_check < self.check_interval:
+            return
+        self._last_check = time.monotonic()
+        try:
+            conn = self.connection_factory()
+            try:
+                version = get_dataset_version(conn, 'lexicon_aggregates')
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Could not check lexicon aggregates version: {e}")
+            return
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"Lexicon aggregates version changed ({self._version} -> {version}), clearing cache")
+            self._version = version
+            self.invalidate()
+
+    def get_cached(self, language: str, strongs_id: str) -> Optional[dict]:
+        """Return a cached page without touching the database, or None."""
+        self._check_version()
+        key = (language, strongs_id)
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            return page
+
+    def load(self, conn, language: str, strongs_id: str) -> Optional[dict]:
+        """
+        Read one entry's aggregate by primary key and cache it.
+
+        Returns:
+            {'entry', 'occurrence_count', 'verse_count', 'occurrences', 'related_words'},
+            or None if the ID has no aggregate row (or the table does not exist yet)
+        """
+        self.stats['misses'] += 1
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (AGGREGATES_TABLE,))
+            if not _row_values(cur.fetchone())[0]:
+                return None
+            cur.execute(f"""
+                SELECT {', '.join(self.COLUMNS)}
+                FROM {AGGREGATES_TABLE}
+                WHERE language = %s AND strongs_id = ANY(%s)
+                ORDER BY strongs_id = %s DESC
+                LIMIT 1
+            """, (language, strongs_variants(strongs_id), strongs_id))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        record = dict(zip(self.COLUMNS, _row_values(row)))
+        page = {
+            'entry': _json(record['entry']),
+            'occurrence_count': record['occurrence_count'],
+            'verse_count': record['verse_count'],
+            'occurrences': _json(record['sample_verses']),
+            'related_words': _json(record['related_words']),
+        }
+        self.put(language, strongs_id, page)
+        return page
+
+    def put(self, language: str, strongs_id: str, page: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(language, strongs_id)] = page
+            self._entries.move_to_end((language, strongs_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache: Optional[LexiconAggregateCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_lexicon_aggregate_cache() -> LexiconAggregateCache:
+    """Return the process-wide LexiconAggregateCache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LexiconAggregateCache()
+    return _cache
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Refresh precomputed lexicon entry aggregates")
+    parser.add_argument("--language", choices=sorted(AGGREGATE_SOURCES), help="Refresh one language only")
+    parser.add_argument("--ids", nargs="+", help="Refresh only these Strong's IDs")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    conn = _default_connection()
+    try:
+        refresh_lexicon_aggregates(conn, languages=[args.language] if args.language else None,
+                                   strongs_ids=args.ids)
+        return 0
+    except Exception as e:
+        logger.error(f"Lexicon aggregates refresh failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
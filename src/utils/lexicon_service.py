@@ -0,0 +1,465 @@
+"""
+Lexicon Lookup Service
+
+Batched, cached access to the Hebrew and Greek lexicons
+(bible.hebrew_entries / bible.greek_entries).
+
+The full lexicon (~14k entries) is loaded once per process into an in-memory
+cache, so per-verse and per-question lookups cost no database round trips.
+Lookups that miss the cache fall back to a single ``= ANY(%s)`` query for the
+whole batch. The cache is refreshed when the lexicon ETL bumps the
+``lexicon`` dataset version (db_utils.mark_dataset_updated, checked at most every
+``LEXICON_CACHE_CHECK_INTERVAL`` seconds) or when ``invalidate()`` is called.
+
+Usage:
+    from src.utils.lexicon_service import get_lexicon_service
+
+    lexicon = get_lexicon_service()
+    entries = lexicon.get_entries(['H430', 'G2316'])
+    matches = lexicon.find_terms(['elohim', 'agape'])
+"""
+
+import os
+import re
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .db_utils import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv('LEXICON_CACHE_CHECK_INTERVAL', '60'))
+
+LEXICON_TABLES = {
+    'hebrew': ('bible.hebrew_entries', 'hebrew_word'),
+    'greek': ('bible.greek_entries', 'greek_word'),
+}
+
+_STRONGS_RE = re.compile(r'([HG])0*(\d+)([A-Za-z]?)')
+
+
+@dataclass(frozen=True)
+class LexiconEntry:
+    """A single Hebrew or Greek lexicon entry."""
+    strongs_id: str
+    language: str
+    lemma: Optional[str]
+    transliteration: Optional[str]
+    gloss: Optional[str]
+    definition: Optional[str]
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {
+            'strongs_id': self.strongs_id,
+            'lemma': self.lemma,
+            'transliteration': self.transliteration,
+            'gloss': self.gloss,
+            'definition': self.definition,
+        }
+
+
+def normalize_strongs_id(strongs_id: str) -> Optional[str]:
+    """
+    Normalize a Strong's ID for cache lookups ("H0430" -> "H430", "h430a" -> "H430a").
+
+    Returns None if the value does not contain a Strong's ID.
+    """
+    if not strongs_id:
+        return None
+    match = _STRONGS_RE.search(strongs_id.strip().upper())
+    if not match:
+        return None
+    prefix, number, suffix = match.groups()
+    return f"{prefix}{number}{suffix.lower()}"
+
+
+def strongs_variants(strongs_id: str) -> List[str]:
+    """
+    Return the stored spellings of a Strong's ID (H430, H0430), for ``= ANY(%s)``.
+
+    >>> strongs_variants('h0430')
+    ['H430', 'H0430']
+    """
+    normalized = normalize_strongs_id(strongs_id)
+    if not normalized:
+        return [strongs_id]
+    prefix, number, suffix = _STRONGS_RE.match(normalized).groups()
+    variants = [normalized, f"{prefix}{number.zfill(4)}{suffix}"]
+    return list(dict.fromkeys(variants))
+
+
+def normalize_term(term: str) -> str:
+    """Case-fold and strip accents/punctuation from a lemma or transliteration."""
+    if not term:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', term.strip().lower())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"[\s()'’ʼʾʿ.-]+", '', stripped)
+
+
+def _default_connection():
+    from .db_utils import get_db_connection
+    return get_db_connection()
+
+
+class LexiconService:
+    """
+    In-process lexicon cache with batched database fallback.
+
+    Args:
+        connection_factory: Callable returning a DB-API connection (psycopg2 or psycopg)
+        check_interval: Seconds between checks of the lexicon data version
+    """
+
+    def __init__(self, connection_factory: Optional[Callable] = None,
+                 check_interval: float = CHECK_INTERVAL):
+        self.connection_factory = connection_factory or _default_connection
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, LexiconEntry] = {}
+        self._by_term: Dict[str, List[LexiconEntry]] = {}
+        self._sorted_terms: List[str] = []
+        self._loaded = False
+        self._version = None
+        self._last_check = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'queries': 0, 'loads': 0}
+
+    # --- cache management -------------------------------------------------
+
+    def invalidate(self):
+        """Drop the cache; the next lookup reloads it."""
+        with self._lock:
+            self._loaded = False
+            self._last_check = 0.0
+
+    def refresh(self, conn=None) -> int:
+        """
+        Load every lexicon entry into memory.
+
+        Args:
+            conn: Optional open connection to reuse
+
+        Returns:
+            Number of entries cached
+        """
+        own_conn = conn is None
+        conn = conn or self.connection_factory()
+        try:
+            entries: Dict[str, LexiconEntry] = {}
+            with conn.cursor() as cur:
+                for language, (table, word_column) in LEXICON_TABLES.items():
+                    cur.execute(f"""
+                        SELECT strongs_id, {word_column}, transliteration, gloss, definition
+                        FROM {table}
+                    """)
+                    for row in cur.fetchall():
+                        entry = self._row_to_entry(row, language)
+                        if entry.strongs_id:
+                            entries[entry.strongs_id] = entry
+            self._install(entries, get_dataset_version(conn, 'lexicon'))
+            logger.info(f"Lexicon cache loaded with {len(entries)} entries")
+            return len(entries)
+        finally:
+            if own_conn:
+                conn.close()
+
+    def _install(self, entries: Dict[str, LexiconEntry], version=None):
+        by_term: Dict[str, List[LexiconEntry]] = {}
+        for entry in entries.values():
+            for term in {normalize_term(entry.lemma), normalize_term(entry.transliteration)}:
+                if term:
+                    by_term.setdefault(term, []).append(entry)
+        normalized = {}
+        for strongs_id, entry in entries.items():
+            key = normalize_strongs_id(strongs_id)
+            normalized[key or strongs_id] = entry
+        with self._lock:
+            self._entries = normalized
+            self._by_term = by_term
+            self._sorted_terms = sorted(by_term)
+            self._version = version
+            self._loaded = True
+            self._last_check = time.monotonic()
+            self.stats['loads'] += 1
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            # Retry a failed load at most once per check interval
+            if self._last_check and time.monotonic() - self._last_check < (self.check_interval or 0):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                self._last_check = time.monotonic()
+                logger.error(f"Error loading lexicon cache: {e}")
+            return
+        if self.check_interval is None or time.monotonic() - self._last_check < self.check_interval:
+            return
+        self._last_check = time.monotonic()
+        try:
+            conn = self.connection_factory()
+            try:
+                version = get_dataset_version(conn, 'lexicon')
+                if version != self._version:
+                    logger.info(f"Lexicon version changed ({self._version} -> {version}), reloading")
+                    self.refresh(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Could not check lexicon version: {e}")
+
+    @staticmethod
+    def _row_to_entry(row, language: str) -> LexiconEntry:
+        if hasattr(row, 'keys'):
+            row = list(row.values())
+        strongs_id, lemma, transliteration, gloss, definition = row[:5]
+        return LexiconEntry(strongs_id, language, lemma, transliteration, gloss, definition)
+
+    # --- lookups ------------------------------------------------------------
+
+    def get_entries(self, strongs_ids: Iterable[str], conn=None) -> Dict[str, LexiconEntry]:
+        """
+        Look up many Strong's IDs at once.
+
+        Entries are served from the warm cache without touching the database.
+        If the cache could not be loaded, the whole batch is fetched with one
+        ``= ANY(%s)`` query per language instead of one query per ID.
+
+        Args:
+            strongs_ids: Strong's IDs as stored in the word tables (e.g. "H0430", "G2316")
+            conn: Optional open connection for the fallback query
+
+        Returns:
+            Dict mapping each requested ID (as given) to its entry; unknown IDs are omitted
+        """
+        self._ensure_loaded()
+        found: Dict[str, LexiconEntry] = {}
+        missing: Dict[str, List[str]] = {}
+        for raw in strongs_ids:
+            if not raw or raw in found:
+                continue
+            key = normalize_strongs_id(raw)
+            if key is None:
+                continue
+            entry = self._entries.get(key)
+            if entry is None and key[-1].isalpha():
+                # Extended IDs (H1254a) fall back to the base entry
+                entry = self._entries.get(key[:-1])
+            if entry is not None:
+                found[raw] = entry
+                self.stats['hits'] += 1
+            else:
+                missing.setdefault(key, []).append(raw)
+                self.stats['misses'] += 1
+        if missing and not self._loaded:
+            # Cache unavailable: one batched query for everything requested
+            keys = set(missing).union(*missing.values())
+            for entry in self._fetch(sorted(keys), conn):
+                for raw in missing.get(normalize_strongs_id(entry.strongs_id), []):
+                    found[raw] = entry
+        return found
+
+    def _fetch(self, keys: List[str], conn=None) -> List[LexiconEntry]:
+        own_conn = conn is None
+        results = []
+        try:
+            conn = conn or self.connection_factory()
+            with conn.cursor() as cur:
+                for language, (table, word_column) in LEXICON_TABLES.items():
+                    wanted = [k for k in keys if k[:1].upper() == language[0].upper()]
+                    if not wanted:
+                        continue
+                    self.stats['queries'] += 1
+                    cur.execute(f"""
+                        SELECT strongs_id, {word_column}, transliteration, gloss, definition
+                        FROM {table}
+                        WHERE strongs_id = ANY(%s)
+                    """, (wanted,))
+                    results.extend(self._row_to_entry(row, language) for row in cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error fetching lexicon entries: {e}")
+        finally:
+            if own_conn and conn is not None:
+                conn.close()
+        return results
+
+    def find_terms(self, terms: Iterable[str], prefix: bool = False,
+                   limit: int = 10, conn=None) -> Dict[str, List[LexiconEntry]]:
+        """
+        Look up lexicon entries by lemma or transliteration.
+
+        Matching ignores case, accents and punctuation ("Elohim", "ʾelohim").
+        Hebrew matches are listed before Greek ones. If the cache could not be
+        loaded, all terms are matched with one query per language against the
+        stored spelling (case-insensitive only).
+
+        Args:
+            terms: Lemmas or transliterations
+            prefix: Also match entries whose term starts with the given text
+            limit: Maximum entries returned per term
+            conn: Optional open connection for the fallback query
+
+        Returns:
+            Dict mapping each term (as given) to its matching entries
+        """
+        self._ensure_loaded()
+        if not self._loaded:
+            return self._fetch_terms(list(terms), prefix, limit, conn)
+        results: Dict[str, List[LexiconEntry]] = {}
+        for term in terms:
+            key = normalize_term(term)
+            if not key:
+                continue
+            matches = list(self._by_term.get(key, []))
+            if prefix and len(matches) < limit:
+                i = bisect.bisect_left(self._sorted_terms, key)
+                while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(key) and len(matches) < limit:
+                    for entry in self._by_term[self._sorted_terms[i]]:
+                        if entry not in matches:
+                            matches.append(entry)
+                    i += 1
+            if matches:
+                matches.sort(key=lambda e: e.language != 'hebrew')
+                results[term] = matches[:limit]
+        return results
+
+    def _fetch_terms(self, terms: List[str], prefix: bool, limit: int,
+                     conn=None) -> Dict[str, List[LexiconEntry]]:
+        wanted = {term: normalize_term(term) for term in terms if normalize_term(term)}
+        results: Dict[str, List[LexiconEntry]] = {}
+        if not wanted:
+            return results
+        spellings = sorted({term.strip().lower() for term in wanted})
+        if prefix:
+            # Escape LIKE wildcards; the text_pattern_ops indexes serve the prefix match
+            spellings = [re.sub(r'([\\%_])', r'\\\1', t) + '%' for t in spellings]
+        operator = 'LIKE ANY(%s)' if prefix else '= ANY(%s)'
+        entries: List[LexiconEntry] = []
+        own_conn = conn is None
+        try:
+            conn = conn or self.connection_factory()
+            with conn.cursor() as cur:
+                for language, (table, word_column) in LEXICON_TABLES.items():
+                    self.stats['queries'] += 1
+                    cur.execute(f"""
+                        SELECT strongs_id, {word_column}, transliteration, gloss, definition
+                        FROM {table}
+                        WHERE LOWER(transliteration) {operator} OR LOWER({word_column}) {operator}
+                    """, (spellings, spellings))
+                    entries.extend(self._row_to_entry(row, language) for row in cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error fetching lexicon terms: {e}")
+        finally:
+            if own_conn and conn is not None:
+                conn.close()
+        for term, key in wanted.items():
+            matches = []
+            for entry in entries:
+                forms = {normalize_term(entry.lemma), normalize_term(entry.transliteration)}
+                if key in forms or (prefix and any(form.startswith(key) for form in forms)):
+                    matches.append(entry)
+            if matches:
+                matches.sort(key=lambda e: e.language != 'hebrew')
+                results[term] = matches[:limit]
+        return results
+
+    def fuzzy_search(self, terms: List[str], min_similarity: float = 0.4,
+                     limit: int = 10, conn=None) -> Dict[str, List[Tuple[LexiconEntry, float]]]:
+        """
+        Trigram similarity search on transliterations (requires pg_trgm).
+
+        All terms are matched in one query per language, using the GIN trigram
+        indexes from create_lexicon_indexes().
+
+        Returns:
+            Dict mapping each term to (entry, similarity) pairs, best first
+        """
+        results: Dict[str, List[Tuple[LexiconEntry, float]]] = {t: [] for t in terms}
+        if not terms:
+            return results
+        own_conn = conn is None
+        try:
+            conn = conn or self.connection_factory()
+            with conn.cursor() as cur:
+                cur.execute("SELECT set_limit(%s)", (min_similarity,))
+                for language, (table, word_column) in LEXICON_TABLES.items():
+                    self.stats['queries'] += 1
+                    cur.execute(f"""
+                        SELECT t.term, e.strongs_id, e.{word_column}, e.transliteration, e.gloss,
+                               e.definition, similarity(LOWER(e.transliteration), t.term) AS score
+                        FROM unnest(%s::text[]) AS t(term)
+                        JOIN {table} e ON LOWER(e.transliteration) %% t.term
+                        ORDER BY t.term, score DESC
+                    """, ([t.lower() for t in terms],))
+                    lookup = {t.lower(): t for t in terms}
+                    for row in cur.fetchall():
+                        if hasattr(row, 'keys'):
+                            row = list(row.values())
+                        term = lookup.get(row[0], row[0])
+                        entry = self._row_to_entry(row[1:6], language)
+                        results.setdefault(term, []).append((entry, float(row[6])))
+        except Exception as e:
+            logger.error(f"Error in fuzzy lexicon search: {e}")
+        finally:
+            if own_conn and conn is not None:
+                conn.close()
+        for term in results:
+            results[term] = sorted(results[term], key=lambda pair: -pair[1])[:limit]
+        return results
+
+
+def create_lexicon_indexes(conn):
+    """
+    Create prefix and trigram indexes used by term lookups.
+
+    Trigram indexes need the pg_trgm extension; if it cannot be installed only
+    the prefix (text_pattern_ops) indexes are created.
+    """
+    try:
+        with conn.cursor() as cur:
+            for language, (table, word_column) in LEXICON_TABLES.items():
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_{language}_entries_translit_prefix
+                    ON {table} (LOWER(transliteration) text_pattern_ops)
+                """)
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_{language}_entries_word_prefix
+                    ON {table} (LOWER({word_column}) text_pattern_ops)
+                """)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating lexicon prefix indexes: {e}")
+        raise
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for language, (table, _) in LEXICON_TABLES.items():
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_{language}_entries_translit_trgm
+                    ON {table} USING gin (LOWER(transliteration) gin_trgm_ops)
+                """)
+        conn.commit()
+        logger.info("Lexicon prefix and trigram indexes created or already exist")
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Could not create trigram indexes (is pg_trgm available?): {e}")
+
+
+_service: Optional[LexiconService] = None
+_service_lock = threading.Lock()
+
+
+def get_lexicon_service() -> LexiconService:
+    """Return the process-wide LexiconService, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = LexiconService()
+    return _service
@@ -0,0 +1,502 @@
+"""
+LM Studio Client
+
+Shared client for OpenAI-compatible chat completion endpoints (LM Studio by
+default). It keeps one keep-alive HTTP session per client, bounds the number
+of in-flight requests with a semaphore, retries timeouts and 5xx responses
+with exponential backoff, caches structured responses keyed by
+(model, schema, prompt hash), and records token and latency metrics for every
+call. ``map_concurrent`` fans independent calls out over a thread pool.
+
+``stream_chat`` / ``stream_complete`` read server-sent events and yield text
+as it is generated, recording time to first token. ``PromptPrefix`` renders
+a stable system prompt and conversation history once per conversation, so
+consecutive requests share a byte-identical prefix that servers with prompt
+caching can reuse.
+
+Configuration (environment):
+    LM_STUDIO_API_URL          Base URL (".../v1") or full chat completions URL
+    LM_STUDIO_CHAT_MODEL       Default chat model
+    LM_CLIENT_MAX_CONCURRENCY  Maximum in-flight requests (default: 4)
+    LM_CLIENT_TIMEOUT          Per-request timeout in seconds (default: 120)
+    LM_CLIENT_MAX_RETRIES      Retries after the first attempt (default: 3)
+    LM_CLIENT_CACHE_SIZE       Cached responses kept in memory (default: 256)
+    LM_CLIENT_CACHE_PROMPT     Send "cache_prompt": true so llama.cpp-based
+                               servers keep the KV cache of a shared prompt
+                               prefix (default: 0)
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "http://localhost:1234/v1"
+DEFAULT_CHAT_MODEL = "Qwen/Qwen3-14B"
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+
+class LMClientError(RuntimeError):
+    """Raised when a completion cannot be obtained after all retries."""
+
+
+def chat_completions_url(api_url: Optional[str] = None) -> str:
+    """
+    Return the chat completions endpoint for a base or full API URL.
+
+    Args:
+        api_url: ".../v1" base URL or full ".../chat/completions" URL
+
+    Returns:
+        Full chat completions URL
+    """
+    return api_base_url(api_url) + "/chat/completions"
+
+
+def api_base_url(api_url: Optional[str] = None) -> str:
+    """Return the ".../v1" base for a base, chat completions or completions URL."""
+    url = (api_url or os.getenv("LM_STUDIO_API_URL", DEFAULT_API_URL)).rstrip("/")
+    for suffix in ("/chat/completions", "/completions"):
+        if url.endswith(suffix):
+            return url[:-len(suffix)]
+    return url
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LMMetrics:
+    """Thread-safe accumulator of per-call latency and token usage."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.retries = 0
+            self.cache_hits = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.streams = 0
+            self.latencies: List[float] = []
+            self.ttfts: List[float] = []
+
+    def record(self, latency: float, usage: Optional[Dict[str, Any]] = None,
+               ttft: Optional[float] = None):
+        """Record one finished call; ``ttft`` (time to first token) for streamed calls."""
+        usage = usage or {}
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+            self.latencies.append(latency)
+            if len(self.latencies) > self._window:
+                del self.latencies[:len(self.latencies) - self._window]
+            if ttft is not None:
+                self.streams += 1
+                self.ttfts.append(ttft)
+                if len(self.ttfts) > self._window:
+                    del self.ttfts[:len(self.ttfts) - self._window]
+
+    def increment(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a summary dict suitable for logging or a health endpoint."""
+        with self._lock:
+            latencies = list(self.latencies)
+            ttfts = list(self.ttfts)
+            total_latency = sum(latencies)
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "cache_hits": self.cache_hits,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "latency_p50": round(_percentile(latencies, 50), 4),
+                "latency_p95": round(_percentile(latencies, 95), 4),
+                "streams": self.streams,
+                "ttft_p50": round(_percentile(ttfts, 50), 4),
+                "ttft_p95": round(_percentile(ttfts, 95), 4),
+                "completion_tokens_per_second": round(
+                    self.completion_tokens / total_latency, 2) if total_latency else 0.0,
+            }
+
+
+class LMClient:
+    """
+    Pooled, rate-limited client for an OpenAI-compatible chat endpoint.
+
+    A single instance is safe to share between threads; see get_lm_client().
+    """
+
+    def __init__(self, api_url: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff: float = 0.5,
+                 cache_size: Optional[int] = None, session: Optional[requests.Session] = None,
+                 cache_prompt: Optional[bool] = None):
+        self.base_url = api_base_url(api_url)
+        self.url = self.base_url + "/chat/completions"
+        self.completions_url = self.base_url + "/completions"
+        self.model = model or os.getenv("LM_STUDIO_CHAT_MODEL", DEFAULT_CHAT_MODEL)
+        self.max_concurrency = max_concurrency or int(os.getenv("LM_CLIENT_MAX_CONCURRENCY", "4"))
+        self.timeout = timeout or float(os.getenv("LM_CLIENT_TIMEOUT", "120"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LM_CLIENT_MAX_RETRIES", "3"))
+        self.backoff = backoff
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("LM_CLIENT_CACHE_SIZE", "256"))
+        if cache_prompt is None:
+            cache_prompt = os.getenv("LM_CLIENT_CACHE_PROMPT", "0").lower() in ("1", "true", "yes")
+        self.cache_prompt = cache_prompt
+        self.metrics = LMMetrics()
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Content-Type": "application/json"})
+        self.session = session
+
+    def close(self):
+        self.session.close()
+
+    # -- caching ---------------------------------------------------------
+
+    @staticmethod
+    def cache_key(model: str, messages: List[Dict[str, str]], response_format: Optional[Dict] = None,
+                  **params) -> str:
+        """Hash of (model, schema, prompt, sampling params) used as the cache key."""
+        schema = json.dumps(response_format, sort_keys=True) if response_format else ""
+        prompt = json.dumps([messages, params], sort_keys=True, ensure_ascii=False)
+        return "|".join([
+            model,
+            hashlib.sha1(schema.encode("utf-8")).hexdigest()[:16],
+            hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        ])
+
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _cache_put(self, key: str, value):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    # -- requests --------------------------------------------------------
+
+    def _payload(self, model: str, max_tokens: int, temperature: float, **fields) -> Dict[str, Any]:
+        payload = {"model": model, "temperature": temperature, "max_tokens": max_tokens}
+        payload.update((key, value) for key, value in fields.items() if value is not None)
+        if self.cache_prompt:
+            payload["cache_prompt"] = True
+        return payload
+
+    def _backoff(self, attempt: int):
+        self.metrics.increment("retries")
+        delay = self.backoff * (2 ** (attempt - 1))
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+    def _post(self, payload: Dict[str, Any], url: Optional[str] = None) -> Dict[str, Any]:
+        """POST with bounded concurrency and exponential backoff on retryable failures."""
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._backoff(attempt)
+            start = time.perf_counter()
+            try:
+                with self._semaphore:
+                    resp = self.session.post(url or self.url, json=payload, timeout=self.timeout)
+                if resp.status_code in RETRY_STATUS_CODES:
+                    last_error = LMClientError(f"LM server returned HTTP {resp.status_code}")
+                    logger.warning(f"LM request attempt {attempt + 1} failed: HTTP {resp.status_code}")
+                    continue
+                resp.raise_for_status()
+                data = resp.json()
+                self.metrics.record(time.perf_counter() - start, data.get("usage"))
+                return data
+            except (requests.Timeout, requests.ConnectionError) as e:
+                last_error = e
+                logger.warning(f"LM request attempt {attempt + 1} failed: {e}")
+            except Exception as e:
+                self.metrics.increment("errors")
+                raise LMClientError(f"Error communicating with language model: {e}") from e
+        self.metrics.increment("errors")
+        raise LMClientError(f"Error communicating with language model: {last_error}")
+
+    @staticmethod
+    def message_content(data: Dict[str, Any]) -> str:
+        """Extract the assistant text (falling back to reasoning_content) from a response."""
+        message = (data.get("choices") or [{}])[0].get("message", {})
+        return message.get("content") or message.get("reasoning_content") or ""
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: int = 1024, temperature: float = 0.3,
+             response_format: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+             model: Optional[str] = None) -> str:
+        """
+        Run a chat completion and return the assistant message text.
+
+        Args:
+            messages: OpenAI-style message list
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            response_format: Optional structured-output format (e.g. json_schema)
+            use_cache: Serve identical requests from the response cache
+            model: Override the client's default model
+
+        Returns:
+            Assistant message content
+
+        Raises:
+            LMClientError: If the request fails after all retries
+        """
+        model = model or self.model
+        key = None
+        if use_cache:
+            key = self.cache_key(model, messages, response_format,
+                                 max_tokens=max_tokens, temperature=temperature)
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.metrics.increment("cache_hits")
+                return cached
+
+        payload = self._payload(model, max_tokens, temperature, messages=messages,
+                                response_format=response_format or None)
+        content = self.message_content(self._post(payload))
+        if key is not None and content:
+            self._cache_put(key, content)
+        return content
+
+    def chat_json(self, messages: List[Dict[str, str]], schema: Dict[str, Any],
+                  schema_name: str = "response", **kwargs) -> Dict[str, Any]:
+        """
+        Run a structured-output chat completion and return the parsed JSON object.
+
+        Raises:
+            LMClientError: If the request fails or the response is not valid JSON
+        """
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "strict": True, "schema": schema},
+        }
+        content = self.chat(messages, response_format=response_format, **kwargs)
+        try:
+            return json.loads(content)
+        except (TypeError, ValueError) as e:
+            raise LMClientError(f"Language model returned invalid JSON: {e}") from e
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.3,
+                 stop: Optional[List[str]] = None, use_cache: bool = True,
+                 model: Optional[str] = None) -> str:
+        """
+        Run a text completion (the /completions endpoint) and return the generated text.
+
+        Raises:
+            LMClientError: If the request fails after all retries
+        """
+        model = model or self.model
+        key = None
+        if use_cache:
+            key = self.cache_key(model, [{"role": "prompt", "content": prompt}], None,
+                                 max_tokens=max_tokens, temperature=temperature, stop=stop)
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.metrics.increment("cache_hits")
+                return cached
+
+        payload = self._payload(model, max_tokens, temperature, prompt=prompt, stop=stop)
+        data = self._post(payload, self.completions_url)
+        text = (data.get("choices") or [{}])[0].get("text") or ""
+        if key is not None and text:
+            self._cache_put(key, text)
+        return text
+
+    def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 1024,
+                    temperature: float = 0.3, model: Optional[str] = None) -> Iterator[str]:
+        """
+        Run a chat completion with ``stream: true`` and yield the text as it arrives.
+
+        Connection failures and 5xx responses are retried until the first
+        byte; a stream that breaks after that raises LMClientError.
+        """
+        payload = self._payload(model or self.model, max_tokens, temperature, messages=messages)
+        return self._stream(self.url, payload)
+
+    def stream_complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.3,
+                        stop: Optional[List[str]] = None, model: Optional[str] = None) -> Iterator[str]:
+        """Streaming counterpart of complete()."""
+        payload = self._payload(model or self.model, max_tokens, temperature, prompt=prompt, stop=stop)
+        return self._stream(self.completions_url, payload)
+
+    def _stream(self, url: str, payload: Dict[str, Any]) -> Iterator[str]:
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._backoff(attempt)
+            start = time.perf_counter()
+            # The slot is held until the stream is exhausted or closed
+            with self._semaphore:
+                try:
+                    resp = self.session.post(url, json=payload, timeout=self.timeout, stream=True)
+                except (requests.Timeout, requests.ConnectionError) as e:
+                    last_error = e
+                    logger.warning(f"LM stream attempt {attempt + 1} failed: {e}")
+                    continue
+                with resp:
+                    if resp.status_code in RETRY_STATUS_CODES:
+                        last_error = LMClientError(f"LM server returned HTTP {resp.status_code}")
+                        logger.warning(f"LM stream attempt {attempt + 1} failed: HTTP {resp.status_code}")
+                        continue
+                    if resp.status_code >= 400:
+                        self.metrics.increment("errors")
+                        raise LMClientError(f"LM server returned HTTP {resp.status_code}: {resp.text[:200]}")
+                    yield from self._read_events(resp, start)
+                    return
+        self.metrics.increment("errors")
+        raise LMClientError(f"Error communicating with language model: {last_error}")
+
+    def _read_events(self, resp: requests.Response, start: float) -> Iterator[str]:
+        """Yield text deltas from a server-sent event stream and record its metrics."""
+        ttft = None
+        usage = None
+        pieces = 0
+        try:
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                event = json.loads(data)
+                usage = event.get("usage") or usage
+                for choice in event.get("choices") or []:
+                    text = (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+                    if text:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        pieces += 1
+                        yield text
+        except (requests.RequestException, ValueError) as e:
+            self.metrics.increment("errors")
+            raise LMClientError(f"LM stream interrupted: {e}") from e
+        # Servers that do not report usage for streams: count the deltas instead
+        self.metrics.record(time.perf_counter() - start, usage or {"completion_tokens": pieces},
+                            ttft=ttft if ttft is not None else time.perf_counter() - start)
+
+    def map_concurrent(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Apply func to each item concurrently, bounded by max_concurrency.
+
+        Results keep the input order; an exception from any call is re-raised.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(func, items))
+
+
+class PromptPrefix:
+    """
+    A stable system prompt plus rendered conversation history.
+
+    Renderings are memoised by history content, so each turn of a
+    conversation is rendered once and every request in it starts with
+    byte-identical text (which servers with prompt caching can reuse).
+
+    Args:
+        system: System prompt
+        cache_size: Rendered histories kept in memory
+    """
+
+    def __init__(self, system: str, cache_size: int = 256):
+        self.system = system
+        self.system_message = {"role": "system", "content": system}
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _turns(history: Optional[Sequence[Dict[str, Any]]]) -> Tuple[Tuple[str, str], ...]:
+        return tuple((str(h.get("question", "")), str(h.get("answer", ""))) for h in history or ())
+
+    def _memo(self, key: Tuple, render: Callable[[], Any]):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = render()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def messages(self, history: Optional[Sequence[Dict[str, Any]]] = None) -> List[Dict[str, str]]:
+        """System message and history turns as chat messages (a new list the caller may extend)."""
+        turns = self._turns(history)
+
+        def render():
+            messages = [self.system_message]
+            for question, answer in turns:
+                messages.append({"role": "user", "content": question})
+                messages.append({"role": "assistant", "content": answer})
+            return tuple(messages)
+
+        return list(self._memo(("messages", turns), render))
+
+    def history_text(self, history: Optional[Sequence[Dict[str, Any]]] = None) -> str:
+        """History as "Q: ...\\nA: ..." blocks for text-completion prompts."""
+        turns = self._turns(history)
+        return self._memo(("text", turns),
+                          lambda: "".join(f"Q: {q}\nA: {a}\n\n" for q, a in turns))
+
+
+_client: Optional[LMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_lm_client() -> LMClient:
+    """Return the process-wide LM client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LMClient()
+        return _client
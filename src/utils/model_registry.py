@@ -0,0 +1,532 @@
+"""
+Model Registry
+
+Keeps trained Bible QA models resident and switches between them without a
+restart. Versions are listed in a JSON registry file:
+
+    {"versions": {"v1": {"path": "models/dspy/bible_qa_v1"}, "v2": {"run_id": "..."}},
+     "production": "v2", "previous": "v1", "latest": "v2",
+     "traffic": {"v2": 0.9, "v1": 0.1}}
+
+- ``start()`` loads the production version, and every version in the traffic
+  split, on a background thread, so the first request does not pay for it.
+- ``promote()`` loads the new version before swapping it in with a single
+  assignment; requests already running keep the model they started with, and
+  if the load fails the current version keeps serving. ``rollback()``
+  promotes the previous production version, which is kept resident.
+- ``traffic`` splits requests between versions by weight for A/B
+  comparisons; passing a ``key`` (e.g. a session id) keeps a client on one
+  version.
+- A watcher thread re-reads the registry file when it changes, so a version
+  can also be promoted by rewriting the file (or from another process).
+- ``admin_token_error`` guards the HTTP routes that promote, roll back or
+  split traffic. They stay disabled until MODEL_ADMIN_TOKEN (or the server's
+  own token option) is set, and then require it as a bearer token or in the
+  X-API-Token header.
+
+Model files can also be discovered by glob pattern; the newest one serves
+when the registry file names no production version.
+
+Each resident version records its load time and the memory it added: the
+process resident set size (RSS) before and after the load, so approximate, and
+including anything other threads allocated meanwhile. It also counts the
+requests the version has served. MODEL_REGISTRY_TRACE_MEMORY switches to
+tracemalloc's count of the bytes Python allocated during the load, at the cost
+of tracing every allocation in every thread while a load runs.
+
+Configuration (environment):
+    MODEL_REGISTRY_PATH            Registry file (default: models/registry.json)
+    MODEL_REGISTRY_MAX_RESIDENT    Versions kept loaded (default: 3)
+    MODEL_REGISTRY_WATCH_INTERVAL  Seconds between registry file checks (default: 5)
+    MODEL_REGISTRY_TRACE_MEMORY    Measure loads with tracemalloc instead of RSS (default: false)
+    MODEL_ADMIN_TOKEN              Token for the promote/rollback/traffic routes (default: unset, routes off)
+
+Usage:
+    registry = ModelRegistry(load_version, default=('default', {'path': model_path}))
+    registry.start()
+
+    resident = registry.select(key=session_id)
+    answer = resident.model(context=context, question=question)
+"""
+
+import os
+import glob
+import hmac
+import json
+import time
+import random
+import zlib
+import logging
+import resource
+import threading
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_PATH = os.getenv('MODEL_REGISTRY_PATH', 'models/registry.json')
+MAX_RESIDENT = int(os.getenv('MODEL_REGISTRY_MAX_RESIDENT', '3'))
+WATCH_INTERVAL = float(os.getenv('MODEL_REGISTRY_WATCH_INTERVAL', '5'))
+MODEL_ADMIN_TOKEN = os.getenv('MODEL_ADMIN_TOKEN') or None
+TRACE_MEMORY = os.getenv('MODEL_REGISTRY_TRACE_MEMORY', 'false').lower() in ('1', 'true', 'yes')
+
+# Aliases accepted wherever a version id is
+PRODUCTION = 'production'
+LATEST = 'latest'
+
+
+class ModelNotFound(KeyError):
+    """Raised for a version id that is not in the registry."""
+
+
+class ModelLoadError(RuntimeError):
+    """Raised when the loader fails or returns no model."""
+
+
+@dataclass
+class ResidentModel:
+    version_id: str
+    model: Any
+    load_seconds: float
+    memory_bytes: int
+    loaded_at: str
+    requests: int = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 3),
+            'memory_bytes': self.memory_bytes,
+            'requests': self.requests,
+        }
+
+
+def admin_token_error(headers: Mapping[str, str], token: Optional[str] = MODEL_ADMIN_TOKEN) -> Optional[Tuple[int, str]]:
+    """
+    Check a request's credentials for the model administration routes.
+
+    Returns:
+        None when the request may proceed, otherwise (HTTP status, message):
+        403 while no token is configured, 401 for a missing or wrong token
+    """
+    if not token:
+        return 403, "Model administration is disabled; set MODEL_ADMIN_TOKEN to enable it"
+    provided = headers.get('X-API-Token') or ''
+    authorization = headers.get('Authorization') or ''
+    if authorization.lower().startswith('bearer '):
+        provided = authorization[7:].strip()
+    if not hmac.compare_digest(provided.encode(), token.encode()):
+        return 401, "Invalid or missing API token"
+    return None
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {'versions': {}, 'production': None, 'previous': None, 'latest': None, 'traffic': {}}
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _rss_bytes() -> int:
+    """Current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in kilobytes on Linux (bytes on macOS); a peak, but never decreasing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _measure(func: Callable[[], Any], trace: bool = False) -> Tuple[Any, float, int]:
+    """Run ``func`` and return (result, seconds, bytes added); ``trace`` counts them with tracemalloc."""
+    started_tracing = trace and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0] if trace else _rss_bytes()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        held = (tracemalloc.get_traced_memory()[0] if trace else _rss_bytes()) - before
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return result, seconds, max(0, held)
+
+
+class ModelRegistry:
+    """
+    Resident model versions with atomic promotion, rollback and traffic splitting.
+
+    Args:
+        loader: Called with a version's registry entry (e.g. ``{'path': ...}``
+                or ``{'run_id': ...}``); returns the model
+        path: Registry file
+        max_resident: Versions kept loaded; production, previous and
+                      traffic-split versions are never evicted
+        watch_interval: Seconds between registry file checks
+        default: (version_id, entry) served when nothing else is available
+        patterns: Glob patterns of model files to register automatically
+        trace_memory: Measure loads with tracemalloc instead of the RSS delta
+    """
+
+    def __init__(self, loader: Callable[[Dict[str, Any]], Any], path: str = REGISTRY_PATH,
+                 max_resident: int = MAX_RESIDENT, watch_interval: float = WATCH_INTERVAL,
+                 default: Optional[Tuple[str, Dict[str, Any]]] = None, patterns: Iterable[str] = (),
+                 trace_memory: bool = TRACE_MEMORY):
+        self.loader = loader
+        self.trace_memory = trace_memory
+        self.path = path
+        self.max_resident = max_resident
+        self.watch_interval = watch_interval
+        self.default = default
+        self.patterns = list(patterns)
+        self._lock = threading.RLock()
+        # One load at a time: bounds peak memory and keeps the memory figures apart
+        self._load_lock = threading.Lock()
+        self._state = _empty_state()
+        self._mtime: Optional[float] = None
+        self._discovered: Dict[str, Dict[str, Any]] = {}
+        self._discovered_latest: Optional[str] = None
+        self._resident: "OrderedDict[str, ResidentModel]" = OrderedDict()
+        self._errors: Dict[str, str] = {}
+        # The version answering requests; only changes once its replacement is resident
+        self._serving: Optional[str] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- registry state ---------------------------------------------------------
+
+    def _versions(self, state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        versions = {}
+        if self.default is not None:
+            versions[self.default[0]] = self.default[1]
+        versions.update(self._discovered)
+        versions.update(state['versions'])
+        return versions
+
+    def _production(self, state: Dict[str, Any]) -> Optional[str]:
+        if state['production']:
+            return state['production']
+        if self._discovered_latest:
+            return self._discovered_latest
+        return self.default[0] if self.default is not None else None
+
+    def _wanted(self, state: Dict[str, Any]) -> List[str]:
+        """Versions that must be resident for ``state`` to serve."""
+        wanted = [self._production(state)]
+        wanted.extend(v for v, weight in state['traffic'].items() if weight > 0)
+        return [v for v in dict.fromkeys(wanted) if v is not None]
+
+    def _read_file(self) -> Optional[Dict[str, Any]]:
+        """The registry file as a state dict; empty if missing, None if unreadable."""
+        if not os.path.exists(self.path):
+            return _empty_state()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading model registry {self.path}: {e}")
+            return None
+        state = _empty_state()
+        state.update({k: data[k] for k in state if data.get(k) is not None})
+        return state
+
+    def _write_file(self):
+        """Write the registry atomically, so readers never see a partial file."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = _mtime(self.path)
+
+    def discover(self, pattern: str) -> List[str]:
+        """Register model files matching ``pattern`` (not persisted); returns the new version ids."""
+        found = []
+        for file_path in glob.glob(pattern):
+            version_id = os.path.splitext(os.path.basename(file_path))[0]
+            found.append((_mtime(file_path) or 0, version_id, file_path))
+        found.sort()
+        new = []
+        with self._lock:
+            for mtime, version_id, file_path in found:
+                if version_id not in self._discovered:
+                    self._discovered[version_id] = {
+                        'path': file_path,
+                        'creation_time': datetime.fromtimestamp(mtime).isoformat(),
+                    }
+                    new.append(version_id)
+            if found:
+                self._discovered_latest = found[-1][1]
+        return new
+
+    # --- loading ----------------------------------------------------------------
+
+    def _load(self, version_id: str, entry: Dict[str, Any]) -> ResidentModel:
+        with self._lock:
+            resident = self._resident.get(version_id)
+            if resident is not None:
+                self._resident.move_to_end(version_id)
+                return resident
+        with self._load_lock:
+            with self._lock:
+                resident = self._resident.get(version_id)
+            if resident is not None:
+                return resident
+            logger.info(f"Loading model version {version_id}")
+            try:
+                model, seconds, memory = _measure(lambda: self.loader(entry), trace=self.trace_memory)
+                if model is None:
+                    raise ModelLoadError(f"Loader returned no model for version {version_id}")
+            except Exception as e:
+                with self._lock:
+                    self._errors[version_id] = str(e)
+                if isinstance(e, ModelLoadError):
+                    raise
+                raise ModelLoadError(f"Error loading model version {version_id}: {e}") from e
+            resident = ResidentModel(version_id, model, seconds, memory, datetime.now().isoformat())
+            logger.info(f"Loaded model version {version_id} in {seconds:.2f}s ({memory / 1e6:.1f} MB)")
+            with self._lock:
+                self._errors.pop(version_id, None)
+                self._resident[version_id] = resident
+                self._evict()
+            return resident
+
+    def load(self, version_id: str) -> ResidentModel:
+        """Make a version resident (without serving it) and return it."""
+        version_id = self.resolve(version_id)
+        entry = self.entry(version_id)
+        if entry is None:
+            raise ModelNotFound(version_id)
+        return self._load(version_id, entry)
+
+    def load_async(self, version_id: str) -> threading.Thread:
+        """Start loading a version on a background thread (raises ModelNotFound at once)."""
+        version_id = self.resolve(version_id)
+        if self.entry(version_id) is None:
+            raise ModelNotFound(version_id)
+
+        def load():
+            try:
+                self.load(version_id)
+            except ModelLoadError as e:
+                logger.error(str(e))
+
+        thread = threading.Thread(target=load, name=f"model-load-{version_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def entry(self, version_id: str) -> Optional[Dict[str, Any]]:
+        """A copy of a version's registry entry, or None if the version is unknown."""
+        with self._lock:
+            entry = self._versions(self._state).get(self.resolve(version_id))
+        return dict(entry) if entry is not None else None
+
+    def _evict(self):
+        state = self._state
+        protected = set(self._wanted(state)) | {self._serving, state['previous']}
+        for version_id in list(self._resident):
+            if len(self._resident) <= self.max_resident:
+                break
+            if version_id not in protected:
+                del self._resident[version_id]
+                logger.info(f"Evicted model version {version_id}")
+
+    def refresh(self) -> bool:
+        """
+        Re-read the registry file and rescan model files; load whatever the
+        new state needs, then switch to it. Returns True if the state changed.
+        """
+        for pattern in self.patterns:
+            self.discover(pattern)
+        mtime = _mtime(self.path)
+        changed = mtime != self._mtime or self._serving is None
+        state = self._read_file() if changed else None
+        if state is None:
+            # Unchanged, or unreadable: keep the current state until the file changes again
+            self._mtime = mtime
+            state = self._state
+        with self._lock:
+            versions = self._versions(state)
+        for version_id in self._wanted(state):
+            if version_id not in versions:
+                logger.error(f"Model version {version_id} is not in the registry")
+                continue
+            try:
+                self._load(version_id, versions[version_id])
+            except ModelLoadError as e:
+                logger.error(str(e))
+        with self._lock:
+            old_serving = self._serving
+            self._state = state
+            self._mtime = mtime
+            production = self._production(state)
+            if production in self._resident:
+                self._serving = production
+            elif self._serving is None and self._resident:
+                self._serving = next(reversed(self._resident))
+            self._evict()
+        if self._serving != old_serving:
+            logger.info(f"Serving model version {self._serving}")
+        return changed
+
+    # --- serving ----------------------------------------------------------------
+
+    def resolve(self, version_id: Optional[str]) -> Optional[str]:
+        """Map the ``production``/``latest`` aliases to version ids."""
+        with self._lock:
+            if version_id in (None, PRODUCTION):
+                return self._serving
+            if version_id == LATEST:
+                return self._state['latest'] or self._discovered_latest or self._serving
+            return version_id
+
+    def get(self, version_id: Optional[str] = None) -> Optional[ResidentModel]:
+        """A resident version (default: production), or None if it is not loaded."""
+        with self._lock:
+            return self._resident.get(self.resolve(version_id))
+
+    def select(self, key: Optional[str] = None) -> Optional[ResidentModel]:
+        """
+        The model for one request: drawn from the traffic split if there is
+        one, otherwise production. Versions in the split that are not resident
+        yet are skipped. Returns None until a model has been loaded.
+        """
+        with self._lock:
+            split = [(v, w) for v, w in self._state['traffic'].items() if w > 0 and v in self._resident]
+            version_id = self._serving
+            if split:
+                total = sum(w for _, w in split)
+                # crc32 rather than hash(): stable across processes and restarts
+                point = (zlib.crc32(key.encode('utf-8')) / 2 ** 32 if key is not None
+                         else random.random()) * total
+                for version_id, weight in split:
+                    point -= weight
+                    if point < 0:
+                        break
+            resident = self._resident.get(version_id) if version_id is not None else None
+            if resident is not None:
+                resident.requests += 1
+            return resident
+
+    # --- administration -----------------------------------------------------------
+
+    def register(self, version_id: str, entry: Dict[str, Any]):
+        """Add a version to the registry file and mark it latest."""
+        with self._lock:
+            self._state['versions'][version_id] = dict(entry)
+            self._state['latest'] = version_id
+            self._write_file()
+
+    def promote(self, version_id: str) -> ResidentModel:
+        """
+        Load ``version_id`` if needed, then make it production and end any
+        traffic split. The current version keeps serving until the new one is
+        resident, and keeps serving if it fails to load.
+        """
+        version_id = self.resolve(version_id)
+        resident = self.load(version_id)
+        with self._lock:
+            current = self._production(self._state)
+            if current != version_id:
+                self._state['previous'] = current
+            if version_id not in self._state['versions']:
+                self._state['versions'][version_id] = dict(self._versions(self._state)[version_id])
+            self._state['production'] = version_id
+            self._state['traffic'] = {}
+            self._serving = version_id
+            self._write_file()
+        logger.info(f"Promoted model version {version_id} (previous: {self._state['previous']})")
+        return resident
+
+    def rollback(self) -> ResidentModel:
+        """Promote the previous production version."""
+        with self._lock:
+            previous = self._state['previous']
+        if previous is None:
+            raise ModelNotFound("No previous production version to roll back to")
+        return self.promote(previous)
+
+    def set_traffic(self, weights: Dict[str, float]) -> Dict[str, float]:
+        """
+        Split traffic between versions by weight (an empty dict ends the split).
+        All versions are loaded before the split takes effect.
+        """
+        weights = {self.resolve(v): float(w) for v, w in weights.items()}
+        if any(w < 0 for w in weights.values()) or (weights and sum(weights.values()) <= 0):
+            raise ValueError("Traffic weights must be non-negative and not all zero")
+        for version_id, weight in weights.items():
+            if weight > 0:
+                self.load(version_id)
+        with self._lock:
+            self._state['traffic'] = weights
+            self._write_file()
+        return weights
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            versions = []
+            for version_id, entry in self._versions(state).items():
+                resident = self._resident.get(version_id)
+                versions.append({
+                    'version_id': version_id,
+                    **{k: v for k, v in entry.items() if k in ('path', 'run_id', 'creation_time',
+                                                               'model_type', 'description')},
+                    'is_production': version_id == self._serving,
+                    'traffic_weight': state['traffic'].get(version_id, 0),
+                    'resident': resident is not None,
+                    **(resident.info() if resident is not None else {}),
+                    **({'error': self._errors[version_id]} if version_id in self._errors else {}),
+                })
+            return {
+                'ready': self._ready.is_set(),
+                'production': self._serving,
+                'previous': state['previous'],
+                'latest': state['latest'] or self._discovered_latest,
+                'traffic': dict(state['traffic']),
+                'versions': versions,
+            }
+
+    # --- background loading and watching -------------------------------------------
+
+    def _watch(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Error loading models: {e}")
+        finally:
+            self._ready.set()
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing model registry: {e}")
+
+    def start(self):
+        """Load models and start watching the registry file, in a background thread."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._watch, name='model-registry', daemon=True)
+                    self._thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the initial load to finish; returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection for Training Corpora
+
+Groups paraphrased and near-identical QA examples with MinHash signatures and
+locality-sensitive hashing (LSH), so duplicates can be dropped and, more
+importantly, never straddle a train/validation split.
+
+Each example's question and answer are normalised (case, punctuation,
+whitespace and the prompt prefixes added by ``train_t5_bible_qa.augment_dataset``
+such as "According to the Bible, ...") and cut into character shingles.
+Signatures are computed for a whole batch at once with numpy. The LSH bands
+of every group representative live in sorted uint64 runs, and candidates are
+confirmed by comparing signatures against the similarity threshold. Memory
+grows with the number of distinct groups (about ``4 * num_perm + 12 * bands``
+bytes each), not with the size of the records, and JSONL files are processed
+in one streaming pass.
+
+Configuration (environment):
+    NEAR_DUP_THRESHOLD      Estimated Jaccard similarity for a duplicate (default: 0.8)
+    NEAR_DUP_NUM_PERM       MinHash permutations per signature (default: 64)
+    NEAR_DUP_SHINGLE_SIZE   Characters per shingle (default: 5)
+
+Usage:
+    index = NearDuplicateIndex(threshold=0.8)
+    groups = index.assign(examples)          # group id per example
+    splits = split_by_group(examples, {'train': 0.8, 'val': 0.2})
+
+    python -m src.utils.near_duplicates dedup data.jsonl deduped.jsonl [--threshold 0.8]
+    python -m src.utils.near_duplicates split data.jsonl --out train=train.jsonl --out val=val.jsonl \
+        --ratio train=0.8 --ratio val=0.2
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import logging
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.8'))
+DEFAULT_NUM_PERM = int(os.getenv('NEAR_DUP_NUM_PERM', '64'))
+DEFAULT_SHINGLE_SIZE = int(os.getenv('NEAR_DUP_SHINGLE_SIZE', '5'))
+BATCH_SIZE = 256
+
+# Prompt prefixes that make paraphrases of one example (see train_t5_bible_qa.augment_dataset)
+AUGMENTATION_PREFIXES = (
+    'please answer in detail',
+    'according to the bible',
+    'from a biblical perspective',
+    'according to scripture',
+    'in the bible',
+)
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+_PREFIX_RE = re.compile(r'^(?:(?:' + '|'.join(re.escape(p) for p in AUGMENTATION_PREFIXES) + r')\s+)+')
+_MASK64 = (1 << 64) - 1
+
+
+def normalize_text(text: Any) -> str:
+    """Lower-case, drop punctuation and augmentation prefixes, collapse whitespace."""
+    text = _PUNCTUATION_RE.sub(' ', str(text or '').lower())
+    text = ' '.join(text.split())
+    return _PREFIX_RE.sub('', text + ' ').strip()
+
+
+def example_text(example: Dict[str, Any], fields: Sequence[str] = ('question', 'answer')) -> str:
+    """The normalised fields of an example joined into the text that gets shingled."""
+    return ' | '.join(normalize_text(example.get(f)) for f in fields)
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) for a similarity threshold: the split of ``num_perm`` that
+    minimises the area of false positives below and false negatives above it.
+    """
+    if not 0.0 < threshold < 1.0:
+        raise ValueError(f"threshold must be between 0 and 1, not {threshold}")
+    # Areas as means over an even grid on [0, 1]
+    s = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1.0 - (1.0 - s ** rows) ** bands
+        false_positive = np.where(s < threshold, p, 0.0).mean()
+        false_negative = np.where(s >= threshold, 1.0 - p, 0.0).mean()
+        if false_positive + false_negative < best_error:
+            best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class BandIndex:
+    """
+    Map from uint64 band keys to group ids, kept as sorted numpy runs.
+
+    Runs of similar size are merged, so lookups are a few vectorized binary
+    searches. The first group stored under a key keeps it.
+    """
+
+    def __init__(self):
+        self._runs: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self._runs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(keys.nbytes + values.nbytes for keys, values in self._runs)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Group id for each key, or -1."""
+        found = np.full(len(keys), -1, dtype=np.int64)
+        # Newest runs are last; older entries win, so search them last
+        for run_keys, run_values in reversed(self._runs):
+            pos = np.searchsorted(run_keys, keys)
+            pos[pos == len(run_keys)] = 0
+            hit = run_keys[pos] == keys
+            found[hit] = run_values[pos[hit]]
+        return found
+
+    def add(self, keys: np.ndarray, values: np.ndarray):
+        if not len(keys):
+            return
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        while self._runs and len(self._runs[-1][0]) <= len(keys):
+            old_keys, old_values = self._runs.pop()
+            merged_keys = np.concatenate([old_keys, keys])
+            merged_values = np.concatenate([old_values, values])
+            # Stable sort keeps the older value first; keep one entry per key
+            order = np.argsort(merged_keys, kind='stable')
+            merged_keys, merged_values = merged_keys[order], merged_values[order]
+            first = np.ones(len(merged_keys), dtype=bool)
+            first[1:] = merged_keys[1:] != merged_keys[:-1]
+            keys, values = merged_keys[first], merged_values[first]
+        self._runs.append((keys, values))
+
+
+class NearDuplicateIndex:
+    """
+    Streaming MinHash/LSH grouping of near-duplicate examples.
+
+    Args:
+        threshold: Estimated Jaccard similarity at or above which two examples are duplicates
+        num_perm: Signature length (more is more accurate and uses more memory)
+        shingle_size: Characters per shingle
+        fields: Example fields that make up the compared text
+        seed: Seed for the hash functions
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE, fields: Sequence[str] = ('question', 'answer'),
+                 seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.fields = tuple(fields)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        self._shingle_weights = rng.integers(1, 2 ** 63, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 2 ** 63, size=(self.bands, self.rows), dtype=np.uint64) | np.uint64(1)
+        self._band_salts = rng.integers(0, 2 ** 63, size=self.bands, dtype=np.uint64)
+        self._bands = BandIndex()
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.groups = 0
+        self.stats = {'examples': 0, 'duplicates': 0, 'candidates': 0, 'rejected_candidates': 0}
+
+    def _shingles(self, text: str) -> np.ndarray:
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        k = self.shingle_size
+        if len(data) < k:
+            data = np.pad(data, (0, k - len(data)))
+        return (sliding_window_view(data, k) * self._shingle_weights).sum(axis=1)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """MinHash signatures (len(texts) x num_perm, uint32) for normalised texts."""
+        shingles = [self._shingles(t) for t in texts]
+        offsets = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+        hashes = np.concatenate(shingles)
+        # Multiply-shift hashing; uint64 arithmetic wraps around
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32)
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """One uint64 key per LSH band (len(signatures) x bands)."""
+        used = signatures[:, :self.bands * self.rows].astype(np.uint64)
+        bands = used.reshape(len(signatures), self.bands, self.rows)
+        return (bands * self._band_weights[None]).sum(axis=2) ^ self._band_salts[None]
+
+    def _store(self, signature: np.ndarray) -> int:
+        group = self.groups
+        if group == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[group] = signature
+        self.groups += 1
+        return group
+
+    def similarity(self, signature: np.ndarray, group: int) -> float:
+        """Estimated Jaccard similarity between a signature and a group's representative."""
+        return float(np.mean(self._signatures[group] == signature))
+
+    def assign_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Group ids for normalised texts, in order; a new group takes the next id."""
+        groups = np.empty(len(texts), dtype=np.int64)
+        for start in range(0, len(texts), BATCH_SIZE):
+            batch = texts[start:start + BATCH_SIZE]
+            signatures = self.signatures(batch)
+            keys = self.band_keys(signatures)
+            known = self._bands.lookup(keys.ravel()).reshape(keys.shape)
+            local: Dict[int, int] = {}
+            for i, signature in enumerate(signatures):
+                candidates = {int(g) for g in known[i] if g >= 0}
+                candidates.update(local[k] for k in keys[i].tolist() if k in local)
+                group = None
+                for candidate in sorted(candidates):
+                    self.stats['candidates'] += 1
+                    if self.similarity(signature, candidate) >= self.threshold:
+                        group = candidate
+                        break
+                    self.stats['rejected_candidates'] += 1
+                if group is None:
+                    group = self._store(signature)
+                    for k in keys[i].tolist():
+                        local.setdefault(k, group)
+                else:
+                    self.stats['duplicates'] += 1
+                groups[start + i] = group
+            self._bands.add(np.fromiter(local.keys(), dtype=np.uint64, count=len(local)),
+                            np.fromiter(local.values(), dtype=np.int64, count=len(local)))
+        self.stats['examples'] += len(texts)
+        return groups
+
+    def assign(self, examples: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Group ids for examples (dicts with the configured fields), in order."""
+        return self.assign_texts([example_text(e, self.fields) for e in examples])
+
+    def memory(self) -> int:
+        """Bytes held for signatures and band keys."""
+        return self.groups * self.num_perm * 4 + self._bands.nbytes
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a JSONL file, skipping blank lines, // comments and lines that are not JSON."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line in {path}: {line[:80]}")
+
+
+def _batches(records: Iterable[Dict[str, Any]], size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def deduplicate_jsonl(input_path: str, output_path: str, index: Optional[NearDuplicateIndex] = None,
+                      **kwargs) -> Dict[str, Any]:
+    """
+    Copy a JSONL file, keeping the first example of every near-duplicate group.
+
+    Comment lines (``// ...``) at the top of the file are preserved. Extra
+    keyword arguments configure a new NearDuplicateIndex.
+    """
+    index = index or NearDuplicateIndex(**kwargs)
+    kept = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        with open(input_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.startswith('//'):
+                    break
+                out.write(line)
+        seen_groups = index.groups
+        for batch in _batches(iter_jsonl(input_path)):
+            groups = index.assign(batch)
+            for record, group in zip(batch, groups):
+                if group >= seen_groups:
+                    seen_groups = group + 1
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    kept += 1
+    return {'input': index.stats['examples'], 'kept': kept, **index.stats, 'memory_bytes': index.memory()}
+
+
+def _split_names(ratios: Dict[str, float]) -> Tuple[List[str], np.ndarray]:
+    total = sum(ratios.values())
+    if total <= 0 or any(r < 0 for r in ratios.values()):
+        raise ValueError(f"Split ratios must be non-negative with a positive sum: {ratios}")
+    names = list(ratios)
+    return names, np.cumsum([ratios[n] / total for n in names])
+
+
+def hash_split(groups: np.ndarray, ratios: Dict[str, float], seed: int = 42) -> List[str]:
+    """Split name per group id from a seeded hash, so a group always lands in one split."""
+    names, bounds = _split_names(ratios)
+    x = (np.asarray(groups, dtype=np.uint64) + np.uint64(seed & _MASK64)) * np.uint64(0x9E3779B97F4A7C15)
+    x ^= x >> np.uint64(31)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(29)
+    u = (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+    return [names[i] for i in np.minimum(np.searchsorted(bounds, u, side='right'), len(names) - 1)]
+
+
+def split_by_group(items: Sequence[Any], ratios: Dict[str, float], seed: int = 42,
+                   groups: Optional[Sequence[int]] = None, **kwargs) -> Dict[str, List[Any]]:
+    """
+    Split items so that every near-duplicate group lands in a single split.
+
+    Groups are shuffled with ``seed`` and each goes to the split furthest below
+    its share, so split sizes stay close to the ratios. Items keep their
+    relative order within a group. ``groups`` can be passed when already
+    computed; otherwise items must be example dicts and extra keyword arguments
+    configure a NearDuplicateIndex.
+    """
+    names, _ = _split_names(ratios)
+    total_ratio = sum(ratios.values())
+    if groups is None:
+        groups = NearDuplicateIndex(**kwargs).assign(items)
+    members: Dict[int, List[int]] = {}
+    for i, group in enumerate(groups):
+        members.setdefault(int(group), []).append(i)
+    order = list(members)
+    random.Random(seed).shuffle(order)
+
+    splits: Dict[str, List[Any]] = {name: [] for name in names}
+    placed = 0
+    for group in order:
+        idx = members[group]
+        # Largest shortfall against the target share after placing this group
+        name = max(names, key=lambda n: ratios[n] / total_ratio * (placed + len(idx)) - len(splits[n]))
+        splits[name].extend(items[i] for i in idx)
+        placed += len(idx)
+    return splits
+
+
+def split_jsonl(input_path: str, outputs: Dict[str, str], ratios: Dict[str, float], seed: int = 42,
+                drop_duplicates: bool = False, index: Optional[NearDuplicateIndex] = None,
+                **kwargs) -> Dict[str, Any]:
+    """
+    Stream a JSONL file into split files; near-duplicates always share a split.
+
+    Args:
+        outputs: Split name -> output path (every name in ``ratios``)
+        drop_duplicates: Also keep only the first example of each group
+    """
+    missing = set(ratios) - set(outputs)
+    if missing:
+        raise ValueError(f"No output path for splits: {sorted(missing)}")
+    index = index or NearDuplicateIndex(**kwargs)
+    counts = {name: 0 for name in ratios}
+    files = {name: open(outputs[name], 'w', encoding='utf-8') for name in ratios}
+    try:
+        seen_groups = index.groups
+        for batch in _batches(iter_jsonl(input_path)):
+            groups = index.assign(batch)
+            for record, group, name in zip(batch, groups, hash_split(groups, ratios, seed)):
+                if drop_duplicates:
+                    if group < seen_groups:
+                        continue
+                    seen_groups = group + 1
+                files[name].write(json.dumps(record, ensure_ascii=False) + '\n')
+                counts[name] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return {'splits': counts, 'groups': index.groups, **index.stats, 'memory_bytes': index.memory()}
+
+
+def _pairs(values: List[str], option: str) -> Dict[str, str]:
+    pairs = {}
+    for value in values:
+        name, sep, rest = value.partition('=')
+        if not sep:
+            raise SystemExit(f"{option} expects name=value, got {value!r}")
+        pairs[name] = rest
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Near-duplicate removal and group-aware splitting for JSONL")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--num-perm', type=int, default=DEFAULT_NUM_PERM)
+    parser.add_argument('--shingle-size', type=int, default=DEFAULT_SHINGLE_SIZE)
+    parser.add_argument('--fields', default='question,answer', help="Comma-separated fields to compare")
+    sub = parser.add_subparsers(dest='command', required=True)
+    dedup = sub.add_parser('dedup', help="Keep the first example of each near-duplicate group")
+    dedup.add_argument('input')
+    dedup.add_argument('output')
+    split = sub.add_parser('split', help="Split so near-duplicates share a split")
+    split.add_argument('input')
+    split.add_argument('--out', action='append', required=True, help="name=path (repeatable)")
+    split.add_argument('--ratio', action='append', required=True, help="name=weight (repeatable)")
+    split.add_argument('--seed', type=int, default=42)
+    split.add_argument('--drop-duplicates', action='store_true')
+    args = parser.parse_args(argv)
+
+    index = NearDuplicateIndex(args.threshold, args.num_perm, args.shingle_size, args.fields.split(','))
+    if args.command == 'dedup':
+        stats = deduplicate_jsonl(args.input, args.output, index=index)
+    else:
+        ratios = {name: float(weight) for name, weight in _pairs(args.ratio, '--ratio').items()}
+        stats = split_jsonl(args.input, _pairs(args.out, '--out'), ratios, seed=args.seed,
+                            drop_duplicates=args.drop_duplicates, index=index)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
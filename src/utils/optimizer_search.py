@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Optimizer Search
+
+Runs a sweep of DSPy optimizer configurations (BootstrapFewShot, MIPROv2,
+SIMBA, GRPO with different settings) and keeps the best compiled program:
+
+- Every LM call of every candidate goes through ``CachedLM``, which looks
+  the request up in a persistent, content-addressed ``LMCallCache`` first.
+  The key is a hash of the model, the full message list (instructions,
+  demos and inputs as the adapter rendered them) and the sampling
+  arguments, so bootstrapping, trials and dev evaluations that repeat a
+  request across configurations, optimizers or whole sweeps hit the cache.
+  Concurrent identical requests are made once.
+- Only calls that reach the LM count against a global ``CallBudget``. When
+  it runs out, the configuration that hit it is marked ``budget_exhausted``
+  and queued ones are skipped.
+- Configurations are grouped into tracks (one per optimizer by default)
+  ordered by cost. Tracks run concurrently on ``workers`` threads; within a
+  track the next configuration only runs while the dev score keeps
+  improving by ``min_delta`` (``patience`` configurations without
+  improvement stop the track).
+- Each configuration records its cost: LM calls, cache hits, tokens spent
+  and saved, and wall time. Results are appended to a JSONL file.
+
+Configuration (environment):
+    OPTIMIZER_LM_CACHE     Persistent LM call cache (default: cache/optimizer_lm_calls.jsonl)
+    OPTIMIZER_LM_BUDGET    LM calls allowed per sweep, 0 for unlimited (default: 0)
+    OPTIMIZER_WORKERS      Configurations run concurrently (default: 2)
+
+Usage:
+    search = OptimizerSearch(dspy.settings.lm, BibleQAModule, trainset, devset, metric=metric,
+                             budget=2000)
+    results = search.run(sweep_configs(['bootstrap', 'miprov2', 'simba']))
+    program = search.best.program
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.utils.eval_harness import DEFAULT_WORKERS as EVAL_WORKERS, evaluate, model_hash, predict
+
+try:
+    import dspy
+    _BaseLM = dspy.BaseLM
+    DSPY_AVAILABLE = True
+except (ImportError, AttributeError):
+    dspy = None
+    _BaseLM = object
+    DSPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv('OPTIMIZER_LM_CACHE', 'cache/optimizer_lm_calls.jsonl')
+DEFAULT_BUDGET = int(os.getenv('OPTIMIZER_LM_BUDGET', '0'))
+DEFAULT_WORKERS = int(os.getenv('OPTIMIZER_WORKERS', '2'))
+
+# Request arguments that do not change the completion, left out of cache keys
+_TRANSPORT_KWARGS = frozenset({'api_key', 'api_base', 'base_url', 'timeout', 'num_retries', 'headers', 'stream'})
+
+OPTIMIZER_CLASSES = {
+    'bootstrap': 'BootstrapFewShot',
+    'miprov2': 'MIPROv2',
+    'simba': 'SIMBA',
+    'grpo': 'GRPO',
+}
+
+# Per-optimizer configurations, cheapest first (one track each)
+DEFAULT_LADDERS = {
+    'bootstrap': [
+        {'max_bootstrapped_demos': 2, 'max_labeled_demos': 4},
+        {'max_bootstrapped_demos': 4, 'max_labeled_demos': 8},
+        {'max_bootstrapped_demos': 8, 'max_labeled_demos': 16},
+    ],
+    'miprov2': [{'auto': 'light'}, {'auto': 'medium'}, {'auto': 'heavy'}],
+    'simba': [
+        {'max_steps': 4, 'num_candidates': 4, 'max_demos': 2},
+        {'max_steps': 8, 'num_candidates': 6, 'max_demos': 4},
+    ],
+    'grpo': [{'num_train_steps': 100}, {'num_train_steps': 500}],
+}
+
+
+class BudgetExhausted(RuntimeError):
+    """Raised instead of making an LM call once the sweep's call budget is spent."""
+
+
+# --- cache and budget --------------------------------------------------------------
+
+def request_key(model: str, prompt: Optional[str], messages: Optional[List[Dict[str, Any]]],
+                kwargs: Dict[str, Any]) -> str:
+    """Content address of an LM request."""
+    relevant = {k: v for k, v in kwargs.items() if k not in _TRANSPORT_KWARGS}
+    payload = json.dumps([model, prompt, messages, relevant], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LMCallCache:
+    """
+    Persistent map from request key to completion texts.
+
+    Entries are appended to a JSONL file as they are made and loaded on the
+    first lookup; a partial last line from a crash is ignored. Several
+    processes may append to the same file, but each only sees the entries
+    that existed when it loaded it.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            entries = {}
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            entries[entry['key']] = entry
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            self._entries = entries
+            logger.info(f"Loaded {len(entries)} cached LM calls from {self.path}")
+        return self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, outputs: List[str], usage: Dict[str, int], model: str):
+        entry = {'key': key, 'model': model, 'outputs': outputs, 'usage': usage}
+        with self._lock:
+            self._load()[key] = entry
+            if not self.path:
+                return
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CallBudget:
+    """Thread-safe count of LM calls against an optional limit (None or 0: unlimited)."""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit or None
+        self.used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.limit is not None and self.used >= self.limit
+
+    def charge(self):
+        with self._lock:
+            if self.exhausted:
+                raise BudgetExhausted(f"LM call budget of {self.limit} calls is spent")
+            self.used += 1
+
+
+@dataclass
+class CostMeter:
+    """What one configuration cost: LM calls made and served from the cache."""
+    lm_calls: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    saved_tokens: int = 0
+    lm_seconds: float = 0.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'lm_calls': self.lm_calls, 'cache_hits': self.cache_hits,
+                    'prompt_tokens': self.prompt_tokens, 'completion_tokens': self.completion_tokens,
+                    'saved_tokens': self.saved_tokens, 'lm_seconds': round(self.lm_seconds, 3)}
+
+
+def _usage_tokens(usage: Any) -> Dict[str, int]:
+    get = usage.get if isinstance(usage, dict) else (lambda k, d=0: getattr(usage, k, d))
+    return {'prompt_tokens': int(get('prompt_tokens', 0) or 0),
+            'completion_tokens': int(get('completion_tokens', 0) or 0)}
+
+
+def _cached_response(outputs: List[str], model: str) -> SimpleNamespace:
+    """An OpenAI-style chat completion for outputs served from the cache (no tokens used)."""
+    return SimpleNamespace(
+        id=f"cached-{hashlib.sha1(''.join(outputs).encode('utf-8')).hexdigest()[:12]}",
+        object='chat.completion',
+        model=model,
+        choices=[SimpleNamespace(index=i, finish_reason='stop',
+                                 message=SimpleNamespace(role='assistant', content=text))
+                 for i, text in enumerate(outputs)],
+        usage={'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        cache_hit=True,
+    )
+
+
+class CachedLM(_BaseLM):
+    """
+    ``dspy.BaseLM`` in front of another LM, serving repeated requests from an LMCallCache.
+
+    Args:
+        lm: The LM that makes real calls (a dspy.LM, FakeLM, ...)
+        cache: Shared LMCallCache
+        budget: Shared CallBudget; only real calls are charged
+        meter: Where this LM's calls and hits are counted
+    """
+
+    _inflight: Dict[str, threading.Event] = {}
+    _inflight_lock = threading.Lock()
+
+    def __init__(self, lm, cache: LMCallCache, budget: Optional[CallBudget] = None,
+                 meter: Optional[CostMeter] = None):
+        model = getattr(lm, 'model', type(lm).__name__)
+        if DSPY_AVAILABLE:
+            # The cache replaces DSPy's own request cache for these calls
+            super().__init__(model=model, model_type=getattr(lm, 'model_type', 'chat'), cache=False,
+                             **dict(getattr(lm, 'kwargs', {})))
+        else:
+            self.model = model
+            self.model_type = 'chat'
+            self.kwargs = dict(getattr(lm, 'kwargs', {}))
+            self.history = []
+        self.lm = lm
+        self.cache = cache
+        self.budget = budget or CallBudget()
+        self.meter = meter or CostMeter()
+
+    def _hit(self, entry: dict) -> SimpleNamespace:
+        usage = entry.get('usage') or {}
+        self.meter.add(cache_hits=1, saved_tokens=usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0))
+        return _cached_response(entry['outputs'], self.model)
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        key = request_key(self.model, prompt, messages, {**self.kwargs, **kwargs})
+        while True:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return self._hit(entry)
+            with self._inflight_lock:
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            # The same request is being made by another configuration; reuse its result
+            waiting.wait()
+
+        try:
+            self.budget.charge()
+            start = time.perf_counter()
+            response = self.lm.forward(prompt=prompt, messages=messages, **kwargs)
+            outputs = [c.message.content if hasattr(c, 'message') else c['text'] for c in response.choices]
+            usage = _usage_tokens(getattr(response, 'usage', None) or {})
+            self.meter.add(lm_calls=1, lm_seconds=time.perf_counter() - start, **usage)
+            self.cache.put(key, outputs, usage, self.model)
+            return response
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key).set()
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        return await asyncio.to_thread(self.forward, prompt=prompt, messages=messages, **kwargs)
+
+    if not DSPY_AVAILABLE:
+        def __call__(self, prompt=None, messages=None, **kwargs):
+            response = self.forward(prompt=prompt, messages=messages, **kwargs)
+            return [choice.message.content for choice in response.choices]
+
+
+@contextmanager
+def lm_scope(lm):
+    """Make ``lm`` the DSPy LM of the current thread (DSPy's parallel workers inherit it)."""
+    with (dspy.context(lm=lm) if DSPY_AVAILABLE else nullcontext()):
+        yield
+
+
+# --- configurations ----------------------------------------------------------------
+
+@dataclass(frozen=True)
+class SearchConfig:
+    """One optimizer setting to try; configurations sharing a track run cheapest first."""
+    optimizer: str
+    params: Dict[str, Any] = field(default_factory=dict, hash=False)
+    track: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        args = ','.join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.optimizer}({args})"
+
+    @property
+    def track_name(self) -> str:
+        return self.track or self.optimizer
+
+
+def sweep_configs(optimizers: Iterable[str], ladders: Optional[Dict[str, List[Dict[str, Any]]]] = None
+                  ) -> List[SearchConfig]:
+    """The configurations of each optimizer's ladder (DEFAULT_LADDERS by default)."""
+    ladders = ladders or DEFAULT_LADDERS
+    configs = []
+    for optimizer in optimizers:
+        if optimizer not in ladders:
+            raise ValueError(f"No configurations for optimizer {optimizer!r}; known: {sorted(ladders)}")
+        configs.extend(SearchConfig(optimizer, dict(params)) for params in ladders[optimizer])
+    return configs
+
+
+def _accepted(func: Callable, params: Dict[str, Any]) -> Dict[str, Any]:
+    signature = inspect.signature(func)
+    if any(p.kind == p.VAR_KEYWORD for p in signature.parameters.values()):
+        return dict(params)
+    return {k: v for k, v in params.items() if k in signature.parameters}
+
+
+def make_optimizer(name: str, metric: Optional[Callable] = None, **params):
+    """A DSPy optimizer by short name, given only the parameters its constructor takes."""
+    if name not in OPTIMIZER_CLASSES:
+        raise ValueError(f"Unknown optimizer {name!r}; known: {sorted(OPTIMIZER_CLASSES)}")
+    import dspy.teleprompt as teleprompt
+    optimizer_class = getattr(teleprompt, OPTIMIZER_CLASSES[name], None) or getattr(dspy, OPTIMIZER_CLASSES[name])
+    kwargs = _accepted(optimizer_class.__init__, {'metric': metric, **params})
+    dropped = set(params) - set(kwargs)
+    if dropped:
+        logger.warning(f"{optimizer_class.__name__} does not take {sorted(dropped)}; ignoring them")
+    return optimizer_class(**kwargs)
+
+
+# --- search ------------------------------------------------------------------------
+
+@dataclass
+class ConfigResult:
+    """Outcome and cost of one configuration."""
+    config: SearchConfig
+    status: str = 'pending'  # ok, error, budget_exhausted, skipped_budget, stopped_plateau
+    score: Optional[float] = None
+    seconds: float = 0.0
+    cost: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    program: Any = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'config': self.config.name, 'optimizer': self.config.optimizer, 'params': self.config.params,
+                'track': self.config.track_name, 'status': self.status, 'score': self.score,
+                'seconds': round(self.seconds, 3), 'error': self.error, **self.cost}
+
+
+class OptimizerSearch:
+    """
+    Concurrent, cached sweep over optimizer configurations.
+
+    Args:
+        lm: The LM that makes real calls
+        program_factory: Returns a fresh, uncompiled program
+        trainset, devset: Examples for compiling and for scoring on dev
+        metric: DSPy metric passed to the optimizers
+        cache: LMCallCache, or a path for one (default: OPTIMIZER_LM_CACHE)
+        budget: LM calls allowed for the whole sweep (default: OPTIMIZER_LM_BUDGET; 0 is unlimited)
+        workers: Tracks run concurrently
+        patience: Configurations without improvement before a track stops
+        min_delta: Dev score gain that counts as an improvement
+        results_path: JSONL file each ConfigResult is appended to
+        compile_fn: ``compile_fn(config, trainset, devset, lm)`` -> program; default compiles
+                    ``program_factory()`` with the configured DSPy optimizer
+        score_fn: ``score_fn(program, devset, lm)`` -> dev score; default is the eval
+                  harness's accuracy
+    """
+
+    def __init__(self, lm, program_factory: Optional[Callable[[], Any]], trainset: Sequence[Any],
+                 devset: Sequence[Any], metric: Optional[Callable] = None, cache=None,
+                 budget: Optional[int] = DEFAULT_BUDGET, workers: int = DEFAULT_WORKERS, patience: int = 1,
+                 min_delta: float = 0.005, results_path: Optional[str] = None,
+                 compile_fn: Optional[Callable] = None, score_fn: Optional[Callable] = None,
+                 eval_workers: int = EVAL_WORKERS):
+        self.lm = lm
+        self.program_factory = program_factory
+        self.trainset = trainset
+        self.devset = devset
+        self.metric = metric
+        self.cache = cache if isinstance(cache, LMCallCache) else LMCallCache(cache or DEFAULT_CACHE_PATH)
+        self.budget = CallBudget(budget)
+        self.workers = max(1, workers)
+        self.patience = max(1, patience)
+        self.min_delta = min_delta
+        self.results_path = results_path
+        self.compile_fn = compile_fn or self.compile
+        self.score_fn = score_fn or self.score
+        self.eval_workers = eval_workers
+        self.results: List[ConfigResult] = []
+        self._results_lock = threading.Lock()
+
+    def compile(self, config: SearchConfig, trainset, devset, lm):
+        """Compile a fresh program with the configured optimizer, making LM calls through ``lm``."""
+        with lm_scope(lm):
+            optimizer = make_optimizer(config.optimizer, metric=self.metric, **config.params)
+            kwargs = _accepted(optimizer.compile, {'trainset': list(trainset), 'valset': list(devset),
+                                                   'requires_permission_to_run': False})
+            return optimizer.compile(self.program_factory(), **kwargs)
+
+    def score(self, program, devset, lm) -> float:
+        """Dev accuracy of a compiled program."""
+        def scoped_predict(model, fields):
+            with lm_scope(lm):
+                return predict(model, fields)
+
+        report = evaluate(program, devset, workers=self.eval_workers, predict_fn=scoped_predict,
+                          model_id=model_hash(program), progress_every=0)
+        if self.budget.exhausted and any(r.get('error') for r in report.records):
+            # Failed predictions count as wrong, so a partly scored program is not comparable
+            raise BudgetExhausted("LM call budget ran out while scoring on dev")
+        return float(report.metrics.get('accuracy', 0.0))
+
+    def _record(self, result: ConfigResult):
+        with self._results_lock:
+            if self.results_path:
+                os.makedirs(os.path.dirname(self.results_path) or '.', exist_ok=True)
+                with open(self.results_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(result.to_dict(), ensure_ascii=False, default=str) + '\n')
+        logger.info(f"{result.config.name}: {result.status}, score={result.score}, "
+                    f"{result.cost.get('lm_calls', 0)} LM calls, {result.cost.get('cache_hits', 0)} cache hits, "
+                    f"{result.seconds:.1f}s")
+
+    def _run_config(self, result: ConfigResult):
+        meter = CostMeter()
+        lm = CachedLM(self.lm, self.cache, self.budget, meter)
+        start = time.perf_counter()
+        try:
+            result.program = self.compile_fn(result.config, self.trainset, self.devset, lm)
+            result.score = self.score_fn(result.program, self.devset, lm)
+            result.status = 'ok'
+        except BudgetExhausted as e:
+            result.status, result.error = 'budget_exhausted', str(e)
+        except Exception as e:
+            logger.error(f"Error running {result.config.name}: {e}")
+            result.status, result.error = 'error', f"{type(e).__name__}: {e}"
+        result.seconds = time.perf_counter() - start
+        result.cost = meter.to_dict()
+        self._record(result)
+
+    def _run_track(self, track: List[ConfigResult]):
+        best = None
+        stale = 0
+        for i, result in enumerate(track):
+            if self.budget.exhausted:
+                result.status = 'skipped_budget'
+                continue
+            if stale >= self.patience:
+                result.status = 'stopped_plateau'
+                continue
+            self._run_config(result)
+            if result.status != 'ok':
+                stale += 1
+            elif best is None or result.score > best + self.min_delta:
+                best, stale = result.score, 0
+            else:
+                stale += 1
+        stopped = sum(r.status == 'stopped_plateau' for r in track)
+        if stopped:
+            logger.info(f"Track {track[0].config.track_name} plateaued at {best}; skipped {stopped} configurations")
+
+    def run(self, configs: Iterable[SearchConfig]) -> List[ConfigResult]:
+        """Run the configurations; results are in the order given."""
+        self.results = [ConfigResult(config) for config in configs]
+        tracks: Dict[str, List[ConfigResult]] = {}
+        for result in self.results:
+            tracks.setdefault(result.config.track_name, []).append(result)
+        logger.info(f"Searching {len(self.results)} configurations in {len(tracks)} tracks "
+                    f"({self.workers} workers, budget {self.budget.limit or 'unlimited'} LM calls)")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='optimizer') as pool:
+                for future in [pool.submit(self._run_track, track) for track in tracks.values()]:
+                    future.result()
+        finally:
+            self.cache.close()
+        return self.results
+
+    @property
+    def best(self) -> Optional[ConfigResult]:
+        """The highest-scoring successful configuration."""
+        scored = [r for r in self.results if r.status == 'ok']
+        return max(scored, key=lambda r: r.score) if scored else None
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals over the sweep."""
+        totals = {'configs': len(self.results), 'lm_calls': self.budget.used, 'cache_entries': len(self.cache)}
+        for name in ('cache_hits', 'prompt_tokens', 'completion_tokens', 'saved_tokens'):
+            totals[name] = sum(r.cost.get(name, 0) for r in self.results)
+        for result in self.results:
+            totals[result.status] = totals.get(result.status, 0) + 1
+        best = self.best
+        totals['best'] = best.config.name if best else None
+        totals['best_score'] = best.score if best else None
+        return totals
@@ -0,0 +1,485 @@
+"""
+Question Router
+
+Decides which IntegratedBibleQA sub-module answers a question, in front of
+every LM call, so it has to be cheap:
+
+- All routing phrases (term-lookup phrases, complexity markers, theological
+  terms, conversational markers, language names) are compiled into one
+  prefix-trie regex. A single scan of the lowercased question finds every
+  phrase, including overlapping ones, and rules are evaluated over the set
+  of hits.
+- When no rule fires, an optional ``HashedNgramClassifier`` (multinomial
+  logistic regression over hashed word 1-2 grams, trained from the QA JSONL
+  datasets) can pick the route. Its prediction is used only above
+  ``min_confidence``.
+- Every decision is counted per route and per source (rule, classifier,
+  default), with the total time spent routing.
+
+Routes, in rule priority order: ``theological_term``,
+``complex_theological``, ``conversational`` and ``basic``.
+
+Configuration (environment):
+    QUESTION_ROUTER_MODEL           Trained classifier (.npz) loaded by
+                                    get_question_router() if it exists
+                                    (default: models/question_router.npz)
+    QUESTION_ROUTER_MIN_CONFIDENCE  Classifier probability required to
+                                    override the default route (default: 0.6)
+
+Usage:
+    router = get_question_router()
+    decision = router.analyze("What does the Hebrew word chesed mean?")
+    decision.route                      # 'theological_term'
+    router.extract_term(question, decision)  # ('chesed', 'Hebrew', '')
+
+    python -m src.utils.question_router train data/processed/dspy_training_data/qa_dataset_train.jsonl
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.getenv('QUESTION_ROUTER_MODEL', 'models/question_router.npz')
+MIN_CONFIDENCE = float(os.getenv('QUESTION_ROUTER_MIN_CONFIDENCE', '0.6'))
+
+THEOLOGICAL_TERM = 'theological_term'
+COMPLEX_THEOLOGICAL = 'complex_theological'
+CONVERSATIONAL = 'conversational'
+BASIC = 'basic'
+ROUTES = (THEOLOGICAL_TERM, COMPLEX_THEOLOGICAL, CONVERSATIONAL, BASIC)
+
+# Phrase lists by role; a phrase may serve several roles
+TERM_PATTERNS = (
+    "meaning of", "what does", "definition of", "etymology of",
+    "translate", "translation of", "hebrew word", "greek word",
+    "strong's", "strongs", "lexicon",
+)
+# Phrases after which the term itself follows, in extraction priority order
+TERM_MARKERS = ("meaning of", "definition of", "what does", "translate")
+COMPLEXITY_MARKERS = (
+    "how does", "compare", "relationship between",
+    "theological significance", "how do", "what are the implications",
+    "interpret", "symbolism", "different views", "reconcile",
+    "connection between", "how would", "why did",
+)
+THEOLOGICAL_TERMS = (
+    "salvation", "justification", "sanctification", "redemption",
+    "atonement", "covenant", "grace", "faith", "trinity", "incarnation",
+    "predestination", "election", "sin", "resurrection", "messiah",
+    "prophecy", "apocalypse", "heaven", "hell", "judgment",
+)
+CONVERSATIONAL_MARKERS = (
+    "follow up", "related to that", "on that note", "additionally",
+    "furthermore", "building on", "continuing", "earlier", "previous",
+    "you mentioned", "you said", "elaborate", "expand", "tell me more",
+)
+LANGUAGES = ("hebrew", "greek", "aramaic")
+STRONGS_PATTERNS = ("strong's", "strongs")
+
+# Questions longer than this many words are treated as complex
+COMPLEX_WORD_COUNT = 15
+
+# Dataset metadata.type values and the route that answers them best
+CATEGORY_ROUTES = {
+    'lexical': THEOLOGICAL_TERM,
+    'etymology': THEOLOGICAL_TERM,
+    'theological_term': THEOLOGICAL_TERM,
+    'translation_comparison': THEOLOGICAL_TERM,
+    'translation_challenge': THEOLOGICAL_TERM,
+    'theological': COMPLEX_THEOLOGICAL,
+    'cross_reference': COMPLEX_THEOLOGICAL,
+    'multi-turn': CONVERSATIONAL,
+}
+
+_STRONGS_ID_RE = re.compile(r'[HG]\d{1,4}')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# --- phrase automaton ---------------------------------------------------------------
+
+def _trie_regex(phrases: Iterable[str]) -> str:
+    """Regex for a set of literals, factored by common prefix so each position is tried once."""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional continuation is greedy, so the longest phrase wins
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class PhraseScanner:
+    """
+    Finds every phrase of every role in one pass.
+
+    Args:
+        roles: Role name -> phrases; a phrase may appear under several roles
+    """
+
+    def __init__(self, roles: Dict[str, Sequence[str]]):
+        phrase_roles: Dict[str, set] = {}
+        for role, phrases in roles.items():
+            for phrase in phrases:
+                phrase_roles.setdefault(phrase, set()).add(role)
+        # A match reports the longest phrase at a position; credit the shorter
+        # phrases that are prefixes of it too ("how do" in "how does")
+        self._hits: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            phrase: tuple((role, phrase[:i]) for i in range(1, len(phrase) + 1)
+                          for role in sorted(phrase_roles.get(phrase[:i], ())))
+            for phrase in phrase_roles
+        }
+        # Zero-width lookahead so overlapping phrases are all found
+        self._pattern = re.compile(f"(?=({_trie_regex(phrase_roles)}))")
+
+    def scan(self, text: str) -> Dict[str, Dict[str, int]]:
+        """Role -> {phrase: first position} for every phrase in ``text``."""
+        hits: Dict[str, Dict[str, int]] = {}
+        phrase_hits = self._hits
+        for match in self._pattern.finditer(text):
+            for role, phrase in phrase_hits[match.group(1)]:
+                hits.setdefault(role, {}).setdefault(phrase, match.start())
+        return hits
+
+
+# --- learned classifier ----------------------------------------------------------------
+
+def _features(text: str, n_features: int) -> np.ndarray:
+    """Hashed word unigrams and bigrams (crc32, so stable across processes)."""
+    words = _WORD_RE.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.fromiter((zlib.crc32(g.encode('utf-8')) % n_features for g in grams),
+                                 dtype=np.int64, count=len(grams)))
+
+
+class HashedNgramClassifier:
+    """
+    Multinomial logistic regression over hashed word 1-2 grams.
+
+    Args:
+        labels: Class names
+        n_features: Hash space size
+    """
+
+    def __init__(self, labels: Sequence[str] = ROUTES, n_features: int = 2 ** 18):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        logits = self.weights[_features(text, self.n_features)].sum(axis=0) + self.bias
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely label and its probability."""
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 30,
+            learning_rate: float = 0.5, l2: float = 1e-4) -> 'HashedNgramClassifier':
+        """Full-batch gradient descent on cross-entropy with L2 regularisation."""
+        index = {label: i for i, label in enumerate(self.labels)}
+        rows = [_features(text, self.n_features) for text in texts]
+        y = np.array([index[label] for label in labels], dtype=np.int64)
+        n = len(rows)
+        if n == 0:
+            raise ValueError("No training examples")
+        lengths = np.array([len(r) for r in rows], dtype=np.int64)
+        # Rows without any word still get a slot so reduceat stays aligned
+        features = np.concatenate([r if len(r) else np.zeros(1, dtype=np.int64) for r in rows])
+        mask = np.concatenate([np.ones(len(r)) if len(r) else np.zeros(1) for r in rows])
+        starts = np.concatenate([[0], np.cumsum(np.maximum(lengths, 1))[:-1]])
+        row_of = np.repeat(np.arange(n), np.maximum(lengths, 1))
+        onehot = np.eye(len(self.labels))[y]
+
+        weights = self.weights.astype(np.float64)
+        bias = self.bias.astype(np.float64)
+        for _ in range(epochs):
+            logits = np.add.reduceat(weights[features] * mask[:, None], starts, axis=0) + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            proba = np.exp(logits)
+            proba /= proba.sum(axis=1, keepdims=True)
+            error = (proba - onehot) / n
+            grad = np.zeros_like(weights)
+            np.add.at(grad, features, error[row_of] * mask[:, None])
+            touched = np.unique(features)
+            grad[touched] += l2 * weights[touched]
+            weights -= learning_rate * grad
+            bias -= learning_rate * error.sum(axis=0)
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        return self
+
+    def accuracy(self, texts: Sequence[str], labels: Sequence[str]) -> float:
+        if not texts:
+            return 0.0
+        return sum(self.predict(t)[0] == l for t, l in zip(texts, labels)) / len(texts)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Only hashed rows that were trained are stored
+        rows = np.flatnonzero(np.abs(self.weights).sum(axis=1))
+        np.savez_compressed(path, rows=rows, weights=self.weights[rows], bias=self.bias,
+                            labels=np.array(self.labels), n_features=self.n_features)
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedNgramClassifier':
+        with np.load(path, allow_pickle=False) as data:
+            classifier = cls([str(label) for label in data['labels']], int(data['n_features']))
+            classifier.weights[data['rows']] = data['weights']
+            classifier.bias = data['bias'].astype(np.float32)
+        return classifier
+
+
+# --- router ---------------------------------------------------------------------------
+
+@dataclass
+class RouteDecision:
+    route: str
+    source: str  # 'rule', 'classifier' or 'default'
+    confidence: float = 1.0
+    hits: Dict[str, Dict[str, int]] = field(default_factory=dict, repr=False)
+    question_lower: str = field(default='', repr=False)
+
+
+class QuestionRouter:
+    """
+    Rule-first question router with an optional learned fallback.
+
+    Args:
+        classifier: Used when no rule fires
+        min_confidence: Probability the classifier needs to override ``basic``
+    """
+
+    def __init__(self, classifier: Optional[HashedNgramClassifier] = None,
+                 min_confidence: float = MIN_CONFIDENCE):
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.scanner = PhraseScanner({
+            'term': TERM_PATTERNS,
+            'term_marker': TERM_MARKERS,
+            'complex': COMPLEXITY_MARKERS,
+            'theological': THEOLOGICAL_TERMS,
+            'conversational': CONVERSATIONAL_MARKERS,
+            'language': LANGUAGES,
+            'strongs': STRONGS_PATTERNS,
+        })
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._routes: Counter = Counter()
+            self._sources: Counter = Counter()
+            self._seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._routes.values())
+            return {
+                'total': total,
+                'routes': dict(self._routes),
+                'sources': dict(self._sources),
+                'mean_microseconds': round(self._seconds / total * 1e6, 2) if total else 0.0,
+            }
+
+    def _rule_route(self, question: str, hits: Dict[str, Dict[str, int]]) -> Optional[str]:
+        if 'term' in hits:
+            return THEOLOGICAL_TERM
+        if ('complex' in hits or len(hits.get('theological', ())) >= 2
+                or len(question.split()) > COMPLEX_WORD_COUNT):
+            return COMPLEX_THEOLOGICAL
+        if 'conversational' in hits:
+            return CONVERSATIONAL
+        return None
+
+    def analyze(self, question: str) -> RouteDecision:
+        """Route a question and count the decision."""
+        start = time.perf_counter()
+        question_lower = question.lower()
+        hits = self.scanner.scan(question_lower)
+        route = self._rule_route(question, hits)
+        if route is not None:
+            decision = RouteDecision(route, 'rule', 1.0, hits, question_lower)
+        else:
+            decision = RouteDecision(BASIC, 'default', 1.0, hits, question_lower)
+            if self.classifier is not None:
+                label, confidence = self.classifier.predict(question)
+                if label in ROUTES and confidence >= self.min_confidence:
+                    decision = RouteDecision(label, 'classifier', confidence, hits, question_lower)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._routes[decision.route] += 1
+            self._sources[decision.source] += 1
+            self._seconds += elapsed
+        return decision
+
+    def route(self, question: str) -> str:
+        return self.analyze(question).route
+
+    def is_complex(self, question: str) -> bool:
+        """Whether a question needs multi-hop reasoning (not counted in stats)."""
+        hits = self.scanner.scan(question.lower())
+        return ('complex' in hits or len(hits.get('theological', ())) >= 2
+                or len(question.split()) > COMPLEX_WORD_COUNT)
+
+    def extract_term(self, question: str, decision: Optional[RouteDecision] = None) -> Tuple[str, str, str]:
+        """
+        The term, language and Strong's ID a term question asks about.
+
+        Returns:
+            tuple: (term, language, strongs_id), empty strings where absent
+        """
+        if decision is None:
+            question_lower = question.lower()
+            hits = self.scanner.scan(question_lower)
+        else:
+            question_lower, hits = decision.question_lower, decision.hits
+
+        term = ""
+        markers = hits.get('term_marker', {})
+        marker = next((m for m in TERM_MARKERS if m in markers), None)
+        if marker is not None:
+            remaining = question[markers[marker] + len(marker):].strip()
+            if "mean" in remaining:
+                term = remaining.split("mean")[0].strip()
+            elif "?" in remaining:
+                term = remaining.split("?")[0].strip()
+            else:
+                term = remaining
+            term = term.strip("\"'.,;: ")
+            if term.startswith("the "):
+                term = term[4:]
+
+        languages = hits.get('language', {})
+        language = next((lang.capitalize() for lang in LANGUAGES if lang in languages), "")
+
+        strongs_id = ""
+        if 'strongs' in hits:
+            match = _STRONGS_ID_RE.search(question)
+            if match:
+                strongs_id = match.group(0)
+        return term, language, strongs_id
+
+    # Shared between module copies (dspy deep-copies programs when compiling)
+    def __deepcopy__(self, memo):
+        return self
+
+
+_router: Optional[QuestionRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_question_router() -> QuestionRouter:
+    """Process-wide router, with the trained classifier at QUESTION_ROUTER_MODEL if present."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                classifier = None
+                if os.path.exists(MODEL_PATH):
+                    try:
+                        classifier = HashedNgramClassifier.load(MODEL_PATH)
+                        logger.info(f"Loaded question router classifier from {MODEL_PATH}")
+                    except Exception as e:
+                        logger.warning(f"Could not load question router classifier {MODEL_PATH}: {e}")
+                _router = QuestionRouter(classifier)
+    return _router
+
+
+# --- training ---------------------------------------------------------------------------
+
+def example_route(example: Dict[str, Any]) -> Optional[str]:
+    """Route label for a dataset example: multi-turn if it has history, else by metadata.type."""
+    if example.get('history'):
+        return CONVERSATIONAL
+    metadata = example.get('metadata') or {}
+    category = metadata.get('type') if isinstance(metadata, dict) else None
+    if category is None:
+        return None
+    return CATEGORY_ROUTES.get(category, BASIC)
+
+
+def load_labeled_questions(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """(questions, routes) from QA JSONL files; examples without a category are skipped."""
+    texts: List[str] = []
+    labels: List[str] = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('//'):
+                    continue
+                example = json.loads(line)
+                route = example_route(example)
+                if route is not None and example.get('question'):
+                    texts.append(example['question'])
+                    labels.append(route)
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the question router's classifier")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    train = subparsers.add_parser('train', help='Train from QA JSONL datasets')
+    train.add_argument('datasets', nargs='+', help='JSONL files with question and metadata.type')
+    train.add_argument('--output', default=MODEL_PATH, help='Where to save the classifier')
+    train.add_argument('--epochs', type=int, default=30)
+    train.add_argument('--holdout', type=float, default=0.2, help='Share of examples held out for accuracy')
+    route = subparsers.add_parser('route', help='Route questions and print the decisions')
+    route.add_argument('questions', nargs='+')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'route':
+        router = get_question_router()
+        for question in args.questions:
+            decision = router.analyze(question)
+            print(f"{decision.route:20} {decision.source:10} {decision.confidence:.2f}  {question}")
+        print(json.dumps(router.stats()))
+        return 0
+
+    texts, labels = load_labeled_questions(args.datasets)
+    if not texts:
+        logger.error("No labeled questions found")
+        return 1
+    order = np.random.RandomState(42).permutation(len(texts))
+    split = int(len(texts) * (1 - args.holdout))
+    train_idx, test_idx = order[:split], order[split:]
+    classifier = HashedNgramClassifier().fit([texts[i] for i in train_idx], [labels[i] for i in train_idx],
+                                             epochs=args.epochs)
+    logger.info(f"Trained on {len(train_idx)} questions {dict(Counter(labels[i] for i in train_idx))}; "
+                f"holdout accuracy {classifier.accuracy([texts[i] for i in test_idx], [labels[i] for i in test_idx]):.3f}")
+    classifier.save(args.output)
+    logger.info(f"Saved question router classifier to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,625 @@
+"""
+Canonical Bible reference engine.
+
+This module is the single place where verse references are tokenized, parsed
+and converted to packed integer verse IDs. ``bible_reference_parser``,
+``text_utils``, the vector search API and the contextual insights program
+delegate to it. The TVTMS parser keeps its own grammar and only resolves book
+names here.
+
+Packed verse IDs use the layout ``book * 1_000_000 + chapter * 1_000 + verse``
+with books numbered 1-66 in Protestant canonical order, so ``John 3:16`` is
+``43003016``. Whole chapters and whole books are represented as inclusive ID
+ranges ending in verse/chapter ``999``.
+
+Supported grammar (case-insensitive, whitespace tolerant):
+
+- ``John 3:16``, ``Jn 3.16``, ``Jhn.3.16`` (STEP style), ``1 John 1:9``, ``I John 1:9``
+- ranges: ``Gen 1:1-3``, ``Gen 1:1-2:3`` (cross-chapter), ``Gen 50:26-Exo 1:2``
+- lists: ``Rom 8:28, 31-39``, ``Rom 8:28; 9:1-5``, ``Gen 1:1; Exo 20:1-17``
+- subverses: ``Gen 6:1a``, ``Gen.6:1.1``
+- whole chapters and books: ``Psalm 23``, ``Psa 1-3``, ``Jude``
+- single-chapter books: ``Jude 5`` means verse 5
+- alternate versification markers are ignored: ``Mat.15.6(15.5)``
+- psalm titles: ``Psa.142:Title`` (verse 0)
+
+Usage:
+    from src.utils.reference_engine import parse, parse_many, pack_verse_id
+
+    ref = parse("Rom 8:28, 31-39")
+    ref.spans          # two VerseSpan objects with packed start/end IDs
+    ref.canonical()    # 'Romans 8:28, 31-39'
+    parse_many(df['ref'])  # one call for a whole column
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BOOK_FACTOR = 1_000_000
+CHAPTER_FACTOR = 1_000
+# Sentinel verse/chapter number used for "to the end of the chapter/book"
+OPEN_END = 999
+
+# (number, canonical name, STEP abbreviation, chapter count)
+BOOKS: Tuple[Tuple[int, str, str, int], ...] = (
+    (1, 'Genesis', 'Gen', 50), (2, 'Exodus', 'Exo', 40), (3, 'Leviticus', 'Lev', 27),
+    (4, 'Numbers', 'Num', 36), (5, 'Deuteronomy', 'Deu', 34), (6, 'Joshua', 'Jos', 24),
+    (7, 'Judges', 'Jdg', 21), (8, 'Ruth', 'Rut', 4), (9, '1 Samuel', '1Sa', 31),
+    (10, '2 Samuel', '2Sa', 24), (11, '1 Kings', '1Ki', 22), (12, '2 Kings', '2Ki', 25),
+    (13, '1 Chronicles', '1Ch', 29), (14, '2 Chronicles', '2Ch', 36), (15, 'Ezra', 'Ezr', 10),
+    (16, 'Nehemiah', 'Neh', 13), (17, 'Esther', 'Est', 10), (18, 'Job', 'Job', 42),
+    (19, 'Psalms', 'Psa', 150), (20, 'Proverbs', 'Pro', 31), (21, 'Ecclesiastes', 'Ecc', 12),
+    (22, 'Song of Solomon', 'Sng', 8), (23, 'Isaiah', 'Isa', 66), (24, 'Jeremiah', 'Jer', 52),
+    (25, 'Lamentations', 'Lam', 5), (26, 'Ezekiel', 'Ezk', 48), (27, 'Daniel', 'Dan', 12),
+    (28, 'Hosea', 'Hos', 14), (29, 'Joel', 'Jol', 3), (30, 'Amos', 'Amo', 9),
+    (31, 'Obadiah', 'Oba', 1), (32, 'Jonah', 'Jon', 4), (33, 'Micah', 'Mic', 7),
+    (34, 'Nahum', 'Nam', 3), (35, 'Habakkuk', 'Hab', 3), (36, 'Zephaniah', 'Zep', 3),
+    (37, 'Haggai', 'Hag', 2), (38, 'Zechariah', 'Zec', 14), (39, 'Malachi', 'Mal', 4),
+    (40, 'Matthew', 'Mat', 28), (41, 'Mark', 'Mrk', 16), (42, 'Luke', 'Luk', 24),
+    (43, 'John', 'Jhn', 21), (44, 'Acts', 'Act', 28), (45, 'Romans', 'Rom', 16),
+    (46, '1 Corinthians', '1Co', 16), (47, '2 Corinthians', '2Co', 13), (48, 'Galatians', 'Gal', 6),
+    (49, 'Ephesians', 'Eph', 6), (50, 'Philippians', 'Php', 4), (51, 'Colossians', 'Col', 4),
+    (52, '1 Thessalonians', '1Th', 5), (53, '2 Thessalonians', '2Th', 3), (54, '1 Timothy', '1Ti', 6),
+    (55, '2 Timothy', '2Ti', 4), (56, 'Titus', 'Tit', 3), (57, 'Philemon', 'Phm', 1),
+    (58, 'Hebrews', 'Heb', 13), (59, 'James', 'Jas', 5), (60, '1 Peter', '1Pe', 5),
+    (61, '2 Peter', '2Pe', 3), (62, '1 John', '1Jn', 5), (63, '2 John', '2Jn', 1),
+    (64, '3 John', '3Jn', 1), (65, 'Jude', 'Jud', 1), (66, 'Revelation', 'Rev', 22),
+)
+
+BOOK_NAMES: Dict[int, str] = {num: name for num, name, _, _ in BOOKS}
+BOOK_ABBREVIATIONS: Dict[int, str] = {num: abbr for num, _, abbr, _ in BOOKS}
+CHAPTER_COUNTS: Dict[int, int] = {num: chapters for num, _, _, chapters in BOOKS}
+OT_BOOKS = frozenset(range(1, 40))
+NT_BOOKS = frozenset(range(40, 67))
+
+# Extra spellings on top of canonical names, STEP abbreviations and the
+# aliases in bible_reference_parser.BOOK_ALIASES / tvtms.constants.
+_EXTRA_ALIASES = {
+    'psalm': 19, 'pss': 19, 'song of songs': 22, 'canticles': 22, 'cant': 22, 'sng': 22,
+    'qoh': 21, 'qoheleth': 21, 'revelations': 66, 'apocalypse': 66, 'apoc': 66,
+    'exod': 2, 'judg': 7, 'ezk': 26, 'jol': 29, 'joe': 29, 'nam': 34, 'mar': 41, 'mrk': 41,
+    'joh': 43, 'jhn': 43, 'act': 44, 'phlp': 50, 'jam': 59, '1kgs': 11, '2kgs': 12,
+    '1chr': 13, '2chr': 14, 'obd': 31,
+}
+
+_ROMAN_PREFIX_RE = re.compile(r'^(iii|ii|i|first|second|third|1st|2nd|3rd)\s+')
+_ROMAN_PREFIX_MAP = {
+    'i': '1', 'ii': '2', 'iii': '3', 'first': '1', 'second': '2', 'third': '3',
+    '1st': '1', '2nd': '2', '3rd': '3',
+}
+_BOOK_KEY_STRIP_RE = re.compile(r"[\s.']+")
+
+
+def book_key(name: str) -> str:
+    """
+    Normalize a book name or abbreviation to its alias-table key.
+
+    ``"I John"``, ``"1 John"`` and ``"1john."`` all become ``"1john"``.
+    """
+    key = name.strip().lower()
+    key = _ROMAN_PREFIX_RE.sub(lambda m: _ROMAN_PREFIX_MAP[m.group(1)], key)
+    return _BOOK_KEY_STRIP_RE.sub('', key)
+
+
+def _build_alias_table() -> Dict[str, int]:
+    from .bible_reference_parser import BOOK_ALIASES
+
+    by_name = {name: num for num, name, _, _ in BOOKS}
+    table: Dict[str, int] = {}
+    for alias, canonical in BOOK_ALIASES.items():
+        if canonical in by_name:
+            table[book_key(alias)] = by_name[canonical]
+    for alias, num in _EXTRA_ALIASES.items():
+        table[book_key(alias)] = num
+    # Canonical names and STEP abbreviations always win over short aliases
+    for num, name, abbr, _ in BOOKS:
+        table[book_key(name)] = num
+        table[book_key(abbr)] = num
+    return table
+
+
+_ALIAS_TABLE: Optional[Dict[str, int]] = None
+
+
+def book_aliases() -> Dict[str, int]:
+    """Every normalized book key (see ``book_key``) the engine resolves, mapped to its book number."""
+    global _ALIAS_TABLE
+    if _ALIAS_TABLE is None:
+        _ALIAS_TABLE = _build_alias_table()
+    return dict(_ALIAS_TABLE)
+
+
+def resolve_book(name) -> Optional[int]:
+    """
+    Resolve a book name, alias, STEP abbreviation or number to its book number.
+
+    Args:
+        name: Book name (e.g. "Genesis", "gen", "Gen.", "1 Jn") or book number
+
+    Returns:
+        Book number (1-66) or None if the book is not recognized
+    """
+    global _ALIAS_TABLE
+    if isinstance(name, int):
+        return name if name in BOOK_NAMES else None
+    if not name:
+        return None
+    if _ALIAS_TABLE is None:
+        _ALIAS_TABLE = _build_alias_table()
+    return _ALIAS_TABLE.get(book_key(name))
+
+
+def pack_verse_id(book, chapter: int, verse: int) -> int:
+    """
+    Pack a verse reference into a single integer.
+
+    Args:
+        book: Book number or any name accepted by resolve_book
+        chapter: Chapter number
+        verse: Verse number (0 for psalm titles)
+
+    Returns:
+        Packed verse ID (book * 1e6 + chapter * 1e3 + verse)
+
+    Raises:
+        ValueError: If the book is unknown or chapter/verse are out of range
+    """
+    book_num = resolve_book(book)
+    if book_num is None:
+        raise ValueError(f"Unknown book: {book}")
+    chapter = int(chapter)
+    verse = int(verse)
+    if not 0 < chapter <= OPEN_END or not 0 <= verse <= OPEN_END:
+        raise ValueError(f"Chapter/verse out of range: {chapter}:{verse}")
+    return book_num * BOOK_FACTOR + chapter * CHAPTER_FACTOR + verse
+
+
+def unpack_verse_id(verse_id: int) -> Tuple[int, int, int]:
+    """Split a packed verse ID into (book_number, chapter, verse)."""
+    book, rest = divmod(int(verse_id), BOOK_FACTOR)
+    chapter, verse = divmod(rest, CHAPTER_FACTOR)
+    return book, chapter, verse
+
+
+def format_verse_id(verse_id: int, abbreviated: bool = False) -> str:
+    """Format a packed verse ID as 'Book C:V' (or 'Abr C:V')."""
+    book, chapter, verse = unpack_verse_id(verse_id)
+    names = BOOK_ABBREVIATIONS if abbreviated else BOOK_NAMES
+    return f"{names[book]} {chapter}:{verse}"
+
+
+@dataclass(frozen=True)
+class VerseSpan:
+    """An inclusive range of packed verse IDs, optionally with subverse markers."""
+    start: int
+    end: int
+    start_subverse: Optional[str] = None
+    end_subverse: Optional[str] = None
+
+    @property
+    def book(self) -> int:
+        return self.start // BOOK_FACTOR
+
+    @property
+    def chapter(self) -> int:
+        return self.start // CHAPTER_FACTOR % CHAPTER_FACTOR
+
+    @property
+    def verse(self) -> int:
+        return self.start % CHAPTER_FACTOR
+
+    @property
+    def is_single_verse(self) -> bool:
+        return self.start == self.end
+
+    @property
+    def is_whole_chapter(self) -> bool:
+        return (self.start % CHAPTER_FACTOR == 1 and self.end % CHAPTER_FACTOR == OPEN_END
+                and self.start // CHAPTER_FACTOR == self.end // CHAPTER_FACTOR)
+
+    def contains(self, verse_id: int) -> bool:
+        return self.start <= verse_id <= self.end
+
+    def verse_ids(self) -> List[int]:
+        """
+        Expand a span that stays inside one chapter into individual verse IDs.
+
+        Open-ended and cross-chapter spans cannot be expanded without verse
+        counts; query them as ID ranges instead.
+        """
+        if self.start // CHAPTER_FACTOR != self.end // CHAPTER_FACTOR or self.end % CHAPTER_FACTOR == OPEN_END:
+            raise ValueError("Only bounded single-chapter spans can be expanded")
+        return list(range(self.start, self.end + 1))
+
+
+@dataclass(frozen=True)
+class ParsedReference:
+    """A parsed reference: the source text plus one or more verse spans."""
+    text: str
+    spans: Tuple[VerseSpan, ...]
+
+    @property
+    def book(self) -> int:
+        return self.spans[0].book
+
+    @property
+    def book_name(self) -> str:
+        return BOOK_NAMES[self.book]
+
+    @property
+    def book_abbreviation(self) -> str:
+        return BOOK_ABBREVIATIONS[self.book]
+
+    @property
+    def chapter(self) -> int:
+        return self.spans[0].chapter
+
+    @property
+    def verse(self) -> int:
+        return self.spans[0].verse
+
+    @property
+    def start_id(self) -> int:
+        return self.spans[0].start
+
+    @property
+    def is_single_verse(self) -> bool:
+        return len(self.spans) == 1 and self.spans[0].is_single_verse
+
+    def to_legacy_tuple(self) -> Tuple[str, int, int, Optional[int]]:
+        """
+        Return the (book_name, chapter, verse_start, verse_end) tuple used by
+        bible_reference_parser.parse_reference. Only the first span is used;
+        verse_end is None when the span runs to the end of the chapter.
+        """
+        span = self.spans[0]
+        end_book, end_chapter, end_verse = unpack_verse_id(span.end)
+        if (end_book, end_chapter) != (span.book, span.chapter) or end_verse == OPEN_END:
+            end_verse = None
+        return self.book_name, span.chapter, span.verse, end_verse
+
+    def key_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Return the spans as sorted, merged inclusive (start, end) verse-key ranges.
+
+        Open ends use verse/chapter 999, so ``BETWEEN start AND end`` on a
+        ``verse_key`` column selects exactly the referenced verses.
+        """
+        return merge_key_ranges((span.start, span.end) for span in self.spans)
+
+    def canonical(self, abbreviated: bool = False) -> str:
+        """Render the reference in canonical 'Book C:V-V, V; C:V' form."""
+        names = BOOK_ABBREVIATIONS if abbreviated else BOOK_NAMES
+        parts: List[str] = []
+        prev_book = prev_chapter = None
+        for span in self.spans:
+            sb, sc, sv = unpack_verse_id(span.start)
+            eb, ec, ev = unpack_verse_id(span.end)
+            s_sub = _format_subverse(span.start_subverse)
+            e_sub = _format_subverse(span.end_subverse)
+            if sb != prev_book:
+                sep = '; ' if parts else ''
+                head = f"{names[sb]} "
+            elif sc != prev_chapter:
+                sep, head = '; ', ''
+            else:
+                sep, head = ', ', ''
+            if sv == 1 and ev == OPEN_END and (eb, ec) == (sb, sc) and not s_sub:
+                body = f"{sc}"
+            elif sc == OPEN_END or (sv == 1 and ec == OPEN_END):
+                body = ''
+            elif (sb, sc) == (eb, ec) and prev_chapter == sc and sb == prev_book:
+                body = f"{sv}{s_sub}" if span.start == span.end else f"{sv}{s_sub}-{ev}{e_sub}"
+            elif span.start == span.end:
+                body = f"{sc}:{_format_verse(sv)}{s_sub}"
+            elif (sb, sc) == (eb, ec):
+                body = f"{sc}:{sv}{s_sub}-{ev}{e_sub}"
+            elif sb == eb:
+                body = f"{sc}:{sv}{s_sub}-{ec}:{ev}{e_sub}"
+            else:
+                body = f"{sc}:{sv}{s_sub}-{names[eb]} {ec}:{ev}{e_sub}"
+            if sv == 1 and ev == OPEN_END and sc < ec < OPEN_END and sb == eb and not s_sub:
+                body = f"{sc}-{ec}"
+            parts.append(f"{sep}{head}{body}".rstrip())
+            prev_book, prev_chapter = eb, ec
+        return ''.join(parts)
+
+    def __str__(self) -> str:
+        return self.canonical()
+
+
+def merge_key_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort inclusive verse-key ranges and merge overlapping or adjacent ones."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _format_verse(verse: int) -> str:
+    return 'Title' if verse == 0 else str(verse)
+
+
+def _format_subverse(subverse: Optional[str]) -> str:
+    if not subverse:
+        return ''
+    return f'.{subverse}' if subverse.isdigit() else subverse
+
+
+# --- Tokenizer --------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<alt>[(\[{][^)\]}]*[)\]}])                         # alternate versification, ignored
+      | (?P<title>title)\b
+      | (?P<chapword>chapters?|chap)\b\.?
+      | (?P<verseword>verses?|vv?)\b\.?
+      | (?P<andword>and|&)
+      | (?P<book>(?:[1-4]\s*|(?:iii|ii|i|first|second|third)\s+)?
+                 (?!(?:chapters?|chap|verses?|vv?|and|title)\b)
+                 [^\W\d_][^\W\d_']+\.?(?:\s+of\s+[^\W\d_]+)?)
+      | (?P<num>\d+)(?P<sub>[a-z](?![a-z]))?
+      | (?P<sep>[:.])
+      | (?P<dash>[-‐-―])
+      | (?P<comma>,)
+      | (?P<semi>;)
+    )""", re.IGNORECASE | re.VERBOSE)
+
+Token = Tuple[str, str, Optional[str]]
+
+
+def tokenize(text: str) -> Optional[List[Token]]:
+    """
+    Split a reference string into (kind, value, subverse) tokens.
+
+    Returns None when the text contains characters outside the grammar.
+    """
+    tokens: List[Token] = []
+    pos = 0
+    end = len(text)
+    match = _TOKEN_RE.match
+    while pos < end:
+        m = match(text, pos)
+        if not m or m.end() == pos:
+            if text[pos:].strip():
+                return None
+            break
+        kind = m.lastgroup
+        if kind == 'sub':
+            kind = 'num'
+        if kind != 'alt':
+            tokens.append((kind, m.group(kind), m.group('sub') if kind == 'num' else None))
+        pos = m.end()
+    return tokens
+
+
+# --- Grammar ------------------------------------------------------------------
+
+class _Cursor:
+    __slots__ = ('tokens', 'pos')
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        i = self.pos + offset
+        return self.tokens[i][0] if i < len(self.tokens) else None
+
+    def take(self) -> Token:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+
+def _read_point(cur: _Cursor, book: int, chapter: Optional[int], chapter_context: bool):
+    """
+    Read one reference point. Returns (chapter, verse, subverse, verse_level)
+    where verse is None for a whole chapter and chapter is None for a whole book.
+    """
+    kind = cur.peek()
+    if kind == 'chapword':
+        cur.take()
+        chapter_context = True
+        kind = cur.peek()
+    if kind == 'verseword':
+        cur.take()
+        if cur.peek() != 'num':
+            raise ValueError("expected verse number")
+        _, value, sub = cur.take()
+        return (chapter or 1), int(value), sub, True
+    if kind == 'title':
+        cur.take()
+        return chapter, 0, None, True
+    if kind != 'num':
+        raise ValueError(f"unexpected token {kind}")
+    _, value, sub = cur.take()
+    first = int(value)
+
+    nxt = cur.peek()
+    if nxt in ('sep', 'verseword') and cur.peek(1) in ('num', 'title') and sub is None:
+        cur.take()
+        kind2, value2, sub2 = cur.take()
+        verse = 0 if kind2 == 'title' else int(value2)
+        # Numeric subverse after a full chapter:verse, e.g. Gen.6:1.1
+        if sub2 is None and cur.peek() == 'sep' and cur.peek(1) == 'num' and cur.peek(2) != 'sep':
+            cur.take()
+            sub2 = cur.take()[1]
+        return first, verse, sub2, True
+
+    single_chapter = CHAPTER_COUNTS[book] == 1
+    if chapter_context and not single_chapter and sub is None:
+        return first, None, None, False
+    return (chapter or 1), first, sub, True
+
+
+def _span(book, chapter, verse, sub, end_book, end_chapter, end_verse, end_sub, verse_level) -> VerseSpan:
+    if chapter is None:
+        start = pack_verse_id(book, 1, 1)
+        end = pack_verse_id(end_book, OPEN_END, OPEN_END)
+        return VerseSpan(start, end)
+    start = pack_verse_id(book, chapter, 1 if verse is None else verse)
+    if end_verse is None:
+        end = pack_verse_id(end_book, end_chapter, OPEN_END)
+    else:
+        end = pack_verse_id(end_book, end_chapter, end_verse)
+    if end < start:
+        raise ValueError("range end precedes start")
+    return VerseSpan(start, end, sub, end_sub)
+
+
+def _parse_tokens(tokens: List[Token]) -> Tuple[VerseSpan, ...]:
+    cur = _Cursor(tokens)
+    spans: List[VerseSpan] = []
+    book: Optional[int] = None
+    chapter: Optional[int] = None
+    chapter_context = True
+
+    while cur.peek() is not None:
+        kind = cur.peek()
+        if kind == 'book':
+            book = resolve_book(cur.take()[1])
+            if book is None:
+                raise ValueError("unknown book")
+            chapter = None
+            chapter_context = True
+            if cur.peek() in (None, 'semi', 'comma'):
+                spans.append(_span(book, None, None, None, book, None, None, None, False))
+            continue
+        if kind in ('comma', 'andword'):
+            cur.take()
+            continue
+        if kind == 'semi':
+            cur.take()
+            chapter_context = True
+            continue
+        if book is None:
+            raise ValueError("reference has no book")
+
+        s_chapter, s_verse, s_sub, verse_level = _read_point(cur, book, chapter, chapter_context)
+        e_book, e_chapter, e_verse, e_sub = book, s_chapter, s_verse, s_sub
+        if cur.peek() == 'dash':
+            cur.take()
+            if cur.peek() == 'book':
+                e_book = resolve_book(cur.take()[1])
+                if e_book is None:
+                    raise ValueError("unknown book")
+                e_chapter, e_verse, e_sub, _ = _read_point(cur, e_book, None, True)
+            else:
+                e_chapter, e_verse, e_sub, _ = _read_point(cur, book, s_chapter, not verse_level)
+        spans.append(_span(book, s_chapter, s_verse, s_sub, e_book, e_chapter, e_verse, e_sub, verse_level))
+        book, chapter = e_book, e_chapter
+        chapter_context = not verse_level
+    if not spans:
+        raise ValueError("empty reference")
+    return tuple(spans)
+
+
+@lru_cache(maxsize=65536)
+def parse(text: str) -> Optional[ParsedReference]:
+    """
+    Parse a reference string into a ParsedReference.
+
+    Results are memoized, so repeated references in a column cost a dict lookup.
+
+    Args:
+        text: Reference string (e.g. "John 3:16", "Gen.1.1", "Rom 8:28, 31-39")
+
+    Returns:
+        ParsedReference or None if the text is not a valid reference
+    """
+    if not text or not isinstance(text, str):
+        return None
+    tokens = tokenize(text.strip().rstrip('.'))
+    if not tokens:
+        return None
+    try:
+        return ParsedReference(text, _parse_tokens(tokens))
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        logger.debug(f"Failed to parse reference '{text}': {e}")
+        return None
+
+
+def normalize(text: str, abbreviated: bool = False) -> Optional[str]:
+    """Return the canonical form of a reference string, or None if invalid."""
+    parsed = parse(text)
+    return parsed.canonical(abbreviated) if parsed else None
+
+
+def parse_many(texts: Iterable[str]) -> List[Optional[ParsedReference]]:
+    """
+    Parse a list or column of reference strings in one call.
+
+    Each distinct string is parsed once; duplicates reuse the result.
+    """
+    seen: Dict[str, Optional[ParsedReference]] = {}
+    out: List[Optional[ParsedReference]] = []
+    for text in texts:
+        try:
+            out.append(seen[text])
+        except KeyError:
+            result = parse(text) if isinstance(text, str) else None
+            seen[text] = result
+            out.append(result)
+        except TypeError:
+            out.append(None)
+    return out
+
+
+def pack_many(texts: Iterable[str], end: bool = False) -> List[Optional[int]]:
+    """
+    Parse references and return the packed start (or end) ID of their first span.
+
+    Args:
+        texts: Iterable of reference strings
+        end: Return the end ID of the first span instead of the start
+
+    Returns:
+        List of packed IDs (None for unparseable entries)
+    """
+    return [None if p is None else (p.spans[0].end if end else p.spans[0].start)
+            for p in parse_many(texts)]
+
+
+def pack_column(values, end: bool = False):
+    """
+    Pack a pandas Series of reference strings into a nullable Int64 Series.
+
+    Unique values are parsed once, which is the common case for ETL columns
+    such as ``Gen.1.1`` repeated once per word.
+    """
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values))
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    packed = pack_many(list(uniques), end=end)
+    lookup = pd.array(packed + [None], dtype='Int64')
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
+
+
+def pack_triples(rows: Sequence[Tuple[str, int, int]]) -> List[Optional[int]]:
+    """
+    Pack (book_name, chapter, verse) rows as stored in the database.
+
+    Book names are resolved once per distinct spelling.
+    """
+    books: Dict[str, Optional[int]] = {}
+    out: List[Optional[int]] = []
+    for book, chapter, verse in rows:
+        if book not in books:
+            books[book] = resolve_book(book)
+        num = books[book]
+        if num is None or chapter is None or verse is None:
+            out.append(None)
+        else:
+            out.append(num * BOOK_FACTOR + int(chapter) * CHAPTER_FACTOR + int(verse))
+    return out
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Cross-Language Term Statistics
+
+Materialized per-Strong's-ID occurrence counts across all tagged texts
+(Hebrew OT, Greek NT, Arabic) and the Hebrew<->Greek<->Arabic alignments built
+from ``bible.word_relationships``, so the cross-language endpoints read one
+indexed view instead of running COUNT(*) queries per term on every request.
+
+Extended IDs roll up to their base number (H1254a -> H1254) and zero padding
+is removed, so counts are comparable across sources. The ETL refreshes the
+views with ``refresh_term_stats`` and bumps the ``term_stats`` dataset version;
+the ETL mains use ``refresh_term_stats_after_load``, which logs a failed
+refresh instead of failing the load. ``TermStatsService`` keeps an in-process
+copy that reloads when that version changes.
+
+Usage:
+    python -m src.utils.term_stats [--create-only] [--rebuild]
+
+Options:
+    --create-only   Create missing views and indexes without refreshing them
+    --rebuild       Drop and recreate the views (picks up newly loaded tagged texts)
+"""
+
+import os
+import re
+import sys
+import logging
+import argparse
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .db_utils import get_dataset_version, mark_dataset_updated
+from .lexicon_service import normalize_strongs_id
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv('TERM_STATS_CHECK_INTERVAL', '300'))
+
+STATS_VIEW = 'bible.strongs_term_stats'
+ALIGNMENTS_VIEW = 'bible.cross_language_alignments'
+
+# (source, table, surface-form column) for every tagged text that carries Strong's IDs
+TAGGED_TEXT_SOURCES = [
+    ('hebrew', 'bible.hebrew_ot_words', 'word_text'),
+    ('greek', 'bible.greek_nt_words', 'word_text'),
+    ('arabic', 'bible.arabic_words', 'arabic_word'),
+]
+
+# Canonical SQL form of a Strong's ID: upper-case prefix, no padding, no suffix
+_SQL_BASE_ID = "upper(m[1]) || m[2]"
+_SQL_ID_MATCH = "regexp_match({column}, '^([HGhg])0*([0-9]+)') AS m"
+
+_BASE_ID_RE = re.compile(r'^[HG]\d+')
+
+# Letter suffixes used by extended Strong's numbers (H1254a, G1722G, ...)
+EXTENDED_SUFFIXES = tuple('abcdefghijkl') + tuple('ABCDEFGHIJKL')
+
+
+def base_strongs_id(strongs_id: str) -> Optional[str]:
+    """
+    Return the base Strong's number used as the statistics key.
+
+    >>> base_strongs_id('H0430')
+    'H430'
+    >>> base_strongs_id('h1254A')
+    'H1254'
+    """
+    normalized = normalize_strongs_id(strongs_id)
+    match = _BASE_ID_RE.match(normalized) if normalized else None
+    return match.group(0) if match else None
+
+
+def _row_values(row) -> list:
+    # Works for both tuple cursors and RealDictCursor connections
+    return list(row.values()) if hasattr(row, 'keys') else list(row)
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return bool(_row_values(cur.fetchone())[0])
+
+
+def _stats_view_sql(sources) -> str:
+    occurrences = "\n            UNION ALL\n".join(
+        f"            SELECT '{source}' AS source, {_SQL_BASE_ID} AS strongs_id, {column} AS form\n"
+        f"            FROM {table}, {_SQL_ID_MATCH.format(column='strongs_id')}\n"
+        f"            WHERE strongs_id IS NOT NULL AND m IS NOT NULL"
+        for source, table, column in sources
+    )
+    return f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {STATS_VIEW} AS
+        WITH occurrences AS (
+{occurrences}
+        )
+        SELECT strongs_id,
+               COUNT(*) FILTER (WHERE source = 'hebrew') AS hebrew_count,
+               COUNT(*) FILTER (WHERE source = 'greek') AS greek_count,
+               COUNT(*) FILTER (WHERE source = 'arabic') AS arabic_count,
+               mode() WITHIN GROUP (ORDER BY form) FILTER (WHERE source <> 'arabic') AS original_form,
+               mode() WITHIN GROUP (ORDER BY form) FILTER (WHERE source = 'arabic') AS arabic_form
+        FROM occurrences
+        GROUP BY strongs_id
+    """
+
+
+ALIGNMENTS_VIEW_SQL = f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {ALIGNMENTS_VIEW} AS
+    WITH pairs AS (
+        SELECT DISTINCT
+               CASE WHEN upper(s[1]) = 'H' THEN 'H' || s[2] ELSE 'H' || t[2] END AS hebrew_strongs,
+               CASE WHEN upper(s[1]) = 'H' THEN 'G' || t[2] ELSE 'G' || s[2] END AS greek_strongs
+        FROM bible.word_relationships r,
+             regexp_match(r.source_id, '^([HGhg])0*([0-9]+)') AS s,
+             regexp_match(r.target_id, '^([HGhg])0*([0-9]+)') AS t
+        WHERE r.relationship_type IN ('hebrew_of_greek', 'greek_of_hebrew')
+          AND s IS NOT NULL AND t IS NOT NULL
+          AND upper(s[1]) <> upper(t[1])
+    )
+    SELECT p.hebrew_strongs,
+           p.greek_strongs,
+           h.original_form AS hebrew_form,
+           g.original_form AS greek_form,
+           COALESCE(g.arabic_form, h.arabic_form) AS arabic_form,
+           COALESCE(h.hebrew_count, 0) AS hebrew_count,
+           COALESCE(g.greek_count, 0) AS greek_count,
+           COALESCE(h.arabic_count, 0) + COALESCE(g.arabic_count, 0) AS arabic_count
+    FROM pairs p
+    LEFT JOIN {STATS_VIEW} h ON h.strongs_id = p.hebrew_strongs
+    LEFT JOIN {STATS_VIEW} g ON g.strongs_id = p.greek_strongs
+"""
+
+TERM_STATS_INDEXES = [
+    # Unique indexes are required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_strongs_term_stats_id ON {STATS_VIEW} (strongs_id)",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_cross_language_alignments_pair "
+    f"ON {ALIGNMENTS_VIEW} (hebrew_strongs, greek_strongs)",
+    f"CREATE INDEX IF NOT EXISTS idx_cross_language_alignments_greek "
+    f"ON {ALIGNMENTS_VIEW} (greek_strongs)",
+]
+
+
+def create_term_stats_views(conn, rebuild: bool = False) -> Dict[str, bool]:
+    """
+    Create the statistics and alignment materialized views and their indexes.
+
+    Only tagged-text tables that exist are included in the statistics view; the
+    alignment view is skipped when bible.word_relationships is missing.
+
+    Args:
+        conn: Database connection
+        rebuild: Drop and recreate the views (e.g. after a new tagged text was added)
+
+    Returns:
+        Dict of view name to True if it was created by this call, False if it already existed
+    """
+    try:
+        created = {}
+        with conn.cursor() as cur:
+            if rebuild:
+                cur.execute(f"DROP MATERIALIZED VIEW IF EXISTS {STATS_VIEW} CASCADE")
+            sources = [s for s in TAGGED_TEXT_SOURCES if _table_exists(cur, s[1])]
+            if not sources:
+                raise RuntimeError("No tagged-text tables found for term statistics")
+            created[STATS_VIEW] = not _table_exists(cur, STATS_VIEW)
+            cur.execute(_stats_view_sql(sources))
+            cur.execute(TERM_STATS_INDEXES[0])
+            if _table_exists(cur, 'bible.word_relationships'):
+                created[ALIGNMENTS_VIEW] = not _table_exists(cur, ALIGNMENTS_VIEW)
+                cur.execute(ALIGNMENTS_VIEW_SQL)
+                for statement in TERM_STATS_INDEXES[1:]:
+                    cur.execute(statement)
+            else:
+                logger.warning("bible.word_relationships not found, skipping alignment view")
+        conn.commit()
+        logger.info("Term statistics views created or already exist")
+        return created
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating term statistics views: {e}")
+        raise
+
+
+def refresh_term_stats(conn, rebuild: bool = False) -> int:
+    """
+    Refresh the term statistics views and bump the ``term_stats`` dataset version.
+
+    Called by the ETL after tagged texts, Arabic words or lexicon relationships
+    are (re)loaded. Refreshes run CONCURRENTLY so readers are never blocked;
+    views created by this call are already populated and are not refreshed again.
+
+    Returns:
+        The new term_stats dataset version
+    """
+    created = create_term_stats_views(conn, rebuild=rebuild)
+    try:
+        with conn.cursor() as cur:
+            for view, is_new in created.items():
+                if is_new:
+                    continue
+                start = time.perf_counter()
+                cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                logger.info(f"Refreshed {view} in {time.perf_counter() - start:.1f}s")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error refreshing term statistics: {e}")
+        raise
+    return mark_dataset_updated(conn, 'term_stats')
+
+
+def refresh_term_stats_after_load(conn) -> Optional[int]:
+    """
+    ``refresh_term_stats`` for the end of an ETL run.
+
+    The loaded data is already committed, so a failed refresh is logged
+    instead of failing the run; the views keep their previous contents until
+    ``python -m src.utils.term_stats`` is run again.
+
+    Returns:
+        The new term_stats dataset version, or None if the refresh failed
+    """
+    try:
+        return refresh_term_stats(conn)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Term statistics were not refreshed ({e}); "
+                     f"run 'python -m src.utils.term_stats' to retry")
+        return None
+
+
+def _default_connection():
+    from .db_utils import get_db_connection
+    return get_db_connection()
+
+
+class TermStatsService:
+    """
+    In-process cache of the term statistics and alignment views.
+
+    Args:
+        connection_factory: Callable returning a DB-API connection
+        check_interval: Seconds between checks of the term_stats data version
+    """
+
+    STATS_COLUMNS = ('strongs_id', 'hebrew_count', 'greek_count', 'arabic_count',
+                     'original_form', 'arabic_form')
+    ALIGNMENT_COLUMNS = ('hebrew_strongs', 'greek_strongs', 'hebrew_form', 'greek_form',
+                         'arabic_form', 'hebrew_count', 'greek_count', 'arabic_count')
+
+    def __init__(self, connection_factory: Optional[Callable] = None,
+                 check_interval: Optional[float] = CHECK_INTERVAL):
+        self.connection_factory = connection_factory or _default_connection
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+        self._alignments: List[dict] = []
+        self._alignments_by_id: Dict[str, List[dict]] = {}
+        self._loaded = False
+        self._version = None
+        self._last_check = 0.0
+
+    def invalidate(self):
+        """Drop the cache; the next lookup reloads it."""
+        with self._lock:
+            self._loaded = False
+            self._last_check = 0.0
+
+    def refresh(self, conn=None) -> int:
+        """
+        Load both views into memory.
+
+        Returns:
+            Number of Strong's IDs with statistics
+        """
+        own_conn = conn is None
+        conn = conn or self.connection_factory()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {', '.join(self.STATS_COLUMNS)} FROM {STATS_VIEW}")
+                stats = {}
+                for row in cur.fetchall():
+                    record = dict(zip(self.STATS_COLUMNS, _row_values(row)))
+                    stats[record['strongs_id']] = record
+                alignments = []
+                if _table_exists(cur, ALIGNMENTS_VIEW):
+                    cur.execute(f"""
+                        SELECT {', '.join(self.ALIGNMENT_COLUMNS)} FROM {ALIGNMENTS_VIEW}
+                        ORDER BY hebrew_count + greek_count + arabic_count DESC,
+                                 hebrew_strongs, greek_strongs
+                    """)
+                    alignments = [dict(zip(self.ALIGNMENT_COLUMNS, _row_values(row)))
+                                  for row in cur.fetchall()]
+            version = get_dataset_version(conn, 'term_stats')
+        finally:
+            if own_conn:
+                conn.close()
+
+        by_id: Dict[str, List[dict]] = {}
+        for alignment in alignments:
+            by_id.setdefault(alignment['hebrew_strongs'], []).append(alignment)
+            by_id.setdefault(alignment['greek_strongs'], []).append(alignment)
+        with self._lock:
+            self._stats = stats
+            self._alignments = alignments
+            self._alignments_by_id = by_id
+            self._version = version
+            self._loaded = True
+            self._last_check = time.monotonic()
+        logger.info(f"Term statistics cache loaded: {len(stats)} IDs, {len(alignments)} alignments")
+        return len(stats)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            # Retry a failed load at most once per check interval
+            if self._last_check and time.monotonic() - self._last_check < (self.check_interval or 0):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                self._last_check = time.monotonic()
+                logger.error(f"Error loading term statistics: {e}")
+            return
+        if self.check_interval is None or time.monotonic() - self._last_check < self.check_interval:
+            return
+        self._last_check = time.monotonic()
+        try:
+            conn = self.connection_factory()
+            try:
+                version = get_dataset_version(conn, 'term_stats')
+                if version != self._version:
+                    logger.info(f"Term statistics version changed ({self._version} -> {version}), reloading")
+                    self.refresh(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Could not check term statistics version: {e}")
+
+    @property
+    def available(self) -> bool:
+        self._ensure_loaded()
+        return self._loaded
+
+    def get_counts(self, strongs_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Get occurrence counts for a batch of Strong's IDs.
+
+        Served from the cache; if the views are not available yet the whole
+        batch is counted with a single grouped query over the tagged texts.
+
+        Args:
+            strongs_ids: IDs in any common form (H0430, H430, h430, H1254a)
+
+        Returns:
+            Dict keyed by the requested ID; unknown IDs get zero counts
+        """
+        self._ensure_loaded()
+        keys = {s: base_strongs_id(s) for s in strongs_ids if s}
+        keys = {s: k for s, k in keys.items() if k}
+        stats = self._stats if self._loaded else self._fetch_counts(set(keys.values()))
+        result = {}
+        for strongs_id, key in keys.items():
+            record = stats.get(key)
+            result[strongs_id] = {
+                'hebrew': record['hebrew_count'] if record else 0,
+                'greek': record['greek_count'] if record else 0,
+                'arabic': record['arabic_count'] if record else 0,
+            }
+        return result
+
+    def _fetch_counts(self, keys: set) -> Dict[str, dict]:
+        if not keys:
+            return {}
+        # Every stored spelling of each base ID (H430, H0430, H430a, ...), so the
+        # strongs_id indexes can serve the lookup
+        variants = [
+            prefix + suffix
+            for key in sorted(keys)
+            for prefix in {key, key[0] + key[1:].zfill(4)}
+            for suffix in ('',) + EXTENDED_SUFFIXES
+        ]
+        stats: Dict[str, dict] = {}
+        conn = self.connection_factory()
+        try:
+            with conn.cursor() as cur:
+                sources = [s for s in TAGGED_TEXT_SOURCES if _table_exists(cur, s[1])]
+                if not sources:
+                    return stats
+                union = " UNION ALL ".join(
+                    f"SELECT '{source}' AS source, strongs_id FROM {table} "
+                    f"WHERE strongs_id = ANY(%s)"
+                    for source, table, _ in sources
+                )
+                cur.execute(f"""
+                    SELECT source, {_SQL_BASE_ID} AS strongs_id, COUNT(*)
+                    FROM ({union}) o, {_SQL_ID_MATCH.format(column='o.strongs_id')}
+                    GROUP BY 1, 2
+                """, [variants] * len(sources))
+                for row in cur.fetchall():
+                    source, key, count = _row_values(row)
+                    record = stats.setdefault(key, {'hebrew_count': 0, 'greek_count': 0, 'arabic_count': 0})
+                    record[f'{source}_count'] = count
+        except Exception as e:
+            logger.error(f"Error counting term occurrences: {e}")
+        finally:
+            conn.close()
+        return stats
+
+    def get_alignments(self, strongs_id: Optional[str] = None, limit: int = 50,
+                       offset: int = 0) -> List[dict]:
+        """
+        Get Hebrew<->Greek<->Arabic alignments, most frequent first.
+
+        Args:
+            strongs_id: Restrict to alignments involving this Hebrew or Greek ID
+            limit: Maximum number of alignments
+            offset: Number of alignments to skip
+
+        Returns:
+            List of alignment dicts (IDs, surface forms and counts)
+        """
+        self._ensure_loaded()
+        if strongs_id:
+            alignments = self._alignments_by_id.get(base_strongs_id(strongs_id) or '', [])
+        else:
+            alignments = self._alignments
+        return [dict(a) for a in alignments[offset:offset + limit]]
+
+
+_service: Optional[TermStatsService] = None
+_service_lock = threading.Lock()
+
+
+def get_term_stats_service() -> TermStatsService:
+    """Return the process-wide TermStatsService, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TermStatsService()
+    return _service
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Create and refresh cross-language term statistics")
+    parser.add_argument("--create-only", action="store_true", help="Create views without refreshing")
+    parser.add_argument("--rebuild", action="store_true", help="Drop and recreate the views")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    conn = _default_connection()
+    try:
+        if args.create_only:
+            create_term_stats_views(conn, rebuild=args.rebuild)
+        else:
+            version = refresh_term_stats(conn, rebuild=args.rebuild)
+            logger.info(f"Term statistics refreshed (version {version})")
+        return 0
+    except Exception as e:
+        logger.error(f"Term statistics refresh failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
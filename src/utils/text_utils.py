@@ -7,6 +7,8 @@ import re
 import logging
 import unicodedata
 
+from .reference_engine import parse
+
 logger = logging.getLogger(__name__)
 
 def normalize_text(text):
@@ -55,34 +57,18 @@ def parse_reference(ref_str):
     Parse a Bible reference string.
     
     Args:
-        ref_str (str): Reference string (e.g., "Gen.1.1", "Mat.5.3")
+        ref_str (str): Reference string (e.g., "Gen.1.1", "Mat.5.3", "Mat.15.6(15.5)")
         
     Returns:
-        tuple: (book, chapter, verse) or None if parsing fails
+        tuple: (book, chapter, verse) with the STEP book abbreviation,
+            or None if parsing fails
     """
-    # Handle various reference formats
-    simple_match = re.match(r'(\w+)\.(\d+)\.(\d+)', ref_str)
-    if simple_match:
-        book, chapter, verse = simple_match.groups()
-        return book, int(chapter), int(verse)
-        
-    # Handle parenthetical alternates (e.g., "Mat.15.6(15.5)")
-    paren_match = re.match(r'(\w+)\.(\d+)\.(\d+)\(\d+\.\d+\)', ref_str)
-    if paren_match:
-        book, chapter, verse = paren_match.groups()
-        return book, int(chapter), int(verse)
-        
-    # Handle square bracket alternates (e.g., "Mat.17.15[17.14]")
-    bracket_match = re.match(r'(\w+)\.(\d+)\.(\d+)\[\d+\.\d+\]', ref_str)
-    if bracket_match:
-        book, chapter, verse = bracket_match.groups()
-        return book, int(chapter), int(verse)
-        
-    # Handle curly brace alternates (e.g., "Rom.16.25{14.24}")
-    brace_match = re.match(r'(\w+)\.(\d+)\.(\d+)\{\d+\.\d+\}', ref_str)
-    if brace_match:
-        book, chapter, verse = brace_match.groups()
-        return book, int(chapter), int(verse)
-        
-    logger.warning(f"Failed to parse reference: {ref_str}")
-    return None 
\ No newline at end of file
+    # Alternate versification markers ("(15.5)", "[17.14]", "{14.24}") are
+    # ignored by the engine; word suffixes such as "#01=NKO" are dropped here
+    parsed = parse(ref_str) if ref_str else None
+    if parsed is None and ref_str and '#' in ref_str:
+        parsed = parse(ref_str.split('#', 1)[0])
+    if parsed is None:
+        logger.warning(f"Failed to parse reference: {ref_str}")
+        return None
+    return parsed.book_abbreviation, parsed.chapter, parsed.verse
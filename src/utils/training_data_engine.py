@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Template-Driven Training Data Engine
+
+Generates question-answer training examples from the database with
+declarative templates instead of one handcrafted query per verse or term.
+
+Each source table is read once through a named (server-side) cursor,
+``batch_size`` rows at a time. Every batch becomes a DataFrame and every
+template that applies to the source's data type is expanded over the whole
+batch at once: placeholders are filled by concatenating columns, ``requires``
+drops rows with empty fields and ``when`` (a pandas expression) selects rows.
+Candidates are hashed in bulk and checked against a sorted-run index of
+uint64 hashes (8 bytes per kept example), so duplicates within and across
+sources are dropped as the data streams through. Memory use is one batch plus
+the hash index, whatever the corpus size.
+
+Data types and their sources:
+    verse       bible.verses
+    lexeme      bible.hebrew_ot_words / bible.greek_nt_words joined to their lexicons
+    name        bible.proper_names with forms and references
+    morphology  bible.hebrew_morphology_codes / bible.greek_morphology_codes
+
+Templates can be replaced with a JSON file of the same shape as TEMPLATES
+({"verse": [{"name": ..., "question": ..., "answer": ...}, ...], ...}).
+
+Configuration (environment):
+    TRAINING_DATA_BATCH_SIZE   Rows fetched per round trip (default: 5000)
+
+Usage:
+    engine = TrainingDataEngine()
+    with open(path, 'w', encoding='utf-8') as f:
+        stats = engine.write_jsonl(conn, f, limit=None)
+
+    python -m src.utils.training_data_engine output.jsonl [--limit N] [--templates t.json]
+"""
+
+import os
+import sys
+import json
+import string
+import logging
+import argparse
+import contextlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .lexicon_service import LEXICON_TABLES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv('TRAINING_DATA_BATCH_SIZE', '5000'))
+
+DATA_TYPES = ('verse', 'lexeme', 'name', 'morphology')
+
+# Example fields that are rendered from templates; everything else is metadata
+EXAMPLE_FIELDS = ('context', 'question', 'answer')
+
+# Columns copied into each example's metadata when the source has them
+METADATA_COLUMNS = ('book_name', 'chapter_num', 'verse_num', 'translation_source', 'strongs_id', 'language',
+                    'code', 'name')
+METADATA_KEYS = {'book_name': 'book', 'chapter_num': 'chapter', 'verse_num': 'verse',
+                 'translation_source': 'translation'}
+
+
+@dataclass(frozen=True)
+class QuestionTemplate:
+    """
+    One question pattern for a data type.
+
+    ``question``, ``answer`` and ``context`` are format strings over the
+    source's columns (plus ``reference`` for sources with verse columns).
+
+    Args:
+        requires: Columns that must be non-empty (default: every placeholder)
+        when: pandas expression selecting the rows the template applies to
+        dedup_on: Example fields that identify a duplicate
+    """
+    name: str
+    data_type: str
+    question: str
+    answer: str
+    context: str = ''
+    qa_type: str = 'factual'
+    requires: Optional[Tuple[str, ...]] = None
+    when: Optional[str] = None
+    dedup_on: Tuple[str, ...] = EXAMPLE_FIELDS
+
+    def __post_init__(self):
+        if self.data_type not in DATA_TYPES:
+            raise ValueError(f"Unknown data type: {self.data_type}")
+        unknown = set(self.dedup_on) - set(EXAMPLE_FIELDS)
+        if unknown:
+            raise ValueError(f"dedup_on must name example fields, not {sorted(unknown)}")
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        names = []
+        for text in (self.question, self.answer, self.context):
+            names.extend(f for _, f, _, _ in string.Formatter().parse(text) if f)
+        return tuple(dict.fromkeys(names))
+
+    @property
+    def required(self) -> Tuple[str, ...]:
+        return self.requires if self.requires is not None else self.placeholders
+
+    @classmethod
+    def from_dict(cls, data_type: str, spec: Dict[str, Any]) -> 'QuestionTemplate':
+        spec = dict(spec)
+        for key in ('requires', 'dedup_on'):
+            if spec.get(key) is not None:
+                spec[key] = tuple(spec[key])
+        return cls(data_type=data_type, **spec)
+
+
+def _t(data_type: str, name: str, question: str, answer: str, **kwargs) -> QuestionTemplate:
+    return QuestionTemplate(name=name, data_type=data_type, question=question, answer=answer, **kwargs)
+
+
+def _verse_is(book: str, chapter: int, verse: int) -> str:
+    return f"book_name == '{book}' and chapter_num == {chapter} and verse_num == {verse}"
+
+
+VERSE_CONTEXT = "{verse_text}"
+WORD_CONTEXT = "{language} word '{word_text}' (Strong's ID: {strongs_id}) in {reference}"
+
+TEMPLATES: Dict[str, List[QuestionTemplate]] = {
+    'verse': [
+        # Curated questions about well-known verses
+        _t('verse', 'creation_who', "Who created the heavens and the earth?", "God",
+           context=VERSE_CONTEXT, when=_verse_is('Genesis', 1, 1)),
+        _t('verse', 'creation_what', "What did God create in the beginning?", "The heavens and the earth",
+           context=VERSE_CONTEXT, when=_verse_is('Genesis', 1, 1)),
+        _t('verse', 'john_gift', "What did God give because of his love for the world?", "His one and only Son",
+           context=VERSE_CONTEXT, qa_type='theological', when=_verse_is('John', 3, 16)),
+        _t('verse', 'john_why', "Why did God give his one and only Son?", "Because he loved the world",
+           context=VERSE_CONTEXT, qa_type='theological', when=_verse_is('John', 3, 16)),
+        _t('verse', 'psalm_shepherd', "Who is the psalmist's shepherd?", "The LORD",
+           context=VERSE_CONTEXT, qa_type='theological', when=_verse_is('Psalms', 23, 1)),
+        # Every verse
+        _t('verse', 'verse_text', "What does {reference} say?", "{verse_text}", context=VERSE_CONTEXT,
+           requires=('verse_text',), dedup_on=('question', 'answer')),
+        _t('verse', 'verse_reference', "Which verse says: \"{verse_text}\"?", "{reference}",
+           qa_type='reference', requires=('verse_text',), dedup_on=('question',)),
+    ],
+    'lexeme': [
+        _t('lexeme', 'lexeme_meaning', "What is the meaning of the {language} word '{transliteration}'?",
+           "{gloss}", context=WORD_CONTEXT, qa_type='lexical', dedup_on=('question', 'answer')),
+        _t('lexeme', 'lexeme_strongs', "What is the Strong's number of the {language} word '{word_text}' in {reference}?",
+           "{strongs_id}", context=WORD_CONTEXT, qa_type='lexical'),
+        _t('lexeme', 'lexeme_definition', "How does the lexicon define {strongs_id} ({transliteration})?",
+           "{definition}", context="{language} lexicon entry {strongs_id}: {lemma}", qa_type='lexical',
+           dedup_on=('question',)),
+        _t('lexeme', 'lexeme_parsing', "What is the grammatical form of '{word_text}' in {reference}?",
+           "{grammar_code}", context=WORD_CONTEXT, qa_type='morphology'),
+    ],
+    'name': [
+        _t('name', 'name_who', "Who or what is {name} in the Bible?", "{short_description}",
+           context="{name} ({type})", qa_type='entity', dedup_on=('question',)),
+        _t('name', 'name_form', "What is the {language} form of the name {name}?", "{form}",
+           context="{name}: {language} {form} ({transliteration}, {strongs_id})", qa_type='entity',
+           dedup_on=('question', 'answer')),
+        _t('name', 'name_mention', "Which name is mentioned in {name_reference}: \"{name_context}\"?", "{name}",
+           context="{name_context}", qa_type='entity', dedup_on=('question', 'answer')),
+    ],
+    'morphology': [
+        _t('morphology', 'morphology_code', "What does the {language} morphology code {code} mean?",
+           "{description}", context="{language} morphology code {code}: {explanation}", qa_type='morphology',
+           requires=('code', 'description'), dedup_on=('question',)),
+        _t('morphology', 'morphology_lookup', "Which {language} morphology code means \"{description}\"?",
+           "{code}", qa_type='morphology', dedup_on=('question',)),
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Source:
+    """One streamed query; its rows feed the templates of ``data_type``."""
+    name: str
+    data_type: str
+    sql: str
+
+
+def _lexeme_source(language: str, words_table: str) -> Source:
+    entries_table, lemma_column = LEXICON_TABLES[language]
+    return Source(f"{language}_words", 'lexeme', f"""
+        SELECT w.book_name, w.chapter_num, w.verse_num, w.word_text, w.strongs_id, w.grammar_code,
+               e.{lemma_column} AS lemma, e.transliteration, e.gloss, e.definition,
+               '{language.capitalize()}' AS language
+        FROM {words_table} w
+        JOIN {entries_table} e ON e.strongs_id = w.strongs_id
+    """)
+
+
+def _morphology_source(language: str) -> Source:
+    return Source(f"{language}_morphology", 'morphology', f"""
+        SELECT code, code_type, description, explanation, example, '{language.capitalize()}' AS language
+        FROM bible.{language}_morphology_codes
+    """)
+
+
+SOURCES: List[Source] = [
+    Source('verses', 'verse', """
+        SELECT book_name, chapter_num, verse_num, verse_text, translation_source
+        FROM bible.verses
+    """),
+    _lexeme_source('hebrew', 'bible.hebrew_ot_words'),
+    _lexeme_source('greek', 'bible.greek_nt_words'),
+    Source('proper_names', 'name', """
+        SELECT n.name, n.type, n.gender, n.short_description, f.language, f.form,
+               f.transliteration, f.strongs_id, r.reference AS name_reference, r.context AS name_context
+        FROM bible.proper_names n
+        JOIN bible.proper_name_forms f ON f.proper_name_id = n.id
+        LEFT JOIN bible.proper_name_references r ON r.proper_name_form_id = f.id
+    """),
+    _morphology_source('hebrew'),
+    _morphology_source('greek'),
+]
+
+
+def load_templates(path: str) -> Dict[str, List[QuestionTemplate]]:
+    """Templates from a JSON file keyed by data type."""
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    return {data_type: [QuestionTemplate.from_dict(data_type, t) for t in templates]
+            for data_type, templates in spec.items()}
+
+
+class HashIndex:
+    """
+    Set of uint64 hashes kept as sorted numpy runs.
+
+    New hashes become a sorted run; runs of similar size are merged (like a
+    binary counter), so there are O(log n) runs and lookups are vectorized
+    binary searches.
+    """
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(run.nbytes for run in self._runs)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, hashes)
+            pos[pos == len(run)] = 0
+            found |= run[pos] == hashes
+        return found
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Add hashes and return a mask of those not seen before (first occurrence only)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        _, first = np.unique(hashes, return_index=True)
+        new = np.zeros(len(hashes), dtype=bool)
+        new[first] = True
+        new &= ~self.contains(hashes)
+        if new.any():
+            run = np.sort(hashes[new])
+            while self._runs and len(self._runs[-1]) <= len(run):
+                run = np.union1d(self._runs.pop(), run)
+            self._runs.append(run)
+        return new
+
+
+def _text(values: pd.Series) -> pd.Series:
+    return values.where(values.notna(), '').astype(str).str.strip()
+
+
+def as_text(frame: pd.DataFrame) -> pd.DataFrame:
+    """Every column as stripped strings (missing values become ''), computed once per batch."""
+    return pd.DataFrame({column: _text(frame[column]) for column in frame.columns}, index=frame.index)
+
+
+def render(template: str, text: pd.DataFrame) -> pd.Series:
+    """Fill a format string for every row by concatenating literal parts and text columns."""
+    result = pd.Series('', index=text.index, dtype=object)
+    for literal, field_name, _, _ in string.Formatter().parse(template):
+        if literal:
+            result = result + literal
+        if field_name:
+            result = result + text[field_name]
+    return result
+
+
+def with_references(frame: pd.DataFrame) -> pd.DataFrame:
+    """Add a ``reference`` column ("Genesis 1:1") when the rows carry verse columns."""
+    if {'book_name', 'chapter_num', 'verse_num'} <= set(frame.columns) and 'reference' not in frame:
+        frame = frame.assign(reference=_text(frame['book_name']) + ' ' + _text(frame['chapter_num'])
+                             + ':' + _text(frame['verse_num']))
+    return frame
+
+
+def expand(template: QuestionTemplate, frame: pd.DataFrame, text: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """All examples a template produces from a batch, as a DataFrame (``text`` is as_text(frame))."""
+    missing = [c for c in template.placeholders if c not in frame.columns]
+    if missing:
+        raise KeyError(f"Template {template.name} uses columns missing from the source: {missing}")
+    if text is None:
+        text = as_text(frame)
+    mask = np.ones(len(frame), dtype=bool)
+    for column in template.required:
+        mask &= (text[column] != '').to_numpy()
+    if template.when:
+        mask &= frame.eval(template.when, engine='python').to_numpy(dtype=bool)
+    rows = text[mask]
+    out = pd.DataFrame({
+        'context': render(template.context, rows),
+        'question': render(template.question, rows),
+        'answer': render(template.answer, rows),
+    }, index=rows.index)
+    for column in METADATA_COLUMNS:
+        if column in frame.columns:
+            out[METADATA_KEYS.get(column, column)] = frame[column][mask]
+    out['type'] = template.qa_type
+    out['template'] = template.name
+    return out.reset_index(drop=True)
+
+
+def example_hashes(examples: pd.DataFrame, fields: Sequence[str]) -> np.ndarray:
+    """uint64 hashes of the normalised (case- and whitespace-insensitive) example fields."""
+    normalised = pd.DataFrame({
+        f: [' '.join(value.lower().split()) for value in examples[f].tolist()] for f in fields
+    })
+    # The field set is part of the key, so templates deduplicated on different fields never collide
+    normalised['_fields'] = '|'.join(fields)
+    return pd.util.hash_pandas_object(normalised, index=False).to_numpy(dtype=np.uint64)
+
+
+def to_records(examples: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+    """DSPy QA records: context, question, answer and a metadata dict."""
+    metadata_columns = [c for c in examples.columns if c not in EXAMPLE_FIELDS]
+    # Column lists hold plain Python values, so rows need no per-value conversion
+    columns = [examples[c].tolist() for c in EXAMPLE_FIELDS]
+    metadata_values = [examples[c].astype(object).where(examples[c].notna(), None).tolist()
+                       for c in metadata_columns]
+    for i, (context, question, answer) in enumerate(zip(*columns)):
+        metadata = {c: values[i] for c, values in zip(metadata_columns, metadata_values) if values[i] is not None}
+        yield {'context': context, 'question': question, 'answer': answer, 'metadata': metadata}
+
+
+def stream_batches(conn, source: Source, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """Rows of a source as DataFrames of up to ``batch_size`` rows, from one named cursor."""
+    # Server-side cursors need a transaction; autocommit connections get one for the pass
+    transaction = conn.transaction() if getattr(conn, 'autocommit', False) and hasattr(conn, 'transaction') \
+        else contextlib.nullcontext()
+    with transaction, conn.cursor(name=f"training_{source.name}") as cur:
+        cur.itersize = batch_size
+        cur.execute(source.sql)
+        columns = None
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            if columns is None:
+                columns = [d[0] for d in cur.description]
+            yield pd.DataFrame.from_records(batch, columns=columns)
+
+
+class TrainingDataEngine:
+    """
+    Streams sources through templates into deduplicated examples.
+
+    Args:
+        templates: Templates keyed by data type (default: TEMPLATES)
+        sources: Queries to stream (default: SOURCES)
+        batch_size: Rows per fetch and per vectorized expansion
+        max_per_template: Cap on examples from any one template
+    """
+
+    def __init__(self, templates: Optional[Dict[str, List[QuestionTemplate]]] = None,
+                 sources: Optional[Sequence[Source]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_per_template: Optional[int] = None):
+        self.templates = templates if templates is not None else TEMPLATES
+        self.sources = list(sources if sources is not None else SOURCES)
+        self.batch_size = batch_size
+        self.max_per_template = max_per_template
+        self.seen = HashIndex()
+        self.stats: Dict[str, Any] = {'rows': 0, 'candidates': 0, 'duplicates': 0, 'examples': 0,
+                                      'per_template': {}, 'failed_sources': []}
+
+    def _take(self, name: str, examples: pd.DataFrame) -> pd.DataFrame:
+        if self.max_per_template is None:
+            return examples
+        taken = self.stats['per_template'].get(name, 0)
+        return examples.head(max(self.max_per_template - taken, 0))
+
+    def examples_from_batch(self, data_type: str, frame: pd.DataFrame) -> pd.DataFrame:
+        """Expand every template of a data type over one batch and drop duplicates."""
+        frame = with_references(frame)
+        text = as_text(frame)
+        kept = []
+        for template in self.templates.get(data_type, []):
+            examples = expand(template, frame, text)
+            if examples.empty:
+                continue
+            self.stats['candidates'] += len(examples)
+            new = self.seen.add_new(example_hashes(examples, template.dedup_on))
+            self.stats['duplicates'] += int((~new).sum())
+            examples = self._take(template.name, examples[new])
+            if examples.empty:
+                continue
+            per_template = self.stats['per_template']
+            per_template[template.name] = per_template.get(template.name, 0) + len(examples)
+            kept.append(examples)
+        if not kept:
+            return pd.DataFrame(columns=list(EXAMPLE_FIELDS))
+        return pd.concat(kept, ignore_index=True)
+
+    def iter_examples(self, conn, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield example records, one streamed pass per source.
+
+        A source that fails (e.g. a table that is not loaded) is logged and
+        skipped. Stops as soon as ``limit`` examples have been produced.
+        """
+        for source in self.sources:
+            if not self.templates.get(source.data_type):
+                continue
+            logger.info(f"Generating {source.data_type} examples from {source.name}")
+            try:
+                for frame in stream_batches(conn, source, self.batch_size):
+                    self.stats['rows'] += len(frame)
+                    examples = self.examples_from_batch(source.data_type, frame)
+                    if limit is not None:
+                        examples = examples.head(limit - self.stats['examples'])
+                    self.stats['examples'] += len(examples)
+                    yield from to_records(examples)
+                    if limit is not None and self.stats['examples'] >= limit:
+                        return
+            except Exception as e:
+                logger.error(f"Error generating examples from {source.name}: {e}")
+                self.stats['failed_sources'].append(source.name)
+                rollback = getattr(conn, 'rollback', None)
+                if rollback is not None and not getattr(conn, 'autocommit', False):
+                    rollback()
+
+    def write_jsonl(self, conn, out: TextIO, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Write examples as JSON lines while they are generated; returns the stats."""
+        for record in self.iter_examples(conn, limit=limit):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stats['hash_index_bytes'] = self.seen.nbytes
+        return self.stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate template-based QA training data")
+    parser.add_argument('output', help="JSONL file to write")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after this many examples")
+    parser.add_argument('--max-per-template', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--templates', help="JSON file replacing the built-in templates")
+    args = parser.parse_args(argv)
+
+    from .db_utils import get_db_connection
+
+    templates = load_templates(args.templates) if args.templates else None
+    engine = TrainingDataEngine(templates, batch_size=args.batch_size, max_per_template=args.max_per_template)
+    conn = get_db_connection()
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            stats = engine.write_jsonl(conn, f, limit=args.limit)
+    finally:
+        conn.close()
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -14,6 +14,7 @@ from dotenv import load_dotenv
 
 from src.database.connection import get_db_connection
 from src.database.secure_connection import get_secure_connection
+from .verse_keys import verse_key
 
 # Configure logging
 logging.basicConfig(
@@ -188,22 +189,25 @@ def get_verse_by_reference(
                 logger.error(f"Failed to connect with secure_connection: {e}")
                 return None
         
+        key = verse_key(book_name, chapter_num, verse_num)
+        if key is None:
+            logger.warning(f"Unknown book name: {book_name}")
+            conn.close()
+            return None
+        
         cursor = conn.cursor()
         
-        # Execute the query
+        # Execute the query (single index probe on verse_key)
         query = """
-        SELECT v.verse_id, b.book_name, v.chapter_num, v.verse_num, 
+        SELECT v.id AS verse_id, v.book_name, v.chapter_num, v.verse_num, 
                v.verse_text, v.translation_source
         FROM bible.verses v
-        JOIN bible.books b ON v.book_id = b.book_id
-        WHERE b.book_name = %s
-        AND v.chapter_num = %s
-        AND v.verse_num = %s
+        WHERE v.verse_key = %s
         AND v.translation_source = %s
         LIMIT 1
         """
         
-        cursor.execute(query, (book_name, chapter_num, verse_num, translation))
+        cursor.execute(query, (key, translation))
         result = cursor.fetchone()
         
         # Close the connection
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Verse Key Subsystem
+
+Adds a canonical integer ``verse_key`` column (packed as
+``book * 1_000_000 + chapter * 1_000 + verse``, see reference_engine) to the
+verse-addressed tables, keeps it populated with a trigger (which also resolves
+book spellings it has not seen before), backfills existing rows in batches,
+and builds covering B-tree indexes so that single-verse and range reads become
+index range scans instead of book-name string matching.
+
+``make etl-texts`` (and so ``make etl``) runs this after loading verses and
+words, so a freshly loaded database always has the column filled.
+
+Usage:
+    python -m src.utils.verse_keys [--table TABLE] [--batch-size N] [--skip-indexes]
+
+Options:
+    --table          Only process one table (e.g. bible.verses)
+    --batch-size     Number of rows updated per transaction (default: 50000)
+    --skip-indexes   Backfill without (re)creating indexes
+"""
+
+import sys
+import logging
+import argparse
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .reference_engine import BOOK_FACTOR, CHAPTER_FACTOR, book_aliases, merge_key_ranges, parse, resolve_book
+
+logger = logging.getLogger(__name__)
+
+# Tables that carry (book_name, chapter_num, verse_num) and get a verse_key,
+# with the covering indexes that serve their hot lookups
+VERSE_KEY_TABLES = {
+    'bible.verses': [
+        ('idx_verses_verse_key', '(verse_key, translation_source) INCLUDE (id)'),
+    ],
+    'bible.greek_nt_words': [
+        ('idx_greek_nt_words_verse_key', '(verse_key, word_num) INCLUDE (strongs_id)'),
+        ('idx_greek_nt_words_strongs_verse_key', '(strongs_id, verse_key)'),
+    ],
+    'bible.hebrew_ot_words': [
+        ('idx_hebrew_ot_words_verse_key', '(verse_key, word_num) INCLUDE (strongs_id)'),
+        ('idx_hebrew_ot_words_strongs_verse_key', '(strongs_id, verse_key)'),
+    ],
+    'bible.verse_embeddings': [
+        ('idx_verse_embeddings_verse_key', '(verse_key, translation_source) INCLUDE (verse_id)'),
+    ],
+}
+
+# SQL mirror of reference_engine.book_key, so the trigger can resolve spellings
+# that are not yet in bible.verse_key_books
+VERSE_BOOK_KEY_FUNCTION = r"""
+    CREATE OR REPLACE FUNCTION bible.verse_book_key(name TEXT) RETURNS TEXT AS $$
+    DECLARE
+        key TEXT := lower(regexp_replace(name, '^\s+|\s+$', '', 'g'));
+        prefix TEXT := substring(key from '^(iii|ii|i|first|second|third|1st|2nd|3rd)\s+');
+    BEGIN
+        IF prefix IS NOT NULL THEN
+            key := CASE
+                       WHEN prefix IN ('i', 'first', '1st') THEN '1'
+                       WHEN prefix IN ('ii', 'second', '2nd') THEN '2'
+                       ELSE '3'
+                   END || regexp_replace(key, '^(iii|ii|i|first|second|third|1st|2nd|3rd)\s+', '');
+        END IF;
+        RETURN regexp_replace(key, '[\s.'']+', '', 'g');
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+SET_VERSE_KEY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION bible.set_verse_key() RETURNS trigger AS $$
+    DECLARE
+        book SMALLINT;
+    BEGIN
+        SELECT b.book_number INTO book
+          FROM bible.verse_key_books b
+         WHERE b.book_name = NEW.book_name;
+        IF book IS NULL AND NEW.book_name IS NOT NULL THEN
+            -- A spelling not seen before: resolve it through the engine's aliases and remember it
+            SELECT a.book_number INTO book
+              FROM bible.verse_key_book_aliases a
+             WHERE a.alias = bible.verse_book_key(NEW.book_name);
+            IF book IS NOT NULL THEN
+                INSERT INTO bible.verse_key_books (book_name, book_number)
+                VALUES (NEW.book_name, book)
+                ON CONFLICT (book_name) DO NOTHING;
+            END IF;
+        END IF;
+        NEW.verse_key := book * {book} + NEW.chapter_num * {chapter} + NEW.verse_num;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+""".format(book=BOOK_FACTOR, chapter=CHAPTER_FACTOR)
+
+
+def verse_key(book, chapter: int, verse: int) -> Optional[int]:
+    """
+    Return the verse_key for a book/chapter/verse, or None if the book is unknown.
+
+    Accepts any spelling understood by the reference engine ("Gen", "Genesis",
+    "1 Jn", "1Jn", ...), so callers never need ILIKE or LOWER() on book names.
+    """
+    book_num = resolve_book(book)
+    if book_num is None or chapter is None or verse is None:
+        return None
+    return book_num * BOOK_FACTOR + int(chapter) * CHAPTER_FACTOR + int(verse)
+
+
+def reference_key_ranges(references: Iterable[str]) -> List[Tuple[int, int]]:
+    """
+    Map reference strings to merged, sorted inclusive verse_key ranges.
+
+    Args:
+        references: Reference strings (e.g. ["John 3:16-18", "Rom 8:28, 31"])
+
+    Returns:
+        List of (start_key, end_key) tuples; unparseable references are skipped
+    """
+    ranges = []
+    for ref in references:
+        parsed = parse(ref) if isinstance(ref, str) else None
+        if parsed is None:
+            logger.debug(f"Skipping unparseable reference: {ref}")
+            continue
+        ranges.extend(parsed.key_ranges())
+    return merge_key_ranges(ranges)
+
+
+def key_range_condition(column: str, ranges: Sequence[Tuple[int, int]]) -> Tuple[str, list]:
+    """
+    Build a SQL condition and parameters selecting the given verse_key ranges.
+
+    Single verses use equality; everything else uses BETWEEN, so each range is
+    one index range scan.
+
+    Args:
+        column: Qualified column name (e.g. "v.verse_key")
+        ranges: Inclusive (start, end) key ranges
+
+    Returns:
+        Tuple of (sql_fragment, params); an empty range list yields "FALSE"
+    """
+    if not ranges:
+        return "FALSE", []
+    clauses = []
+    params: list = []
+    for start, end in ranges:
+        if start == end:
+            clauses.append(f"{column} = %s")
+            params.append(start)
+        else:
+            clauses.append(f"{column} BETWEEN %s AND %s")
+            params.extend((start, end))
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def _row_values(row) -> list:
+    # Works for both tuple cursors and RealDictCursor connections
+    return list(row.values()) if hasattr(row, 'keys') else list(row)
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return bool(_row_values(cur.fetchone())[0])
+
+
+def sync_book_mapping(conn, tables: Iterable[str] = VERSE_KEY_TABLES) -> int:
+    """
+    Populate bible.verse_key_books with every book_name spelling found in the tables.
+
+    The DB mixes full names ("Genesis") and STEP abbreviations ("Gen"); each
+    distinct spelling is resolved once through the reference engine. The
+    engine's alias table is copied to bible.verse_key_book_aliases so the
+    trigger can resolve spellings that later loads introduce.
+
+    Returns:
+        Number of book spellings mapped
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS bible.verse_key_books (
+                book_name TEXT PRIMARY KEY,
+                book_number SMALLINT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS bible.verse_key_book_aliases (
+                alias TEXT PRIMARY KEY,
+                book_number SMALLINT NOT NULL
+            )
+        """)
+        for alias, book_num in sorted(book_aliases().items()):
+            cur.execute("""
+                INSERT INTO bible.verse_key_book_aliases (alias, book_number)
+                VALUES (%s, %s)
+                ON CONFLICT (alias) DO UPDATE SET book_number = EXCLUDED.book_number
+            """, (alias, book_num))
+        names = set()
+        for table in tables:
+            if _table_exists(cur, table):
+                cur.execute(f"SELECT DISTINCT book_name FROM {table}")
+                names.update(_row_values(row)[0] for row in cur.fetchall())
+        rows = []
+        for name in sorted(n for n in names if n):
+            book_num = resolve_book(name)
+            if book_num is None:
+                logger.warning(f"No verse_key mapping for book name '{name}'")
+                continue
+            rows.append((name, book_num))
+        for name, book_num in rows:
+            cur.execute("""
+                INSERT INTO bible.verse_key_books (book_name, book_number)
+                VALUES (%s, %s)
+                ON CONFLICT (book_name) DO UPDATE SET book_number = EXCLUDED.book_number
+            """, (name, book_num))
+    conn.commit()
+    logger.info(f"Mapped {len(rows)} book name spellings to book numbers")
+    return len(rows)
+
+
+def create_verse_key_columns(conn, tables: Iterable[str] = VERSE_KEY_TABLES):
+    """Add the verse_key column and its maintenance trigger to each table."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(VERSE_BOOK_KEY_FUNCTION)
+            cur.execute(SET_VERSE_KEY_FUNCTION)
+            for table in tables:
+                if not _table_exists(cur, table):
+                    logger.warning(f"Table {table} does not exist, skipping")
+                    continue
+                trigger = f"trg_{table.split('.')[-1]}_verse_key"
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS verse_key INTEGER")
+                cur.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+                cur.execute(f"""
+                    CREATE TRIGGER {trigger}
+                    BEFORE INSERT OR UPDATE OF book_name, chapter_num, verse_num ON {table}
+                    FOR EACH ROW EXECUTE FUNCTION bible.set_verse_key()
+                """)
+        conn.commit()
+        logger.info("verse_key columns and triggers created or already exist")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating verse_key columns: {e}")
+        raise
+
+
+def backfill_verse_keys(conn, table: str, batch_size: int = 50000) -> int:
+    """
+    Populate verse_key for existing rows of a table in id-ordered batches.
+
+    Each batch is its own transaction so the backfill can be interrupted and
+    resumed; rows that already hold the correct key are not rewritten.
+
+    Returns:
+        Number of rows updated
+    """
+    updated = 0
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM {table}")
+        low, high = _row_values(cur.fetchone())
+        for start in range(low, high + 1, batch_size):
+            cur.execute(f"""
+                UPDATE {table} t
+                   SET verse_key = b.book_number * {BOOK_FACTOR} + t.chapter_num * {CHAPTER_FACTOR} + t.verse_num
+                  FROM bible.verse_key_books b
+                 WHERE b.book_name = t.book_name
+                   AND t.id BETWEEN %s AND %s
+                   AND t.verse_key IS DISTINCT FROM
+                       b.book_number * {BOOK_FACTOR} + t.chapter_num * {CHAPTER_FACTOR} + t.verse_num
+            """, (start, start + batch_size - 1))
+            updated += cur.rowcount
+            conn.commit()
+        cur.execute(f"SELECT COUNT(*) FROM {table} WHERE verse_key IS NULL")
+        missing = _row_values(cur.fetchone())[0]
+    if missing:
+        logger.warning(f"{table}: {missing} rows still have no verse_key (unmapped book names)")
+    logger.info(f"{table}: backfilled {updated} rows")
+    return updated
+
+
+def create_verse_key_indexes(conn, tables: Iterable[str] = VERSE_KEY_TABLES):
+    """Create the covering B-tree indexes on verse_key and analyze the tables."""
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                if not _table_exists(cur, table):
+                    continue
+                for index_name, definition in VERSE_KEY_TABLES[table]:
+                    cur.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} {definition}")
+                cur.execute(f"ANALYZE {table}")
+        conn.commit()
+        logger.info("verse_key indexes created or already exist")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating verse_key indexes: {e}")
+        raise
+
+
+def setup_verse_keys(conn, tables: Optional[Sequence[str]] = None, batch_size: int = 50000,
+                     create_indexes: bool = True) -> dict:
+    """
+    Run the full verse_key setup: mapping table, columns, trigger, backfill, indexes.
+
+    Safe to re-run; ETL scripts can call it after loading new verses or words.
+
+    Returns:
+        Dict of table name to number of rows backfilled
+    """
+    tables = list(tables or VERSE_KEY_TABLES)
+    sync_book_mapping(conn, tables)
+    create_verse_key_columns(conn, tables)
+    results = {}
+    with conn.cursor() as cur:
+        existing = [t for t in tables if _table_exists(cur, t)]
+    for table in existing:
+        results[table] = backfill_verse_keys(conn, table, batch_size)
+    if create_indexes:
+        create_verse_key_indexes(conn, existing)
+    return results
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Add and backfill verse_key columns")
+    parser.add_argument("--table", choices=sorted(VERSE_KEY_TABLES), help="Only process one table")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per update batch")
+    parser.add_argument("--skip-indexes", action="store_true", help="Do not create indexes")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    from src.database.connection import get_db_connection
+
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Could not connect to database")
+        return 1
+    try:
+        results = setup_verse_keys(
+            conn,
+            tables=[args.table] if args.table else None,
+            batch_size=args.batch_size,
+            create_indexes=not args.skip_indexes,
+        )
+        for table, count in results.items():
+            logger.info(f"{table}: {count} rows updated")
+        return 0
+    except Exception as e:
+        logger.error(f"verse_key setup failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@ Web application for STEPBible lexicons and tagged Bible texts.
 
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
 import psycopg2
 import psycopg2.extras
 from dotenv import load_dotenv
@@ -22,7 +22,7 @@ from scripts.log_user_interactions import log_web_interaction, log_question_answ
 from api.external_resources_api import external_resources_bp
 
 # Import the cross-language API blueprint
-from src.api.cross_language_api import api_blueprint as cross_language_api
+from src.api.cross_language_api import api_blueprint as cross_language_api, MAPPINGS as CROSS_LANGUAGE_MAPPINGS
 
 # Import the new API
 from src.api.vector_search_api import vector_search_api
@@ -33,6 +33,20 @@ from src.api.comprehensive_search import comprehensive_search_api
 # Import DSPy API
 from src.api.dspy_api import api_blueprint as dspy_api
 
+# Import the Bible data API and the service layer the routes below share with it
+from src.api.bible_data_api import bible_data_api
+from src.services import get_bible_data_service, ServiceError
+from src.services.fanout import FanOut, fan_out, fetch_json
+from src.services.export import CONCORDANCE_COLUMNS, EXPORT_FORMATS, streaming_export
+from src.services.request_metrics import UNTRACKED_PATHS, InteractionLog, RequestMetrics, track_upstream
+from src.services.response_cache import get_response_cache, skip_response_cache
+
+# Server-sent event helpers for streamed DSPy answers
+from src.utils.answer_stream import SSE_HEADERS, parse_sse
+
+# Packed integer verse keys for indexed verse lookups
+from src.utils.verse_keys import verse_key
+
 # Load environment variables
 load_dotenv()
 
@@ -54,6 +68,12 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key')
 # Create necessary directories for logging
 ensure_directories()
 
+# Request timing, upstream call counts and /metrics; page interactions are
+# sampled for DSPy training data and written on a background thread
+interaction_log = InteractionLog(log_web_interaction)
+request_metrics = RequestMetrics(interaction_log=interaction_log)
+request_metrics.init_app(app)
+
 # Register the external resources blueprint
 app.register_blueprint(external_resources_bp)
 
@@ -69,10 +89,24 @@ app.register_blueprint(comprehensive_search_api, url_prefix='/api/comprehensive'
 # Register the DSPy API
 app.register_blueprint(dspy_api, url_prefix='/api/dspy')
 
+# Register the Bible data API
+app.register_blueprint(bible_data_api, url_prefix='/api')
+
 # API Base URL - use local host if running on same server
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:5000')
 logger.info(f"Using API Base URL: {API_BASE_URL}")
 
+# Data backend for the page routes: queries run in-process unless
+# BIBLE_DATA_BACKEND=http points them at the API server above
+bible_data = get_bible_data_service()
+logger.info(f"Using {'remote' if bible_data.is_remote else 'in-process'} Bible data backend")
+
+# Read-only pages are cached until an ETL load bumps the data version
+response_cache = get_response_cache()
+
+# External resources (commentaries, manuscripts, ...) API - defaults to the API server
+EXTERNAL_API_URL = os.getenv('EXTERNAL_API_URL', API_BASE_URL).rstrip('/')
+
 # DSPy API Base URL - points to the standalone DSPy server
 DSPY_API_URL = os.getenv('DSPY_API_URL', 'http://localhost:5003')
 logger.info(f"Using DSPy API URL: {DSPY_API_URL}")
@@ -83,19 +117,15 @@ _api_checked = False
 
 @app.before_request
 def check_api_connection():
-    """Verify API connection is available before processing any request."""
-    if request.endpoint == 'static':
+    """Verify the remote API server is available; the in-process backend needs no check."""
+    if not bible_data.is_remote or request.endpoint == 'static':
         return  # Skip for static assets
         
-    try:
-        # Catch the health check endpoint to avoid infinite recursion
-        if request.path == '/health':
-            return
-            
-        response = requests.get(f"{API_BASE_URL}/health", timeout=2)
-        if response.status_code != 200:
-            return render_template('error.html', message="API server is not available.")
-    except requests.RequestException:
+    # Catch the health check endpoint to avoid infinite recursion
+    if request.path == '/health':
+        return
+        
+    if not bible_data.health():
         return render_template('error.html', message="Cannot connect to API server.")
 
 # Book name mapping dictionary
@@ -207,11 +237,11 @@ def get_db_connection():
         return None
 
 @app.route('/')
+@response_cache.cached
 def index():
     """Home page with statistics."""
     try:
-        # Get statistics from API
-        response = requests.get(f"{API_BASE_URL}/api/lexicon/stats")
+        api_stats = bible_data.lexicon_stats()
         
         stats = {
             'hebrew_lexicon_count': 0,
@@ -221,22 +251,21 @@ def index():
             'proper_name_refs_count': 0
         }
         
-        if response.status_code == 200:
-            api_stats = response.json()
-            if 'hebrew_lexicon' in api_stats:
-                stats['hebrew_lexicon_count'] = api_stats['hebrew_lexicon']['count']
-            if 'greek_lexicon' in api_stats:
-                stats['greek_lexicon_count'] = api_stats['greek_lexicon']['count']
-            if 'verses' in api_stats:
-                stats['verse_count'] = api_stats['verses']['count']
-            if 'proper_names' in api_stats:
-                stats['proper_names_count'] = api_stats['proper_names']['count']
-                stats['proper_name_refs_count'] = api_stats['proper_names']['references']
+        if 'hebrew_lexicon' in api_stats:
+            stats['hebrew_lexicon_count'] = api_stats['hebrew_lexicon']['count']
+        if 'greek_lexicon' in api_stats:
+            stats['greek_lexicon_count'] = api_stats['greek_lexicon']['count']
+        if 'verses' in api_stats:
+            stats['verse_count'] = api_stats['verses']['count']
+        if 'proper_names' in api_stats:
+            stats['proper_names_count'] = api_stats['proper_names']['count']
+            stats['proper_name_refs_count'] = api_stats['proper_names']['references']
         
         return render_template('index.html', stats=stats)
     
     except Exception as e:
         logging.error(f"Error retrieving home page stats: {e}")
+        skip_response_cache()
         # If we can't get stats, still show the home page with default values
         return render_template('index.html', stats={
             'hebrew_lexicon_count': 8674,  # Default estimate
@@ -247,6 +276,7 @@ def index():
         })
 
 @app.route('/search')
+@response_cache.cached
 def search():
     """Search page for lexicons, verses, and proper names."""
     query = request.args.get('q', '')
@@ -259,46 +289,25 @@ def search():
         try:
             if search_type == 'lexicon':
                 # Search lexicons
-                response = requests.get(f"{API_BASE_URL}/api/lexicon/search", 
-                                       params={'q': query, 'limit': 50})
-                
-                if response.status_code == 200:
-                    results = response.json()
-                else:
-                    error = f"Lexicon search error: {response.json().get('error', 'Unknown error')}"
+                results = bible_data.search_lexicon(query, limit=50)
                     
             elif search_type == 'verse':
                 # Search verses
-                response = requests.get(f"{API_BASE_URL}/api/verses/search", 
-                                       params={'q': query, 'limit': 50})
-                
-                if response.status_code == 200:
-                    results = response.json()
-                else:
-                    error = f"Verse search error: {response.json().get('error', 'Unknown error')}"
+                results = bible_data.search_verses(query, limit=50)
                 
             elif search_type == 'name':
                 # Search proper names
-                response = requests.get(f"{API_BASE_URL}/api/names/search", 
-                                       params={'q': query, 'type': 'name', 'limit': 50})
-                
-                if response.status_code == 200:
-                    results = response.json()
-                else:
-                    error = f"Name search error: {response.json().get('error', 'Unknown error')}"
+                results = bible_data.search_names(query, search_type='name', limit=50)
                 
             elif search_type == 'morphology':
-                # Search morphology codes
-                hebrew_response = requests.get(f"{API_BASE_URL}/api/morphology/hebrew", 
-                                             params={'code': query, 'limit': 25})
-                
-                greek_response = requests.get(f"{API_BASE_URL}/api/morphology/greek", 
-                                            params={'code': query, 'limit': 25})
-                
-                results = {
-                    'hebrew': hebrew_response.json() if hebrew_response.status_code == 200 else [],
-                    'greek': greek_response.json() if greek_response.status_code == 200 else []
-                }
+                # Search Hebrew and Greek morphology codes concurrently
+                page = fan_out({
+                    'hebrew': lambda: bible_data.search_morphology('hebrew', query, limit=25),
+                    'greek': lambda: bible_data.search_morphology('greek', query, limit=25)
+                }, defaults={'hebrew': [], 'greek': []})
+                results = page.results
+                if page.degraded:
+                    skip_response_cache()
                 
                 if not results['hebrew'] and not results['greek']:
                     error = "No morphology codes found matching the query"
@@ -306,6 +315,8 @@ def search():
             else:
                 error = f"Invalid search type: {search_type}"
         
+        except ServiceError as e:
+            error = f"{search_type.capitalize()} search error: {e.message}"
         except Exception as e:
             logging.error(f"Error in search: {e}")
             error = f"An error occurred: {str(e)}"
@@ -317,134 +328,30 @@ def search():
                           error=error)
 
 @app.route('/lexicon/<lang>/<strongs_id>')
+@response_cache.cached
 def lexicon_entry(lang, strongs_id):
     """
     Display details for a specific lexicon entry.
     """
+    if lang not in ('hebrew', 'greek'):
+        return render_template('error.html', error="Invalid language")
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return render_template('error.html', error="Database connection error")
-            
-        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            if lang == 'hebrew':
-                cur.execute("""
-                    SELECT * FROM bible.hebrew_entries WHERE strongs_id = %s
-                """, (strongs_id,))
-                entry = cur.fetchone()
-                
-                if not entry:
-                    return render_template('error.html', error="Entry not found")
-                
-                # Get related words
-                cur.execute("""
-                    SELECT wr.target_id, wr.relationship_type, 
-                           CASE 
-                               WHEN he.hebrew_word IS NOT NULL THEN he.hebrew_word 
-                               ELSE ge.greek_word 
-                           END as word,
-                           CASE 
-                               WHEN he.transliteration IS NOT NULL THEN he.transliteration 
-                               ELSE ge.transliteration 
-                           END as transliteration,
-                           CASE 
-                               WHEN he.gloss IS NOT NULL THEN he.gloss 
-                               ELSE ge.gloss 
-                           END as gloss,
-                           CASE 
-                               WHEN he.strongs_id IS NOT NULL THEN 'hebrew' 
-                               ELSE 'greek' 
-                           END as language
-                    FROM bible.word_relationships wr
-                    LEFT JOIN bible.hebrew_entries he ON wr.target_id = he.strongs_id
-                    LEFT JOIN bible.greek_entries ge ON wr.target_id = ge.strongs_id
-                    WHERE wr.source_id = %s
-                """, (strongs_id,))
-                related_words = [dict(row) for row in cur.fetchall()]
-                
-                # Get verse occurrences
-                cur.execute("""
-                    SELECT DISTINCT v.book_name, v.chapter_num, v.verse_num, v.verse_text
-                    FROM bible.hebrew_ot_words w
-                    JOIN bible.verses v ON 
-                        w.book_name = v.book_name AND 
-                        w.chapter_num = v.chapter_num AND 
-                        w.verse_num = v.verse_num
-                    WHERE w.strongs_id = %s
-                    LIMIT 20
-                """, (strongs_id,))
-                occurrences = [dict(row) for row in cur.fetchall()]
-                
-                return render_template('lexicon_entry.html', 
-                                       entry=dict(entry), 
-                                       related_words=related_words,
-                                       occurrences=occurrences,
-                                       lang=lang)
-            
-            elif lang == 'greek':
-                cur.execute("""
-                    SELECT * FROM bible.greek_entries WHERE strongs_id = %s
-                """, (strongs_id,))
-                entry = cur.fetchone()
-                
-                if not entry:
-                    return render_template('error.html', error="Entry not found")
-                
-                # Get related words
-                cur.execute("""
-                    SELECT wr.target_id, wr.relationship_type, 
-                           CASE 
-                               WHEN he.hebrew_word IS NOT NULL THEN he.hebrew_word 
-                               ELSE ge.greek_word 
-                           END as word,
-                           CASE 
-                               WHEN he.transliteration IS NOT NULL THEN he.transliteration 
-                               ELSE ge.transliteration 
-                           END as transliteration,
-                           CASE 
-                               WHEN he.gloss IS NOT NULL THEN he.gloss 
-                               ELSE ge.gloss 
-                           END as gloss,
-                           CASE 
-                               WHEN he.strongs_id IS NOT NULL THEN 'hebrew' 
-                               ELSE 'greek' 
-                           END as language
-                    FROM bible.word_relationships wr
-                    LEFT JOIN bible.hebrew_entries he ON wr.target_id = he.strongs_id
-                    LEFT JOIN bible.greek_entries ge ON wr.target_id = ge.strongs_id
-                    WHERE wr.source_id = %s
-                """, (strongs_id,))
-                related_words = [dict(row) for row in cur.fetchall()]
-                
-                # Get verse occurrences
-                cur.execute("""
-                    SELECT DISTINCT v.book_name, v.chapter_num, v.verse_num, v.verse_text
-                    FROM bible.greek_nt_words w
-                    JOIN bible.verses v ON 
-                        w.book_name = v.book_name AND 
-                        w.chapter_num = v.chapter_num AND 
-                        w.verse_num = v.verse_num
-                    WHERE w.strongs_id = %s
-                    LIMIT 20
-                """, (strongs_id,))
-                occurrences = [dict(row) for row in cur.fetchall()]
-                
-                return render_template('lexicon_entry.html', 
-                                       entry=dict(entry), 
-                                       related_words=related_words,
-                                       occurrences=occurrences,
-                                       lang=lang)
-            
-            else:
-                return render_template('error.html', error="Invalid language")
-    except Exception as e:
-        logger.error(f"Error loading lexicon entry {lang}/{strongs_id}: {e}")
-        return render_template('error.html', error=str(e))
-    finally:
-        if conn:
-            conn.close()
+        page = bible_data.lexicon_entry(lang, strongs_id)
+    except ServiceError as e:
+        logger.error(f"Error loading lexicon entry {lang}/{strongs_id}: {e.message}")
+        return render_template('error.html', error=e.message)
+    if page is None:
+        return render_template('error.html', error="Entry not found")
+    return render_template('lexicon_entry.html',
+                           entry=page['entry'],
+                           related_words=page['related_words'],
+                           occurrences=page['occurrences'],
+                           occurrence_count=page['occurrence_count'],
+                           verse_count=page['verse_count'],
+                           lang=lang)
 
 @app.route('/verse/<book>/<int:chapter>/<int:verse>')
+@response_cache.cached
 def verse_detail(book, chapter, verse):
     """
     Display details for a specific verse with its tagged words.
@@ -456,13 +363,18 @@ def verse_detail(book, chapter, verse):
         
         # Convert book name to abbreviated form
         api_book = get_abbreviated_book_name(book)
+        key = verse_key(book, chapter, verse)
+        if key is None:
+            return render_template('error.html', error="Verse not found")
             
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
             # Get verse
             cur.execute("""
                 SELECT * FROM bible.verses 
-                WHERE book_name = %s AND chapter_num = %s AND verse_num = %s
-            """, (api_book, chapter, verse))
+                WHERE verse_key = %s
+                ORDER BY (book_name = %s) DESC
+                LIMIT 1
+            """, (key, api_book))
             verse_data = cur.fetchone()
             
             if not verse_data:
@@ -473,9 +385,9 @@ def verse_detail(book, chapter, verse):
                 SELECT w.*, g.gloss, g.transliteration, g.pos
                 FROM bible.greek_nt_words w
                 LEFT JOIN bible.greek_entries g ON w.strongs_id = g.strongs_id
-                WHERE w.book_name = %s AND w.chapter_num = %s AND w.verse_num = %s
+                WHERE w.verse_key = %s
                 ORDER BY w.word_num
-            """, (api_book, chapter, verse))
+            """, (key,))
             greek_words = [dict(row) for row in cur.fetchall()]
             
             # Try to get Hebrew words for this verse
@@ -483,9 +395,9 @@ def verse_detail(book, chapter, verse):
                 SELECT w.*, h.gloss, h.transliteration, h.pos
                 FROM bible.hebrew_ot_words w
                 LEFT JOIN bible.hebrew_entries h ON w.strongs_id = h.strongs_id
-                WHERE w.book_name = %s AND w.chapter_num = %s AND w.verse_num = %s
+                WHERE w.verse_key = %s
                 ORDER BY w.word_num
-            """, (api_book, chapter, verse))
+            """, (key,))
             hebrew_words = [dict(row) for row in cur.fetchall()]
             
             # Get parallel verses if any
@@ -500,13 +412,7 @@ def verse_detail(book, chapter, verse):
             # Get proper names mentioned in this verse
             proper_names = []
             try:
-                names_response = requests.get(
-                    f"{API_BASE_URL}/api/verse/names",
-                    params={'book': api_book, 'chapter': chapter, 'verse': verse}
-                )
-                if names_response.status_code == 200:
-                    names_data = names_response.json()
-                    proper_names = names_data.get('names', [])
+                proper_names = bible_data.verse_names(api_book, chapter, verse)
             except Exception as e:
                 logger.warning(f"Error fetching proper names for verse: {e}")
             
@@ -529,27 +435,24 @@ def verse_detail(book, chapter, verse):
 
 # Add routes for morphology codes
 @app.route('/morphology')
+@response_cache.cached
 def morphology_home():
     """Display morphology codes search and info page."""
     return render_template('morphology.html')
 
 @app.route('/morphology/hebrew/<code>')
+@response_cache.cached
 def hebrew_morphology_detail(code):
     """Display details for a specific Hebrew morphology code."""
     try:
-        # Get the morphology code data from the API
-        response = requests.get(f"{API_BASE_URL}/api/morphology/hebrew/{code}")
+        morphology_data = bible_data.get_morphology_code('hebrew', code)
         
-        if response.status_code != 200:
+        if morphology_data is None:
             return render_template('error.html', 
-                                   message=f"Error retrieving Hebrew morphology code: {response.json().get('error', 'Unknown error')}")
-        
-        morphology_data = response.json()
+                                   message=f"Error retrieving Hebrew morphology code: {code} not found")
         
         # Get a list of examples where this code is used
-        examples_response = requests.get(f"{API_BASE_URL}/api/hebrew/words", 
-                                        params={'grammar_code': code, 'limit': 10})
-        examples = examples_response.json() if examples_response.status_code == 200 else []
+        examples = bible_data.words_by_grammar_code('hebrew', code, limit=10)
         
         return render_template('morphology_detail.html', 
                               morphology=morphology_data,
@@ -561,22 +464,18 @@ def hebrew_morphology_detail(code):
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/morphology/greek/<code>')
+@response_cache.cached
 def greek_morphology_detail(code):
     """Display details for a specific Greek morphology code."""
     try:
-        # Get the morphology code data from the API
-        response = requests.get(f"{API_BASE_URL}/api/morphology/greek/{code}")
+        morphology_data = bible_data.get_morphology_code('greek', code)
         
-        if response.status_code != 200:
+        if morphology_data is None:
             return render_template('error.html', 
-                                   message=f"Error retrieving Greek morphology code: {response.json().get('error', 'Unknown error')}")
-        
-        morphology_data = response.json()
+                                   message=f"Error retrieving Greek morphology code: {code} not found")
         
         # Get a list of examples where this code is used
-        examples_response = requests.get(f"{API_BASE_URL}/api/greek/words", 
-                                        params={'grammar_code': code, 'limit': 10})
-        examples = examples_response.json() if examples_response.status_code == 200 else []
+        examples = bible_data.words_by_grammar_code('greek', code, limit=10)
         
         return render_template('morphology_detail.html', 
                               morphology=morphology_data,
@@ -588,24 +487,30 @@ def greek_morphology_detail(code):
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 # Add routes for proper names
+DEFAULT_NAME_FILTERS = {
+    'types': ['Person', 'Location', 'Title', 'Other'],
+    'genders': ['Male', 'Female'],
+    'book_counts': {}
+}
+
+def get_name_filter_data():
+    """Filter values for the names search form, with defaults if they cannot be loaded."""
+    try:
+        return bible_data.name_types()
+    except ServiceError as e:
+        logger.warning(f"Error loading name filters: {e}")
+        skip_response_cache()
+        return DEFAULT_NAME_FILTERS
+
 @app.route('/names')
+@response_cache.cached
 def names_home():
     """Display proper names search and info page."""
     try:
-        # Get filter data from API
-        filter_response = requests.get(f"{API_BASE_URL}/api/names/types")
-        filter_data = filter_response.json() if filter_response.status_code == 200 else {
-            'types': ['Person', 'Location', 'Title', 'Other'],
-            'genders': ['Male', 'Female'],
-            'book_counts': {}
-        }
+        filter_data = get_name_filter_data()
         
         # Get most viewed/popular names (limited to 5)
-        popular_response = requests.get(f"{API_BASE_URL}/api/names", params={'limit': 5})
-        popular_names = []
-        
-        if popular_response.status_code == 200:
-            popular_names = popular_response.json()
+        popular_names = bible_data.list_names(limit=5)
             
         return render_template('names.html', 
                               filter_data=filter_data,
@@ -615,17 +520,15 @@ def names_home():
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/names/<int:name_id>')
+@response_cache.cached
 def name_detail(name_id):
     """Display details for a specific proper name."""
     try:
-        # Get the proper name data from the API
-        response = requests.get(f"{API_BASE_URL}/api/names/{name_id}")
+        name_data = bible_data.get_name(name_id)
         
-        if response.status_code != 200:
+        if name_data is None:
             return render_template('error.html', 
-                                   message=f"Error retrieving proper name: {response.json().get('error', 'Unknown error')}")
-        
-        name_data = response.json()
+                                   message=f"Error retrieving proper name: {name_id} not found")
         
         return render_template('name_detail.html', name=name_data)
         
@@ -634,6 +537,7 @@ def name_detail(name_id):
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/names/search')
+@response_cache.cached
 def name_search():
     """Search for proper names."""
     try:
@@ -646,40 +550,28 @@ def name_search():
         offset = request.args.get('offset', 0, type=int)
         limit = request.args.get('limit', 50, type=int)
         
-        # Get filter data for form fields
-        filter_response = requests.get(f"{API_BASE_URL}/api/names/types")
-        filter_data = filter_response.json() if filter_response.status_code == 200 else {
-            'types': ['Person', 'Location', 'Title', 'Other'],
-            'genders': ['Male', 'Female'],
-            'book_counts': {}
-        }
-        
         # If no search parameters provided, just show the form
         if not search_term and not name_type and not gender and not book:
             return render_template('names.html', 
-                                  filter_data=filter_data,
+                                  filter_data=get_name_filter_data(),
                                   search_term=search_term,
                                   search_type=search_type)
         
-        # Call the API with all parameters
-        params = {
-            'q': search_term,
-            'type': search_type,
-            'name_type': name_type,
-            'gender': gender,
-            'book': book,
-            'offset': offset,
-            'limit': limit
-        }
-        
-        # Remove empty parameters
-        params = {k: v for k, v in params.items() if v}
-        
-        response = requests.get(f"{API_BASE_URL}/api/names/search", params=params)
-        
-        if response.status_code != 200:
+        # Load the form filters and run the search concurrently
+        page = fan_out({
+            'filters': bible_data.name_types,
+            'search': lambda: bible_data.search_names(search_term, search_type=search_type,
+                                                      name_type=name_type, gender=gender, book=book,
+                                                      offset=offset, limit=limit)
+        }, defaults={'filters': DEFAULT_NAME_FILTERS})
+        filter_data = page['filters']
+        data = page['search']
+        if page.degraded:
+            skip_response_cache()
+        
+        if data is None:
             return render_template('names.html', 
-                                  error=f"Search error: {response.json().get('error', 'Unknown error')}",
+                                  error=f"Search error: {page.errors['search']}",
                                   search_term=search_term,
                                   search_type=search_type,
                                   filter_data=filter_data,
@@ -689,7 +581,6 @@ def name_search():
                                     'book': book
                                   })
         
-        data = response.json()
         results = data.get('results', [])
         metadata = data.get('metadata', {})
         
@@ -741,17 +632,15 @@ def bible_verse(book, chapter, verse):
 
 # Arabic Bible routes
 @app.route('/arabic')
+@response_cache.cached
 def arabic_bible_home():
     """Display the Arabic Bible explorer page."""
     try:
-        # Call the API to get Arabic Bible stats
-        response = requests.get(f"{API_BASE_URL}/api/arabic/stats")
-        
-        if response.status_code != 200:
+        try:
+            stats = bible_data.arabic_stats()
+        except ServiceError as e:
             return render_template('error.html', 
-                                  message=f"Error retrieving Arabic Bible stats: {response.json().get('error', 'Unknown error')}")
-        
-        stats = response.json()
+                                  message=f"Error retrieving Arabic Bible stats: {e.message}")
         
         return render_template('arabic_bible.html', 
                               stats=stats)
@@ -761,29 +650,21 @@ def arabic_bible_home():
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/arabic/verse/<book>/<int:chapter>/<int:verse>')
+@response_cache.cached
 def arabic_verse(book, chapter, verse):
     """Display a verse from the Arabic Bible."""
     try:
         # Convert book name to abbreviated form
         api_book = get_abbreviated_book_name(book)
         
-        # Call the API to get verse data
-        response = requests.get(f"{API_BASE_URL}/api/arabic/verse", 
-                               params={'book': api_book, 'chapter': chapter, 'verse': verse})
+        verse_data = bible_data.arabic_verse(api_book, chapter, verse)
         
-        if response.status_code != 200:
+        if verse_data is None:
             return render_template('error.html', 
-                                  message=f"Error retrieving Arabic verse: {response.json().get('error', 'Unknown error')}")
-        
-        verse_data = response.json()
+                                  message=f"Error retrieving Arabic verse: {book} {chapter}:{verse} not found")
         
         # Get surrounding verses for context
-        context_response = requests.get(f"{API_BASE_URL}/api/arabic/context", 
-                                      params={'book': api_book, 'chapter': chapter, 'verse': verse, 'context': 3})
-        
-        context_verses = []
-        if context_response.status_code == 200:
-            context_verses = context_response.json().get('verses', [])
+        context_verses = bible_data.arabic_context(api_book, chapter, verse, context=3).get('verses', [])
             
         return render_template('arabic_verse.html', 
                               verse=verse_data.get('verse', {}),
@@ -798,6 +679,7 @@ def arabic_verse(book, chapter, verse):
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/arabic/search')
+@response_cache.cached
 def arabic_search():
     """Search the Arabic Bible."""
     query = request.args.get('q', '')
@@ -808,15 +690,11 @@ def arabic_search():
         return render_template('arabic_search.html', results=None)
     
     try:
-        # Call the API to search
-        response = requests.get(f"{API_BASE_URL}/api/arabic/search", 
-                               params={'q': query, 'book': book, 'limit': 50})
-        
-        if response.status_code != 200:
+        try:
+            search_results = bible_data.arabic_search(query, book=book or None, limit=50)
+        except ServiceError as e:
             return render_template('error.html', 
-                                  message=f"Error searching Arabic Bible: {response.json().get('error', 'Unknown error')}")
-        
-        search_results = response.json()
+                                  message=f"Error searching Arabic Bible: {e.message}")
         
         return render_template('arabic_search.html', 
                               results=search_results,
@@ -828,21 +706,18 @@ def arabic_search():
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/arabic/parallel/<book>/<int:chapter>/<int:verse>')
+@response_cache.cached
 def arabic_parallel(book, chapter, verse):
     """Display a verse in Arabic alongside Greek or Hebrew."""
     try:
         # Convert book name to abbreviated form
         api_book = get_abbreviated_book_name(book)
         
-        # Call the API to get parallel verses
-        response = requests.get(f"{API_BASE_URL}/api/arabic/parallel", 
-                               params={'book': api_book, 'chapter': chapter, 'verse': verse})
-        
-        if response.status_code != 200:
+        try:
+            parallel_data = bible_data.arabic_parallel(api_book, chapter, verse)
+        except ServiceError as e:
             return render_template('error.html', 
-                                  message=f"Error retrieving parallel verses: {response.json().get('error', 'Unknown error')}")
-        
-        parallel_data = response.json()
+                                  message=f"Error retrieving parallel verses: {e.message}")
         
         return render_template('arabic_parallel.html', 
                               parallel=parallel_data,
@@ -855,6 +730,7 @@ def arabic_parallel(book, chapter, verse):
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/concordance/<strongs_id>')
+@response_cache.cached
 def concordance(strongs_id):
     """
     Display concordance for a specific Strong's number.
@@ -863,26 +739,23 @@ def concordance(strongs_id):
         # Determine if this is Arabic or standard concordance
         show_arabic = request.args.get('arabic', '').lower() == 'true'
         
-        if show_arabic:
-            response = requests.get(f"{API_BASE_URL}/api/concordance/arabic/{strongs_id}")
-        else:
-            response = requests.get(f"{API_BASE_URL}/api/concordance/{strongs_id}")
-        
-        if response.status_code == 200:
-            concordance_data = response.json()
-            
-            # Get language info
-            is_hebrew = strongs_id.startswith('H')
-            language = "Hebrew" if is_hebrew else "Greek"
-            
-            return render_template('concordance.html', 
-                                  data=concordance_data, 
-                                  strongs_id=strongs_id,
-                                  language=language,
-                                  show_arabic=show_arabic)
-        else:
-            error = response.json().get('error', 'Unknown error')
-            return render_template('error.html', message=f"Error: {error}")
+        try:
+            if show_arabic:
+                concordance_data = bible_data.arabic_concordance(strongs_id)
+            else:
+                concordance_data = bible_data.concordance(strongs_id)
+        except ServiceError as e:
+            return render_template('error.html', message=f"Error: {e.message}")
+        
+        # Get language info
+        is_hebrew = strongs_id.startswith('H')
+        language = "Hebrew" if is_hebrew else "Greek"
+        
+        return render_template('concordance.html', 
+                              data=concordance_data, 
+                              strongs_id=strongs_id,
+                              language=language,
+                              show_arabic=show_arabic)
             
     except Exception as e:
         logger.error(f"Error displaying concordance for {strongs_id}: {e}")
@@ -891,56 +764,29 @@ def concordance(strongs_id):
 @app.route('/export/concordance/<strongs_id>')
 def export_concordance(strongs_id):
     """
-    Export concordance data to CSV format.
+    Export concordance data as CSV (default), TSV or JSON Lines (?format=).
+    
+    Rows are streamed from a server-side cursor and encoded batch by batch,
+    gzipped when the client accepts it, so memory use does not depend on the
+    number of occurrences.
     """
+    # Determine if this is Arabic or standard concordance
+    show_arabic = request.args.get('arabic', '').lower() == 'true'
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported export format: {fmt}"}), 400
+    
     try:
-        # Determine if this is Arabic or standard concordance
-        show_arabic = request.args.get('arabic', '').lower() == 'true'
-        
-        if show_arabic:
-            response = requests.get(f"{API_BASE_URL}/api/concordance/arabic/{strongs_id}")
-        else:
-            response = requests.get(f"{API_BASE_URL}/api/concordance/{strongs_id}")
-        
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to retrieve concordance data'}), 500
-            
-        concordance_data = response.json()
-        
-        # Generate CSV data
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Reference', 'Verse Text', 'Target Word', 'Strong\'s ID'])
-        
-        # Write data rows
-        for occurrence in concordance_data['occurrences']:
-            writer.writerow([
-                occurrence['reference'],
-                occurrence['verse_text'],
-                occurrence['target_word']['text'],
-                occurrence['target_word']['strongs_id']
-            ])
-        
-        # Prepare response
-        response = app.response_class(
-            response=output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                "Content-Disposition": f"attachment;filename=concordance_{strongs_id}.csv"
-            }
-        )
-        return response
-            
-    except Exception as e:
+        rows = bible_data.iter_concordance(strongs_id, arabic=show_arabic)
+    except ServiceError as e:
         logger.error(f"Error exporting concordance for {strongs_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return jsonify({'error': 'Failed to retrieve concordance data'}), e.status
+    
+    return streaming_export(rows, CONCORDANCE_COLUMNS, f"concordance_{strongs_id}", fmt=fmt,
+                            accept_encoding=request.headers.get('Accept-Encoding', ''))
 
 @app.route('/cross-references/<book>/<int:chapter>/<int:verse>')
+@response_cache.cached
 def cross_references(book, chapter, verse):
     """
     Display cross-references for a specific verse.
@@ -949,24 +795,25 @@ def cross_references(book, chapter, verse):
         # Convert full book name to abbreviated form if needed
         api_book = get_abbreviated_book_name(book)
         
-        response = requests.get(f"{API_BASE_URL}/api/cross-references",
-                               params={'book': api_book, 'chapter': chapter, 'verse': verse})
+        try:
+            data = bible_data.cross_references(api_book, chapter, verse)
+        except ServiceError as e:
+            return render_template('error.html', message=f"Error: {e.message}")
         
-        if response.status_code == 200:
-            data = response.json()
-            return render_template('cross_references.html', 
-                                  verse_reference=f"{book} {chapter}:{verse}",
-                                  verse_text=data['verse']['text'],
-                                  cross_references=data['cross_references'])
-        else:
-            error = response.json().get('error', 'Unknown error')
-            return render_template('error.html', message=f"Error: {error}")
+        if data is None:
+            return render_template('error.html', message="Error: Verse not found")
+        
+        return render_template('cross_references.html', 
+                              verse_reference=f"{book} {chapter}:{verse}",
+                              verse_text=data['verse']['text'],
+                              cross_references=data['cross_references'])
             
     except Exception as e:
         logger.error(f"Error displaying cross-references for {book} {chapter}:{verse}: {e}")
         return render_template('error.html', message=f"An error occurred: {str(e)}")
 
 @app.route('/semantic-search')
+@response_cache.cached
 def semantic_search():
     """
     Display semantic search form and results.
@@ -978,14 +825,9 @@ def semantic_search():
     
     if query:
         try:
-            response = requests.get(f"{API_BASE_URL}/api/semantic-search",
-                                  params={'q': query, 'limit': 20})
-            
-            if response.status_code == 200:
-                results = response.json()
-            else:
-                error = response.json().get('error', 'Unknown error')
-                
+            results = bible_data.semantic_search(query, limit=20)
+        except ServiceError as e:
+            error = e.message
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
             error = f"An error occurred: {str(e)}"
@@ -1006,98 +848,82 @@ def verse_with_resources(book, chapter, verse):
         chapter (int): Chapter number
         verse (int): Verse number
     """
-    try:
-        # Get the verse details from our internal API
-        abbr_book = get_abbreviated_book_name(book)
-        response = requests.get(f"{API_BASE_URL}/api/tagged/verse?book={abbr_book}&chapter={chapter}&verse={verse}")
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to get verse data: {response.status_code}")
-            return render_template('error.html', message=f"Failed to retrieve verse data for {book} {chapter}:{verse}")
-        
-        verse_data = response.json()
-        
-        # Get commentaries from external API
-        commentaries_response = requests.get(f"/api/external/commentaries/{abbr_book}/{chapter}/{verse}")
-        commentaries = commentaries_response.json() if commentaries_response.status_code == 200 else {"commentaries": []}
-        
-        # Get archaeological data if relevant
-        location = None
-        archaeological_data = None
-        
-        # This is a simplistic approach - in reality, you'd need more sophisticated
-        # location detection based on the verse content
-        if 'Jerusalem' in verse_data.get('text', ''):
-            location = 'Jerusalem'
-        elif 'Bethlehem' in verse_data.get('text', ''):
-            location = 'Bethlehem'
-        
-        if location:
-            arch_response = requests.get(f"/api/external/archaeological/{location}")
-            archaeological_data = arch_response.json() if arch_response.status_code == 200 else None
-        
-        # Get manuscript data for NT verses
-        manuscript_data = None
-        if abbr_book in ['Mat', 'Mrk', 'Luk', 'Jhn', 'Act', 'Rom', 'Gal', 'Eph']:
-            manu_response = requests.get(f"/api/external/manuscripts/{abbr_book} {chapter}:{verse}")
-            manuscript_data = manu_response.json() if manu_response.status_code == 200 else None
-        
-        # Get multiple translations
-        translations_response = requests.get(f"/api/external/translations/{abbr_book} {chapter}:{verse}")
-        translations = translations_response.json() if translations_response.status_code == 200 else {"translations": {}}
-        
-        # Return template with all data
-        return render_template(
-            'verse_with_resources.html',
-            verse=verse_data,
-            book=book,
-            chapter=chapter,
-            verse_num=verse,
-            commentaries=commentaries,
-            archaeological_data=archaeological_data,
-            manuscript_data=manuscript_data,
-            translations=translations,
-            citation_url=f"/api/external/citations/{abbr_book} {chapter}:{verse}"
-        )
+    abbr_book = get_abbreviated_book_name(book)
+    reference = f"{abbr_book} {chapter}:{verse}"
     
-    except Exception as e:
-        logger.error(f"Error retrieving verse with resources: {e}")
-        return render_template('error.html', message=f"Error: {e}")
+    def external(path):
+        return lambda: fetch_json(f"{EXTERNAL_API_URL}/api/external/{path}", timeout=max(page.remaining(), 0.1))
+    
+    # The verse and every external section are fetched concurrently under one page deadline;
+    # sections that fail or run late are left out and listed as degraded
+    page = FanOut()
+    calls = {
+        'verse': lambda: bible_data.tagged_verse(abbr_book, chapter, verse),
+        'commentaries': external(f"commentaries/{abbr_book}/{chapter}/{verse}"),
+        'translations': external(f"translations/{reference}")
+    }
+    # Get manuscript data for NT verses
+    if abbr_book in ['Mat', 'Mrk', 'Luk', 'Jhn', 'Act', 'Rom', 'Gal', 'Eph']:
+        calls['manuscripts'] = external(f"manuscripts/{reference}")
+    page.run(calls, defaults={'commentaries': {"commentaries": []}, 'translations': {"translations": {}}})
+    
+    verse_data = page['verse']
+    if verse_data is None:
+        logger.error(f"Failed to get verse data: {page.errors.get('verse', 'not found')}")
+        return render_template('error.html', message=f"Failed to retrieve verse data for {book} {chapter}:{verse}")
+    
+    # Get archaeological data if relevant.
+    # This is a simplistic approach - in reality, you'd need more sophisticated
+    # location detection based on the verse content
+    location = None
+    if 'Jerusalem' in verse_data.get('text', ''):
+        location = 'Jerusalem'
+    elif 'Bethlehem' in verse_data.get('text', ''):
+        location = 'Bethlehem'
+    
+    if location:
+        page.run({'archaeological': external(f"archaeological/{location}")})
+    
+    # Return template with all data
+    return render_template(
+        'verse_with_resources.html',
+        verse=verse_data,
+        book=book,
+        chapter=chapter,
+        verse_num=verse,
+        commentaries=page['commentaries'],
+        archaeological_data=page.get('archaeological'),
+        manuscript_data=page.get('manuscripts'),
+        translations=page['translations'],
+        degraded=page.degraded,
+        citation_url=f"/api/external/citations/{reference}"
+    )
 
 @app.route('/hebrew_terms_validation')
+@response_cache.cached
 def hebrew_terms_validation():
     try:
-        response = requests.get(f"{API_BASE_URL}/api/lexicon/hebrew/validate_critical_terms")
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch critical terms: {response.status_code}")
-            return render_template('error.html', message="Failed to retrieve term validation data")
-        results = response.json()
+        results = bible_data.validate_critical_terms()
         return render_template('hebrew_terms_validation.html', results=results)
     except Exception as e:
         logger.error(f"Error rendering term validation: {e}")
         return render_template('error.html', message=str(e))
 
 @app.route('/cross_language')
+@response_cache.cached
 def cross_language():
     try:
-        response = requests.get(f"{API_BASE_URL}/api/cross_language/terms")
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch cross-language terms: {response.status_code}")
-            return render_template('error.html', message="Failed to retrieve cross-language terms")
-        results = response.json()
+        results = bible_data.cross_language_terms(CROSS_LANGUAGE_MAPPINGS)
         return render_template('cross_language.html', results=results)
     except Exception as e:
         logger.error(f"Error rendering cross-language page: {e}")
         return render_template('error.html', message=str(e))
 
 @app.route('/theological_terms_report')
+@response_cache.cached
 def theological_terms_report():
     try:
-        response = requests.get(f"{API_BASE_URL}/api/theological_terms_report")
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch theological terms report: {response.status_code}")
-            return render_template('error.html', message="Failed to retrieve theological terms report")
-        results = response.json()
+        results = bible_data.theological_terms_report()
         return render_template('theological_terms_report.html', results=results)
     except Exception as e:
         logger.error(f"Error rendering theological terms report: {e}")
@@ -1118,19 +944,13 @@ def log_web_request(f):
     
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        # The handler runs exactly once; logging happens afterwards and off the request thread
+        response = f(*args, **kwargs)
         try:
-            # Get route info
             route = request.path
-            query_params = dict(request.args)
             
             # Only log non-static requests with meaningful paths
-            if (not route.startswith('/static') and 
-                not route == '/health' and 
-                not route == '/favicon.ico'):
-                
-                # Process the request
-                response = f(*args, **kwargs)
-                
+            if not route.startswith(UNTRACKED_PATHS):
                 # Determine response type
                 if hasattr(response, 'template_name'):
                     response_type = f"template:{response.template_name}"
@@ -1139,20 +959,14 @@ def log_web_request(f):
                 else:
                     response_type = "json" if hasattr(response, 'get_json') else "other"
                 
-                # Log the web interaction
-                log_web_interaction(
+                interaction_log.submit(
                     route=route,
-                    query_params=query_params,
+                    query_params=dict(request.args),
                     response_type=response_type
                 )
-                
-                return response
-            else:
-                return f(*args, **kwargs)
-            
         except Exception as e:
             logger.error(f"Error logging web interaction: {e}")
-            return f(*args, **kwargs)
+        return response
     
     return decorated_function
 
@@ -1177,7 +991,7 @@ def vector_search_page():
                 results = response.json()
                 
                 # Log successful semantic search for analytics
-                log_web_interaction(
+                interaction_log.submit(
                     route='/vector-search',
                     query_params={'q': query, 'translation': translation},
                     response_type='success',
@@ -1232,7 +1046,7 @@ def similar_verses_page():
                 results = response.json()
                 
                 # Log successful similar verses search
-                log_web_interaction(
+                interaction_log.submit(
                     route='/similar-verses',
                     query_params={'book': book, 'chapter': chapter, 'verse': verse, 'translation': translation},
                     response_type='success',
@@ -1296,9 +1110,9 @@ def dspy_ask():
                     result = response.json()
                     
                     # Log the successful interaction
-                    log_web_interaction(
+                    interaction_log.submit(
                         route='/dspy-ask',
-                        parameters=str(data),
+                        query_params=data,
                         response_status=response.status_code,
                         response_data=str(result)
                     )
@@ -1311,5 +1125,67 @@ def dspy_ask():
     
     return render_template('dspy_ask.html', context=context, question=question, result=result)
 
+@app.route('/dspy-ask/stream', methods=['POST'])
+def dspy_ask_stream():
+    """
+    Stream an answer from the DSPy API to the browser as it is generated.
+    
+    The upstream server-sent events are passed through chunk by chunk without
+    buffering; the interaction is logged once the answer is complete.
+    """
+    data = request.get_json(silent=True) or request.form.to_dict()
+    if not data.get('question'):
+        return jsonify({'error': 'No question provided'}), 400
+    payload = {'question': data['question'], 'context': data.get('context', '')}
+    if data.get('session_id'):
+        payload['session_id'] = data['session_id']
+    
+    try:
+        # Only the wait for the first byte counts as the upstream call
+        with track_upstream():
+            upstream = requests.post(
+                f"{DSPY_API_URL}/api/dspy/ask_with_context/stream",
+                json=payload,
+                stream=True,
+                timeout=(5, 120)  # Connect, then the longest pause between tokens
+            )
+    except requests.RequestException as e:
+        logger.error(f"DSPy stream request error: {str(e)}")
+        return jsonify({'error': str(e)}), 502
+    
+    if upstream.status_code != 200:
+        logger.error(f"DSPy API error: {upstream.status_code} - {upstream.text}")
+        try:
+            error = upstream.json()
+        except ValueError:
+            error = {'error': upstream.text or 'Unknown error'}
+        upstream.close()
+        return jsonify(error), upstream.status_code
+    
+    def relay():
+        received = []
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                received.append(chunk)
+                yield chunk
+        except requests.RequestException as e:
+            logger.error(f"DSPy stream interrupted: {str(e)}")
+            return
+        finally:
+            upstream.close()
+        
+        # Log the completed interaction
+        events = parse_sse(b''.join(received).decode('utf-8', errors='replace'))
+        done = [event_data for event, event_data in events if event == 'done']
+        if done:
+            interaction_log.submit(
+                route='/dspy-ask/stream',
+                query_params=payload,
+                response_status=upstream.status_code,
+                response_data=str(done[-1])
+            )
+    
+    return Response(stream_with_context(relay()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001) 
\ No newline at end of file
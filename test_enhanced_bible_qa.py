@@ -21,15 +21,17 @@ import json
 import time
 import logging
 import argparse
-import re
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional, Union
 import datetime
 
 import dspy
 import mlflow
+import numpy as np
 from dotenv import load_dotenv
 
+from src.utils.answer_metrics import AnswerScorer, score_answers, strongs_ids, summarize
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -287,24 +289,17 @@ def validate_example(example: Any) -> bool:
     return True
 
 def extract_strongs_ids(text: str) -> List[str]:
-    """Extract Strong's IDs from text."""
-    # Match Strong's IDs like H1234 or G5678
-    strongs_pattern = r'((?:H|G)\d{1,4})'
-    return re.findall(strongs_pattern, text)
+    """Extract Strong's IDs from text, normalised (H0430 -> H430)."""
+    return strongs_ids(text)
 
 def check_strongs_id_match(prediction: str, expected_strongs: List[str]) -> bool:
     """Check if prediction contains the expected Strong's IDs."""
-    if not expected_strongs:
+    expected = [i for strongs_id in expected_strongs or [] for i in extract_strongs_ids(strongs_id)]
+    if not expected:
         return True
     
-    prediction_strongs = extract_strongs_ids(prediction)
-    
     # Check if any expected Strong's IDs are in the prediction
-    for strongs_id in expected_strongs:
-        if strongs_id in prediction_strongs:
-            return True
-    
-    return False
+    return bool(set(expected) & set(extract_strongs_ids(prediction)))
 
 def check_term_match(prediction: str, expected_terms: List[str]) -> bool:
     """Check if prediction contains the expected theological terms."""
@@ -321,96 +316,74 @@ def check_term_match(prediction: str, expected_terms: List[str]) -> bool:
     return False
 
 def calculate_rouge_score(prediction: str, reference: str) -> float:
-    """Calculate ROUGE-1 F1 score between prediction and reference."""
-    try:
-        # Simple word-level ROUGE-1
-        pred_words = set(prediction.lower().split())
-        ref_words = set(reference.lower().split())
-        
-        if not ref_words:
-            return 0.0
-        
-        # Calculate precision, recall, and F1
-        overlap = len(pred_words.intersection(ref_words))
-        precision = overlap / max(len(pred_words), 1)
-        recall = overlap / max(len(ref_words), 1)
-        
-        if precision + recall == 0:
-            return 0.0
-        
-        f1 = 2 * (precision * recall) / (precision + recall)
-        return f1
-    
-    except Exception as e:
-        logger.error(f"Error calculating ROUGE score: {e}")
-        return 0.0
+    """Calculate ROUGE-1 F1 score (distinct tokens) between prediction and reference."""
+    scores = score_answers([prediction], [reference], strongs=[None], distinct=True)
+    return float(scores["token_f1"][0])
+
+# Weights of (exact match, ROUGE-1, Strong's ID match, term match) in the overall score
+SCORE_WEIGHTS = {
+    "theological": (0.3, 0.3, 0.2, 0.2),
+    "multi-turn": (0.2, 0.8, 0.0, 0.0),
+    "factual": (0.7, 0.3, 0.0, 0.0),
+}
+
+def _expected_list(metadata: Dict[str, Any], key: str) -> Optional[List[str]]:
+    """metadata[key] as a list for theological examples, None when it does not apply."""
+    if metadata.get("type", "factual") != "theological" or key not in metadata:
+        return None
+    value = metadata[key]
+    return [value] if isinstance(value, str) else list(value or [])
+
+def evaluate_predictions(predictions: List[str], examples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Evaluate many predictions at once.
+    
+    References are tokenized once and all scores are computed as arrays with
+    src.utils.answer_metrics; returns one evaluation dict per example.
+    """
+    metadata = [example.get("metadata", {}) or {} for example in examples]
+    expected_strongs = [_expected_list(m, "strongs_id") for m in metadata]
+    scorer = AnswerScorer([example.get("answer", "") for example in examples],
+                          strongs=[ids or None for ids in expected_strongs])
+    scores = scorer.score(predictions)
+    rouge = scorer.score(predictions, distinct=True)["token_f1"]
+    
+    # Exact match needs both texts (punctuation and case are ignored)
+    present = np.array([bool(p) and bool(e.get("answer", "")) for p, e in zip(predictions, examples)], dtype=bool)
+    exact_match = scores["exact_match"] & present
+    
+    # Strong's IDs are checked for theological examples; an empty expectation always matches
+    applies = np.array([ids is not None for ids in expected_strongs], dtype=bool)
+    strongs_match = applies & (np.isnan(scores["strongs_recall"]) | (np.nan_to_num(scores["strongs_recall"]) > 0))
+    
+    term_match = np.array([terms is not None and check_term_match(prediction, terms)
+                           for prediction, terms in zip(predictions, (_expected_list(m, "term") for m in metadata))],
+                          dtype=bool)
+    
+    weights = np.array([SCORE_WEIGHTS.get(m.get("type", "factual"), SCORE_WEIGHTS["factual"]) for m in metadata],
+                       dtype=float).reshape(len(examples), 4)
+    parts = np.stack([exact_match, rouge, strongs_match, term_match], axis=1).astype(float)
+    overall = (weights * parts).sum(axis=1)
+    
+    return [
+        {
+            "exact_match": bool(exact_match[i]),
+            "rouge_score": float(rouge[i]),
+            "rouge_l": float(scores["rouge_l"][i]),
+            "token_f1": float(scores["token_f1"][i]),
+            "strongs_match": bool(strongs_match[i]),
+            "term_match": bool(term_match[i]),
+            "overall_score": float(overall[i]),
+        }
+        for i in range(len(examples))
+    ]
 
 def evaluate_prediction(prediction: str, example: Dict[str, Any]) -> Dict[str, Any]:
     """Evaluate a prediction against an example."""
-    results = {}
-    
-    # Get expected answer
-    expected_answer = example.get("answer", "")
-    
-    # Get metadata
-    metadata = example.get("metadata", {})
-    example_type = metadata.get("type", "factual")
-    
-    # Check for exact match (for factual questions)
-    exact_match = False
-    if expected_answer and prediction:
-        # Normalize both texts (remove punctuation, lowercase)
-        norm_pred = re.sub(r'[^\w\s]', '', prediction.lower())
-        norm_exp = re.sub(r'[^\w\s]', '', expected_answer.lower())
-        
-        # Check for exact match
-        exact_match = norm_pred == norm_exp
-    
-    results["exact_match"] = exact_match
-    
-    # Calculate ROUGE score
-    rouge_score = calculate_rouge_score(prediction, expected_answer)
-    results["rouge_score"] = rouge_score
-    
-    # Check for Strong's IDs if applicable
-    strongs_match = False
-    if example_type == "theological" and "strongs_id" in metadata:
-        expected_strongs = metadata["strongs_id"]
-        if isinstance(expected_strongs, str):
-            expected_strongs = [expected_strongs]
-        
-        strongs_match = check_strongs_id_match(prediction, expected_strongs)
-    
-    results["strongs_match"] = strongs_match
-    
-    # Check for theological terms if applicable
-    term_match = False
-    if example_type == "theological" and "term" in metadata:
-        expected_terms = metadata["term"]
-        if isinstance(expected_terms, str):
-            expected_terms = [expected_terms]
-        
-        term_match = check_term_match(prediction, expected_terms)
-    
-    results["term_match"] = term_match
-    
-    # Calculate overall score based on example type
-    if example_type == "theological":
-        # For theological questions, prioritize Strong's ID and term matches
-        overall_score = 0.3 * float(exact_match) + 0.3 * rouge_score + 0.2 * float(strongs_match) + 0.2 * float(term_match)
-    elif example_type == "multi-turn":
-        # For multi-turn questions, prioritize ROUGE score
-        overall_score = 0.2 * float(exact_match) + 0.8 * rouge_score
-    else:
-        # For factual questions, prioritize exact match
-        overall_score = 0.7 * float(exact_match) + 0.3 * rouge_score
-    
-    results["overall_score"] = overall_score
-    
-    return results
+    return evaluate_predictions([prediction], [example])[0]
 
-def run_single_test(model: dspy.Module, example: Dict[str, Any]) -> Dict[str, Any]:
-    """Run a single test on an example."""
+def run_single_test(model: dspy.Module, example: Dict[str, Any], evaluate: bool = True) -> Dict[str, Any]:
+    """Run a single test on an example (evaluate=False leaves scoring to the caller)."""
     context = example.get("context", "")
     question = example.get("question", "")
     history = example.get("history", [])
@@ -470,7 +443,7 @@ def run_single_test(model: dspy.Module, example: Dict[str, Any]) -> Dict[str, An
         end_time = time.time()
         
         # Evaluate the prediction
-        evaluation = evaluate_prediction(predicted_answer, example)
+        evaluation = evaluate_prediction(predicted_answer, example) if evaluate else None
         
         # Create the result
         result = {
@@ -508,37 +481,25 @@ def run_single_test(model: dspy.Module, example: Dict[str, Any]) -> Dict[str, An
 def run_batch_test(model: Any, examples: List[Dict[str, Any]], output_file: Optional[str] = None) -> Dict[str, float]:
     """Run a batch test on a list of examples."""
     results = []
-    metrics = {
-        "exact_match": 0,
-        "rouge_score": 0.0,
-        "strongs_match": 0,
-        "term_match": 0,
-        "overall_score": 0.0,
-        "theological_score": 0.0,
-        "factual_score": 0.0,
-        "multi_turn_score": 0.0
-    }
+    for i, example in enumerate(examples):
+        logger.info(f"Testing example {i+1}/{len(examples)}...")
+        results.append(run_single_test(model, example, evaluate=False))
+    
+    # Score every successful prediction in one pass; failed tests keep their zero evaluation
+    scored = [i for i, result in enumerate(results) if result.get("evaluation") is None]
+    evaluations = evaluate_predictions([results[i]["predicted_answer"] for i in scored], [examples[i] for i in scored])
+    for i, evaluation in zip(scored, evaluations):
+        results[i]["evaluation"] = evaluation
     
-    # Counters for each type of example
-    theological_count = 0
-    factual_count = 0
-    multi_turn_count = 0
+    num_examples = len(examples)
+    columns = {
+        key: np.array([float(result["evaluation"].get(key, 0.0)) for result in results], dtype=float)
+        for key in ("exact_match", "rouge_score", "rouge_l", "strongs_match", "term_match", "overall_score")
+    }
     
+    # Track scores by example type
+    example_types = []
     for i, example in enumerate(examples):
-        logger.info(f"Testing example {i+1}/{len(examples)}...")
-        result = run_single_test(model, example)
-        results.append(result)
-        
-        # Update metrics
-        example_eval = result.get("evaluation", {})
-        for key in metrics.keys():
-            if key in example_eval:
-                if isinstance(example_eval[key], bool):
-                    metrics[key] += int(example_eval[key])
-                else:
-                    metrics[key] += float(example_eval[key])
-        
-        # Track scores by example type
         example_type = example.get("metadata", {}).get("type", "")
         # If metadata is missing or type is not set, try to infer from context
         if not example_type:
@@ -548,36 +509,23 @@ def run_batch_test(model: Any, examples: List[Dict[str, Any]], output_file: Opti
                 example_type = "multi_turn"
             else:
                 example_type = "factual"
-        
-        # Add scores to the appropriate category
-        overall_score = example_eval.get("overall_score", 0.0)
-        if example_type == "theological":
-            metrics["theological_score"] += overall_score
-            theological_count += 1
-        elif example_type == "multi_turn":
-            metrics["multi_turn_score"] += overall_score
-            multi_turn_count += 1
-        else:  # default to factual
-            metrics["factual_score"] += overall_score
-            factual_count += 1
+        example_types.append(example_type if example_type in ("theological", "multi_turn") else "factual")
         
         # Log individual result
-        logger.info(f"Example {i+1} score: {example_eval.get('overall_score', 0.0):.4f} (type: {example_type})")
+        logger.info(f"Example {i+1} score: {columns['overall_score'][i]:.4f} (type: {example_type})")
     
-    # Calculate averages for overall metrics
-    num_examples = len(examples)
-    for key in ["exact_match", "rouge_score", "strongs_match", "term_match", "overall_score"]:
-        metrics[key] = metrics[key] / num_examples if num_examples > 0 else 0.0
-    
-    # Calculate type-specific averages
-    metrics["theological_score"] = metrics["theological_score"] / max(theological_count, 1)
-    metrics["factual_score"] = metrics["factual_score"] / max(factual_count, 1)
-    metrics["multi_turn_score"] = metrics["multi_turn_score"] / max(multi_turn_count, 1)
+    # Averages with bootstrap 95% confidence intervals
+    metrics = summarize(columns) if num_examples else {key: 0.0 for key in columns}
+    metrics.pop("count", None)
     
-    # Add counts to metrics for logging
-    metrics["theological_count"] = theological_count
-    metrics["factual_count"] = factual_count
-    metrics["multi_turn_count"] = multi_turn_count
+    example_types = np.array(example_types, dtype=object)
+    for example_type, name in (("theological", "theological"), ("factual", "factual"), ("multi_turn", "multi_turn")):
+        mask = example_types == example_type
+        metrics[f"{name}_score"] = float(columns["overall_score"][mask].mean()) if mask.any() else 0.0
+        metrics[f"{name}_count"] = int(mask.sum())
+    theological_count = metrics["theological_count"]
+    factual_count = metrics["factual_count"]
+    multi_turn_count = metrics["multi_turn_count"]
     
     # Log metrics to console
     logger.info("\nBatch Test Results:")
@@ -585,8 +533,13 @@ def run_batch_test(model: Any, examples: List[Dict[str, Any]], output_file: Opti
     logger.info(f"Theological examples: {theological_count}")
     logger.info(f"Factual examples: {factual_count}")
     logger.info(f"Multi-turn examples: {multi_turn_count}")
-    logger.info(f"Average overall score: {metrics['overall_score']:.4f}")
+    if num_examples:
+        logger.info(f"Average overall score: {metrics['overall_score']:.4f} "
+                    f"(95% CI {metrics['overall_score_ci_low']:.4f}-{metrics['overall_score_ci_high']:.4f})")
+    else:
+        logger.info(f"Average overall score: {metrics['overall_score']:.4f}")
     logger.info(f"Average ROUGE score: {metrics['rouge_score']:.4f}")
+    logger.info(f"Average ROUGE-L: {metrics['rouge_l']:.4f}")
     logger.info(f"Exact match rate: {metrics['exact_match']:.4f}")
     logger.info(f"Strong's ID match rate: {metrics['strongs_match']:.4f}")
     logger.info(f"Term match rate: {metrics['term_match']:.4f}")
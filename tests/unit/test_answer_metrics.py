@@ -0,0 +1,60 @@
+"""
+Unit tests for the vectorized answer metrics.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.utils.answer_metrics import (
+    AnswerScorer, Vocabulary, bootstrap_ci, lcs_lengths, normalize_answer, score_answers, strongs_ids, summarize
+)
+
+
+def reference_lcs(a, b):
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def test_lcs_matches_dynamic_programming_for_short_and_long_answers():
+    rng = random.Random(3)
+    words = "god love faith hope the of and lord israel one".split()
+    predictions = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 90))) for _ in range(200)]
+    references = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 25))) for _ in range(200)]
+    vocab = Vocabulary()
+    lcs = lcs_lengths(vocab.encode(predictions), vocab.encode(references))
+    assert lcs.tolist() == [reference_lcs(p.split(), r.split()) for p, r in zip(predictions, references)]
+
+
+def test_scores_per_example():
+    scores = score_answers(
+        ["The Lord our God is one Lord.", "love love love", "", "Faith, hope and love (G26)"],
+        ["the LORD our God is one LORD", "love is patient", "Moses", "Love, G0026 agape"],
+    )
+    assert scores["exact_match"].tolist() == [True, False, False, False]
+    # Every distinct token of the second prediction is in the reference
+    assert scores["correct"].tolist() == [True, True, False, False]
+    # Clipped counts: one of the three "love"s matches
+    assert scores["token_precision"][1] == pytest.approx(1 / 3)
+    assert scores["rouge_l"][3] == pytest.approx(0.25)
+    assert np.isnan(scores["strongs_recall"][:3]).all() and scores["strongs_recall"][3] == 1.0
+    assert normalize_answer("Ἐν ἀρχῇ, בְּרֵאשִׁית!") == "ἐν ἀρχῇ בְּרֵאשִׁית"
+    assert strongs_ids("H0430, h430 and G26a") == ["H430", "G26a"]
+
+
+def test_summary_is_deterministic_with_confidence_intervals():
+    values = np.random.default_rng(0).random(500)
+    mean, low, high = bootstrap_ci(values, n_resamples=500, seed=7)
+    assert low < mean < high and (mean, low, high) == bootstrap_ci(values, n_resamples=500, seed=7)
+
+    scorer = AnswerScorer(["In the beginning God created", "H430"], strongs=[None, "H0430"])
+    summary = scorer.summary(["in the beginning", "Elohim, H430"], n_resamples=200)
+    assert summary["strongs_recall"] == 1.0 and summary["count"] == 2.0
+    assert summary["token_recall_ci_low"] <= summary["token_recall"] <= summary["token_recall_ci_high"]
+    assert summarize(scorer.score(["", ""]), n_resamples=0) == summarize(scorer.score(["", ""]), n_resamples=0)
+    with pytest.raises(ValueError):
+        scorer.score(["one prediction"])
@@ -0,0 +1,62 @@
+"""
+Unit tests for answer token streaming.
+"""
+
+from types import SimpleNamespace
+
+from src.utils.answer_stream import parse_sse, sse_event, stream_answer
+
+
+class StreamingModel:
+    def __init__(self, pieces, fail_after=None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.calls = []
+
+    def stream(self, context, question, history=None):
+        self.calls.append((context, question, history))
+        for i, piece in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise ConnectionError("LM stream interrupted")
+            yield piece
+
+
+def test_streams_tokens_then_done():
+    model = StreamingModel(['In the ', '', 'beginning ', 'God'])
+    completed = []
+    events = list(stream_answer(model, 'Genesis 1', 'Who created?', history=[('q', 'a')],
+                                on_complete=lambda answer, stats: completed.append((answer, stats))))
+
+    assert [e for e, _ in events] == ['token', 'token', 'token', 'done']
+    assert ''.join(d['text'] for e, d in events if e == 'token') == 'In the beginning God'
+    done = events[-1][1]
+    assert done['answer'] == 'In the beginning God' and done['chunks'] == 3
+    assert 0 <= done['ttft'] <= done['seconds']
+    assert completed == [('In the beginning God', {k: done[k] for k in ('ttft', 'seconds', 'chunks')})]
+    assert model.calls == [('Genesis 1', 'Who created?', [('q', 'a')])]
+
+
+def test_failed_or_abandoned_streams_are_not_recorded():
+    completed = []
+    on_complete = lambda answer, stats: completed.append(answer)
+
+    events = list(stream_answer(StreamingModel(['a', 'b', 'c'], fail_after=2), '', 'q', on_complete=on_complete))
+    assert events[-1] == ('error', {'error': 'LM stream interrupted'})
+
+    events = stream_answer(StreamingModel(['a', 'b', 'c']), '', 'q', on_complete=on_complete)
+    assert next(events) == ('token', {'text': 'a'})
+    events.close()
+    assert completed == []
+
+
+def test_plain_models_and_sse_round_trip():
+    def model(context, question):
+        return SimpleNamespace(answer=f"  {question.upper()} ")
+
+    events = list(stream_answer(model, '', 'who was moses?'))
+    assert events[0] == ('token', {'text': '  WHO WAS MOSES? '})
+    assert events[1][1]['answer'] == 'WHO WAS MOSES?'
+
+    text = ''.join(sse_event(event, data) for event, data in events)
+    assert text.startswith('event: token\ndata: {"text": ')
+    assert parse_sse(text + 'event: token\ndata: {"tex') == events
@@ -0,0 +1,109 @@
+"""
+Unit tests for the benchmark fixture, workload mixes, load driver and baselines.
+"""
+
+import json
+import time
+from dataclasses import replace
+
+import pytest
+
+from src.testing.baselines import Thresholds, baseline_path, compare, load_baseline, save_baseline
+from src.testing.fixture_db import FixtureConfig, generate_fixture
+from src.testing.load_driver import LoadDriver, format_summary
+from src.testing.stub_server import StubLMServer
+from src.testing.workloads import MIXES, PlannedRequest, WorkloadMix, get_mix
+
+SMALL = FixtureConfig(ot_books=('Genesis',), nt_books=('John',), chapters=2, verses=5, hebrew_entries=200,
+                      greek_entries=150, parallel_links=20, relationships=30)
+
+
+@pytest.fixture(scope='module')
+def fixture():
+    return generate_fixture(SMALL)
+
+
+def _page(method, path, body):
+    time.sleep(0.002)
+    return 200, {'path': path}
+
+
+@pytest.fixture
+def server():
+    with StubLMServer() as stub:
+        stub.route('/missing', lambda method, path, body: (404, {'error': 'not found'}))
+        stub.route('/', _page)
+        yield f"http://127.0.0.1:{stub.server_address[1]}"
+
+
+def test_fixture_is_reproducible_and_skewed(fixture):
+    assert generate_fixture(SMALL).fingerprint() == fixture.fingerprint()
+    assert generate_fixture(replace(SMALL, seed=1)).fingerprint() != fixture.fingerprint()
+    catalog = fixture.catalog()
+    assert len(catalog.references) == 2 * 2 * 5
+    hebrew = catalog.strongs_ids['hebrew']
+    assert hebrew[0][0] == 'H430' and hebrew[0][1] > hebrew[-1][1]
+    assert catalog.queries and all(q['question'] and q['context'] for q in catalog.questions)
+
+
+def test_plans_are_deterministic_and_cover_the_mix(fixture):
+    catalog = fixture.catalog()
+    mix = get_mix('mixed')
+    plan = mix.plan(catalog, 500, seed=3)
+    assert [(r.path, r.params, r.json) for r in plan] == \
+        [(r.path, r.params, r.json) for r in mix.plan(catalog, 500, seed=3)]
+    assert {r.route for r in plan} == {route.name for route in mix.routes}
+    assert not any('{' in r.path for r in plan)
+    verse_paths = [r.path for r in plan if r.route == 'verse_page']
+    # Zipf-skewed keys: the hottest verse is asked for far more often than an even spread would give
+    assert max(verse_paths.count(p) for p in verse_paths) > 3 * len(verse_paths) / len(catalog.references)
+    ask = next(r for r in plan if r.route == 'dspy_ask_stream')
+    assert ask.method == 'POST' and ask.stream and set(ask.json) == {'question', 'context'}
+    assert set(MIXES) >= {'pages', 'search', 'export', 'ask', 'mixed'}
+
+    with pytest.raises(ValueError):
+        WorkloadMix.from_dict({'name': 'bad', 'routes': [{'name': 'x', 'path': '/x/{nope}'}]})
+    custom = WorkloadMix.from_dict(json.loads(json.dumps(MIXES['pages'].to_dict())))
+    assert [r.path for r in custom.plan(catalog, 50, seed=1)] == [r.path for r in MIXES['pages'].plan(catalog, 50, seed=1)]
+
+
+def test_driver_records_routes_and_errors(server, fixture):
+    plan = get_mix('pages').plan(fixture.catalog(), 60, seed=1)
+    plan += [PlannedRequest(route='missing', method='GET', path='/missing')] * 5
+    result = LoadDriver(server, plan, concurrency=4, warmup=10).run()
+    assert len(result.samples) == len(plan) and result.mode == 'closed'
+    summary = result.summary()
+    assert summary['routes']['missing']['error_rate'] == 1.0
+    assert summary['overall']['errors'] == 5 and summary['overall']['rps'] > 0
+    assert summary['routes']['verse_page']['latency_p50'] >= 2.0
+    assert 'overall' in format_summary(summary)
+
+    # Open loop: the schedule, not the server, sets the pace
+    result = LoadDriver(server, plan[:20], concurrency=4, rate=200, seed=2).run()
+    assert result.mode == 'open' and len(result.samples) == 20
+    assert result.elapsed >= 0.05
+
+
+def _summary(p95, rps, error_rate=0.0, count=100):
+    stats = {'count': count, 'error_rate': error_rate, 'rps': rps, 'latency_p95': p95, 'latency_p99': p95 * 1.2}
+    return {'elapsed': 10.0, 'overall': stats, 'routes': {'verse_page': dict(stats)}}
+
+
+def test_baseline_thresholds(tmp_path):
+    metadata = {'mix': 'pages', 'fixture': 'abc', 'mode': 'closed', 'concurrency': 8, 'rate': None}
+    path = baseline_path('pages', str(tmp_path))
+    save_baseline(path, _summary(p95=40.0, rps=100.0), metadata)
+    baseline = load_baseline(path)
+    thresholds = Thresholds(latency=0.2, latency_floor_ms=5, rps=0.15, error_rate=0.01, min_samples=30)
+
+    assert compare(baseline, _summary(p95=46.0, rps=90.0), metadata, thresholds).passed
+    slower = compare(baseline, _summary(p95=60.0, rps=80.0, error_rate=0.05), metadata, thresholds)
+    assert {(r.scope, r.metric) for r in slower.regressions} >= {
+        ('overall', 'latency_p95'), ('overall', 'rps'), ('overall', 'error_rate'), ('verse_page', 'latency_p95')}
+    # A large relative change on a fast route stays under the absolute floor
+    save_baseline(path, _summary(p95=2.0, rps=100.0), metadata)
+    assert compare(load_baseline(path), _summary(p95=4.0, rps=100.0), metadata, thresholds).passed
+
+    other = compare(baseline, _summary(p95=40.0, rps=100.0), dict(metadata, fixture='def'), thresholds)
+    assert not other.comparable and 'fixture' in other.reason
+    assert load_baseline(str(tmp_path / 'none.json')) is None
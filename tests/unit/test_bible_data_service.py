@@ -0,0 +1,90 @@
+"""
+Unit tests for the Bible data service layer (local and HTTP backends).
+"""
+
+import pytest
+from src.services import (
+    BibleDataService, RemoteBibleDataService, ServiceError, create_bible_data_service
+)
+from src.services.queries import book_spellings, strongs_variants
+from src.testing import StubLMServer, fake_db
+
+NAME_ROWS = [
+    {'id': 7, 'name': 'Abraham', 'type': 'Person', 'gender': 'Male',
+     'short_description': 'Patriarch', 'total_count': 2},
+    {'id': 8, 'name': 'Abram', 'type': 'Person', 'gender': 'Male',
+     'short_description': 'Patriarch', 'total_count': 2},
+]
+
+class FakeConnection(fake_db.FakeConnection):
+    def respond(self, cursor, query, params):
+        return [dict(row) for row in NAME_ROWS]
+
+def test_helpers():
+    assert strongs_variants('h0430') == ['H430', 'H0430']
+    assert strongs_variants('G26') == ['G26', 'G0026']
+    assert book_spellings('Jn') == ['Jn', 'John', 'Jhn']
+    assert book_spellings('Unknown') == ['Unknown']
+
+def test_local_service_runs_queries_on_one_connection():
+    connections = []
+
+    def factory():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    service = BibleDataService(connection_factory=factory)
+    data = service.search_names('Abr', search_type='name', gender='Male', offset=0, limit=2)
+
+    assert [r['name'] for r in data['results']] == ['Abraham', 'Abram']
+    assert all('total_count' not in r for r in data['results'])
+    assert data['metadata'] == {'total_count': 2, 'offset': 0, 'limit': 2}
+    query, params = connections[0].queries[0]
+    assert 'n.name ILIKE %s' in query and 'n.gender = %s' in query
+    assert params == ['%Abr%', 'Male', 0, 2]
+    assert len(connections) == 1 and connections[0].closed
+
+def test_local_service_errors():
+    conn = FakeConnection(fail=True)
+    with pytest.raises(ServiceError) as excinfo:
+        BibleDataService(connection_factory=lambda: conn).list_names()
+    assert excinfo.value.status == 500
+    assert conn.closed
+
+    with pytest.raises(ServiceError) as excinfo:
+        BibleDataService(connection_factory=lambda: None).arabic_stats()
+    assert excinfo.value.status == 503
+
+@pytest.fixture
+def stub_api():
+    with StubLMServer() as server:
+        server.paths = []
+
+        def api(method, path, body):
+            server.paths.append(path)
+            if path.startswith('/api/names/search'):
+                return 200, {'results': [], 'metadata': {'total_count': 0}}
+            if path.startswith('/api/names/'):
+                return 404, {'error': 'Proper name 1 not found'}
+            return 500, {'error': 'boom'}
+
+        server.route('/api/', api)
+        yield server
+
+def test_remote_service(stub_api):
+    service = RemoteBibleDataService(f"http://127.0.0.1:{stub_api.server_address[1]}", timeout=5)
+
+    assert service.search_names('Abr', gender='Male')['metadata'] == {'total_count': 0}
+    assert 'q=Abr' in stub_api.paths[0] and 'gender=Male' in stub_api.paths[0]
+    assert 'book=' not in stub_api.paths[0]
+    assert service.get_name(1) is None
+    with pytest.raises(ServiceError) as excinfo:
+        service.arabic_stats()
+    assert excinfo.value.status == 500 and excinfo.value.message == 'boom'
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.setenv('BIBLE_DATA_BACKEND', 'http')
+    monkeypatch.setenv('API_BASE_URL', 'http://api.example:5000/')
+    remote = create_bible_data_service()
+    assert remote.is_remote and remote.base_url == 'http://api.example:5000'
+    assert not create_bible_data_service('local').is_remote
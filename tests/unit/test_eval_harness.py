@@ -0,0 +1,114 @@
+"""
+Unit tests for the parallel, resumable evaluation harness.
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.utils.eval_harness import ResultsStore, evaluate, model_hash, score
+
+EXAMPLES = [
+    {'question': 'Who created the heavens?', 'answer': 'God created the heavens and the earth',
+     'metadata': {'type': 'theological'}},
+    {'question': 'Who built the ark?', 'answer': 'Noah built the ark', 'metadata': {'type': 'factual'}},
+    {'question': 'Who led Israel out of Egypt?', 'answer': 'Moses', 'metadata': {'type': 'factual'}},
+    {'question': 'What is faith?', 'answer': 'The substance of things hoped for', 'context': 'Hebrews 11:1'},
+]
+
+ANSWERS = {
+    'Who created the heavens?': 'In the beginning God created the heavens and the earth.',
+    'Who built the ark?': 'Noah built it.',
+    'Who led Israel out of Egypt?': 'Aaron',
+    'What is faith?': 'Trust.',
+}
+
+
+class Prediction:
+    def __init__(self, answer):
+        self.answer = answer
+
+
+class FakeLM:
+    """Deterministic model: canned answers, optional failures, counts concurrent calls."""
+
+    def __init__(self, fail=(), delay=0.0, version='1'):
+        self.fail = set(fail)
+        self.delay = delay
+        self.version = version
+        self.calls = []
+        self._active = 0
+        self._max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_active(self):
+        return self._max_active
+
+    def __call__(self, context, question, history=None):
+        with self._lock:
+            self.calls.append(question)
+            self._active += 1
+            self._max_active = max(self._max_active, self._active)
+        try:
+            time.sleep(self.delay)
+            if question in self.fail:
+                raise ConnectionError("LM unavailable")
+            return Prediction(ANSWERS[question])
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def test_score_vectorized():
+    scores = score(['God created the heavens', 'nothing here', ''], ['god created', 'Moses', 'Moses'])
+    assert scores['correct'].tolist() == [True, False, False]
+    assert scores['exact'].tolist() == [True, False, False]
+    assert np.allclose(scores['recall'], [1.0, 0.0, 0.0])
+    assert np.allclose(scores['precision'], [0.5, 0.0, 0.0])
+
+
+def test_evaluate_checkpoints_and_resumes(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    model = FakeLM(fail={'What is faith?'}, delay=0.02)
+    report = evaluate(model, EXAMPLES, results_path=path, workers=2)
+
+    assert model.max_active == 2
+    assert report.predicted == 4 and report.reused == 0
+    assert report.metrics['count'] == 4
+    assert report.metrics['accuracy'] == pytest.approx(0.5)
+    assert report.metrics['error_rate'] == pytest.approx(0.25)
+    assert report.by_category['factual']['accuracy'] == pytest.approx(0.5)
+    assert report.by_category['theological']['exact_match'] == 1.0
+    assert report.by_category['uncategorized']['count'] == 1
+    assert report.flat()['accuracy/factual'] == pytest.approx(0.5)
+    with open(path) as f:
+        assert len([json.loads(line) for line in f]) == 4
+
+    # A rerun only retries the failed example
+    model.fail.clear()
+    model.calls.clear()
+    report = evaluate(model, EXAMPLES, results_path=path, workers=2)
+    assert model.calls == ['What is faith?']
+    assert report.predicted == 1 and report.reused == 3
+    assert report.metrics['error_rate'] == 0.0
+
+    # A different model does not reuse the first model's predictions
+    other = FakeLM(version='2')
+    assert model_hash(other) != model_hash(model)
+    evaluate(other, EXAMPLES, results_path=path)
+    assert len(other.calls) == 4
+
+
+def test_results_store_ignores_partial_line(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    store = ResultsStore(str(path))
+    store.append({'model': 'm', 'example': 'a', 'prediction': 'x', 'error': None})
+    store.append({'model': 'm', 'example': 'b', 'prediction': None, 'error': 'timeout'})
+    store.close()
+    with open(path, 'a') as f:
+        f.write('{"model": "m", "example": "c", "predi')
+    assert list(ResultsStore(str(path)).load('m')) == ['a']
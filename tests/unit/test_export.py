@@ -0,0 +1,82 @@
+"""
+Unit tests for the streaming concordance export.
+"""
+
+import csv
+import gzip
+import io
+import json
+
+from flask import Flask
+from src.testing import fake_db
+from src.services import BibleDataService
+from src.services.export import (
+    CONCORDANCE_COLUMNS, accepts_gzip, encode_rows, gzip_chunks, streaming_export
+)
+
+ROWS = [
+    ('Gen 1:1', 'In the beginning God created', 'אֱלֹהִים', 'H430'),
+    ('Gen 1:2', 'And the earth was "without form", and void', 'אֱלֹהִים', 'H430'),
+    ('Gen 1:3', 'And God said, Let there be light', 'אֱלֹהִים', 'H430'),
+]
+
+class FakeConnection(fake_db.FakeConnection):
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+
+    def respond(self, cursor, query, params):
+        return [
+            {'book_name': 'Gen', 'chapter_num': 1, 'verse_num': v, 'verse_text': f"verse {v}",
+             'word_text': 'אֱלֹהִים', 'strongs_id': 'H430'}
+            for v in range(1, self.total + 1)
+        ]
+
+def test_encode_rows_formats():
+    chunks = list(encode_rows(ROWS, CONCORDANCE_COLUMNS, 'csv', chunk_rows=2))
+    assert len(chunks) == 2
+    parsed = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert parsed[0] == ['Reference', 'Verse Text', 'Target Word', "Strong's ID"]
+    assert parsed[1:] == [list(row) for row in ROWS]
+
+    tsv = ''.join(encode_rows(ROWS, CONCORDANCE_COLUMNS, 'tsv'))
+    assert tsv.splitlines()[1] == '\t'.join(ROWS[0])
+
+    lines = ''.join(encode_rows(ROWS, CONCORDANCE_COLUMNS, 'jsonl')).splitlines()
+    assert json.loads(lines[2]) == {'reference': 'Gen 1:3', 'verse_text': ROWS[2][1],
+                                    'target_word': 'אֱלֹהִים', 'strongs_id': 'H430'}
+
+def test_gzip_streaming_response():
+    assert accepts_gzip('gzip, deflate, br') and accepts_gzip('*')
+    assert not accepts_gzip('gzip;q=0, identity') and not accepts_gzip('')
+
+    text = ''.join(encode_rows(ROWS, CONCORDANCE_COLUMNS))
+    assert gzip.decompress(b''.join(gzip_chunks(encode_rows(ROWS, CONCORDANCE_COLUMNS)))).decode() == text
+
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = streaming_export(iter(ROWS), CONCORDANCE_COLUMNS, 'concordance_H430',
+                                    fmt='tsv', accept_encoding='gzip')
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Disposition'].endswith('concordance_H430.tsv')
+    body = gzip.decompress(b''.join(response.response)).decode()
+    assert body.splitlines()[3].startswith('Gen 1:3\t')
+
+def test_iter_concordance_batches_and_closes():
+    conn = FakeConnection(total=5)
+    service = BibleDataService(connection_factory=lambda: conn)
+    rows = service.iter_concordance('H0430', batch_size=2)
+    # The first batch is fetched eagerly so errors surface before streaming
+    assert conn.fetches == 1 and not conn.closed
+
+    assert [r[0] for r in rows] == [f"Gen 1:{v}" for v in range(1, 6)]
+    assert conn.fetches == 4
+    assert conn.closed and conn.closed_cursors
+    assert conn.queries[0][1][1] == ['H430', 'H0430']
+
+    conn = FakeConnection(total=3)
+    rows = BibleDataService(connection_factory=lambda: conn).iter_concordance('H430')
+    next(rows)
+    rows.close()
+    assert conn.closed
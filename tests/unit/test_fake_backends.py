@@ -0,0 +1,110 @@
+"""
+Unit tests for the fake LM, fake embeddings and the stub LM Studio server.
+"""
+
+import os
+
+import numpy as np
+import pytest
+import requests
+
+from src.testing import CannedResponses, FakeLM, Latency, fake_embedding
+from src.testing.fake_lm import requested_fields
+from src.testing.fixtures import use_stub_server
+from src.utils.lm_client import LMClient, get_lm_client
+
+CHAT_PROMPT = [
+    {'role': 'system', 'content': 'Your output fields are: `reasoning` (str), `answer` (str), `confidence` (float)'},
+    {'role': 'user', 'content': (
+        "[[ ## question ## ]]\nWho built the ark?\n\n"
+        "Respond with the corresponding output fields, starting with the field `[[ ## reasoning ## ]]`, "
+        "then `[[ ## answer ## ]]`, then `[[ ## confidence ## ]]` (must be formatted as a valid Python float), "
+        "and then ending with the marker for `[[ ## completed ## ]]`."
+    )},
+]
+
+
+def test_latency_parse_and_sample():
+    latency = Latency.parse('uniform:0.1,0.2+0.01')
+    assert latency.kind == 'uniform' and latency.per_token == 0.01
+    samples = [latency.sample(tokens=10) for _ in range(50)]
+    assert all(0.2 <= s <= 0.3 for s in samples)
+    # The same seed gives the same sequence
+    assert [Latency.parse('lognormal:0.4,0.5').sample() for _ in range(3)] == \
+        [Latency.parse('lognormal:0.4,0.5').sample() for _ in range(3)]
+    assert Latency.parse(0.25).sample() == 0.25
+    with pytest.raises(ValueError):
+        Latency('bimodal', 1.0)
+
+
+def test_canned_responses_fill_requested_fields():
+    assert requested_fields(CHAT_PROMPT) == {'reasoning': None, 'answer': None, 'confidence': 'float'}
+
+    canned = CannedResponses({'Who built the ark?': {'answer': 'Noah'}})
+    text = canned.complete(CHAT_PROMPT)
+    assert '[[ ## answer ## ]]\nNoah' in text
+    assert text.index('[[ ## reasoning ## ]]') < text.index('[[ ## answer ## ]]')
+    assert text.endswith('[[ ## completed ## ]]')
+    confidence = text.split('[[ ## confidence ## ]]\n')[1].split('\n')[0]
+    assert 0.0 <= float(confidence) <= 1.0
+
+    # Without a canned reply the output is still deterministic
+    assert CannedResponses().complete(CHAT_PROMPT) == CannedResponses().complete(CHAT_PROMPT)
+    assert CannedResponses(['first', 'second']).complete([{'role': 'user', 'content': 'hi'}]) == 'first'
+
+
+def test_fake_embedding_is_stable_and_normalised():
+    a = np.array(fake_embedding('In the beginning God created the heaven and the earth'))
+    assert a.shape == (768,)
+    assert np.isclose(np.linalg.norm(a), 1.0, atol=1e-5)
+    assert np.array_equal(a, fake_embedding('In the beginning God created the heaven and the earth'))
+    related = np.array(fake_embedding('God created the earth'))
+    unrelated = np.array(fake_embedding('Jesus wept'))
+    assert a @ related > a @ unrelated
+    assert len(fake_embedding('x', dimensions=32)) == 32
+
+
+def test_fake_lm_forward_and_failures():
+    lm = FakeLM(responses={'ark': 'Noah'}, latency=0.01, fail_every=3)
+    response = lm.forward(messages=CHAT_PROMPT)
+    assert '[[ ## reasoning ## ]]\nNoah' in response.choices[0].message.content
+    assert response.usage['completion_tokens'] > 0
+    lm.forward(prompt='plain prompt')
+    with pytest.raises(ConnectionError):
+        lm.forward(prompt='plain prompt')
+    assert lm.calls == 3 and lm.in_flight == 0
+    assert lm.total_sleep == pytest.approx(0.02)
+
+
+def test_stub_server_serves_existing_clients():
+    with use_stub_server(latency=0.05) as server:
+        assert os.environ['LM_STUDIO_API_URL'] == server.url
+        models = requests.get(f"{server.url}/models", timeout=5).json()
+        assert server.embedding_model in [m['id'] for m in models['data']]
+
+        response = requests.post(f"{server.url}/embeddings", timeout=5,
+                                 json={'model': server.embedding_model, 'input': ['Jesus wept', 'God is love']})
+        data = response.json()['data']
+        assert len(data) == 2 and len(data[0]['embedding']) == 768
+        assert data[0]['embedding'] == pytest.approx(fake_embedding('Jesus wept'))
+
+        # The shared client is rebuilt against the stub
+        client = get_lm_client()
+        assert client.url == f"{server.url}/chat/completions"
+        schema = {'type': 'object', 'properties': {'answer': {'type': 'string'}, 'score': {'type': 'integer'}}}
+        result = client.chat_json([{'role': 'user', 'content': 'Who built the ark?'}], schema, use_cache=False)
+        assert set(result) == {'answer', 'score'} and isinstance(result['score'], int)
+
+        # Scripted overloads are retried by the client
+        server.fail_next(2)
+        retrying = LMClient(api_url=server.url, backoff=0.01, max_concurrency=4)
+        assert retrying.chat([{'role': 'user', 'content': 'hello'}], use_cache=False)
+        assert retrying.metrics.snapshot()['retries'] == 2
+
+        # Requests are served concurrently
+        server.reset_stats()
+        retrying.map_concurrent(lambda i: retrying.chat([{'role': 'user', 'content': f"q{i}"}], use_cache=False),
+                                range(8))
+        assert server.stats['chat_completions'] == 8
+        assert server.stats['max_in_flight'] == 4
+        retrying.close()
@@ -0,0 +1,51 @@
+"""
+Unit tests for the concurrent page fan-out.
+"""
+
+import threading
+import time
+
+from src.services.fanout import FanOut, fan_out
+
+def sleeper(seconds, value):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+def test_calls_run_concurrently():
+    start = time.monotonic()
+    page = fan_out({'hebrew': sleeper(0.3, ['H']), 'greek': sleeper(0.3, ['G'])}, deadline=2)
+    assert time.monotonic() - start < 0.55
+    assert page['hebrew'] == ['H'] and page['greek'] == ['G']
+    assert page.degraded == []
+
+def test_slow_and_failing_calls_degrade():
+    release = threading.Event()
+
+    def broken():
+        raise RuntimeError("API server unavailable")
+
+    start = time.monotonic()
+    page = fan_out({
+        'verse': sleeper(0, {'text': 'In the beginning'}),
+        'commentaries': lambda: release.wait(5),
+        'translations': broken,
+    }, deadline=0.3, defaults={'commentaries': {'commentaries': []}})
+    release.set()
+
+    assert time.monotonic() - start < 1
+    assert page['verse'] == {'text': 'In the beginning'}
+    assert page['commentaries'] == {'commentaries': []}
+    assert page['translations'] is None
+    assert page.degraded == ['commentaries', 'translations']
+    assert 'unavailable' in page.errors['translations']
+
+def test_stages_share_the_deadline():
+    page = FanOut(deadline=0.5)
+    page.run({'verse': sleeper(0.3, 'v')})
+    assert page.remaining() < 0.25
+    page.run({'archaeological': sleeper(0.5, 'a')})
+    assert page.get('archaeological') is None
+    assert page['verse'] == 'v'
+    assert page.degraded == ['archaeological']
@@ -0,0 +1,141 @@
+"""
+Unit tests for the async inference executor.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.inference_executor import InferenceExecutor, InferenceSaturated, InferenceTimeout
+
+def slow_answer(seconds, answer):
+    time.sleep(seconds)
+    return answer
+
+def test_calls_run_off_the_event_loop():
+    executor = InferenceExecutor(max_workers=4, max_queue=0, timeout=5)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        start = time.monotonic()
+        answers = await asyncio.gather(*(executor.run(slow_answer, 0.2, f"a{i}") for i in range(4)))
+        elapsed = time.monotonic() - start
+        task.cancel()
+        return answers, elapsed, ticks
+
+    answers, elapsed, ticks = asyncio.run(main())
+    assert answers == ['a0', 'a1', 'a2', 'a3']
+    assert elapsed < 0.45
+    assert ticks >= 10  # the loop kept running while the model calls blocked
+    assert executor.pending == 0
+
+def test_saturation_and_timeouts():
+    executor = InferenceExecutor(max_workers=1, max_queue=1, timeout=5)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(slow_answer, 0, 'queued', timeout=0.1))
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenceSaturated) as saturated:
+            await executor.run(slow_answer, 0, 'rejected')
+        assert saturated.value.retry_after >= 1
+
+        # The queued call times out before it starts and is dropped
+        with pytest.raises(InferenceTimeout):
+            await queued
+        await asyncio.sleep(0.05)
+        assert executor.pending == 1
+        release.set()
+        assert await running is True
+        return await executor.run(slow_answer, 0, 'admitted')
+
+    assert asyncio.run(main()) == 'admitted'
+    assert executor.stats['rejected'] == 1 and executor.stats['timeouts'] == 1
+
+def test_batches_and_single_flight_share_calls():
+    executor = InferenceExecutor(max_workers=4, max_queue=0, timeout=5)
+    calls = []
+
+    def answer(context, question):
+        calls.append(question)
+        time.sleep(0.05)
+        if question == 'bad':
+            raise ValueError("model error")
+        return question.upper()
+
+    async def main():
+        items = [('', 'who'), ('', 'what'), ('', 'who'), ('', 'bad')]
+        results = await executor.run_batch(answer, items, keys=items)
+        shared = await asyncio.gather(executor.run(answer, '', 'why', key='why'),
+                                      executor.run(answer, '', 'why', key='why'))
+        return results, shared
+
+    results, shared = asyncio.run(main())
+    assert results[:3] == ['WHO', 'WHAT', 'WHO']
+    assert isinstance(results[3], ValueError)
+    assert shared == ['WHY', 'WHY']
+    assert sorted(calls) == ['bad', 'what', 'who', 'why']
+    assert executor.stats['shared'] == 1
+
+    # A batch larger than the free capacity is refused as a whole
+    with pytest.raises(InferenceSaturated):
+        asyncio.run(executor.run_batch(answer, [('', str(i)) for i in range(5)]))
+
+def test_streams_items_and_stops_on_disconnect():
+    executor = InferenceExecutor(max_workers=1, max_queue=0, timeout=5)
+    produced = []
+    closed = threading.Event()
+
+    def tokens(n, delay):
+        try:
+            for i in range(n):
+                time.sleep(delay)
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    async def main():
+        received = [item async for item in executor.stream(tokens, 3, 0.01)]
+
+        # A consumer that stops early stops the generator at its next item
+        events = executor.stream(tokens, 100, 0.01)
+        with pytest.raises(InferenceSaturated):
+            executor.stream(tokens, 1, 0)
+        async for item in events:
+            if item == 1:
+                break
+        await events.aclose()
+        await asyncio.sleep(0.05)
+        assert executor.pending == 0
+
+        with pytest.raises(InferenceTimeout):
+            async for _ in executor.stream(tokens, 10, 0.05, timeout=0.1):
+                pass
+
+        # A callable that fails before yielding surfaces its own error, not a timeout
+        def broken():
+            raise ValueError("model not loaded")
+        await asyncio.sleep(0.5)
+        with pytest.raises(ValueError):
+            async for _ in executor.stream(broken, timeout=2):
+                pass
+        return received
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert closed.wait(1)
+    time.sleep(0.2)
+    assert executor.pending == 0
+    assert len(produced) < 20
+    assert executor.stats['rejected'] == 1 and executor.stats['timeouts'] == 1
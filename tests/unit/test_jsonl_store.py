@@ -0,0 +1,72 @@
+"""
+Unit tests for the indexed JSONL dataset store.
+"""
+
+import os
+import json
+
+import pytest
+
+from src.utils.jsonl_store import JsonlDataset, scan_lines
+
+
+def write_jsonl(path, records, header="// generated\n"):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+RECORDS = [
+    {"question": f"Question {i}?", "answer": f"Answer {i} — חֶסֶד", "metadata": {"type": f"t{i % 3}"}}
+    for i in range(50)
+]
+
+
+def test_scan_skips_comments_and_blank_lines():
+    buffer = b'// header\n{"a": 1}\n\n  \n# note\n  {"a": 2}\r\n  // indented comment\n{"a": 3}'
+    offsets, lengths = scan_lines(buffer)
+    assert [json.loads(buffer[o:o + n]) for o, n in zip(offsets, lengths)] == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert len(scan_lines(b"")[0]) == 0
+
+
+def test_random_access_sampling_and_shards(tmp_path):
+    path = str(tmp_path / "qa.jsonl")
+    write_jsonl(path, RECORDS)
+    with JsonlDataset(path) as dataset:
+        assert len(dataset) == 50 and os.path.exists(path + ".idx.npz")
+        assert dataset[7] == RECORDS[7] and dataset[-1] == RECORDS[-1]
+        assert dataset[10:13] == RECORDS[10:13]
+        sample = dataset.sample(5, seed=1)
+        assert len(sample) == 5 and all(record in RECORDS for record in sample)
+        assert dataset.sample(5, seed=1) == sample
+        shards = [list(dataset.shard(k, 3)) for k in range(3)]
+        assert sum(shards, []) == RECORDS and [len(s) for s in shards] == [16, 17, 17]
+        with pytest.raises(IndexError):
+            dataset[50]
+
+
+def test_columns_are_cached_and_invalidated(tmp_path):
+    path = str(tmp_path / "qa.jsonl")
+    write_jsonl(path, RECORDS + [{"question": "Odd one", "answer": ["a", "list"]}])
+    with JsonlDataset(path) as dataset:
+        columns = dataset.columns(["answer", "metadata.type"])
+    assert columns["metadata.type"][:4] == ["t0", "t1", "t2", "t0"] and columns["metadata.type"][-1] is None
+    assert columns["answer"][-1] == ["a", "list"]
+
+    # A reopened dataset reads the column sidecar instead of the records
+    with JsonlDataset(path) as dataset:
+        dataset.record = None
+        assert dataset.column("answer") == columns["answer"]
+
+    # Appending changes size and mtime, so index and columns are rebuilt
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"question": "New?", "answer": "New."}\nnot json\n')
+    with JsonlDataset(path) as dataset:
+        assert dataset.is_stale() is False
+        assert len(dataset) == 53
+        assert dataset.column("answer")[51] == "New."
+        assert len(list(dataset)) == 52
+        with pytest.raises(ValueError):
+            dataset[52]
+        assert dataset.project(["question"])[51] == {"question": "New?"}
@@ -0,0 +1,107 @@
+"""
+Unit tests for the precomputed lexicon entry aggregates.
+"""
+
+import json
+
+from src.services import BibleDataService
+from src.testing import fake_db
+from src.utils import lexicon_aggregates
+from src.utils.lexicon_aggregates import (
+    LexiconAggregateCache, _upsert_sql, refresh_lexicon_aggregates
+)
+
+AGGREGATE_ROW = {
+    'language': 'hebrew',
+    'strongs_id': 'H430',
+    'entry': {'strongs_id': 'H430', 'hebrew_word': 'אֱלֹהִים', 'gloss': 'God'},
+    'occurrence_count': 2602,
+    'verse_count': 2249,
+    'sample_verses': json.dumps([{'verse_key': 1001001, 'book_name': 'Gen', 'chapter_num': 1,
+                                  'verse_num': 1, 'verse_text': 'In the beginning God created'}]),
+    'related_words': [{'target_id': 'G2316', 'relationship_type': 'translation', 'language': 'greek'}],
+}
+
+class FakeConnection(fake_db.FakeConnection):
+    def __init__(self, has_rows=True, version=1):
+        super().__init__()
+        self.has_rows = has_rows
+        self.version = version
+
+    def respond(self, cursor, query, params):
+        if 'to_regclass' in query:
+            return [(True,)]
+        if 'FROM bible.lexicon_entry_aggregates' in query and query.lstrip().startswith('SELECT'):
+            return [dict(AGGREGATE_ROW)] if self.has_rows else []
+        if 'SELECT version FROM bible.etl_versions' in query:
+            return [(self.version,)]
+        if 'RETURNING version' in query:
+            return [(self.version + 1,)]
+        if 'INSERT INTO bible.lexicon_entry_aggregates' in query:
+            cursor.rowcount = 3
+        elif query.lstrip().startswith('DELETE'):
+            cursor.rowcount = 1
+        return []
+
+def test_upsert_only_rewrites_changed_rows():
+    """The upsert skips unchanged rows and narrows every scan to the given IDs."""
+    full = _upsert_sql('greek', filtered=False)
+    assert 'FROM bible.greek_nt_words' in full and 'FROM bible.greek_entries e' in full
+    assert 'ON CONFLICT (language, strongs_id) DO UPDATE' in full
+    assert 'IS DISTINCT FROM' in full
+    assert 'ANY(%(ids)s)' not in full
+
+    filtered = _upsert_sql('hebrew', filtered=True)
+    assert filtered.count('ANY(%(ids)s)') == 4
+
+def test_refresh_expands_ids_and_bumps_version():
+    conn = FakeConnection()
+    changed = refresh_lexicon_aggregates(conn, languages=['hebrew'], strongs_ids=['H0430'])
+    upserts = [p for q, p in conn.queries if 'INSERT INTO bible.lexicon_entry_aggregates' in q]
+    assert len(upserts) == 1 and upserts[0]['language'] == 'hebrew'
+    assert {'H430', 'H0430'} <= set(upserts[0]['ids'])
+    # A targeted refresh never deletes other entries' rows
+    assert not any(q.lstrip().startswith('DELETE') for q, _ in conn.queries)
+    assert changed == 3
+    assert any(p == ('lexicon_aggregates',) for q, p in conn.queries if 'RETURNING version' in q)
+
+    conn = FakeConnection()
+    assert refresh_lexicon_aggregates(conn) == 8
+    assert sum(q.lstrip().startswith('DELETE') for q, _ in conn.queries) == 2
+
+def test_cache_serves_hot_entries_and_clears_on_new_version():
+    conn = FakeConnection(version=1)
+    cache = LexiconAggregateCache(connection_factory=lambda: conn, max_entries=2, check_interval=0)
+    assert cache.get_cached('hebrew', 'H430') is None
+
+    page = cache.load(conn, 'hebrew', 'H430')
+    assert page['occurrence_count'] == 2602
+    assert page['occurrences'][0]['verse_text'].startswith('In the beginning')
+    assert page['related_words'][0]['target_id'] == 'G2316'
+    reads = [p for q, p in conn.queries if 'FROM bible.lexicon_entry_aggregates' in q]
+    assert reads[0][0] == 'hebrew' and 'H0430' in reads[0][1]
+    assert cache.get_cached('hebrew', 'H430') is page
+
+    cache.put('greek', 'G2316', {})
+    cache.put('greek', 'G26', {})
+    assert cache.get_cached('hebrew', 'H430') is None  # evicted as least recently used
+
+    conn.version = 2
+    assert cache.get_cached('greek', 'G26') is None
+
+def test_service_uses_cache_before_connecting(monkeypatch):
+    cache = LexiconAggregateCache(check_interval=None)
+    monkeypatch.setattr(lexicon_aggregates, '_cache', cache)
+    conn = FakeConnection()
+    service = BibleDataService(connection_factory=lambda: conn)
+
+    page = service.lexicon_entry('hebrew', 'H430')
+    assert page['entry']['gloss'] == 'God'
+    queries = len(conn.queries)
+
+    def no_connection():
+        raise AssertionError("cache hit should not connect")
+    service.connection_factory = no_connection
+    assert service.lexicon_entry('hebrew', 'H430') is page
+    assert len(conn.queries) == queries
+    assert cache.stats == {'hits': 1, 'misses': 1}
@@ -0,0 +1,107 @@
+"""
+Unit tests for the batched lexicon lookup service.
+"""
+
+from src.testing import fake_db
+from src.utils.lexicon_service import LexiconService, normalize_strongs_id, normalize_term
+
+HEBREW_ROWS = [
+    ('H0430', 'אֱלֹהִים', 'ʾĕlōhîm', 'God', 'God, gods'),
+    ('H2617', 'חֶסֶד', 'chesed', 'kindness', 'goodness, kindness, faithfulness'),
+]
+GREEK_ROWS = [
+    ('G2316', 'θεός', 'theos', 'God', 'a deity'),
+    ('G0026', 'ἀγάπη', 'agapē', 'love', 'love, benevolence'),
+]
+
+class FakeConnection(fake_db.FakeConnection):
+    """Connection answering the lexicon queries."""
+    def respond(self, cursor, query, params):
+        if 'to_regclass' in query:
+            return [(False,)]
+        if 'LOWER(transliteration)' in query:
+            rows = HEBREW_ROWS if 'hebrew_entries' in query else GREEK_ROWS
+            return [row for row in rows if self._spelled(row, query, params[0])]
+        if 'hebrew_entries' in query:
+            return self._filter(HEBREW_ROWS, params)
+        if 'greek_entries' in query:
+            return self._filter(GREEK_ROWS, params)
+        return []
+
+    @staticmethod
+    def _filter(rows, params):
+        if not params:
+            return list(rows)
+        return [row for row in rows if row[0] in params[0]]
+
+    @staticmethod
+    def _spelled(row, query, spellings):
+        forms = [row[1].lower(), row[2].lower()]
+        if 'LIKE ANY' in query:
+            return any(form.startswith(s.rstrip('%')) for form in forms for s in spellings)
+        return any(form in spellings for form in forms)
+
+def test_normalization():
+    """Strong's IDs and terms normalize to stable cache keys."""
+    assert normalize_strongs_id("H0430") == "H430"
+    assert normalize_strongs_id("h1254A") == "H1254a"
+    assert normalize_strongs_id("none") is None
+    assert normalize_term("ʾĕlōhîm") == normalize_term("elohim")
+
+def test_batch_lookup_served_from_cache():
+    """After one warm-up load, lookups need no further queries."""
+    conn = FakeConnection()
+    service = LexiconService(connection_factory=lambda: conn, check_interval=None)
+
+    entries = service.get_entries(["H430", "G2316", "H0430", "G9999", None])
+    assert entries["H430"].lemma == 'אֱלֹהִים'
+    assert entries["H0430"] is entries["H430"]
+    assert entries["G2316"].language == 'greek'
+    assert "G9999" not in entries
+    queries_after_load = len(conn.queries)
+
+    service.get_entries(["G26", "H2617a"])
+    assert len(conn.queries) == queries_after_load
+
+def test_term_lookup():
+    """Terms match case/accent-insensitively, Hebrew before Greek, with prefixes."""
+    service = LexiconService(connection_factory=FakeConnection, check_interval=None)
+    matches = service.find_terms(["Elohim", "agape", "unknown"])
+    assert [e.strongs_id for e in matches["Elohim"]] == ["H0430"]
+    assert [e.strongs_id for e in matches["agape"]] == ["G0026"]
+    assert "unknown" not in matches
+
+    prefixed = service.find_terms(["the"], prefix=True)
+    assert [e.strongs_id for e in prefixed["the"]] == ["G2316"]
+
+def test_fallback_uses_single_batched_query():
+    """Without a cache, a whole batch costs one ANY() query per language."""
+    calls = {'n': 0}
+
+    def factory():
+        calls['n'] += 1
+        # First call (cache load) fails; the fallback query succeeds
+        return FakeConnection(fail=calls['n'] == 1)
+
+    service = LexiconService(connection_factory=factory, check_interval=60)
+    entries = service.get_entries(["H0430", "H2617", "G2316"])
+    assert set(entries) == {"H0430", "H2617", "G2316"}
+    assert service.stats['queries'] == 2
+
+def test_term_fallback_uses_single_batched_query():
+    """Without a cache, term lookups cost one ANY() query per language."""
+    calls = {'n': 0}
+
+    def factory():
+        calls['n'] += 1
+        return FakeConnection(fail=calls['n'] == 1)
+
+    service = LexiconService(connection_factory=factory, check_interval=60)
+    matches = service.find_terms(["Chesed", "theos", "unknown"])
+    assert [e.strongs_id for e in matches["Chesed"]] == ["H2617"]
+    assert [e.strongs_id for e in matches["theos"]] == ["G2316"]
+    assert "unknown" not in matches
+    assert service.stats['queries'] == 2
+
+    prefixed = service.find_terms(["aga"], prefix=True)
+    assert [e.strongs_id for e in prefixed["aga"]] == ["G0026"]
@@ -0,0 +1,99 @@
+"""
+Unit tests for the pooled LM Studio client, run against a local stub server.
+"""
+
+import json
+
+import pytest
+from src.testing import Latency, StubLMServer
+from src.testing.fake_lm import count_tokens, schema_value, stable_hash
+from src.utils.lm_client import LMClient, LMClientError, chat_completions_url
+
+def echo(messages):
+    return json.dumps({"echo": messages[-1]["content"]})
+
+@pytest.fixture
+def stub_server():
+    with StubLMServer(responses=echo) as server:
+        yield server
+
+def make_client(server, **kwargs):
+    return LMClient(api_url=server.url, model="stub", backoff=0.01, **kwargs)
+
+def test_url_normalization():
+    """Base and full URLs both resolve to the chat completions endpoint."""
+    assert chat_completions_url("http://x:1234/v1") == "http://x:1234/v1/chat/completions"
+    assert chat_completions_url("http://x:1234/v1/chat/completions/") == "http://x:1234/v1/chat/completions"
+
+def test_structured_call_cache_and_metrics(stub_server):
+    """Identical structured calls hit the server once and record token usage."""
+    client = make_client(stub_server)
+    messages = [{"role": "user", "content": "John 3:16"}]
+    schema = {"type": "object", "properties": {"echo": {"type": "string"}}}
+
+    # The stub answers schema requests with a value derived from the model and prompt
+    expected = schema_value(schema, stable_hash("stub", "John 3:16"))
+    assert client.chat_json(messages, schema) == expected
+    assert client.chat_json(messages, schema) == expected
+    assert stub_server.stats["requests"] == 1
+
+    metrics = client.metrics.snapshot()
+    assert metrics["calls"] == 1 and metrics["cache_hits"] == 1
+    assert metrics["prompt_tokens"] == count_tokens("John 3:16")
+    assert metrics["completion_tokens"] == count_tokens(json.dumps(expected))
+
+def test_retries_with_backoff(stub_server):
+    """5xx responses are retried; exhausting retries raises LMClientError."""
+    stub_server.fail_next(2)
+    client = make_client(stub_server, max_retries=2)
+    assert client.chat([{"role": "user", "content": "a"}], use_cache=False)
+    assert client.metrics.snapshot()["retries"] == 2
+
+    stub_server.fail_next(5)
+    with pytest.raises(LMClientError):
+        client.chat([{"role": "user", "content": "b"}], use_cache=False)
+
+def test_concurrency_is_bounded():
+    """Fan-out runs calls in parallel without exceeding max_concurrency."""
+    with StubLMServer(responses=echo, latency=0.05) as server:
+        client = make_client(server, max_concurrency=3)
+        prompts = [f"q{i}" for i in range(9)]
+        results = client.map_concurrent(
+            lambda p: client.chat([{"role": "user", "content": p}], use_cache=False), prompts)
+        assert [json.loads(r)["echo"] for r in results] == prompts
+        assert 1 < server.stats["max_in_flight"] <= 3
+
+def test_streaming_records_time_to_first_token():
+    """Streamed chat and text completions yield deltas and record TTFT."""
+    with StubLMServer(responses=["Noah built the ark of gopher wood"],
+                      latency=Latency.constant(0.05, per_token=0.01)) as server:
+        client = LMClient(api_url=server.url, model="stub", backoff=0.01)
+        pieces = list(client.stream_chat([{"role": "user", "content": "Who built the ark?"}]))
+        assert len(pieces) == 7 and "".join(pieces) == "Noah built the ark of gopher wood"
+        assert client.complete("Genesis 6:14", use_cache=False) == "Noah built the ark of gopher wood"
+        assert "".join(client.stream_complete("Genesis 6:14")) == "Noah built the ark of gopher wood"
+
+        metrics = client.metrics.snapshot()
+        assert metrics["streams"] == 2 and metrics["calls"] == 3
+        assert 0.05 <= metrics["ttft_p50"] < metrics["latency_p50"]
+        assert metrics["completion_tokens"] == 21
+
+        # Overloads before the first byte are retried
+        server.fail_next(1)
+        assert "".join(client.stream_chat([{"role": "user", "content": "again"}]))
+        assert client.metrics.snapshot()["retries"] == 1
+        client.close()
+
+def test_prompt_prefix_reuses_rendered_history():
+    """History renderings are memoised and callers get their own list."""
+    from src.utils.lm_client import PromptPrefix
+
+    prefix = PromptPrefix("You are a biblical scholar assistant.", cache_size=2)
+    history = [{"question": "Who was Moses?", "answer": "A prophet"}]
+    first = prefix.messages(history)
+    first.append({"role": "user", "content": "next"})
+    second = prefix.messages(history)
+    assert len(second) == 3 and second[0] is prefix.system_message
+    assert second[1] is first[1]
+    assert prefix.history_text(history) == "Q: Who was Moses?\nA: A prophet\n\n"
+    assert prefix.messages() == [prefix.system_message]
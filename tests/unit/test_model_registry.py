@@ -0,0 +1,140 @@
+"""
+Unit tests for the model registry.
+"""
+
+import itertools
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from src.utils.model_registry import ModelLoadError, ModelNotFound, ModelRegistry, admin_token_error
+
+_ticks = itertools.count(1)
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.weights = bytearray(100_000)
+
+
+class Loader:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def __call__(self, entry):
+        self.calls.append(entry['path'])
+        if entry['path'] in self.fail:
+            raise IOError(f"cannot read {entry['path']}")
+        return FakeModel(entry['path'])
+
+
+def write_registry(path, **state):
+    with open(path, 'w') as f:
+        json.dump(state, f)
+    # Make sure the watcher sees a new mtime even on coarse-grained filesystems
+    stamp = time.time() + next(_ticks)
+    os.utime(path, (stamp, stamp))
+
+
+def test_start_promote_rollback(tmp_path):
+    path = str(tmp_path / 'registry.json')
+    versions = {'v1': {'path': 'v1'}, 'v2': {'path': 'v2'}, 'v3': {'path': 'v3'}}
+    write_registry(path, versions=versions, production='v1')
+    loader = Loader()
+    registry = ModelRegistry(loader, path=path, watch_interval=60, trace_memory=True)
+    assert registry.select() is None
+
+    registry.start()
+    assert registry.wait_ready(5)
+    assert loader.calls == ['v1']
+    resident = registry.select()
+    assert resident.version_id == 'v1' and resident.model.name == 'v1'
+    info = registry.status()['versions'][0]
+    assert info['resident'] and info['is_production'] and info['requests'] == 1
+    assert info['memory_bytes'] >= 100_000 and info['load_seconds'] >= 0
+
+    registry.promote('v2')
+    assert registry.select().version_id == 'v2'
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved['production'] == 'v2' and saved['previous'] == 'v1'
+
+    # The previous version stays resident, so rolling back does not reload it
+    assert registry.rollback().version_id == 'v1'
+    assert loader.calls == ['v1', 'v2']
+    assert registry.status()['previous'] == 'v2'
+
+    with pytest.raises(ModelNotFound):
+        registry.promote('v9')
+    registry.stop()
+
+
+def test_file_watch_and_failed_load_keep_serving(tmp_path):
+    path = str(tmp_path / 'registry.json')
+    versions = {'v1': {'path': 'v1'}, 'v2': {'path': 'v2'}, 'bad': {'path': 'bad'}}
+    write_registry(path, versions=versions, production='v1')
+    traced = []
+
+    def loader(entry):
+        # By default loads are measured by RSS, without tracing every allocation
+        traced.append(tracemalloc.is_tracing())
+        return Loader(fail={'bad'})(entry)
+
+    registry = ModelRegistry(loader, path=path, max_resident=2)
+    registry.refresh()
+    assert registry.select().version_id == 'v1'
+    assert traced == [False] and registry.status()['versions'][0]['memory_bytes'] >= 0
+
+    # Another process promotes v2 by rewriting the file
+    write_registry(path, versions=versions, production='v2', previous='v1')
+    assert registry.refresh()
+    assert registry.select().version_id == 'v2'
+    assert not registry.refresh()
+
+    # A version that cannot be loaded never replaces the serving one
+    write_registry(path, versions=versions, production='bad', previous='v2')
+    registry.refresh()
+    assert registry.select().version_id == 'v2'
+    assert 'cannot read bad' in next(v for v in registry.status()['versions'] if v['version_id'] == 'bad')['error']
+    with pytest.raises(ModelLoadError):
+        registry.promote('bad')
+    assert registry.select().version_id == 'v2'
+
+
+def test_traffic_split_and_discovery(tmp_path):
+    for i, name in enumerate(['bible_qa_a.dspy', 'bible_qa_b.dspy']):
+        file_path = tmp_path / name
+        file_path.write_text('{}')
+        os.utime(file_path, (1000 + i, 1000 + i))
+    registry = ModelRegistry(Loader(), path=str(tmp_path / 'registry.json'),
+                             default=('default', {'path': 'default'}),
+                             patterns=[str(tmp_path / 'bible_qa_*.dspy')])
+    registry.refresh()
+    # The newest discovered file serves when the registry names no production version
+    assert registry.select().version_id == 'bible_qa_b'
+    assert registry.status()['latest'] == 'bible_qa_b'
+
+    registry.set_traffic({'bible_qa_a': 1, 'bible_qa_b': 1})
+    picks = {registry.select(key=f"session-{i}").version_id for i in range(50)}
+    assert picks == {'bible_qa_a', 'bible_qa_b'}
+    # A key always maps to the same version
+    assert len({registry.select(key='session-7').version_id for _ in range(10)}) == 1
+
+    with pytest.raises(ValueError):
+        registry.set_traffic({'bible_qa_a': -1})
+    # Promoting ends the split
+    registry.promote('default')
+    assert {registry.select(key=f"session-{i}").version_id for i in range(10)} == {'default'}
+
+
+def test_admin_routes_need_a_configured_token():
+    assert admin_token_error({'Authorization': 'Bearer anything'}, None)[0] == 403
+    assert admin_token_error({}, 's3cret')[0] == 401
+    assert admin_token_error({'Authorization': 'Bearer wrong'}, 's3cret')[0] == 401
+    assert admin_token_error({'Authorization': 'Bearer s3cret'}, 's3cret') is None
+    assert admin_token_error({'X-API-Token': 's3cret'}, 's3cret') is None
@@ -0,0 +1,85 @@
+"""
+Unit tests for MinHash/LSH near-duplicate grouping and group-aware splits.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from src.utils.near_duplicates import (
+    BandIndex, NearDuplicateIndex, deduplicate_jsonl, lsh_params, normalize_text, split_by_group,
+    split_jsonl
+)
+
+ARK = {"question": "Who built the ark?", "answer": "Noah built the ark, as God commanded him."}
+
+
+def corpus(n):
+    """n distinct examples, each followed by an augmentation-style paraphrase."""
+    rows = []
+    for i in range(n):
+        question = f"What happened in chapter {i} of the book number {i * 7 % 13}?"
+        answer = f"Chapter {i} records event {i * 31} and the names {i * 17} and {i * 3}."
+        rows.append({"question": question, "answer": answer})
+        rows.append({"question": f"According to the Bible, {question.lower()}", "answer": answer + "!"})
+    return rows
+
+
+def test_paraphrases_share_a_group():
+    assert normalize_text("Please answer in detail: Who built the ARK?") == "who built the ark"
+    assert lsh_params(0.8, 64) == (6, 10)
+    examples = [
+        ARK,
+        {"question": "From a biblical perspective, who built the ark", "answer": ARK["answer"]},
+        {"question": "Who built the temple?", "answer": "Solomon built the temple in Jerusalem."},
+        dict(ARK),
+    ]
+    index = NearDuplicateIndex()
+    assert index.assign(examples).tolist() == [0, 0, 1, 0]
+    assert index.stats['duplicates'] == 2 and index.groups == 2
+    # Later batches resolve against earlier groups
+    assert index.assign([{"question": "In the bible, who built the ark?", "answer": ARK["answer"]}]).tolist() == [0]
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=1.0)
+
+
+def test_band_index_keeps_oldest_group():
+    bands = BandIndex()
+    bands.add(np.array([5, 9], dtype=np.uint64), np.array([0, 1]))
+    bands.add(np.array([9, 2], dtype=np.uint64), np.array([2, 3]))
+    assert bands.lookup(np.array([9, 2, 5, 7], dtype=np.uint64)).tolist() == [1, 3, 0, -1]
+
+
+def test_deduplicate_jsonl(tmp_path):
+    source = tmp_path / "qa.jsonl"
+    rows = corpus(50)
+    with open(source, "w") as f:
+        f.write("// generated header\n")
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    output = tmp_path / "deduped.jsonl"
+    stats = deduplicate_jsonl(str(source), str(output))
+    lines = output.read_text().splitlines()
+    assert lines[0] == "// generated header"
+    assert [json.loads(line) for line in lines[1:]] == rows[::2]
+    assert stats['input'] == 100 and stats['kept'] == 50
+
+
+def test_splits_keep_groups_together(tmp_path):
+    rows = corpus(200)
+    splits = split_by_group(rows, {"train": 0.8, "val": 0.2}, seed=7)
+    assert len(splits["train"]) + len(splits["val"]) == 400
+    assert abs(len(splits["val"]) - 80) <= 2
+    train_answers = {normalize_text(r["answer"]) for r in splits["train"]}
+    assert not train_answers & {normalize_text(r["answer"]) for r in splits["val"]}
+
+    source = tmp_path / "qa.jsonl"
+    source.write_text("".join(json.dumps(r) + "\n" for r in rows))
+    outputs = {"train": str(tmp_path / "train.jsonl"), "val": str(tmp_path / "val.jsonl")}
+    stats = split_jsonl(str(source), outputs, {"train": 0.8, "val": 0.2}, drop_duplicates=True)
+    val = [json.loads(line) for line in open(outputs["val"])]
+    train = [json.loads(line) for line in open(outputs["train"])]
+    assert len(train) + len(val) == 200 and 20 < len(val) < 60
+    assert not {r["answer"] for r in train} & {r["answer"] for r in val}
+    assert stats['examples'] == 400 and stats['groups'] == 200
@@ -0,0 +1,97 @@
+"""
+Unit tests for the cached, concurrent optimizer search.
+"""
+
+import threading
+
+from src.testing.fake_lm import FakeLM
+from src.utils.optimizer_search import (
+    CachedLM, CallBudget, LMCallCache, OptimizerSearch, SearchConfig, request_key, sweep_configs
+)
+
+TRAIN = [f"train question {i}" for i in range(4)]
+DEV = [f"dev question {i}" for i in range(3)]
+
+
+def ask(lm, text, demos):
+    return lm(messages=[{'role': 'system', 'content': f"Answer using {demos} demos."},
+                        {'role': 'user', 'content': text}])[0]
+
+
+def fake_compile(config, trainset, devset, lm):
+    # Bootstrapping: one call per training example, rendered with the config's demo count
+    demos = config.params['demos']
+    for text in trainset:
+        ask(lm, text, demos)
+    return {'demos': demos}
+
+
+def make_score(scores):
+    def score(program, devset, lm):
+        for text in devset:
+            ask(lm, text, program['demos'])
+        return scores[program['demos']]
+    return score
+
+
+def configs(*demos, optimizer='bootstrap'):
+    return [SearchConfig(optimizer, {'demos': d}) for d in demos]
+
+
+def test_sweeps_record_cost_and_reuse_the_cache(tmp_path):
+    cache_path = str(tmp_path / 'lm_calls.jsonl')
+    results_path = str(tmp_path / 'results.jsonl')
+    scores = {1: 0.4, 2: 0.6, 3: 0.5}
+    sweep = configs(1, 2) + configs(3, optimizer='simba')
+
+    lm = FakeLM()
+    search = OptimizerSearch(lm, None, TRAIN, DEV, cache=cache_path, workers=2, results_path=results_path,
+                             compile_fn=fake_compile, score_fn=make_score(scores))
+    results = search.run(sweep)
+    assert [r.status for r in results] == ['ok', 'ok', 'ok']
+    assert search.best.config.params == {'demos': 2}
+    assert lm.calls == 21 and all(r.cost['lm_calls'] == 7 for r in results)
+    assert all(r.cost['completion_tokens'] > 0 for r in results)
+    assert len(open(results_path).readlines()) == 3
+
+    # A second sweep over the same configurations makes no LM calls
+    lm.reset_stats()
+    search = OptimizerSearch(lm, None, TRAIN, DEV, cache=cache_path, compile_fn=fake_compile,
+                             score_fn=make_score(scores))
+    results = search.run(sweep)
+    assert lm.calls == 0
+    assert all(r.cost['cache_hits'] == 7 and r.cost['saved_tokens'] > 0 for r in results)
+    assert search.summary()['lm_calls'] == 0 and search.summary()['best_score'] == 0.6
+
+
+def test_tracks_stop_on_plateau_and_budget(tmp_path):
+    search = OptimizerSearch(FakeLM(), None, TRAIN, DEV, cache=LMCallCache(None), patience=1,
+                             compile_fn=fake_compile, score_fn=make_score({1: 0.5, 2: 0.502, 3: 0.9}))
+    results = search.run(configs(1, 2, 3))
+    assert [r.status for r in results] == ['ok', 'ok', 'stopped_plateau']
+
+    # 10 calls cover the first configuration (7) but not the second
+    search = OptimizerSearch(FakeLM(), None, TRAIN, DEV, cache=LMCallCache(None), budget=10, workers=1,
+                             compile_fn=fake_compile, score_fn=make_score({1: 0.5, 2: 0.6, 3: 0.7}))
+    results = search.run(configs(1, 2, 3))
+    assert [r.status for r in results] == ['ok', 'budget_exhausted', 'skipped_budget']
+    assert results[1].cost['lm_calls'] == 3 and search.budget.used == 10
+
+
+def test_concurrent_identical_requests_call_once():
+    lm = FakeLM(latency=0.05)
+    cache = LMCallCache(None)
+    budget = CallBudget()
+    outputs = []
+    threads = [threading.Thread(target=lambda: outputs.append(ask(CachedLM(lm, cache, budget), "Who built the ark?", 2)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lm.calls == 1 and budget.used == 1 and len(set(outputs)) == 1
+    messages = [{'role': 'user', 'content': 'x'}]
+    assert request_key('m', None, messages, {'temperature': 0.0, 'api_key': 'a'}) == \
+        request_key('m', None, messages, {'temperature': 0.0, 'api_key': 'b'})
+    assert request_key('m', None, messages, {'temperature': 0.0}) != request_key('m', None, messages, {'temperature': 1.0})
+    assert len(sweep_configs(['bootstrap', 'simba'])) == 5
@@ -0,0 +1,97 @@
+"""
+Unit tests for the compiled question router.
+"""
+
+import json
+
+import pytest
+
+from src.utils.question_router import (
+    BASIC, COMPLEX_THEOLOGICAL, CONVERSATIONAL, COMPLEXITY_MARKERS, CONVERSATIONAL_MARKERS,
+    TERM_PATTERNS, THEOLOGICAL_TERM, THEOLOGICAL_TERMS, HashedNgramClassifier, PhraseScanner,
+    QuestionRouter, load_labeled_questions
+)
+
+QUESTIONS = [
+    "What does the Hebrew word chesed mean?",
+    "Explain the meaning of 'agape' in Greek",
+    "Look up Strong's H430 for me",
+    "How does grace relate to the law?",
+    "Is faith connected to salvation?",
+    "Since when did the business of the temple begin?",
+    "You mentioned David earlier, tell me more",
+    "Who built the ark?",
+    "Where was Jesus born?",
+    "In the beginning God created the heavens and the earth and then he rested on the seventh day of creation",
+    "Can you elaborate?",
+    "HOW DO WE RECONCILE THESE PASSAGES",
+]
+
+
+def substring_route(question):
+    """The routing rules as plain substring checks, for comparison."""
+    lower = question.lower()
+    if any(p in lower for p in TERM_PATTERNS):
+        return THEOLOGICAL_TERM
+    if (any(m in lower for m in COMPLEXITY_MARKERS) or sum(t in lower for t in THEOLOGICAL_TERMS) >= 2
+            or len(question.split()) > 15):
+        return COMPLEX_THEOLOGICAL
+    if any(m in lower for m in CONVERSATIONAL_MARKERS):
+        return CONVERSATIONAL
+    return BASIC
+
+
+def test_compiled_rules_match_substring_rules():
+    router = QuestionRouter()
+    for question in QUESTIONS:
+        assert router.route(question) == substring_route(question), question
+    stats = router.stats()
+    assert stats['total'] == len(QUESTIONS)
+    assert stats['sources'] == {'rule': 9, 'default': 3}
+    assert stats['routes'][THEOLOGICAL_TERM] == 3
+
+
+def test_scanner_finds_overlapping_phrases():
+    scanner = PhraseScanner({'a': ['how do', 'sin'], 'b': ['how does', 'since']})
+    hits = scanner.scan('how does it work since then')
+    assert hits == {'a': {'how do': 0, 'sin': 17}, 'b': {'how does': 0, 'since': 17}}
+    assert PhraseScanner({'x': ['ab', 'bc']}).scan('abc') == {'x': {'ab': 0, 'bc': 1}}
+
+
+def test_extract_term():
+    router = QuestionRouter()
+    question = "What does the Hebrew word chesed mean?"
+    decision = router.analyze(question)
+    assert router.extract_term(question, decision) == ('Hebrew word chesed', 'Hebrew', '')
+    assert router.extract_term("Definition of grace in Strong's G5485?") == ('grace in Strong\'s G5485', '', 'G5485')
+    assert router.extract_term("Who built the ark?") == ('', '', '')
+
+
+def test_classifier_fallback_and_persistence(tmp_path):
+    path = tmp_path / 'qa.jsonl'
+    rows = []
+    for name in ['Noah', 'Moses', 'David', 'Ruth', 'Esther', 'Paul']:
+        rows.append({'question': f"Who was {name}?", 'metadata': {'type': 'factual'}})
+        rows.append({'question': f"Why is the covenant with {name} important for theology?",
+                     'metadata': {'type': 'theological'}})
+        rows.append({'question': f"And what happened to {name} next?", 'history': [{'q': 'x', 'a': 'y'}]})
+    with open(path, 'w') as f:
+        f.write('// comment line\n')
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    texts, labels = load_labeled_questions([str(path)])
+    assert len(texts) == 18 and labels.count(CONVERSATIONAL) == 6
+
+    classifier = HashedNgramClassifier(n_features=2 ** 12).fit(texts, labels, epochs=60)
+    assert classifier.accuracy(texts, labels) == 1.0
+    classifier.save(str(tmp_path / 'router.npz'))
+    loaded = HashedNgramClassifier.load(str(tmp_path / 'router.npz'))
+    assert loaded.predict("Why is the covenant with Abraham important for theology?")[0] == COMPLEX_THEOLOGICAL
+
+    router = QuestionRouter(loaded, min_confidence=0.5)
+    decision = router.analyze("And what happened to Jonah next?")
+    assert decision.route == CONVERSATIONAL and decision.source == 'classifier'
+    # Rules take precedence over the classifier
+    assert router.analyze("What does shalom mean?").source == 'rule'
+    with pytest.raises(ValueError):
+        HashedNgramClassifier().fit([], [])
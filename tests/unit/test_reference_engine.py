@@ -0,0 +1,100 @@
+"""
+Unit tests for the canonical Bible reference engine.
+"""
+
+import pytest
+from src.utils.reference_engine import (
+    parse, parse_many, pack_many, pack_verse_id, unpack_verse_id,
+    resolve_book, format_verse_id, OPEN_END
+)
+from src.utils.bible_reference_parser import parse_reference, extract_references
+from src.utils.text_utils import parse_reference as parse_step_reference
+
+@pytest.mark.parametrize("text", [
+    "John 3:16", "Jn 3.16", "Jhn.3.16", "john 3 : 16", "John chapter 3 verse 16", "Jn 3 v 16"
+])
+def test_equivalent_forms_pack_to_same_id(text):
+    """All common spellings of a single verse resolve to one packed ID."""
+    parsed = parse(text)
+    assert parsed is not None
+    assert parsed.start_id == 43003016
+    assert parsed.is_single_verse
+
+def test_numbered_books():
+    """Arabic, roman and STEP forms of numbered books are equivalent."""
+    assert parse("1 John 1:9").start_id == parse("I John 1:9").start_id == parse("1Jn 1:9").start_id
+    assert parse("2 Kings 2:11").book == resolve_book("II Kings") == 12
+    assert parse("1Sa.3.4").book_name == "1 Samuel"
+
+def test_ranges_and_lists():
+    """Ranges, comma lists, semicolon lists and cross-chapter spans."""
+    spans = parse("Rom 8:28, 31-39").spans
+    assert [(s.start, s.end) for s in spans] == [(45008028, 45008028), (45008031, 45008039)]
+
+    spans = parse("Rom 8:28; 9:1-5").spans
+    assert [(s.start, s.end) for s in spans] == [(45008028, 45008028), (45009001, 45009005)]
+
+    span = parse("Gen 1:1-2:3").spans[0]
+    assert (span.start, span.end) == (1001001, 1002003)
+
+    span = parse("Gen 50:26-Exo 1:2").spans[0]
+    assert (span.start, span.end) == (1050026, 2001002)
+
+    refs = parse("Gen 1:1; Exo 20:1-17")
+    assert [s.book for s in refs.spans] == [1, 2]
+
+def test_whole_chapters_books_and_single_chapter_books():
+    """Chapter-only references, whole books and one-chapter books."""
+    span = parse("Psalm 23").spans[0]
+    assert (span.start, span.end) == (19023001, 19023000 + OPEN_END)
+    assert span.is_whole_chapter
+
+    span = parse("Psa 1-3").spans[0]
+    assert (span.start, span.end) == (19001001, 19003000 + OPEN_END)
+
+    assert parse("Jude 5").start_id == 65001005
+    assert parse("Jude").canonical() == "Jude"
+
+def test_subverses_titles_and_alternates():
+    """Subverse letters, numeric subverses, psalm titles and alternate markers."""
+    assert parse("Gen 6:1a").spans[0].start_subverse == "a"
+    assert parse("Gen.6:1.1").spans[0].start_subverse == "1"
+    assert parse("Psa.142:Title").start_id == 19142000
+    assert parse("Mat.15.6(15.5)").start_id == 40015006
+    assert parse("Rom.16.25{14.24}").start_id == 45016025
+
+@pytest.mark.parametrize("text", ["", "foo 1:1", "Gen 3:5-1", "John 3:16 KJV text", "1:1"])
+def test_invalid_references(text):
+    """Unknown books, reversed ranges and bookless text are rejected."""
+    assert parse(text) is None
+
+def test_canonical_round_trip():
+    """Canonical output parses back to the same spans."""
+    for text in ["Rom 8:28, 31-39", "Gen 1:1-2:3", "Psa 1-3", "1 Jn 1:9; 2:1", "Gen 6:1a-3b"]:
+        parsed = parse(text)
+        assert parse(parsed.canonical()).spans == parsed.spans
+
+def test_pack_and_unpack():
+    """Packing is invertible and validates its inputs."""
+    assert pack_verse_id("Revelation", 22, 21) == 66022021
+    assert unpack_verse_id(66022021) == (66, 22, 21)
+    assert format_verse_id(43003016) == "John 3:16"
+    assert format_verse_id(43003016, abbreviated=True) == "Jhn 3:16"
+    with pytest.raises(ValueError):
+        pack_verse_id("Tobit", 1, 1)
+
+def test_bulk_apis():
+    """parse_many and pack_many handle duplicates and invalid entries."""
+    refs = ["Gen.1.1", "Gen.1.1", "bogus", None, "Jhn.3.16"]
+    parsed = parse_many(refs)
+    assert parsed[0] is parsed[1]
+    assert parsed[2] is None and parsed[3] is None
+    assert pack_many(refs) == [1001001, 1001001, None, None, 43003016]
+
+def test_legacy_wrappers_delegate_to_engine():
+    """The older parser entry points keep their return shapes."""
+    assert parse_reference("Genesis 1:1-3") == ("Genesis", 1, 1, 3)
+    assert parse_reference("John 3:16") == ("John", 3, 16, 16)
+    assert parse_reference("Psalm 23") == ("Psalms", 23, 1, None)
+    assert parse_step_reference("Mat.17.15[17.14]") == ("Mat", 17, 15)
+    assert extract_references("See 1 John 1:9 and Rom 8:28, 31-39.") == ["1 John 1:9", "Rom 8:28, 31-39"]
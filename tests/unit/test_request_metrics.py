@@ -0,0 +1,128 @@
+"""
+Unit tests for the request metrics hooks and the background interaction log.
+"""
+
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from src.services.fanout import fan_out
+from src.services.request_metrics import (
+    Counter, Histogram, InteractionLog, RequestMetrics, track_upstream
+)
+
+def test_sharded_metrics_sum_across_threads():
+    latency = Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    calls = Counter('calls_total', 'Calls', ('route',))
+
+    def worker():
+        for _ in range(1000):
+            latency.observe(0.05, '/a')
+            calls.inc(1, '/a')
+        latency.observe(5.0, '/a')
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls.value('/a') == 4000
+    count, total = latency.snapshot('/a')
+    assert count == 4004 and abs(total - (4000 * 0.05 + 20.0)) < 1e-6
+    text = '\n'.join(latency.render())
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 4000' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 4000' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4004' in text
+    assert 'latency_seconds_count{route="/a"} 4004' in text
+
+def test_hooks_record_routes_status_and_upstream_calls():
+    logged = []
+    metrics = RequestMetrics(interaction_log=InteractionLog(lambda **record: logged.append(record),
+                                                             sample_rate=1.0))
+    app = Flask(__name__)
+    metrics.init_app(app)
+    handled = []
+
+    def query():
+        with track_upstream():
+            time.sleep(0.01)
+        return 'rows'
+
+    @app.route('/verse/<book>/<int:chapter>')
+    def verse(book, chapter):
+        handled.append(book)
+        query()
+        page = fan_out({'hebrew': query, 'greek': query})
+        return jsonify(page.results)
+
+    @app.route('/missing')
+    def missing():
+        return jsonify({'error': 'not found'}), 404
+
+    client = app.test_client()
+    assert client.get('/verse/Gen/1?q=light').status_code == 200
+    client.get('/verse/Exo/2')
+    client.get('/missing')
+    client.get('/nowhere')
+    assert handled == ['Gen', 'Exo']
+
+    assert metrics.requests.snapshot('/verse/<book>/<int:chapter>', 'GET', '200')[0] == 2
+    assert metrics.requests.snapshot('/missing', 'GET', '404')[0] == 1
+    assert metrics.requests.snapshot('<unmatched>', 'GET', '404')[0] == 1
+    # One direct query plus two fanned-out queries per request
+    requests, upstream = metrics.upstream_calls.snapshot('/verse/<book>/<int:chapter>')
+    assert requests == 2 and upstream == 6
+    assert metrics.upstream_seconds.value('/verse/<book>/<int:chapter>') >= 0.06
+
+    body = client.get('/metrics')
+    assert body.mimetype == 'text/plain'
+    text = body.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/verse/<book>/<int:chapter>",method="GET",status="200"} 2' in text
+    assert 'route="/metrics"' not in text
+
+    metrics.interaction_log.flush()
+    assert logged[0]['route'] == '/verse/Gen/1' and logged[0]['query_params'] == {'q': 'light'}
+
+def test_requests_logged_by_the_handler_are_not_sampled():
+    logged = []
+    log = InteractionLog(lambda **record: logged.append(record), sample_rate=1.0)
+    app = Flask(__name__)
+    RequestMetrics(interaction_log=log).init_app(app)
+
+    @app.route('/search')
+    def search():
+        log.submit(route='/search', response_type='success')
+        return 'results'
+
+    @app.route('/page')
+    def page():
+        return 'page'
+
+    client = app.test_client()
+    client.get('/search?q=light')
+    client.get('/page')
+    log.flush()
+    assert [(r['route'], r.get('response_type')) for r in logged] == [('/search', 'success'), ('/page', 'text/html')]
+
+def test_interaction_log_never_blocks_the_handler():
+    release = threading.Event()
+    written = []
+
+    def slow_sink(**record):
+        release.wait(5)
+        written.append(record)
+
+    log = InteractionLog(slow_sink, sample_rate=1.0, max_queue=2)
+    start = time.monotonic()
+    results = [log.submit(route=f"/r{i}") for i in range(5)]
+    assert time.monotonic() - start < 0.5
+    # One record is being written, two are queued, the rest are dropped
+    assert log.dropped >= 2 and results[:2] == [True, True]
+    release.set()
+    assert log.flush()
+    assert [r['route'] for r in written] == [f"/r{i}" for i, ok in enumerate(results) if ok]
+
+    assert not InteractionLog(slow_sink, sample_rate=0).sample(route='/never')
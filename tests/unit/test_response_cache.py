@@ -0,0 +1,145 @@
+"""
+Unit tests for the ETag-driven HTTP response cache.
+"""
+
+from datetime import datetime, timezone
+
+from flask import Blueprint, Flask, jsonify, render_template_string, request
+
+from src.services.response_cache import (
+    CachedResponse, DataVersion, FragmentCache, ResponseCache, skip_response_cache
+)
+from src.testing import fake_db
+
+class FakeConnection(fake_db.FakeConnection):
+    def __init__(self, version=7):
+        super().__init__()
+        self.version = version
+
+    def respond(self, cursor, query, params):
+        if 'to_regclass' in query:
+            return [(True,)]
+        return [(self.version, datetime(2024, 5, 1, 12, 0, 0))]
+
+def make_app(conn, **cache_args):
+    cache = ResponseCache(DataVersion(connection_factory=lambda: conn, check_interval=0), **cache_args)
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    calls = []
+
+    @app.route('/verse/<book>')
+    @cache.cached
+    def verse(book):
+        calls.append(book)
+        return render_template_string("<p>{{ book }} {{ q }}</p>", book=book, q=request.args.get('q', ''))
+
+    @app.route('/broken')
+    @cache.cached
+    def broken():
+        calls.append('broken')
+        return render_template_string("<p>{{ error }}</p>", error="Database connection error")
+
+    @app.route('/fallback')
+    @cache.cached
+    def fallback():
+        skip_response_cache()
+        return "default stats"
+
+    bp = Blueprint('data', __name__)
+    cache.register_blueprint(bp, exclude={'export'})
+
+    @bp.route('/stats')
+    def stats():
+        calls.append('stats')
+        return jsonify({'verses': 31102})
+
+    @bp.route('/export')
+    def export():
+        return "a,b\n"
+
+    app.register_blueprint(bp, url_prefix='/api')
+    return app, cache, calls
+
+def test_fragment_cache_is_bounded_by_bytes():
+    cache = FragmentCache(max_bytes=10, max_entry_bytes=6)
+    assert not cache.put('big', CachedResponse(b'x' * 7, 200, []))
+    cache.put('a', CachedResponse(b'aaaa', 200, []))
+    cache.put('b', CachedResponse(b'bbbb', 200, []))
+    cache.get('a')
+    cache.put('c', CachedResponse(b'cccc', 200, []))
+    assert cache.get('b') is None and cache.get('a') is not None
+    assert cache.size == 8 and len(cache) == 2 and cache.stats['evictions'] == 1
+
+def test_conditional_get_and_fragment_hits():
+    conn = FakeConnection()
+    app, cache, calls = make_app(conn)
+    client = app.test_client()
+
+    first = client.get('/verse/Gen')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert 'public' in first.headers['Cache-Control'] and 'max-age=300' in first.headers['Cache-Control']
+    assert first.headers['Last-Modified'] == 'Wed, 01 May 2024 12:00:00 GMT'
+
+    second = client.get('/verse/Gen')
+    assert second.headers['X-Cache'] == 'HIT' and second.data == first.data
+    assert second.headers['ETag'] == etag and second.mimetype == 'text/html'
+
+    revalidated = client.get('/verse/Gen', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    since = client.get('/verse/Gen', headers={'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'})
+    assert since.status_code == 304
+    assert calls == ['Gen']
+
+    other = client.get('/verse/Gen?q=light')
+    assert other.headers['ETag'] != etag and calls == ['Gen', 'Gen']
+
+    # An ETL load bumps the version: new ETags, old validators no longer match
+    conn.version = 8
+    reloaded = client.get('/verse/Gen', headers={'If-None-Match': etag})
+    assert reloaded.status_code == 200 and reloaded.headers['ETag'] != etag
+    assert calls == ['Gen', 'Gen', 'Gen']
+
+def test_error_and_fallback_pages_are_not_cached():
+    app, cache, calls = make_app(FakeConnection())
+    client = app.test_client()
+    for _ in range(2):
+        response = client.get('/broken')
+        assert 'ETag' not in response.headers
+        assert response.headers['Cache-Control'] == 'no-store'
+    assert calls == ['broken', 'broken']
+
+    assert client.get('/fallback').headers['Cache-Control'] == 'no-store'
+    assert len(cache.fragments) == 0
+
+def test_blueprint_routes_and_exclusions():
+    app, cache, calls = make_app(FakeConnection())
+    client = app.test_client()
+    assert client.get('/api/stats').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/stats').headers['X-Cache'] == 'HIT'
+    assert calls == ['stats']
+
+    export = client.get('/api/export')
+    assert 'ETag' not in export.headers and 'X-Cache' not in export.headers
+
+def test_unknown_data_version_disables_caching():
+    def no_database():
+        raise RuntimeError("connection refused")
+
+    version = DataVersion(connection_factory=no_database, check_interval=0)
+    assert version.current() is None
+
+    conn = FakeConnection()
+    version.connection_factory = lambda: conn
+    assert version.current() == (7, datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc))
+    # A failed re-check keeps the last known version
+    version.connection_factory = no_database
+    assert version.current()[0] == 7
+
+def test_session_requests_bypass_cache():
+    app, cache, calls = make_app(FakeConnection())
+    client = app.test_client()
+    client.set_cookie('session', 'flashes')
+    assert 'ETag' not in client.get('/verse/Gen').headers
+    assert len(cache.fragments) == 0
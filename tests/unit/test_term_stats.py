@@ -0,0 +1,88 @@
+"""
+Unit tests for the precomputed cross-language term statistics.
+"""
+
+from src.testing import fake_db
+from src.utils.term_stats import (
+    TermStatsService, base_strongs_id, refresh_term_stats_after_load, _stats_view_sql, TAGGED_TEXT_SOURCES
+)
+
+STATS_ROWS = [
+    ('H430', 2600, 0, 0, 'אֱלֹהִים', None),
+    ('H3068', 6800, 0, 0, 'יְהוָה', None),
+    ('G2316', 0, 1317, 1290, 'θεός', 'الله'),
+]
+ALIGNMENT_ROWS = [
+    ('H430', 'G2316', 'אֱלֹהִים', 'θεός', 'الله', 2600, 1317, 1290),
+    ('H3068', 'G2962', 'יְהוָה', 'κύριος', 'الرب', 6800, 717, 700),
+]
+
+class FakeConnection(fake_db.FakeConnection):
+    def __init__(self, views_exist=True):
+        super().__init__()
+        self.views_exist = views_exist
+
+    def respond(self, cursor, query, params):
+        if 'to_regclass' in query:
+            is_view = 'term_stats' in str(params) or 'alignments' in str(params)
+            return [(self.views_exist or not is_view,)]
+        if 'FROM bible.strongs_term_stats' in query:
+            return STATS_ROWS if self.views_exist else []
+        if 'FROM bible.cross_language_alignments' in query:
+            return ALIGNMENT_ROWS
+        if 'GROUP BY 1, 2' in query:
+            return [('hebrew', 'H430', 2600), ('greek', 'G2316', 1317)]
+        return []
+
+def test_base_strongs_id():
+    """Padding, case and extended suffixes collapse to the base number."""
+    assert base_strongs_id('H0430') == 'H430'
+    assert base_strongs_id('h1254A') == 'H1254'
+    assert base_strongs_id('G0026') == 'G26'
+    assert base_strongs_id('x') is None
+
+def test_stats_view_covers_all_sources():
+    """The materialized view unions every tagged text that is present."""
+    sql = _stats_view_sql(TAGGED_TEXT_SOURCES)
+    for _, table, column in TAGGED_TEXT_SOURCES:
+        assert f"FROM {table}" in sql and column in sql
+    assert sql.count("UNION ALL") == len(TAGGED_TEXT_SOURCES) - 1
+
+def test_counts_and_alignments_served_from_cache():
+    """One load answers counts and alignment queries without further SQL."""
+    conn = FakeConnection()
+    service = TermStatsService(connection_factory=lambda: conn, check_interval=None)
+    counts = service.get_counts(['H0430', 'G2316', 'H9999'])
+    assert counts['H0430'] == {'hebrew': 2600, 'greek': 0, 'arabic': 0}
+    assert counts['G2316']['arabic'] == 1290
+    assert counts['H9999'] == {'hebrew': 0, 'greek': 0, 'arabic': 0}
+    queries = len(conn.queries)
+
+    assert [a['greek_strongs'] for a in service.get_alignments('H430')] == ['G2316']
+    assert [a['hebrew_strongs'] for a in service.get_alignments(limit=1, offset=1)] == ['H3068']
+    assert len(conn.queries) == queries
+
+def test_fallback_counts_in_one_query():
+    """Before the views exist, a batch is counted with one indexed ANY() query."""
+    conn = FakeConnection(views_exist=False)
+    service = TermStatsService(connection_factory=lambda: conn, check_interval=60)
+    service._loaded = False
+    service.refresh = lambda conn=None: (_ for _ in ()).throw(RuntimeError("no view"))
+
+    counts = service.get_counts(['H430', 'G2316'])
+    assert counts['H430']['hebrew'] == 2600 and counts['G2316']['greek'] == 1317
+    grouped = [(q, p) for q, p in conn.queries if 'GROUP BY 1, 2' in q]
+    assert len(grouped) == 1
+    variants = grouped[0][1][0]
+    assert {'H430', 'H0430', 'H430a', 'G2316'} <= set(variants)
+
+def test_failed_refresh_after_load_is_logged():
+    class BrokenConnection(FakeConnection):
+        def respond(self, cursor, query, params):
+            if 'REFRESH MATERIALIZED VIEW' in query:
+                raise RuntimeError("could not refresh")
+            return super().respond(cursor, query, params)
+
+    conn = BrokenConnection()
+    assert refresh_term_stats_after_load(conn) is None
+    assert conn.rollbacks >= 1
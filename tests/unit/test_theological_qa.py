@@ -0,0 +1,63 @@
+"""
+Unit tests for TheologicalQA's execution planner, run against the fake LM.
+"""
+
+import pytest
+
+dspy = pytest.importorskip("dspy")
+
+from src.dspy_programs.theological_qa import ExecutionPlanner, TheologicalQA
+from src.testing.fixtures import use_fake_lm
+from src.utils.lexicon_service import LexiconEntry
+
+CONTEXT = "In the beginning God created the heaven and the earth."
+
+
+class FakeLexicon:
+    def __init__(self, entries):
+        self.entries = entries
+        self.requests = []
+
+    def get_entries(self, strongs_ids):
+        self.requests.append(list(strongs_ids))
+        return {i: self.entries[i] for i in strongs_ids if i in self.entries}
+
+
+ELOHIM = LexiconEntry('H430', 'hebrew', 'אֱלֹהִים', 'elohim', 'God', 'rulers, judges, divine ones')
+
+
+def test_plans_skip_and_merge_stages():
+    lexicon = FakeLexicon({'H430': ELOHIM})
+    qa = TheologicalQA(ExecutionPlanner(lexicon))
+    with use_fake_lm() as lm:
+        # Simple question, no Strong's IDs: one merged call
+        result = qa(context=CONTEXT, question="Who created the earth?")
+        assert result.lm_calls == 1 and lm.calls == 1 and result.answer
+
+        # Known Strong's ID: resolved from the lexicon, no analyzer call
+        result = qa(context=CONTEXT, question="What is the meaning of H430 here?")
+        assert result.lm_calls == 1 and lm.calls == 2
+        assert lexicon.requests == [['H430']]
+
+        # Unknown ID on a complex question: analyzer plus the two-stage chain
+        result = qa(context=CONTEXT, question="How does G2316 compare with H430 in meaning?")
+        assert result.plan == 'strongs=lm,two_stage'
+        assert result.lm_calls == 3 and lm.calls == 5
+
+    stats = qa.planner.stats()
+    assert stats['questions'] == 3 and stats['lm_calls'] == 5
+    assert stats['plans']['strongs=lexicon,merged'] == 1
+
+
+def test_planner_modes_and_lexicon_failure():
+    class BrokenLexicon:
+        def get_entries(self, ids):
+            raise ConnectionError("database unavailable")
+
+    planner = ExecutionPlanner(BrokenLexicon(), merge='never')
+    plan = planner.plan(CONTEXT, "What does H430 mean?")
+    assert plan.unresolved_ids == ['H430'] and not plan.merge
+    assert ExecutionPlanner(FakeLexicon({}), merge='always').plan(' '.join(['word'] * 500), "Compare these").merge
+    assert not ExecutionPlanner(FakeLexicon({})).plan(' '.join(['word'] * 500), "Who?").merge
+    with pytest.raises(ValueError):
+        ExecutionPlanner(merge='sometimes')
@@ -0,0 +1,115 @@
+"""
+Unit tests for the template-driven training data engine.
+"""
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.testing import fake_db
+from src.utils.training_data_engine import (
+    HashIndex, QuestionTemplate, Source, TrainingDataEngine, as_text, expand, load_templates, render
+)
+
+VERSES = [
+    ('Genesis', 1, 1, 'In the beginning God created the heaven and the earth.', 'KJV'),
+    ('Genesis', 1, 2, 'And the earth was without form, and void.', 'KJV'),
+    ('John', 3, 16, 'For God so loved the world, that he gave his only begotten Son.', 'KJV'),
+    ('John', 3, 16, 'For God so loved the world,  that he gave his only begotten Son.', 'ASV'),
+]
+WORDS = [
+    ('Genesis', 1, 1, 'אֱלֹהִים', 'H430', 'HNcmpa', 'אֱלֹהִים', 'elohim', 'God', 'rulers, judges', 'Hebrew'),
+    ('Genesis', 1, 2, 'אֱלֹהִים', 'H430', 'HNcmpa', 'אֱלֹהִים', 'elohim', 'God', 'rulers, judges', 'Hebrew'),
+    ('Genesis', 1, 1, 'בָּרָא', 'H1254', 'HVqp3ms', 'בָּרָא', 'bara', 'create', None, 'Hebrew'),
+]
+
+
+class FakeConnection(fake_db.FakeConnection):
+    def cursor(self, name=None, cursor_factory=None):
+        assert name, "the engine must use named cursors"
+        return super().cursor(name, cursor_factory)
+
+    def respond(self, cursor, sql, params):
+        if 'bible.verses' in sql:
+            columns, rows = ['book_name', 'chapter_num', 'verse_num', 'verse_text', 'translation_source'], VERSES
+        elif 'hebrew_ot_words' in sql:
+            columns = ['book_name', 'chapter_num', 'verse_num', 'word_text', 'strongs_id', 'grammar_code',
+                       'lemma', 'transliteration', 'gloss', 'definition', 'language']
+            rows = WORDS
+        else:
+            raise RuntimeError('relation does not exist')
+        cursor.description = [(c, None, None, None, None, None, None) for c in columns]
+        return rows
+
+
+def test_templates_expand_vectorized():
+    frame = pd.DataFrame({'name': ['Moses', 'Aaron', None], 'form': ['מֹשֶׁה', '', 'x']})
+    template = QuestionTemplate('t', 'name', "Who is {name}?", "{form}", context="{name} ({form})")
+    assert list(render("Who is {name}?", as_text(frame))) == ['Who is Moses?', 'Who is Aaron?', 'Who is ?']
+    examples = expand(template, frame)
+    assert list(examples['question']) == ['Who is Moses?']
+    assert examples.loc[0, 'context'] == 'Moses (מֹשֶׁה)' and examples.loc[0, 'template'] == 't'
+    with pytest.raises(KeyError):
+        expand(QuestionTemplate('bad', 'name', "{missing}?", "x"), frame)
+    with pytest.raises(ValueError):
+        QuestionTemplate('bad', 'poem', "q", "a")
+
+
+def test_hash_index_tracks_new_hashes():
+    index = HashIndex()
+    rng = np.random.default_rng(0)
+    seen = set()
+    for _ in range(20):
+        batch = rng.integers(0, 500, size=64).astype(np.uint64)
+        new = index.add_new(batch)
+        expected = []
+        for h in batch.tolist():
+            expected.append(h not in seen)
+            seen.add(h)
+        assert new.tolist() == expected
+    assert len(index) == len(seen) and len(index._runs) <= 10
+
+
+def test_engine_streams_sources_and_deduplicates():
+    conn = FakeConnection()
+    sources = [s for s in TrainingDataEngine().sources if s.name in ('verses', 'hebrew_words')]
+    sources.append(Source('missing', 'name', 'SELECT * FROM bible.proper_names'))
+    engine = TrainingDataEngine(sources=sources, batch_size=2)
+    out = io.StringIO()
+    stats = engine.write_jsonl(conn, out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    questions = [r['question'] for r in records]
+    assert "Who created the heavens and the earth?" in questions
+    assert questions.count("What did God give because of his love for the world?") == 1
+    # The ASV copy of John 3:16 differs only in whitespace
+    assert sum(q.startswith('Which verse says') and 'only begotten' in q for q in questions) == 1
+    assert questions.count("What is the meaning of the Hebrew word 'elohim'?") == 1
+    assert sum(q.startswith("What is the Strong's number") for q in questions) == 3
+    assert not any('H1254 (bara)' in q for q in questions)  # no definition to answer with
+
+    creation = records[questions.index("Who created the heavens and the earth?")]
+    assert creation['answer'] == 'God'
+    assert creation['metadata'] == {'book': 'Genesis', 'chapter': 1, 'verse': 1, 'translation': 'KJV',
+                                    'type': 'factual', 'template': 'creation_who'}
+    assert stats['rows'] == 7 and stats['examples'] == len(records)
+    assert stats['duplicates'] > 0 and stats['failed_sources'] == ['missing']
+    assert conn.fetches == 6 and conn.rollbacks == 1
+    assert conn.closed_cursors == ['training_verses', 'training_hebrew_words', 'training_missing']
+
+
+def test_limits_and_template_files(tmp_path):
+    engine = TrainingDataEngine(sources=TrainingDataEngine().sources[:1], max_per_template=1)
+    records = list(engine.iter_examples(FakeConnection()))
+    assert engine.stats['per_template']['verse_text'] == 1
+    assert len(list(TrainingDataEngine(sources=engine.sources).iter_examples(FakeConnection(), limit=3))) == 3
+
+    path = tmp_path / 'templates.json'
+    path.write_text(json.dumps({'verse': [{'name': 'book', 'question': "Which book contains {reference}?",
+                                           'answer': "{book_name}", 'dedup_on': ['question']}]}))
+    templates = load_templates(str(path))
+    records = list(TrainingDataEngine(templates, sources=engine.sources).iter_examples(FakeConnection()))
+    assert [r['answer'] for r in records] == ['Genesis', 'Genesis', 'John']
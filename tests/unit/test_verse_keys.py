@@ -0,0 +1,37 @@
+"""
+Unit tests for verse_key helpers.
+"""
+
+from src.utils.reference_engine import book_aliases, book_key, resolve_book
+from src.utils.verse_keys import verse_key, reference_key_ranges, key_range_condition
+
+def test_verse_key_accepts_any_book_spelling():
+    """Full names, STEP abbreviations and aliases give the same key."""
+    assert verse_key("Genesis", 1, 1) == verse_key("Gen", 1, 1) == 1001001
+    assert verse_key("1 John", 1, 9) == verse_key("1Jn", "1", "9") == 62001009
+    assert verse_key("Tobit", 1, 1) is None
+
+def test_reference_key_ranges_merge_and_sort():
+    """Ranges from several references are merged into minimal scans."""
+    ranges = reference_key_ranges(["John 3:16-18", "John 3:17-20", "Gen 1:1", "not a ref"])
+    assert ranges == [(1001001, 1001001), (43003016, 43003020)]
+
+    # Adjacent verses collapse into a single range
+    assert reference_key_ranges(["Rom 8:28, 29-30"]) == [(45008028, 45008030)]
+
+    # Whole chapters cover every verse of the chapter
+    assert reference_key_ranges(["Psalm 23"]) == [(19023001, 19023999)]
+
+def test_key_range_condition():
+    """Single keys use equality and ranges use BETWEEN."""
+    sql, params = key_range_condition("v.verse_key", [(1001001, 1001001), (43003016, 43003020)])
+    assert sql == "(v.verse_key = %s OR v.verse_key BETWEEN %s AND %s)"
+    assert params == [1001001, 43003016, 43003020]
+    assert key_range_condition("verse_key", []) == ("FALSE", [])
+
+
+def test_book_aliases_cover_engine_spellings():
+    """The alias table the trigger falls back on resolves like the engine."""
+    aliases = book_aliases()
+    for spelling in ("Genesis", "Gen", "I John", "1 Jn", "Song of Songs", "Jhn"):
+        assert aliases[book_key(spelling)] == resolve_book(spelling)
@@ -8,9 +8,11 @@ This script implements:
 3. MLflow tracking for experiments
 4. Integration with LM Studio for local model inference
 5. Theological assertions for accuracy validation
+6. Concurrent, cached optimizer sweeps under an LM call budget (--sweep)
 
 Usage:
     python train_dspy_bible_qa.py --optimizer grpo --train-pct 0.8 --model "google/flan-t5-small"
+    python train_dspy_bible_qa.py --sweep bootstrap,miprov2,simba --lm-budget 3000
 """
 
 import os
@@ -84,6 +86,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import database utilities, etc.
 from src.utils.logging_utils import setup_logger
 from src.dspy_programs.bible_qa import BibleQA
+from src.utils.eval_harness import DEFAULT_WORKERS as EVAL_WORKERS, evaluate
+from src.utils.answer_metrics import score_answers
+from src.utils.jsonl_store import JsonlDataset
+from src.utils.optimizer_search import (
+    DEFAULT_BUDGET as OPTIMIZER_LM_BUDGET, DEFAULT_CACHE_PATH as OPTIMIZER_LM_CACHE,
+    DEFAULT_WORKERS as OPTIMIZER_WORKERS, OptimizerSearch, sweep_configs
+)
+from src.utils.lm_client import LMClient, LMClientError, PromptPrefix
 
 # Setup logging
 logger = setup_logger("DSPyTraining", "logs/dspy_training.log")
@@ -175,6 +185,37 @@ def parse_args():
         default=8,
         help="Maximum number of demos to use in optimization"
     )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default="",
+        help="Comma-separated optimizers (e.g. bootstrap,miprov2,simba) whose configurations are "
+             "searched concurrently instead of running --optimizer once"
+    )
+    parser.add_argument(
+        "--lm-budget",
+        type=int,
+        default=OPTIMIZER_LM_BUDGET,
+        help="LM calls allowed for the whole sweep (cache hits are free; 0 for unlimited)"
+    )
+    parser.add_argument(
+        "--lm-cache",
+        type=str,
+        default=OPTIMIZER_LM_CACHE,
+        help="Persistent LM call cache shared by sweeps, configurations and optimizers"
+    )
+    parser.add_argument(
+        "--sweep-workers",
+        type=int,
+        default=OPTIMIZER_WORKERS,
+        help="Optimizer tracks run concurrently during a sweep"
+    )
+    parser.add_argument(
+        "--sweep-results",
+        type=str,
+        default="logs/eval/optimizer_sweep.jsonl",
+        help="Append-only file of per-configuration scores and costs"
+    )
     
     # MLflow configuration
     parser.add_argument(
@@ -198,10 +239,29 @@ def parse_args():
         help="Directory to save the trained model"
     )
     
+    # Evaluation configuration
+    parser.add_argument(
+        "--eval-workers",
+        type=int,
+        default=EVAL_WORKERS,
+        help="Concurrent predictions during evaluation"
+    )
+    parser.add_argument(
+        "--eval-results",
+        type=str,
+        default="logs/eval/bible_qa_eval_results.jsonl",
+        help="Append-only file of evaluation predictions; reruns of the same model skip finished examples"
+    )
+    
     return parser.parse_args()
 
 def load_data(data_dir: str, train_pct: float = 0.8, args=None):
-    """Load training data from JSONL files with conversation history support."""
+    """
+    Load training data from JSONL files with conversation history support.
+    
+    Split files are returned as indexed JsonlDatasets, so records are parsed
+    only when a subset (e.g. ``val_data[:100]``) or example is used.
+    """
     # Check for integrated data if requested
     if args and args.use_integrated_data:
         integrated_dir = Path("data/processed/dspy_training_data/bible_corpus/integrated")
@@ -211,19 +271,9 @@ def load_data(data_dir: str, train_pct: float = 0.8, args=None):
         if train_path.exists() and val_path.exists():
             logger.info(f"Loading integrated dataset from {train_path} and {val_path}")
             
-            train_data = []
-            with open(train_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('//'):
-                        train_data.append(json.loads(line))
+            train_data = JsonlDataset(train_path)
             
-            val_data = []
-            with open(val_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('//'):
-                        val_data.append(json.loads(line))
+            val_data = JsonlDataset(val_path)
             
             logger.info(f"Loaded {len(train_data)} training examples and {len(val_data)} validation examples from integrated dataset")
             return train_data, val_data
@@ -236,19 +286,9 @@ def load_data(data_dir: str, train_pct: float = 0.8, args=None):
     if train_path.exists() and val_path.exists():
         logger.info(f"Loading from split files: {train_path} and {val_path}")
         
-        train_data = []
-        with open(train_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('//'):
-                    train_data.append(json.loads(line))
+        train_data = JsonlDataset(train_path)
         
-        val_data = []
-        with open(val_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('//'):
-                    val_data.append(json.loads(line))
+        val_data = JsonlDataset(val_path)
                     
         logger.info(f"Loaded {len(train_data)} training examples and {len(val_data)} validation examples")
     else:
@@ -264,13 +304,8 @@ def load_data(data_dir: str, train_pct: float = 0.8, args=None):
         logger.info(f"Loading from combined file: {combined_path}")
         
         # Load the data
-        all_data = []
         if combined_path.suffix == ".jsonl":
-            with open(combined_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('//'):
-                        all_data.append(json.loads(line))
+            all_data = list(JsonlDataset(combined_path))
         else:  # .json
             with open(combined_path, 'r', encoding='utf-8') as f:
                 all_data = json.load(f)
@@ -517,50 +552,88 @@ def configure_optimizer(optimizer_name: str, max_demos: int = 8):
             logger.error("No valid optimizer could be loaded")
             raise
 
-def evaluate_model(model, eval_data):
+def evaluate_model(model, eval_data, results_path=None, workers=None):
     """
     Evaluate the model on the validation data.
     
+    Predictions run in parallel and are checkpointed to ``results_path``, so
+    rerunning the same model resumes where the last run stopped.
+    
     Args:
         model: Trained DSPy model
-        eval_data: Validation dataset
+        eval_data: Validation dataset (dicts or dspy.Examples)
+        results_path: JSONL file of per-example predictions (default: in memory only)
+        workers: Concurrent predictions (default: EVAL_WORKERS)
         
     Returns:
-        dict: Evaluation metrics
+        dict: Evaluation metrics, overall and as ``<metric>/<category>``
     """
-    metrics = {}
-    correct = 0
-    total = 0
+    report = evaluate(
+        model, eval_data,
+        results_path=results_path,
+        workers=workers or EVAL_WORKERS
+    )
     
-    for example in eval_data:
-        try:
-            # Make prediction
-            prediction = model(
-                context=example.context,
-                question=example.question,
-                history=example.history
-            )
-            
-            # Check for some key words in both prediction and expected answer
-            pred_words = set(prediction.answer.lower().split())
-            expected_words = set(example.answer.lower().split())
-            
-            # Calculate word overlap
-            overlap = len(pred_words.intersection(expected_words))
-            
-            # Count as correct if there's significant overlap
-            if overlap > 0 and overlap / len(expected_words) > 0.3:
-                correct += 1
-                
-            total += 1
-            
-        except Exception as e:
-            logger.error(f"Error evaluating example: {e}")
+    for category, summary in report.by_category.items():
+        logger.info(f"  {category}: {summary.get('accuracy', 0):.3f} accuracy over {summary['count']} examples")
+    logger.info(f"Evaluation: {report.predicted} predicted, {report.reused} reused; metrics: {report.metrics}")
     
-    if total > 0:
-        metrics["accuracy"] = correct / total
-        
-    return metrics
+    return report.flat()
+
+def to_dspy_examples(data):
+    """dspy.Examples with context, question and history as inputs."""
+    return [
+        dspy.Example(
+            context=example.get("context", ""),
+            question=example.get("question", ""),
+            history=example.get("history") or [],
+            answer=example.get("answer", "")
+        ).with_inputs("context", "question", "history")
+        for example in data
+    ]
+
+def bible_qa_metric(example, prediction, trace=None):
+    """DSPy metric: whether the predicted answer matches the expected one."""
+    return evaluate_answers(getattr(prediction, "answer", ""), example.answer)
+
+def run_optimizer_sweep(args, model, train_data, val_data):
+    """
+    Compile ``model`` with every configuration of the ``--sweep`` optimizers
+    and return the best program on the validation subset.
+    
+    Configurations run concurrently under the ``--lm-budget`` call budget,
+    and all LM calls go through the persistent ``--lm-cache``, so repeated
+    sweeps mostly reuse earlier completions. Each configuration's score and
+    cost are logged to MLflow and appended to ``--sweep-results``.
+    """
+    search = OptimizerSearch(
+        dspy.settings.lm, model.deepcopy,
+        trainset=to_dspy_examples(train_data[:500]),  # Use subset for efficiency
+        devset=to_dspy_examples(val_data[:100]),
+        metric=bible_qa_metric,
+        cache=args.lm_cache,
+        budget=args.lm_budget,
+        workers=args.sweep_workers,
+        results_path=args.sweep_results,
+        eval_workers=args.eval_workers
+    )
+    search.run(sweep_configs(name.strip() for name in args.sweep.split(",") if name.strip()))
+    
+    for result in search.results:
+        prefix = "sweep/" + re.sub(r"[^\w./ -]+", "_", result.config.name)
+        metrics = {name: value for name, value in result.cost.items() if isinstance(value, (int, float))}
+        if result.score is not None:
+            metrics["score"] = result.score
+        mlflow.log_metrics({f"{prefix}/{name}": value for name, value in metrics.items()})
+    
+    summary = search.summary()
+    logger.info(f"Optimizer sweep: {summary}")
+    mlflow.log_metrics({f"sweep_{name}": value for name, value in summary.items()
+                        if isinstance(value, (int, float)) and not isinstance(value, bool)})
+    if search.best is None:
+        raise RuntimeError("No sweep configuration completed")
+    mlflow.set_tag("sweep_best", search.best.config.name)
+    return search.best.program
 
 def create_run_name(args):
     """Create a unique run name for MLflow."""
@@ -694,202 +767,91 @@ def test_lm_studio_api_directly(api_base, model):
         logger.error(f"Error testing LM Studio API directly: {str(e)}")
         return False
 
+SCHOLAR_SYSTEM_PROMPT = "You are a biblical scholar assistant. Answer questions accurately based on the provided biblical context."
+
+class LMStudioResponse:
+    """Response object similar to what a DSPy module would return."""
+    def __init__(self, answer):
+        self.answer = answer
+
 class CustomLMStudioModule:
     """
     Custom implementation of a DSPy module that uses direct API requests
     to LM Studio instead of relying on LiteLLM.
+    
+    Requests go through a pooled LMClient (keep-alive connections, bounded
+    concurrency, retries, latency/TTFT metrics in ``self.client.metrics``).
+    The system prompt and rendered history are reused across calls via
+    PromptPrefix. ``stream()`` yields the answer as it is generated.
     """
     
-    def __init__(self, api_base, model_name, model_format="chat"):
+    def __init__(self, api_base, model_name, model_format="chat", client: Optional[LMClient] = None):
         self.api_base = api_base
         self.model_name = model_name
         self.model_format = model_format
+        self.client = client or LMClient(api_url=api_base, model=model_name, timeout=60)
+        self.prefix = PromptPrefix(SCHOLAR_SYSTEM_PROMPT)
     
     def __call__(self, context, question, history=None):
         """Call the module with the given inputs."""
         if history is None:
             history = []
         
-        if self.model_format == "chat":
-            return self._call_chat_model(context, question, history)
-        elif self.model_format == "instruct":
-            return self._call_instruct_model(context, question, history)
-        else:
-            return self._call_completion_model(context, question, history)
-    
-    def _call_chat_model(self, context, question, history):
-        """Call a chat model using the chat completions API."""
-        # Construct messages for the chat API
-        messages = [
-            {"role": "system", "content": "You are a biblical scholar assistant. Answer questions accurately based on the provided biblical context."},
-        ]
-        
-        # Add history to the messages
-        for h in history:
-            messages.append({"role": "user", "content": h.get("question", "")})
-            messages.append({"role": "assistant", "content": h.get("answer", "")})
-        
-        # Format the final user message with context and question
-        final_prompt = f"Context: {context}\n\nQuestion: {question}\n\nAnswer the question in a comprehensive and scholarly manner using the provided context."
-        messages.append({"role": "user", "content": final_prompt})
-        
-        # Create the request payload
-        payload = {
-            "model": self.model_name,
-            "messages": messages,
-            "temperature": 0.3,  # Lower temperature for more deterministic outputs
-            "max_tokens": 1024,
-            "stream": False
-        }
-        
-        # Make the request
         try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers={"Content-Type": "application/json"},
-                json=payload,
-                timeout=60  # 1 minute timeout
-            )
-            
-            if response.status_code == 200:
-                response_json = response.json()
-                
-                if 'choices' in response_json and len(response_json['choices']) > 0:
-                    answer = response_json['choices'][0]['message']['content']
-                    
-                    # Create a response object similar to what a DSPy module would return
-                    class Response:
-                        def __init__(self, answer):
-                            self.answer = answer
-                    
-                    return Response(answer)
-                else:
-                    logger.error("No choices in API response")
-                    return Response("Error: No answer generated")
+            if self.model_format == "chat":
+                answer = self.client.chat(self._chat_messages(context, question, history),
+                                          max_tokens=1024, temperature=0.3, use_cache=False)
             else:
-                logger.error(f"API request failed: {response.status_code} - {response.text}")
-                return Response(f"Error: API request failed with status {response.status_code}")
-                
-        except Exception as e:
+                answer = self.client.complete(self._text_prompt(context, question, history),
+                                              max_tokens=1024, temperature=0.3, use_cache=False)
+        except LMClientError as e:
             logger.error(f"Error calling LM Studio API: {str(e)}")
-            return Response(f"Error: {str(e)}")
-    
-    def _call_instruct_model(self, context, question, history):
-        """Call an instruction-tuned model using the completions API."""
-        # Format prompt for instruction models
-        history_text = ""
-        if history:
-            for h in history:
-                history_text += f"Q: {h.get('question', '')}\nA: {h.get('answer', '')}\n\n"
-        
-        prompt = f"[INST] <<SYS>>\nYou are a biblical scholar assistant. Answer questions accurately based on the provided biblical context.\n<</SYS>>\n\n"
-        prompt += f"Context: {context}\n\n"
-        
-        if history_text:
-            prompt += f"Previous conversation:\n{history_text}\n"
-        
-        prompt += f"Question: {question}\n\nAnswer the question in a comprehensive and scholarly manner using the provided context. [/INST]"
-        
-        # Create the request payload
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "temperature": 0.3,
-            "max_tokens": 1024,
-            "stream": False
-        }
+            return LMStudioResponse(f"Error: {str(e)}")
         
-        # Make the request
-        try:
-            response = requests.post(
-                f"{self.api_base}/completions",
-                headers={"Content-Type": "application/json"},
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                response_json = response.json()
-                
-                if 'choices' in response_json and len(response_json['choices']) > 0:
-                    answer = response_json['choices'][0]['text']
-                    
-                    class Response:
-                        def __init__(self, answer):
-                            self.answer = answer
-                    
-                    return Response(answer)
-                else:
-                    logger.error("No choices in API response")
-                    return Response("Error: No answer generated")
-            else:
-                logger.error(f"API request failed: {response.status_code} - {response.text}")
-                return Response(f"Error: API request failed with status {response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"Error calling LM Studio API: {str(e)}")
-            return Response(f"Error: {str(e)}")
+        if not answer:
+            logger.error("No choices in API response")
+            return LMStudioResponse("Error: No answer generated")
+        return LMStudioResponse(answer)
     
-    def _call_completion_model(self, context, question, history):
-        """Call a standard completion model."""
-        # Format prompt for completion models
-        history_text = ""
-        if history:
-            for h in history:
-                history_text += f"Q: {h.get('question', '')}\nA: {h.get('answer', '')}\n\n"
-        
-        prompt = "You are a biblical scholar assistant. Answer questions accurately based on the provided biblical context.\n\n"
+    def stream(self, context, question, history=None):
+        """Yield the answer text as the model generates it."""
+        if self.model_format == "chat":
+            return self.client.stream_chat(self._chat_messages(context, question, history or []),
+                                           max_tokens=1024, temperature=0.3)
+        return self.client.stream_complete(self._text_prompt(context, question, history or []),
+                                           max_tokens=1024, temperature=0.3)
+    
+    def _chat_messages(self, context, question, history):
+        """System prompt, history turns and the final user message for the chat API."""
+        messages = self.prefix.messages(history)
+        final_prompt = f"Context: {context}\n\nQuestion: {question}\n\nAnswer the question in a comprehensive and scholarly manner using the provided context."
+        messages.append({"role": "user", "content": final_prompt})
+        return messages
+    
+    def _text_prompt(self, context, question, history):
+        """Prompt for the completions API, in instruct ([INST]) or plain completion format."""
+        history_text = self.prefix.history_text(history)
+        if self.model_format == "instruct":
+            prompt = f"[INST] <<SYS>>\n{self.prefix.system}\n<</SYS>>\n\n"
+        else:
+            prompt = f"{self.prefix.system}\n\n"
         prompt += f"Context: {context}\n\n"
         
         if history_text:
             prompt += f"Previous conversation:\n{history_text}\n"
         
-        prompt += f"Question: {question}\n\nAnswer:"
-        
-        # Create the request payload
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "temperature": 0.3,
-            "max_tokens": 1024,
-            "stream": False
-        }
-        
-        # Make the request
-        try:
-            response = requests.post(
-                f"{self.api_base}/completions",
-                headers={"Content-Type": "application/json"},
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                response_json = response.json()
-                
-                if 'choices' in response_json and len(response_json['choices']) > 0:
-                    answer = response_json['choices'][0]['text']
-                    
-                    class Response:
-                        def __init__(self, answer):
-                            self.answer = answer
-                    
-                    return Response(answer)
-                else:
-                    logger.error("No choices in API response")
-                    return Response("Error: No answer generated")
-            else:
-                logger.error(f"API request failed: {response.status_code} - {response.text}")
-                return Response(f"Error: API request failed with status {response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"Error calling LM Studio API: {str(e)}")
-            return Response(f"Error: {str(e)}")
+        if self.model_format == "instruct":
+            prompt += f"Question: {question}\n\nAnswer the question in a comprehensive and scholarly manner using the provided context. [/INST]"
+        else:
+            prompt += f"Question: {question}\n\nAnswer:"
+        return prompt
 
 def evaluate_answers(result_answer, expected_answer):
     """
     Evaluate if a model answer matches the expected answer.
-    Uses a more flexible comparison than exact match.
+    Uses the shared accept rule of src.utils.answer_metrics: the normalised
+    expected answer appears in the model answer, or enough of their distinct
+    tokens overlap.
     
     Args:
         result_answer: The answer from the model
@@ -898,99 +860,8 @@ def evaluate_answers(result_answer, expected_answer):
     Returns:
         bool: True if the answer is correct, False otherwise
     """
-    if not result_answer or not expected_answer:
-        return False
-    
-    # Convert to lowercase for case-insensitive comparison
-    result_lower = result_answer.lower()
-    expected_lower = expected_answer.lower()
-    
-    # Check for exact match first
-    if expected_lower in result_lower:
-        logger.info("Exact match found")
-        return True
-    
-    # For Mark 12:29, check if the answer contains the key verse content
-    if "mark 12:29" in expected_lower or "what does mark 12:29 say" in expected_lower:
-        # Check for the verse content
-        if "hear, o israel" in result_lower and "the lord our god" in result_lower:
-            logger.info("Special case match for Mark 12:29")
-            return True
-    
-    # For 1 Corinthians 13:13, check if we mention love being the greatest
-    if "1 corinthians 13:13" in expected_lower and "supremacy of love" in expected_lower:
-        if ("greatest" in result_lower and "love" in result_lower) or \
-           ("supreme" in result_lower and "love" in result_lower) or \
-           ("primacy of love" in result_lower):
-            logger.info("Special case match for 1 Corinthians 13:13")
-            return True
-    
-    # For covenant, check if we have the key concept
-    if "covenant" in expected_lower and "binding agreement" in expected_lower:
-        if "covenant" in result_lower and ("agreement" in result_lower or "binding" in result_lower):
-            logger.info("Special case match for covenant")
-            return True
-    
-    # Extract key nouns and concepts from expected answer
-    key_concepts = set()
-    expected_words = expected_lower.split()
-    
-    # Important theological terms to look for
-    theological_terms = [
-        "god", "jesus", "christ", "holy spirit", "faith", "hope", "love", "charity",
-        "covenant", "salvation", "grace", "mercy", "sin", "forgiveness", "heaven", "hell",
-        "resurrection", "commandment", "law", "gospel", "prophet", "apostle", "scripture",
-        "bible", "testament", "creation", "judgment", "kingdom", "church", "worship",
-        "prayer", "righteousness", "eternal life", "salvation", "sacrifice", "redeem",
-        "baptism", "communion", "eucharist", "lord", "savior", "messiah", "trinity",
-        "binding", "agreement", "promise", "beginning", "reshith", "pistis", "trust", "confidence"
-    ]
-    
-    # Extract these terms from the expected answer
-    for term in theological_terms:
-        if term in expected_lower:
-            key_concepts.add(term)
-    
-    # Add other important nouns and adjectives
-    for word in expected_words:
-        if len(word) > 3 and word not in ["the", "and", "but", "for", "with", "that", "this", "from", "have", "will"]:
-            key_concepts.add(word)
-    
-    # Extract key phrases from the expected answer
-    key_phrases = []
-    # Split by comma, period, semicolon
-    for phrase in re.split(r'[,;.]', expected_lower):
-        phrase = phrase.strip()
-        if len(phrase) > 5:  # Only consider substantial phrases
-            key_phrases.append(phrase)
-    
-    # Check if at least 70% of key concepts are in the result
-    if not key_concepts:
-        return False
-    
-    concept_matches = 0
-    for concept in key_concepts:
-        if concept in result_lower:
-            concept_matches += 1
-    
-    # Check if at least 60% of key phrases are in the result
-    phrase_matches = 0
-    for phrase in key_phrases:
-        if phrase in result_lower:
-            phrase_matches += 1
-    
-    # Calculate concept match percentage
-    concept_match_percentage = concept_matches / len(key_concepts) if len(key_concepts) > 0 else 0
-    
-    # Calculate phrase match percentage
-    phrase_match_percentage = phrase_matches / len(key_phrases) if len(key_phrases) > 0 else 0
-    
-    # Compute a weighted average of both metrics
-    match_score = 0.7 * concept_match_percentage + 0.3 * phrase_match_percentage
-    
-    logger.info(f"Match score: {match_score:.2f} (concept: {concept_match_percentage:.2f}, phrase: {phrase_match_percentage:.2f})")
-    
-    return match_score >= 0.45  # Lower the threshold to 45%
+    scores = score_answers([result_answer or ""], [expected_answer or ""], strongs=[None])
+    return bool(scores["correct"][0])
 
 def main():
     """Main function to train a Bible QA model with DSPy and MLflow."""
@@ -1014,6 +885,8 @@ def main():
             "model": args.model,
             "optimizer": args.optimizer,
             "max_demos": args.max_demos,
+            "sweep": args.sweep,
+            "lm_budget": args.lm_budget,
             "train_pct": args.train_pct,
             "data_dir": args.data_dir,
             "use_integrated_data": args.use_integrated_data,
@@ -1053,13 +926,13 @@ def main():
             logger.info("Creating standard BibleQAModule")
             model = BibleQAModule()
         
-        # Configure optimizer
-        optimizer = configure_optimizer(args.optimizer, args.max_demos)
+        # Configure optimizer; a sweep builds its own for every configuration
+        optimizer = None if args.sweep else configure_optimizer(args.optimizer, args.max_demos)
         
-        if not optimizer:
+        if not optimizer and not args.sweep:
             logger.info("Skipping optimization as requested")
             # Evaluate unoptimized model
-            metrics = evaluate_model(model, val_data)
+            metrics = evaluate_model(model, val_data, args.eval_results, args.eval_workers)
             
             # Log metrics
             for metric_name, metric_value in metrics.items():
@@ -1072,10 +945,16 @@ def main():
             return
         
         # Train/optimize the model
-        logger.info(f"Training model with {args.optimizer} optimizer")
+        if args.sweep:
+            logger.info(f"Training model with an optimizer sweep over {args.sweep}")
+        else:
+            logger.info(f"Training model with {args.optimizer} optimizer")
         
         try:
-            if args.optimizer == "bootstrap":
+            if args.sweep:
+                # Search optimizer configurations concurrently, sharing the LM call cache
+                optimized_model = run_optimizer_sweep(args, model, train_data, val_data)
+            elif args.optimizer == "bootstrap":
                 # Configure bootstrap optimizer with train data
                 optimizer = configure_bootstrap_optimizer(train_data)
                 
@@ -1093,7 +972,7 @@ def main():
                 optimized_model = compiled_model
             
             # Evaluate the optimized model
-            metrics = evaluate_model(optimized_model, val_data)
+            metrics = evaluate_model(optimized_model, val_data, args.eval_results, args.eval_workers)
             
             # Log metrics
             for metric_name, metric_value in metrics.items():
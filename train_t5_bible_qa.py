@@ -14,7 +14,6 @@ import logging
 import argparse
 from pathlib import Path
 from datetime import datetime
-import random
 from typing import List, Dict, Any, Tuple
 import numpy as np
 
@@ -23,6 +22,8 @@ import dspy
 import mlflow
 from dotenv import load_dotenv
 
+from src.utils.near_duplicates import NearDuplicateIndex, split_by_group
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -133,48 +134,42 @@ def augment_dataset(data: List[Dict[str, Any]], augmentation_factor: int = 2) ->
 
 def split_dataset(data: List[Dict[str, Any]], train_pct: float = 0.7, dev_pct: float = 0.15, 
                  stratify_by_book: bool = True) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """Split dataset into train, dev, and test sets with improved stratification."""
-    # Set random seed for reproducibility
-    random.seed(42)
+    """
+    Split dataset into train, dev, and test sets with improved stratification.
+    
+    Near-duplicates (including the prompt variants made by augment_dataset)
+    are grouped first and every group goes to a single split, so dev and test
+    never contain paraphrases of training examples.
+    """
+    ratios = {"train": train_pct, "dev": dev_pct, "test": max(0.0, 1.0 - train_pct - dev_pct)}
+    index = NearDuplicateIndex()
+    groups = index.assign(data)
+    logger.info(f"Found {index.groups} near-duplicate groups in {len(data)} examples")
     
     if stratify_by_book and all("metadata" in ex and "book" in ex.get("metadata", {}) for ex in data):
-        # Group examples by book
+        # Group examples by book (a near-duplicate group follows its first member)
+        group_books = {}
         book_examples = {}
-        for ex in data:
-            book = ex["metadata"]["book"]
+        for ex, group in zip(data, groups):
+            book = group_books.setdefault(int(group), ex["metadata"]["book"])
             if book not in book_examples:
-                book_examples[book] = []
-            book_examples[book].append(ex)
+                book_examples[book] = ([], [])
+            book_examples[book][0].append(ex)
+            book_examples[book][1].append(group)
         
         # Create stratified splits
         train_data, dev_data, test_data = [], [], []
         
-        for book, examples in book_examples.items():
-            random.shuffle(examples)
-            n_examples = len(examples)
-            
-            # Calculate split indices
-            train_idx = int(n_examples * train_pct)
-            dev_idx = train_idx + int(n_examples * dev_pct)
-            
-            # Split data
-            train_data.extend(examples[:train_idx])
-            dev_data.extend(examples[train_idx:dev_idx])
-            test_data.extend(examples[dev_idx:])
+        for book, (examples, book_groups) in book_examples.items():
+            splits = split_by_group(examples, ratios, seed=42, groups=book_groups)
+            train_data.extend(splits["train"])
+            dev_data.extend(splits["dev"])
+            test_data.extend(splits["test"])
             
         logger.info(f"Created stratified splits by book: {len(train_data)} train, {len(dev_data)} dev, {len(test_data)} test")
     else:
-        # Shuffle the data
-        random.shuffle(data)
-        
-        # Calculate split points
-        train_size = int(len(data) * train_pct)
-        dev_size = int(len(data) * dev_pct)
-        
-        # Split the data
-        train_data = data[:train_size]
-        dev_data = data[train_size:train_size + dev_size]
-        test_data = data[train_size + dev_size:]
+        splits = split_by_group(data, ratios, seed=42, groups=groups)
+        train_data, dev_data, test_data = splits["train"], splits["dev"], splits["test"]
         
         logger.info(f"Split dataset into {len(train_data)} train, {len(dev_data)} dev, {len(test_data)} test examples")
     